@@ -1 +1,9 @@
-from . import agent
+import importlib
+
+
+def __getattr__(name: str):
+    # `agent` builds every agent, so it is only imported when first accessed
+    # (ADK's loader does so); `import learning_mate.<module>` stays cheap.
+    if name == "agent":
+        return importlib.import_module(".agent", __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,37 +1,30 @@
-import os
 from textwrap import dedent
 
-from google.adk.agents import Agent
-from google.adk.models.google_llm import Gemini
-from google.adk.tools import AgentTool
+from google.adk.apps import App
 from google.adk.tools import load_memory
 from google.adk.tools.load_artifacts_tool import load_artifacts_tool
 
 from .sub_agents import *
-from .utils import retry_config
+from .lesson_assembly import assemble_lesson
+from .tracing import TracingPlugin
+from .compaction import HistoryCompactionPlugin
+from .local_memory import MemoryIngestPlugin
+from .session_store import SessionFlushPlugin
+from .streaming import RelayingAgent, StreamingAgentTool
+from .resilience import DEFAULT_POLICY, ResilientGemini, TurnDeadlinePlugin
+from .scheduler import INTERACTIVE
 
 
-# Check if Google API key exists
-GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
-if not GOOGLE_API_KEY:
-    raise RuntimeError(
-        "Failed to create session: GOOGLE_API_KEY not found. "
-        "Please set the GOOGLE_API_KEY environment variable."
-    )
+# GOOGLE_API_KEY and TAVILY_API_KEY are checked on first use, by the models and the Tavily pool
 
-# Check if Tavily API key exists
-TAVILY_API_KEY = os.getenv("TAVILY_API_KEY")
-if not TAVILY_API_KEY:
-    raise RuntimeError(
-        "Failed to create MCP session: TAVILY_API_KEY not found. "
-        "Please set the TAVILY_API_KEY environment variable."
-    )
+# With SSE streaming, the text of the agents called as tools reaches the learner as it is generated
 
 
-teacher_agent = Agent(
-    model=Gemini(
+teacher_agent = RelayingAgent(
+    model=ResilientGemini(
         model="gemini-2.5-flash",
-        retry_options=retry_config
+        policy=DEFAULT_POLICY,
+        priority=INTERACTIVE,
     ),
     name="teacher_agent",
     description="A professional teacher, designing interactive course plans, guiding users conversationally, and using specialized tools for content and quizzes.",
@@ -49,12 +42,15 @@ teacher_agent = Agent(
         4.  **Media and Data Integration:**
           * Use the **`image_generation_agent`** strategically to produce illustrations that clarify or conceptually visualize complex topics (e.g., diagrams, metaphors, abstract concepts).
           * Use the **`web_search_agent`** to include up-to-date, highly relevant external information, official documentation, or essential source reference links.
+          * When a unit needs more than one of web research, an illustration, and a quiz, use **`assemble_lesson`** to prepare them all at once instead of calling those agents one after another. Teach with whatever it returns; if a material is listed in `failed`, continue without it and offer it again later.
           * Use **`load_memory`** to check historical progress, fetch personalized preferences, or retrieve necessary contextual data.
           * Use **`load_artifacts_tool`** to **retrieve any previously saved file or image artifact** that is needed for the current lesson, **especially when reusing content** (like a diagram generated earlier in the course).
         5.  **Evaluation Management:** At points specified by the curriculum plan:
-          * Delegate quiz generation to the **`quiz_generation_agent`**.
-          * Delegate assessment and scoring to the **`answer_evaluation_agent`**.
+          * Delegate quiz generation to the **`quiz_generation_agent`**. Present each question's `prompt` and `options` to the user, but **never reveal the `answer` key**.
+          * Delegate assessment and scoring to the **`answer_evaluation_agent`**, passing the quiz exactly as returned by the `quiz_generation_agent` (JSON, including the answer key) as `current_quiz`, and the user's answers labelled by question id.
           * **Enforce the score requirement** before proceeding past the evaluation gate.
+          * Use **`get_student_performance_summary`** to check the user's overall score, trend, and per-topic / per-difficulty results, and request an easier or harder quiz `difficulty` accordingly.
+          * When the user wants to revise, or when returning to the course after a break, ask the **`quiz_generation_agent`** for a review quiz with `review` set to true and the units covered so far as `reference_data`. Due questions are picked from the quiz bank at once; a new quiz is only written when too few are available.
         6.  **Course Conclusion:** After successfully completing all planned units and final evaluations, finish the course by providing a brief, encouraging conclusion and transferring control back to the root agent (smart friend).
 
         ## Constraints
@@ -66,19 +62,22 @@ teacher_agent = Agent(
     tools=[
         load_memory,
         load_artifacts_tool,
-        AgentTool(web_search_agent),
-        AgentTool(course_planning_agent),
-        AgentTool(image_generation_agent),
-        AgentTool(quiz_generation_agent),
-        AgentTool(answer_evaluation_agent),
+        get_student_performance_summary,
+        assemble_lesson,
+        StreamingAgentTool(web_search_agent),
+        StreamingAgentTool(course_planning_agent),
+        StreamingAgentTool(image_generation_agent),
+        StreamingAgentTool(quiz_generation_agent),
+        StreamingAgentTool(answer_evaluation_agent),
     ]
 )
 
 
-root_agent = Agent(
-    model=Gemini(
+root_agent = RelayingAgent(
+    model=ResilientGemini(
         model="gemini-2.5-flash",
-        retry_options=retry_config
+        policy=DEFAULT_POLICY,
+        priority=INTERACTIVE,
     ),
     name='smart_friend_agent',
     description="Agent that acts as the primary Learning Mate assistant, answering user questions and suggesting course creation via the teacher agent.",
@@ -106,10 +105,21 @@ root_agent = Agent(
         * **Tool Usage Focus:** The use of **`load_memory`** and **`LoadArtifactsTool`** must be strictly for **context retrieval** and personalization, not for core data processing or course logic and they shoul never be called on first run.
         """),
     sub_agents=[teacher_agent],
+    before_agent_callback=warm_up_web_search,
     tools=[
         load_memory,
         load_artifacts_tool,
-        AgentTool(image_generation_agent),
-        AgentTool(web_search_agent),
+        StreamingAgentTool(image_generation_agent),
+        StreamingAgentTool(web_search_agent),
     ],
 )
+
+
+# Served by `adk web` in place of root_agent; the plugins trace every call, bound each turn's duration
+# keep the prompt size of long courses bounded, add finished turns to the local memory index and
+# commit each turn's session events in one write
+app = App(
+    name="learning_mate",
+    root_agent=root_agent,
+    plugins=[TracingPlugin(), TurnDeadlinePlugin(), HistoryCompactionPlugin(), MemoryIngestPlugin(), SessionFlushPlugin()],
+)
@@ -0,0 +1,261 @@
+"""Keeps the prompt of long learning sessions within a token budget.
+
+A full course runs dozens of turns in one session, and ADK sends the whole
+history with every model call. `HistoryCompactionPlugin` rewrites each
+request before it is sent: the last few turns stay verbatim, bulky earlier
+lesson texts and tool results are archived as artifacts and replaced by a
+reference, and when that is not enough the earlier turns are replaced by a
+summary built from session state (course plan, units covered, mastery
+scores and the key points of each unit). The session itself is never
+modified, so the full history stays available to the UI and to memory.
+"""
+import os
+import json
+import hashlib
+from collections import Counter, deque
+
+import google.genai.types as types
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models.llm_request import LlmRequest
+from google.adk.plugins.base_plugin import BasePlugin
+
+from .performance import PerformanceTracker
+from .prefetch import match_unit, parse_plan_units, plan_fingerprint
+from .tracing import current_span
+
+
+# Estimated prompt tokens above which earlier turns are compacted
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "6000"))
+
+# Number of most recent user turns always sent verbatim
+HISTORY_KEEP_TURNS = int(os.getenv("HISTORY_KEEP_TURNS", "3"))
+
+# Earlier texts and tool results longer than this are archived as artifacts
+HISTORY_BULKY_CHARS = int(os.getenv("HISTORY_BULKY_CHARS", "2000"))
+
+PROGRESS_STATE_KEY = "course_progress"
+
+# Images are billed as a fixed number of tokens, whatever their size
+_IMAGE_CHARS = 258 * 4
+_MAX_NOTES_PER_UNIT = 5
+_MAX_ARCHIVED = 20
+
+
+def _part_chars(part: types.Part) -> int:
+    if part.text:
+        return len(part.text)
+    if part.function_call:
+        return len(part.function_call.name or "") + len(json.dumps(part.function_call.args or {}, default=str))
+    if part.function_response:
+        return len(part.function_response.name or "") + len(json.dumps(part.function_response.response or {}, default=str))
+    if part.inline_data:
+        return _IMAGE_CHARS
+    return 0
+
+
+def estimate_tokens(contents: list[types.Content]) -> int:
+    """Estimates the prompt tokens of `contents` at about four characters per token."""
+    return sum(_part_chars(part) for content in contents for part in content.parts or []) // 4
+
+
+def _text_of(content: types.Content) -> str:
+    return "\n".join(part.text for part in content.parts or [] if part.text)
+
+
+def _is_turn_start(content: types.Content) -> bool:
+    """True for a user message, as opposed to tool results sent back with the user role."""
+    return content.role == "user" and any(part.text for part in content.parts or [])
+
+
+def _headings(text: str) -> list[str]:
+    return [line.lstrip("#").strip() for line in text.splitlines() if line.startswith("#") and line.lstrip("#").strip()]
+
+
+def update_progress(state, earlier: list[types.Content]) -> dict:
+    """Summarizes the units covered in `earlier` turns into `course_progress` state.
+
+    Each earlier user message is matched to a unit of the course plan, and the
+    headings of the replies that followed are kept as that unit's key notes.
+    The summary is rebuilt when the course plan changes.
+    """
+    plan = state.get("course_plan")
+    progress = state.get(PROGRESS_STATE_KEY) or {}
+    if not plan:
+        return progress
+
+    fingerprint = plan_fingerprint(plan)
+    # Artifact names are content hashes, so what was saved stays saved when the plan changes
+    updated = {"plan": fingerprint, "position": None, "covered": [], "notes": {}, "archived": {}, "saved": list(progress.get("saved") or progress.get("archived") or [])}
+    if progress.get("plan") == fingerprint:
+        updated["archived"] = dict(progress.get("archived") or {})
+
+    units = parse_plan_units(plan)
+    unit = None
+    for content in earlier:
+        text = _text_of(content)
+        if _is_turn_start(content):
+            index = match_unit(units, text)
+            unit = units[index] if index is not None else None
+            if unit is not None:
+                if unit not in updated["covered"]:
+                    updated["covered"].append(unit)
+                updated["position"] = max(index, updated["position"] if updated["position"] is not None else index)
+        elif content.role == "model" and unit is not None:
+            notes = updated["notes"].setdefault(unit, [])
+            for heading in _headings(text):
+                if heading not in notes and len(notes) < _MAX_NOTES_PER_UNIT:
+                    notes.append(heading)
+
+    if updated != progress:
+        state[PROGRESS_STATE_KEY] = updated
+    return updated
+
+
+def build_summary(state, progress: dict) -> str:
+    """Renders the compact stand-in for the earlier turns of the session."""
+    lines = ["[Earlier conversation, compacted to save context. Rely on this summary for what came before.]"]
+
+    plan = state.get("course_plan")
+    if plan:
+        lines += ["", "## Course plan", plan.strip()]
+        units = parse_plan_units(plan)
+        if progress.get("covered"):
+            lines += ["", "## Progress", f"Units covered so far: {', '.join(progress['covered'])}."]
+            if progress.get("position") is not None and progress["position"] < len(units):
+                lines.append(f"Furthest unit reached: {units[progress['position']]}.")
+            for unit, notes in progress.get("notes", {}).items():
+                if notes:
+                    lines.append(f"- {unit}: {'; '.join(notes)}")
+
+    tracker = PerformanceTracker.from_state(state)
+    if tracker.quizzes:
+        summary = tracker.summary()
+        lines += ["", "## Mastery", f"Overall {summary['overall_percentage']}% over {summary['quizzes_taken']} quizzes (trend {summary['trend_percentage']}%)."]
+        lines += [f"- {topic}: last {result['last']}%, trend {result['trend']}%" for topic, result in summary["by_topic"].items()]
+
+    if progress.get("archived"):
+        lines += ["", "## Archived content", "Earlier lesson material saved as artifacts; load them with `load_artifacts` when needed:"]
+        lines += [f"- {name}: {label}" for name, label in progress["archived"].items()]
+    return "\n".join(lines)
+
+
+class HistoryCompactionPlugin(BasePlugin):
+    """Bounds the size of every model request, however long the session gets.
+
+    Requests under `token_budget` are sent unchanged. Above it, bulky parts
+    of the turns before the last `keep_turns` are archived and referenced,
+    then, if still over budget, those turns are replaced by a summary.
+    """
+
+    def __init__(
+        self,
+        token_budget: int = HISTORY_TOKEN_BUDGET,
+        keep_turns: int = HISTORY_KEEP_TURNS,
+        bulky_chars: int = HISTORY_BULKY_CHARS,
+    ):
+        super().__init__(name="history_compaction")
+        self.token_budget = token_budget
+        self.keep_turns = keep_turns
+        self.bulky_chars = bulky_chars
+        self.counters = Counter()
+        self.tokens_before = deque(maxlen=1000)
+        self.tokens_after = deque(maxlen=1000)
+
+    async def _archive(self, callback_context: CallbackContext, progress: dict, text: str, label: str) -> str | None:
+        """Saves `text` as a session artifact once and returns its name (None without an artifact store).
+
+        `saved` records every artifact written, so a part is never saved twice;
+        `archived` only keeps the labels of the latest `_MAX_ARCHIVED` for the summary.
+        """
+        name = f"history_{hashlib.sha256(text.encode('utf-8')).hexdigest()[:12]}.md"
+        saved = progress.setdefault("saved", [])
+        if name not in saved:
+            if callback_context._invocation_context.artifact_service is None:
+                return None
+            await callback_context.save_artifact(name, types.Part(text=text))
+            saved.append(name)
+            archived = progress.setdefault("archived", {})
+            archived[name] = label
+            while len(archived) > _MAX_ARCHIVED:
+                archived.pop(next(iter(archived)))
+            callback_context.state[PROGRESS_STATE_KEY] = progress
+            self.counters["archived"] += 1
+        return name
+
+    async def _slim(self, callback_context: CallbackContext, progress: dict, content: types.Content) -> types.Content:
+        """Returns `content` with its bulky parts replaced by artifact references."""
+        parts = []
+        for part in content.parts or []:
+            if _part_chars(part) <= self.bulky_chars:
+                parts.append(part)
+                continue
+            self.counters["slimmed_parts"] += 1
+            if part.function_response:
+                response = json.dumps(part.function_response.response or {}, default=str)
+                name = await self._archive(callback_context, progress, response, f"result of {part.function_response.name}")
+                parts.append(types.Part(function_response=types.FunctionResponse(
+                    id=part.function_response.id,
+                    name=part.function_response.name,
+                    response={"archived_as": name, "excerpt": response[:300]},
+                )))
+            elif part.text:
+                headings = "; ".join(_headings(part.text)[:_MAX_NOTES_PER_UNIT])
+                label = f"{headings or part.text[:80]} ({len(part.text)} characters)"
+                name = await self._archive(callback_context, progress, part.text, label)
+                reference = f"archived as artifact {name}" if name else "omitted"
+                parts.append(types.Part(text=f"[Earlier lesson text {reference}. Covered: {headings or part.text[:300]}]"))
+            elif part.inline_data:
+                parts.append(types.Part(text="[Earlier image omitted]"))
+            else:
+                parts.append(part)
+        return types.Content(role=content.role, parts=parts)
+
+    async def _compact(self, callback_context: CallbackContext, contents: list[types.Content]) -> list[types.Content] | None:
+        """Returns the compacted contents, or None when they are sent unchanged."""
+        turn_starts = [index for index, content in enumerate(contents) if _is_turn_start(content)]
+        if len(turn_starts) <= self.keep_turns:
+            self.counters["over_budget_recent"] += 1
+            return None
+        cut = turn_starts[-self.keep_turns] if self.keep_turns else len(contents)
+        earlier, recent = contents[:cut], contents[cut:]
+
+        progress = update_progress(callback_context.state, earlier)
+        earlier = [await self._slim(callback_context, progress, content) for content in earlier]
+        compacted = earlier + recent
+        if estimate_tokens(compacted) > self.token_budget:
+            summary = types.Content(role="user", parts=[types.Part(text=build_summary(callback_context.state, progress))])
+            compacted = [summary] + recent
+            self.counters["summarized"] += 1
+            self.counters["dropped_contents"] += len(earlier)
+        self.counters["compacted"] += 1
+        return compacted
+
+    async def before_model_callback(self, *, callback_context: CallbackContext, llm_request: LlmRequest):
+        before = estimate_tokens(llm_request.contents)
+        after = before
+        self.counters["requests"] += 1
+        if before > self.token_budget:
+            compacted = await self._compact(callback_context, llm_request.contents)
+            if compacted is not None:
+                after = estimate_tokens(compacted)
+                span = current_span()
+                if span is not None:
+                    span.add_event(
+                        "history.compacted", tokens_before=before, tokens_after=after,
+                        contents_before=len(llm_request.contents), contents_after=len(compacted),
+                    )
+                llm_request.contents = compacted
+        self.tokens_before.append(before)
+        self.tokens_after.append(after)
+        return None
+
+    def stats(self) -> dict:
+        """Returns compaction counters and estimated prompt tokens before and after compaction."""
+        def summarize(samples):
+            return {"mean": round(sum(samples) / len(samples), 1), "max": max(samples)} if samples else {"mean": 0.0, "max": 0}
+
+        return {
+            **self.counters,
+            "tokens_before": summarize(self.tokens_before),
+            "tokens_after": summarize(self.tokens_after),
+        }
@@ -0,0 +1,166 @@
+"""Self-contained course packs generated ahead of time and served from disk.
+
+A pack is a directory holding everything `python -m learning_mate.pregenerate`
+prepared for one course goal:
+
+    <pack>/pack.json                    Goal, plan, units and per-unit progress
+    <pack>/plan.md                      The course plan
+    <pack>/units/01-qubits/lesson.md    Unit outline and web research
+    <pack>/units/01-qubits/quiz.json    Structured quiz with answer key
+    <pack>/units/01-qubits/illustration.json and images/
+
+`pack.json` doubles as the checkpoint of an interrupted pre-generation run.
+At serve time, `assemble_lesson` takes a unit's materials from the pack of
+the learner's course plan instead of regenerating them, the planner reuses
+the pack's plan, and the pack's quizzes seed the quiz bank.
+"""
+import os
+import re
+import json
+import hashlib
+from collections import Counter
+from pathlib import Path
+
+from .embeddings import normalize_text
+from .prefetch import match_unit
+from .quiz_bank import course_key, get_quiz_bank
+
+
+# Where pre-generated course packs are written and looked up
+COURSE_PACKS_DIR = os.getenv("COURSE_PACKS_DIR", os.path.join(".data", "course_packs"))
+
+MANIFEST = "pack.json"
+PACK_FORMAT = 1
+
+# Materials a pack holds per unit, named like the `assemble_lesson` branches
+MATERIALS = ("web_research", "illustration", "quiz")
+_FILES = {"web_research": "lesson.md", "illustration": "illustration.json", "quiz": "quiz.json"}
+
+
+def slugify(text: str, max_chars: int = 40) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", normalize_text(text))[:max_chars].strip("-") or "course"
+
+
+def pack_dir_name(course_goal: str, additional_info: str | None = None) -> str:
+    """Stable directory name of the pack for a goal, so reruns find their checkpoint."""
+    digest = hashlib.sha256(f"{normalize_text(course_goal)}|{normalize_text(additional_info or '')}".encode("utf-8"))
+    return f"{slugify(course_goal)}-{digest.hexdigest()[:8]}"
+
+
+def write_atomic(path: Path, data: str | bytes) -> None:
+    """Writes a file through a temporary sibling, so an interrupted run never leaves it half written."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary = path.with_name(path.name + ".tmp")
+    if isinstance(data, bytes):
+        temporary.write_bytes(data)
+    else:
+        temporary.write_text(data, encoding="utf-8")
+    os.replace(temporary, path)
+
+
+def read_manifest(pack_dir: Path) -> dict | None:
+    try:
+        manifest = json.loads((pack_dir / MANIFEST).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    return manifest if manifest.get("format") == PACK_FORMAT else None
+
+
+def material_path(pack_dir: Path, unit: dict, name: str) -> Path:
+    return pack_dir / unit["dir"] / _FILES[name]
+
+
+def read_material(pack_dir: Path, unit: dict, name: str) -> dict | None:
+    """Loads one finished material of a unit in `run_branches` outcome form, or None."""
+    if name not in unit.get("done", []):
+        return None
+    path = material_path(pack_dir, unit, name)
+    try:
+        text = path.read_text(encoding="utf-8")
+    except OSError:
+        return None
+    if name == "web_research":
+        return {"status": "success", "result": text}
+    if name == "quiz":
+        return {"status": "success", "result": json.loads(text)}
+    illustration = json.loads(text)
+    files = [{**entry, "path": str(path.parent / entry["file"])} for entry in illustration.pop("files", [])]
+    return {"status": "success", "result": illustration, "files": files}
+
+
+class CoursePackLibrary:
+    """Index of the course packs under `root`, keyed by the course of their plan.
+
+    The directory is scanned once, on first use; `refresh()` rescans it.
+    """
+
+    def __init__(self, root: str | Path = COURSE_PACKS_DIR):
+        self.root = Path(root)
+        self.counters = Counter()
+        self._packs: dict[str, tuple[Path, dict]] | None = None
+
+    def _index(self) -> dict[str, tuple[Path, dict]]:
+        if self._packs is None:
+            self._packs = {}
+            for manifest_path in sorted(self.root.glob(f"*/{MANIFEST}")):
+                manifest = read_manifest(manifest_path.parent)
+                if manifest and manifest.get("plan"):
+                    self._packs[course_key(manifest["plan"])] = (manifest_path.parent, manifest)
+                    self._seed_quiz_bank(manifest_path.parent, manifest)
+        return self._packs
+
+    def _seed_quiz_bank(self, pack_dir: Path, manifest: dict) -> None:
+        """Adds the pack's quizzes to the quiz bank, so reviews can draw on them."""
+        course = course_key(manifest["plan"])
+        for unit in manifest.get("units", []):
+            quiz = read_material(pack_dir, unit, "quiz")
+            if quiz is not None:
+                self.counters["quiz_items_seeded"] += get_quiz_bank().add_quiz(course, unit["title"], quiz["result"])
+
+    def refresh(self) -> None:
+        self._packs = None
+
+    def manifests(self) -> list[dict]:
+        """Returns the manifest of every pack with a plan."""
+        return [manifest for _, manifest in self._index().values()]
+
+    def _find_unit(self, plan: str, unit_topic: str) -> tuple[Path, dict] | None:
+        entry = self._index().get(course_key(plan))
+        if entry is None:
+            return None
+        pack_dir, manifest = entry
+        units = manifest.get("units", [])
+        index = match_unit([unit["title"] for unit in units], unit_topic)
+        return (pack_dir, units[index]) if index is not None else None
+
+    def has_unit(self, plan: str, unit_topic: str) -> bool:
+        """True when a pack holds every material of this unit of the plan."""
+        found = self._find_unit(plan, unit_topic)
+        return found is not None and set(MATERIALS) <= set(found[1].get("done", []))
+
+    def unit_materials(self, plan: str, unit_topic: str) -> dict[str, dict] | None:
+        """Returns the finished materials of a unit by branch name, or None without a matching pack."""
+        found = self._find_unit(plan, unit_topic)
+        if found is None:
+            self.counters["misses"] += 1
+            return None
+        pack_dir, unit = found
+        materials = {name: read_material(pack_dir, unit, name) for name in MATERIALS}
+        materials = {name: material for name, material in materials.items() if material is not None}
+        self.counters["hits" if materials else "misses"] += 1
+        return materials or None
+
+    def stats(self) -> dict:
+        """Returns the number of packs and lookup counters."""
+        return {"packs": len(self._index()), **self.counters}
+
+
+_course_packs: CoursePackLibrary | None = None
+
+
+def get_course_packs() -> CoursePackLibrary:
+    """Returns the process-wide course pack library, creating it on first use."""
+    global _course_packs
+    if _course_packs is None:
+        _course_packs = CoursePackLibrary(COURSE_PACKS_DIR)
+    return _course_packs
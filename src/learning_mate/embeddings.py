@@ -0,0 +1,53 @@
+import re
+import math
+import zlib
+
+
+_TOKEN = re.compile(r"[a-z0-9+#]+")
+
+
+def normalize_text(text: str) -> str:
+    """Case-folds text and collapses punctuation and whitespace into single spaces."""
+    return " ".join(_TOKEN.findall(text.casefold()))
+
+
+def hashed_ngram_embedding(text: str, dim: int = 1024) -> dict[int, float]:
+    """Embeds text as a sparse, L2-normalized vector of hashed word and character n-grams.
+
+    Word unigrams and bigrams capture topic words; character trigrams make
+    the vector tolerant to typos and inflections ("quantum computer" vs
+    "quantum computing"). Hashing uses CRC32 so vectors are stable across
+    processes.
+
+    Args:
+        text (str): Text to embed.
+        dim (int): Number of hash buckets.
+
+    Returns:
+        dict[int, float]: Non-zero bucket weights.
+    """
+    words = normalize_text(text).split()
+    features = list(words)
+    features += [f"{a} {b}" for a, b in zip(words, words[1:])]
+    for word in words:
+        padded = f" {word} "
+        features += [f"#{padded[i:i + 3]}" for i in range(len(padded) - 2)]
+
+    vector: dict[int, float] = {}
+    for feature in features:
+        hashed = zlib.crc32(feature.encode("utf-8"))
+        bucket = hashed % dim
+        # The top hash bit picks a sign so colliding features tend to cancel out
+        vector[bucket] = vector.get(bucket, 0.0) + (1.0 if hashed & 0x80000000 else -1.0)
+
+    norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+    if not norm:
+        return {}
+    return {bucket: weight / norm for bucket, weight in vector.items() if weight}
+
+
+def cosine_similarity(a: dict[int, float], b: dict[int, float]) -> float:
+    """Returns the cosine similarity of two normalized sparse vectors."""
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(weight * b.get(bucket, 0.0) for bucket, weight in a.items())
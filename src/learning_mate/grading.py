@@ -0,0 +1,212 @@
+import re
+import json
+from dataclasses import dataclass, field
+
+
+_TRUE = {"true", "t", "yes", "y", "correct", "vrai"}
+_FALSE = {"false", "f", "no", "n", "incorrect", "faux"}
+_LETTER = re.compile(r"^\(?([a-z])(?:[\).:\]]|\s|$)")
+_ANSWER_LINE = re.compile(r"^\s*(?:q(?:uestion)?\s*)?([a-z0-9_.-]+?)(?:\s*[\).:=-]\s*|\s+)(.+)$", re.IGNORECASE)
+
+
+@dataclass
+class GradedItem:
+    """The grading outcome of one quiz question."""
+    question_id: str
+    student_answer: str
+    correct_answer: str
+    points_possible: float
+    status: str | None = None  # "CORRECT", "INCORRECT", or None when judgment is needed
+    points_earned: float = 0.0
+
+
+@dataclass
+class QuizGrade:
+    """Locally graded quiz; `pending` lists the items an LLM still has to judge."""
+    items: list[GradedItem] = field(default_factory=list)
+
+    @property
+    def pending(self) -> list[GradedItem]:
+        return [item for item in self.items if item.status is None]
+
+    @property
+    def complete(self) -> bool:
+        return bool(self.items) and not self.pending
+
+    @property
+    def points_possible(self) -> float:
+        return sum(item.points_possible for item in self.items)
+
+    @property
+    def points_earned(self) -> float:
+        return sum(item.points_earned for item in self.items)
+
+    @property
+    def percentage(self) -> float:
+        return round(100 * self.points_earned / self.points_possible, 1) if self.points_possible else 0.0
+
+
+def _normalize(text: str) -> str:
+    return " ".join(re.sub(r"[^\w\s.-]", " ", str(text).casefold()).split()).strip(" .")
+
+
+def _option_text(option: str) -> str:
+    # Options are often written as "A) text" or "A. text"; compare on the text only
+    return _normalize(re.sub(r"^\(?[A-Za-z][\).:]\s+", "", option))
+
+
+def _letter_for(answer: str, options: list[str]) -> str | None:
+    # Match the option text first: an answer like "a superposition" is not option A
+    texts = [_option_text(option) for option in options]
+    if _normalize(answer) in texts:
+        return chr(ord("A") + texts.index(_normalize(answer)))
+    match = _LETTER.match(answer.strip().casefold())
+    if match and ord(match.group(1)) - ord("a") < len(options):
+        return match.group(1).upper()
+    return None
+
+
+def _sequence(answer: str) -> list[str]:
+    return [token.upper() for token in re.split(r"[\s,;>→-]+", answer.strip()) if token]
+
+
+def _grade_question(question: dict, answer: str | None) -> GradedItem:
+    kind = question.get("type", "open_ended")
+    key = [str(value) for value in question.get("answer") or []]
+    item = GradedItem(
+        question_id=str(question["id"]),
+        student_answer=answer or "",
+        correct_answer=", ".join(key),
+        points_possible=float(question.get("points", 1)),
+    )
+
+    if answer is None or not answer.strip():
+        item.status = "INCORRECT"
+    elif kind == "multiple_choice" and key:
+        options = question.get("options") or []
+        # The key may be a letter or the option text; one that names no option goes to the LLM
+        expected = _letter_for(key[0], options)
+        if expected is not None:
+            item.status = "CORRECT" if _letter_for(answer, options) == expected else "INCORRECT"
+    elif kind == "true_false" and key:
+        given = _normalize(answer).split(" ")[0]
+        expected = _normalize(key[0]) in _TRUE
+        item.status = "CORRECT" if (given in _TRUE and expected) or (given in _FALSE and not expected) else "INCORRECT"
+    elif kind == "ordering" and key:
+        expected = _sequence(" ".join(key))
+        item.status = "CORRECT" if _sequence(answer) == expected else "INCORRECT"
+    elif kind == "fill_in_blank" and key:
+        # Only an exact (normalized) match is unambiguous; synonyms go to the LLM
+        if _normalize(answer) in {_normalize(value) for value in key}:
+            item.status = "CORRECT"
+
+    if item.status == "CORRECT":
+        item.points_earned = item.points_possible
+    return item
+
+
+def parse_answers(answers: str, question_ids: list[str]) -> dict[str, str]:
+    """Maps submitted answers to question ids.
+
+    Accepts a JSON object (`{"q1": "B"}`), one `id: answer` per line
+    (`1) B`, `Q2 - True`), or one bare answer per line in question order.
+
+    Args:
+        answers (str): The student's raw submission.
+        question_ids (list[str]): Ids of the quiz questions, in order.
+
+    Returns:
+        dict[str, str]: Answer per recognized question id.
+    """
+    try:
+        parsed = json.loads(answers)
+        if isinstance(parsed, dict):
+            return {str(key): str(value) for key, value in parsed.items()}
+        if isinstance(parsed, list) and len(parsed) == len(question_ids):
+            return {question_id: str(value) for question_id, value in zip(question_ids, parsed)}
+    except (TypeError, ValueError):
+        pass
+
+    lines = [line for line in answers.splitlines() if line.strip()]
+    known = {question_id.casefold(): question_id for question_id in question_ids}
+    mapped = {}
+    for line in lines:
+        match = _ANSWER_LINE.match(line)
+        if match:
+            label = match.group(1).casefold()
+            question_id = known.get(label) or known.get(f"q{label}")
+            if question_id is None and label.isdigit() and 0 < int(label) <= len(question_ids):
+                question_id = question_ids[int(label) - 1]
+            if question_id is not None:
+                mapped[question_id] = match.group(2).strip()
+
+    if not mapped and len(lines) == len(question_ids):
+        return {question_id: line.strip() for question_id, line in zip(question_ids, lines)}
+    return mapped
+
+
+def grade_quiz(quiz: dict, answers: str) -> QuizGrade:
+    """Scores every objective question of a structured quiz in pure Python.
+
+    Multiple-choice, true/false and ordering items are always scored locally;
+    fill-in-the-blank items only when they match the key exactly. Open-ended
+    items and non-matching fill-ins are left pending for an LLM to judge.
+
+    Args:
+        quiz (dict): A quiz following the quiz_generation_agent output schema.
+        answers (str): The student's raw submission.
+
+    Returns:
+        QuizGrade: Per-item results and totals.
+    """
+    questions = quiz.get("questions") or []
+    submitted = parse_answers(answers, [str(question["id"]) for question in questions])
+    return QuizGrade(items=[_grade_question(q, submitted.get(str(q["id"]))) for q in questions])
+
+
+def _cell(value) -> str:
+    return str(value).replace("|", "\\|").replace("\n", " ")
+
+
+def render_report(grade: QuizGrade, overall_percentage: float) -> str:
+    """Renders a fully graded quiz as the Markdown Student Performance Report."""
+    lines = [
+        "# Student Performance Report",
+        "",
+        "## Detailed Quiz Assessment",
+        "",
+        "| Question ID | Student Answer | Correct Answer | Status | Points Earned |",
+        "| :--- | :--- | :--- | :--- | :--- |",
+    ]
+    for item in grade.items:
+        lines.append(
+            f"| {_cell(item.question_id)} | {_cell(item.student_answer) or '-'} | {_cell(item.correct_answer)} "
+            f"| [{item.status}] | {item.points_earned:g}/{item.points_possible:g} |"
+        )
+    lines += [
+        "",
+        "## Performance Summary",
+        "",
+        "| Total Questions | Total Points Possible | Total Points Earned | Current Quiz Percentage | Overall Performance Percentage |",
+        "| :--- | :--- | :--- | :--- | :--- |",
+        f"| {len(grade.items)} | {grade.points_possible:g} | {grade.points_earned:g} "
+        f"| {grade.percentage:g}% | {overall_percentage:g}% |",
+    ]
+    return "\n".join(lines)
+
+
+def render_partial_grading(grade: QuizGrade) -> str:
+    """Describes locally graded items so the LLM only judges the pending ones."""
+    graded = [item for item in grade.items if item.status is not None]
+    lines = [
+        "The following questions were already scored automatically against the answer key. "
+        "Copy these results into the report unchanged and only evaluate the remaining questions "
+        f"({', '.join(item.question_id for item in grade.pending)}).",
+        "",
+    ]
+    lines += [
+        f"- {item.question_id}: student answered {item.student_answer!r}, key {item.correct_answer!r} "
+        f"-> [{item.status}] {item.points_earned:g}/{item.points_possible:g}"
+        for item in graded
+    ]
+    return "\n".join(lines)
@@ -0,0 +1,187 @@
+import os
+import time
+import asyncio
+import hashlib
+import sqlite3
+import threading
+from collections import Counter
+from functools import partial
+from pathlib import Path
+from typing import Awaitable, Callable
+
+
+def make_cache_key(prompt: str, params: dict) -> str:
+    """Builds a stable cache key from a prompt and the parameters of the render.
+
+    The prompt is normalized (case-folded, whitespace collapsed) so trivially
+    different phrasings of the same request share an entry.
+
+    Args:
+        prompt (str): The image prompt.
+        params (dict): Model name and any render parameters that change the output.
+
+    Returns:
+        str: Hex digest identifying the render.
+    """
+    normalized = " ".join(prompt.casefold().split())
+    material = normalized + "".join(f"|{k}={params[k]}" for k in sorted(params))
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class ImageCache:
+    """Content-addressed, size-bounded on-disk cache for rendered images.
+
+    Blobs are stored once under their SHA-256 digest; a small SQLite index
+    maps cache keys to digests and tracks last use for LRU eviction.
+    Concurrent requests for the same key share a single in-flight render.
+    """
+
+    def __init__(self, root: str | Path, max_bytes: int = 512 * 1024 * 1024):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.counters = Counter()
+        self._lock = threading.Lock()
+        self._in_flight: dict[str, asyncio.Task] = {}
+        self._ready = False
+
+    @property
+    def _index_path(self) -> Path:
+        return self.root / "index.sqlite"
+
+    def _blob_path(self, digest: str) -> Path:
+        return self.root / "blobs" / digest[:2] / digest
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._ready:
+            (self.root / "blobs").mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self._index_path, timeout=30)
+        if not self._ready:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, digest TEXT NOT NULL, "
+                "size INTEGER NOT NULL, last_used REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)")
+            conn.commit()
+            self._ready = True
+        return conn
+
+    def get(self, key: str) -> bytes | None:
+        """Returns the cached bytes for `key`, or None on a miss."""
+        with self._lock:
+            conn = self._connect()
+            try:
+                row = conn.execute("SELECT digest FROM entries WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    return None
+                try:
+                    data = self._blob_path(row[0]).read_bytes()
+                except FileNotFoundError:
+                    # Blob removed behind our back; forget the dangling entry
+                    conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                    conn.commit()
+                    return None
+                conn.execute("UPDATE entries SET last_used = ? WHERE key = ?", (time.time(), key))
+                conn.commit()
+                return data
+            finally:
+                conn.close()
+
+    def put(self, key: str, data: bytes) -> str:
+        """Stores `data` under `key` and evicts old entries if over budget.
+
+        Returns:
+            str: The content digest of the stored blob.
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            conn = self._connect()
+            try:
+                blob_path = self._blob_path(digest)
+                if not blob_path.exists():
+                    blob_path.parent.mkdir(parents=True, exist_ok=True)
+                    tmp_path = blob_path.with_suffix(f".{os.getpid()}.tmp")
+                    tmp_path.write_bytes(data)
+                    os.replace(tmp_path, blob_path)
+                conn.execute(
+                    "INSERT OR REPLACE INTO entries (key, digest, size, last_used) VALUES (?, ?, ?, ?)",
+                    (key, digest, len(data), time.time()),
+                )
+                conn.commit()
+                self._evict(conn)
+            finally:
+                conn.close()
+        return digest
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        """Drops least recently used entries until distinct blobs fit in `max_bytes`."""
+        total = conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM (SELECT DISTINCT digest, size FROM entries)"
+        ).fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        rows = conn.execute("SELECT key, digest, size FROM entries ORDER BY last_used").fetchall()
+        for key, digest, size in rows:
+            if total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self.counters["evictions"] += 1
+            still_used = conn.execute(
+                "SELECT 1 FROM entries WHERE digest = ? LIMIT 1", (digest,)
+            ).fetchone()
+            if not still_used:
+                self._blob_path(digest).unlink(missing_ok=True)
+                total -= size
+        conn.commit()
+
+    async def get_or_render(self, key: str, render: Callable[[], Awaitable[bytes]]) -> bytes:
+        """Returns cached bytes for `key`, rendering and storing them on a miss.
+
+        Identical keys requested concurrently collapse into one call to `render`,
+        run in a task of its own: a caller that is cancelled stops waiting
+        without cancelling the render for the others, and the image is still
+        cached. Exceptions raised by `render` propagate to every waiter and
+        nothing is cached.
+        """
+        data = await asyncio.to_thread(self.get, key)
+        if data is not None:
+            self.counters["hits"] += 1
+            return data
+
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.counters["coalesced"] += 1
+        else:
+            self.counters["misses"] += 1
+            task = asyncio.create_task(self._render_and_store(key, render))
+            self._in_flight[key] = task
+            task.add_done_callback(partial(self._render_done, key))
+        return await asyncio.shield(task)
+
+    async def _render_and_store(self, key: str, render: Callable[[], Awaitable[bytes]]) -> bytes:
+        data = await render()
+        if data:
+            try:
+                await asyncio.to_thread(self.put, key, data)
+            except (OSError, sqlite3.Error):
+                # A full or read-only disk must not fail the render itself
+                self.counters["store_errors"] += 1
+        return data
+
+    def _render_done(self, key: str, task: asyncio.Task) -> None:
+        del self._in_flight[key]
+        if not task.cancelled():
+            # Mark retrieved so a failure no caller waited for does not log a warning
+            task.exception()
+
+    def stats(self) -> dict:
+        """Returns hit/miss/coalesced/eviction counters and the hit ratio."""
+        lookups = self.counters["hits"] + self.counters["misses"] + self.counters["coalesced"]
+        return {
+            "hits": self.counters["hits"],
+            "misses": self.counters["misses"],
+            "coalesced": self.counters["coalesced"],
+            "evictions": self.counters["evictions"],
+            "hit_ratio": round((lookups - self.counters["misses"]) / lookups, 3) if lookups else 0.0,
+        }
@@ -0,0 +1,134 @@
+from io import BytesIO
+from collections import Counter
+from dataclasses import dataclass
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional; without it images are stored as rendered
+    Image = None
+
+
+# Magic-byte signatures of the formats image backends actually return
+_SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+)
+
+_EXTENSIONS = {
+    "image/png": ".png",
+    "image/jpeg": ".jpg",
+    "image/gif": ".gif",
+    "image/webp": ".webp",
+}
+
+# Running totals across every processed image in this process
+totals = Counter()
+
+
+@dataclass
+class ProcessedImage:
+    """A re-encoded image, its preview thumbnail and their size metrics."""
+    data: bytes
+    mime_type: str
+    thumbnail: bytes | None
+    thumbnail_mime_type: str | None
+    original_bytes: int
+
+    @property
+    def extension(self) -> str:
+        return _EXTENSIONS.get(self.mime_type, ".bin")
+
+    @property
+    def thumbnail_extension(self) -> str:
+        return _EXTENSIONS.get(self.thumbnail_mime_type, ".bin")
+
+    def size_metrics(self) -> dict:
+        """Returns before/after sizes in bytes and the compression ratio."""
+        return {
+            "original_bytes": self.original_bytes,
+            "stored_bytes": len(self.data),
+            "thumbnail_bytes": len(self.thumbnail) if self.thumbnail else 0,
+            "ratio": round(len(self.data) / self.original_bytes, 3) if self.original_bytes else 1.0,
+        }
+
+
+def sniff_mime_type(data: bytes) -> str:
+    """Detects the real image format from its leading bytes.
+
+    Args:
+        data (bytes): Encoded image bytes.
+
+    Returns:
+        str: The MIME type, or "application/octet-stream" if unrecognized.
+    """
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    for signature, mime_type in _SIGNATURES:
+        if data.startswith(signature):
+            return mime_type
+    return "application/octet-stream"
+
+
+def _encode(image, image_format: str, quality: int) -> tuple[bytes, str]:
+    buffer = BytesIO()
+    if image_format == "webp":
+        image.save(buffer, format="WEBP", quality=quality, method=4)
+        return buffer.getvalue(), "image/webp"
+    image.save(buffer, format="PNG", optimize=True)
+    return buffer.getvalue(), "image/png"
+
+
+def process_image(
+    data: bytes,
+    image_format: str = "webp",
+    quality: int = 80,
+    max_side: int = 1024,
+    thumbnail_side: int = 256,
+) -> ProcessedImage:
+    """Downscales and re-encodes an image and builds a small preview thumbnail.
+
+    The re-encoded image is only kept when it is actually smaller than the
+    original. Without Pillow installed, or when Pillow cannot decode the
+    data, the original bytes are returned with their sniffed MIME type and
+    no thumbnail.
+
+    Args:
+        data (bytes): Encoded image bytes as returned by the backend.
+        image_format (str): Target format, "webp" or "png".
+        quality (int): Lossy quality (1-100) used for WebP.
+        max_side (int): Longest side of the stored image in pixels.
+        thumbnail_side (int): Longest side of the thumbnail in pixels.
+
+    Returns:
+        ProcessedImage: The image to store, its thumbnail and size metrics.
+    """
+    mime_type = sniff_mime_type(data)
+    processed = ProcessedImage(data, mime_type, None, None, len(data))
+
+    if Image is not None and mime_type != "application/octet-stream":
+        try:
+            with Image.open(BytesIO(data)) as image:
+                image.load()
+                if image.mode not in ("RGB", "RGBA"):
+                    image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+
+                full = image.copy()
+                full.thumbnail((max_side, max_side))
+                encoded, encoded_mime_type = _encode(full, image_format, quality)
+                if len(encoded) < len(data):
+                    processed.data, processed.mime_type = encoded, encoded_mime_type
+
+                preview = image.copy()
+                preview.thumbnail((thumbnail_side, thumbnail_side))
+                processed.thumbnail, processed.thumbnail_mime_type = _encode(preview, image_format, quality)
+        except (OSError, ValueError, SyntaxError, Image.DecompressionBombError):
+            # Undecodable data is stored untouched rather than failing the tool call
+            processed = ProcessedImage(data, mime_type, None, None, len(data))
+            totals["decode_errors"] += 1
+
+    totals["images"] += 1
+    totals["original_bytes"] += processed.original_bytes
+    totals["stored_bytes"] += len(processed.data)
+    return processed
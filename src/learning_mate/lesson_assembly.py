@@ -0,0 +1,280 @@
+import os
+import time
+import asyncio
+from collections import Counter
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+import google.genai.types as types
+from google.adk.artifacts import BaseArtifactService, InMemoryArtifactService
+from google.adk.sessions import Session
+from google.adk.tools import AgentTool
+from google.adk.tools.tool_context import ToolContext
+
+from .course_packs import get_course_packs
+from .prefetch import PREFETCH_ENABLED, get_prefetcher, next_unit, parse_plan_units, plan_fingerprint, unit_excerpt
+from .resilience import clear_turn_deadline
+from .scheduler import demote_to_background
+from .streaming import StreamingAgentTool, detach_relay
+from .sub_agents import image_generation_agent, quiz_generation_agent, web_search_agent
+from .tracing import detach_span
+
+
+# Maximum number of lesson branches (searches, illustrations, quizzes) in flight per process
+LESSON_BRANCH_CONCURRENCY = int(os.getenv("LESSON_BRANCH_CONCURRENCY", "12"))
+
+# Seconds each branch may take before the lesson is assembled without it
+BRANCH_TIMEOUTS = {
+    "web_research": float(os.getenv("LESSON_SEARCH_TIMEOUT", "45")),
+    "illustration": float(os.getenv("LESSON_IMAGE_TIMEOUT", "60")),
+    "quiz": float(os.getenv("LESSON_QUIZ_TIMEOUT", "45")),
+}
+
+_web_search_tool = StreamingAgentTool(web_search_agent)
+_image_tool = AgentTool(image_generation_agent)
+_quiz_tool = AgentTool(quiz_generation_agent)
+
+_branch_semaphore: asyncio.Semaphore | None = None
+
+# Outcome counts per branch, e.g. "illustration_timeout"
+assembly_stats = Counter()
+
+
+def _get_branch_semaphore() -> asyncio.Semaphore:
+    """Returns the semaphore bounding concurrent lesson branches in this process."""
+    global _branch_semaphore
+    if _branch_semaphore is None:
+        _branch_semaphore = asyncio.Semaphore(LESSON_BRANCH_CONCURRENCY)
+    return _branch_semaphore
+
+
+async def _run_branch(name: str, call: Callable[[], Awaitable[Any]], timeout: float) -> dict:
+    """Runs one branch under the shared concurrency limit and its own timeout, never raising."""
+    started = time.perf_counter()
+    try:
+        async with _get_branch_semaphore():
+            result = await asyncio.wait_for(call(), timeout)
+    except asyncio.TimeoutError:
+        outcome = {"status": "timeout", "error_message": f"No result within {timeout:g} seconds."}
+    except Exception as e:
+        outcome = {"status": "error", "error_message": str(e) or type(e).__name__}
+    else:
+        outcome = {"status": "success", "result": result}
+    outcome["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    assembly_stats[f"{name}_{outcome['status']}"] += 1
+    return outcome
+
+
+async def run_branches(
+    branches: dict[str, Callable[[], Awaitable[Any]]],
+    timeouts: dict[str, float] | None = None,
+) -> dict[str, dict]:
+    """Runs independent branches concurrently and collects every outcome.
+
+    A branch that fails or times out is reported with its status instead of
+    failing the others, so the slowest or broken branch only costs itself.
+
+    Args:
+        branches (dict): Branch name to zero-argument coroutine factory.
+        timeouts (dict, optional): Per-branch timeouts in seconds (defaults to BRANCH_TIMEOUTS).
+
+    Returns:
+        dict[str, dict]: Per branch, its status, result or error message, and elapsed time.
+    """
+    timeouts = {**BRANCH_TIMEOUTS, **(timeouts or {})}
+    names = list(branches)
+    outcomes = await asyncio.gather(*(
+        _run_branch(name, branches[name], timeouts.get(name, 60.0)) for name in names
+    ))
+    return dict(zip(names, outcomes))
+
+
+def _build_branches(
+    tool_context: ToolContext,
+    unit_topic: str,
+    search_request: str | None = None,
+    image_prompt: str | None = None,
+    quiz_reference: str | None = None,
+    quiz_difficulty: str | None = None,
+) -> dict[str, Callable[[], Awaitable[Any]]]:
+    """Returns the branch factories for the materials that were asked for."""
+    branches = {}
+    if search_request:
+        branches["web_research"] = lambda: _web_search_tool.run_async(
+            args={"request": search_request}, tool_context=tool_context
+        )
+    if image_prompt:
+        branches["illustration"] = lambda: _image_tool.run_async(
+            args={"prompt": image_prompt, "context": unit_topic}, tool_context=tool_context
+        )
+    if quiz_reference:
+        quiz_args = {"reference_data": quiz_reference}
+        if quiz_difficulty in ("easy", "medium", "hard"):
+            quiz_args["difficulty"] = quiz_difficulty
+        branches["quiz"] = lambda: _quiz_tool.run_async(args=quiz_args, tool_context=tool_context)
+    return branches
+
+
+def default_unit_requests(plan: str, unit: str) -> dict[str, str]:
+    """Returns the search, illustration and quiz requests used to prepare a unit ahead of the learner."""
+    return {
+        "search_request": f"{unit}: key concepts, examples and references",
+        "image_prompt": f"Educational illustration explaining {unit}",
+        "quiz_reference": f"Course unit: {unit}\n\n{unit_excerpt(plan, unit)}",
+    }
+
+
+def _session_key(tool_context: ToolContext) -> str:
+    session = tool_context._invocation_context.session
+    return f"{session.user_id}/{session.id}"
+
+
+def _schedule_next_unit(tool_context: ToolContext, plan: str, unit_topic: str) -> None:
+    """Starts preparing the unit after `unit_topic` in the background, if the plan has one."""
+    upcoming = next_unit(parse_plan_units(plan), unit_topic)
+    if upcoming is None or get_course_packs().has_unit(plan, upcoming):
+        return
+
+    # Work on a copy of the session so speculative state writes never reach the live one, and keep
+    # speculative artifacts in memory until the learner actually reaches the unit
+    invocation = tool_context._invocation_context
+    session = invocation.session.model_copy(deep=True)
+    buffer = InMemoryArtifactService()
+    detached_context = ToolContext(invocation.model_copy(update={"session": session, "artifact_service": buffer}))
+    branches = _build_branches(detached_context, upcoming, **default_unit_requests(plan, upcoming))
+
+    async def prepare() -> dict:
+        # Not part of this turn: no deadline, its own trace, nothing relayed and the lowest scheduling priority
+        clear_turn_deadline()
+        detach_span()
+        detach_relay()
+        demote_to_background()
+        materials = await run_branches(branches)
+        if materials.get("illustration", {}).get("status") == "success":
+            materials["illustration"]["artifacts"] = await _buffered_artifacts(buffer, session)
+        return materials
+
+    get_prefetcher().schedule(_session_key(tool_context), upcoming, plan_fingerprint(plan), prepare)
+
+
+async def _buffered_artifacts(buffer: BaseArtifactService, session: Session) -> list[tuple[str, types.Part]]:
+    """Returns the latest version of every artifact a speculative run saved into `buffer`."""
+    ids = {"app_name": session.app_name, "user_id": session.user_id, "session_id": session.id}
+    return [
+        (filename, await buffer.load_artifact(filename=filename, **ids))
+        for filename in await buffer.list_artifact_keys(**ids)
+    ]
+
+
+async def _restore_prefetched_artifacts(tool_context: ToolContext, illustration: dict) -> dict:
+    """Saves the images a prefetch kept in memory as artifacts of the learner's session."""
+    result = dict(illustration["result"])
+    for filename, artifact in illustration.get("artifacts", []):
+        version = await tool_context.save_artifact(filename=filename, artifact=artifact)
+        if filename == result.get("image_artifact_name"):
+            result["version"] = version
+    restored = {**illustration, "result": result}
+    restored.pop("artifacts", None)
+    return restored
+
+
+async def _restore_illustration(tool_context: ToolContext, illustration: dict) -> dict:
+    """Saves a pack's images as artifacts of the learner's session, as if just generated."""
+    result = dict(illustration["result"])
+    for entry in illustration.get("files", []):
+        data = await asyncio.to_thread(Path(entry["path"]).read_bytes)
+        version = await tool_context.save_artifact(
+            filename=entry["name"],
+            artifact=types.Part(inline_data=types.Blob(mime_type=entry["mime_type"], data=data)),
+        )
+        if entry["name"] == result.get("image_artifact_name"):
+            result["version"] = version
+    return {"status": "success", "result": result}
+
+
+async def _take_from_pack(tool_context: ToolContext, plan: str, unit_topic: str, wanted: list[str]) -> dict[str, dict]:
+    """Returns the wanted materials a pre-generated course pack holds for this unit."""
+    materials = await asyncio.to_thread(get_course_packs().unit_materials, plan, unit_topic)
+    outcomes = {}
+    for name in wanted:
+        material = (materials or {}).get(name)
+        if material is None:
+            continue
+        if name == "illustration":
+            try:
+                material = await _restore_illustration(tool_context, material)
+            except OSError:
+                continue
+        outcomes[name] = {"status": "success", "result": material["result"], "from_pack": True}
+    return outcomes
+
+
+async def assemble_lesson(
+    unit_topic: str,
+    tool_context: ToolContext,
+    search_request: str | None = None,
+    image_prompt: str | None = None,
+    quiz_reference: str | None = None,
+    quiz_difficulty: str | None = None,
+) -> dict:
+    """Prepares the web research, illustration and quiz of one lesson unit at the same time.
+
+    Use this instead of calling `web_search_agent`, `image_generation_agent` and
+    `quiz_generation_agent` one after another when a unit needs more than one of them.
+    Only the materials whose argument is given are prepared. If one of them fails or
+    is too slow, the others are still returned and the missing one is listed in `failed`.
+
+    Args:
+        unit_topic: The lesson unit the materials are for.
+        search_request: What to look up on the web for this unit.
+        image_prompt: Description of the illustration to generate.
+        quiz_reference: Lesson content the quiz should be generated from.
+        quiz_difficulty: Optional quiz difficulty: "easy", "medium" or "hard".
+
+    Returns:
+        A dictionary with the overall status ("success", "partial" or "error"), the
+        prepared `materials` per kind, the kinds that `failed`, and the elapsed time.
+    """
+    branches = _build_branches(tool_context, unit_topic, search_request, image_prompt, quiz_reference, quiz_difficulty)
+    if not branches:
+        return {"status": "error", "error_message": "Give at least one of search_request, image_prompt or quiz_reference."}
+
+    started = time.perf_counter()
+    plan = tool_context.state.get("course_plan")
+    outcomes = {}
+    if plan:
+        outcomes.update(await _take_from_pack(tool_context, plan, unit_topic, list(branches)))
+        for name in outcomes:
+            del branches[name]
+    if plan and branches and PREFETCH_ENABLED:
+        fingerprint = plan_fingerprint(plan)
+        prefetched = await get_prefetcher().take(_session_key(tool_context), unit_topic, fingerprint)
+        if prefetched is not None:
+            materials, generated_at = prefetched
+            for name in list(branches):
+                if materials.get(name, {}).get("status") == "success":
+                    material = materials[name]
+                    if name == "illustration":
+                        material = await _restore_prefetched_artifacts(tool_context, material)
+                    outcomes[name] = {**material, "prefetched": True}
+                    del branches[name]
+            if any(outcome.get("prefetched") for outcome in outcomes.values()):
+                tool_context.state["prefetched_unit"] = {
+                    "unit": unit_topic, "plan": fingerprint, "generated_at": generated_at,
+                }
+
+    if "quiz" in outcomes:
+        tool_context.state["current_quiz"] = outcomes["quiz"]["result"]
+    if branches:
+        outcomes.update(await run_branches(branches))
+    if plan and PREFETCH_ENABLED:
+        _schedule_next_unit(tool_context, plan, unit_topic)
+
+    failed = [name for name, outcome in outcomes.items() if outcome["status"] != "success"]
+    return {
+        "status": "error" if len(failed) == len(outcomes) else "partial" if failed else "success",
+        "unit_topic": unit_topic,
+        "materials": outcomes,
+        "failed": failed,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
@@ -0,0 +1,414 @@
+"""On-disk vector memory that backs the `load_memory` tool.
+
+`LocalMemoryService` is an ADK memory service: finished turns are split into
+passages, embedded, and stored in SQLite, and `search_memory` returns the
+passages closest to the query. Embeddings come from a local
+sentence-transformers model when `MEMORY_EMBEDDING_MODEL` names one (and the
+package is installed), and from hashed n-grams otherwise.
+
+Search is approximate. Each passage also gets a 128-bit SimHash signature
+(random-hyperplane LSH), and each learner's signatures are kept in memory,
+partitioned around sampled centres once there are thousands of them. A query
+only scans the quarter of the partitions nearest to it, ranking passages by
+Hamming distance, and only the vectors of the `MEMORY_CANDIDATES` closest
+are loaded from disk and re-ranked by exact cosine similarity. At tens of
+thousands of passages per learner, a search takes about ten milliseconds and
+finds about 90% of the exact top 5 (see tests/bench_memory.py).
+"""
+import os
+import math
+import time
+import heapq
+import random
+import struct
+import asyncio
+import hashlib
+import logging
+import sqlite3
+import operator
+import threading
+from array import array
+from collections import Counter, deque
+from datetime import datetime, timezone
+from functools import lru_cache
+from itertools import repeat
+from pathlib import Path
+from typing import Sequence
+
+import google.genai.types as types
+from google.adk.events import Event
+from google.adk.memory.base_memory_service import BaseMemoryService, SearchMemoryResponse
+from google.adk.memory.memory_entry import MemoryEntry
+from google.adk.plugins.base_plugin import BasePlugin
+from google.adk.sessions import Session
+
+from .embeddings import hashed_ngram_embedding
+from .utils import summarize_latencies
+
+
+# Memories are stored next to the session database started by start_agent.sh
+MEMORY_STORE_PATH = os.getenv("MEMORY_STORE_PATH", os.path.join(".data", "memory.sqlite"))
+
+# Optional sentence-transformers model, e.g. "all-MiniLM-L6-v2"; hashed n-grams are used without it
+MEMORY_EMBEDDING_MODEL = os.getenv("MEMORY_EMBEDDING_MODEL")
+
+MEMORY_TOP_K = int(os.getenv("MEMORY_TOP_K", "5"))
+MEMORY_MIN_SCORE = float(os.getenv("MEMORY_MIN_SCORE", "0.2"))
+
+# Closest signatures re-ranked by exact similarity per search; more raise recall at some latency
+MEMORY_CANDIDATES = int(os.getenv("MEMORY_CANDIDATES", "256"))
+
+SIGNATURE_BITS = 128
+_PASSAGE_CHARS = 800
+
+logger = logging.getLogger(__name__)
+
+
+class HashedNgramEmbedder:
+    """Dependency-free embedder; see `hashed_ngram_embedding`."""
+    name = "hashed-ngram-1024"
+
+    def embed(self, texts: list[str]) -> list[dict[int, float]]:
+        return [hashed_ngram_embedding(text) for text in texts]
+
+
+class SentenceTransformerEmbedder:
+    """Dense embeddings from a local sentence-transformers model."""
+
+    def __init__(self, model_name: str):
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(model_name)
+        self.name = f"sentence-transformers:{model_name}"
+
+    def embed(self, texts: list[str]) -> list[dict[int, float]]:
+        vectors = self.model.encode(texts, normalize_embeddings=True)
+        return [{dim: float(weight) for dim, weight in enumerate(vector) if weight} for vector in vectors]
+
+
+def get_embedder(model_name: str | None = MEMORY_EMBEDDING_MODEL):
+    """Returns the local model embedder when available, else the hashed n-gram one."""
+    if model_name:
+        try:
+            return SentenceTransformerEmbedder(model_name)
+        except ImportError:
+            logger.warning("sentence-transformers is not installed; memory uses hashed n-gram embeddings")
+    return HashedNgramEmbedder()
+
+
+# simhash keeps one 32-bit counter per hyperplane side by side in a single integer,
+# so each dimension costs one big-integer multiply-add instead of 128 float operations
+_LANE_BITS = 32
+_ALL_LANES = sum(1 << (_LANE_BITS * bit) for bit in range(SIGNATURE_BITS))
+_WEIGHT_SCALE = 1 << 16
+
+
+@lru_cache(maxsize=4096)
+def _hyperplane_lanes(dim: int) -> int:
+    # Which hyperplanes have a positive component along `dim`, derived from the dimension alone
+    bits = int.from_bytes(hashlib.blake2b(dim.to_bytes(4, "little"), digest_size=SIGNATURE_BITS // 8).digest(), "little")
+    return sum(1 << (_LANE_BITS * bit) for bit in range(SIGNATURE_BITS) if bits >> bit & 1)
+
+
+def simhash(vector: dict[int, float]) -> int:
+    """Returns the random-hyperplane signature of a vector.
+
+    Bit i is set when the vector lies on the positive side of hyperplane i.
+    The Hamming distance between two signatures grows with the angle between
+    the vectors, so it ranks neighbours without computing any cosine.
+    """
+    agreeing, total = 0, 0
+    for dim, weight in vector.items():
+        scaled = round(abs(weight) * _WEIGHT_SCALE)
+        lanes = _hyperplane_lanes(dim)
+        agreeing += scaled * (lanes if weight > 0 else _ALL_LANES - lanes)
+        total += scaled
+    counters = struct.unpack(f"<{SIGNATURE_BITS}I", agreeing.to_bytes(SIGNATURE_BITS * _LANE_BITS // 8, "little"))
+    # A hyperplane is on the positive side when the agreeing weight outweighs the rest
+    return sum(1 << bit for bit, counter in enumerate(counters) if 2 * counter > total)
+
+
+def split_passages(text: str, max_chars: int = _PASSAGE_CHARS) -> list[str]:
+    """Splits text into paragraph-aligned passages of at most about `max_chars` characters."""
+    passages, current = [], ""
+    for paragraph in filter(None, (part.strip() for part in text.split("\n\n"))):
+        if current and len(current) + len(paragraph) > max_chars:
+            passages.append(current)
+            current = ""
+        current = f"{current}\n\n{paragraph}" if current else paragraph
+        while len(current) > max_chars:
+            passages.append(current[:max_chars])
+            current = current[max_chars:]
+    if current:
+        passages.append(current)
+    return passages
+
+
+def _pack(vector: dict[int, float]) -> tuple[bytes, bytes]:
+    return array("I", vector.keys()).tobytes(), array("f", vector.values()).tobytes()
+
+
+def _score(query: dict[int, float], dims: bytes, weights: bytes) -> float:
+    """Cosine similarity of a query with a stored vector, without unpacking it into a dict."""
+    dim_array, weight_array = array("I"), array("f")
+    dim_array.frombytes(dims)
+    weight_array.frombytes(weights)
+    return sum(map(operator.mul, weight_array, map(query.get, dim_array, repeat(0.0))))
+
+
+def _hamming(signature: int, signatures: list[int]) -> list[int]:
+    return list(map(int.bit_count, map(signature.__xor__, signatures)))
+
+
+class _UserIndex:
+    """In-memory signatures of one learner's passages, partitioned for sublinear search.
+
+    Small indexes are scanned in full. From `min_partitioned` passages on,
+    about sqrt(n) passages are sampled as partition centres, every passage
+    joins the partition of its nearest centre, and a query only scans the
+    partitions whose centres are nearest to it (an inverted-file index over
+    the signatures). Partitions are rebuilt whenever the index doubles.
+    """
+
+    def __init__(self, min_partitioned: int = 4096, probe_fraction: float = 0.25):
+        self.ids: list[int] = []
+        self.signatures: list[int] = []
+        self.min_partitioned = min_partitioned
+        self.probe_fraction = probe_fraction
+        self.centres: list[int] = []
+        self.partitions: list[list[int]] = []  # Positions in ids/signatures per centre
+        self.built_size = 0
+        self.last_id = 0  # Highest row loaded; rows are only ever appended
+
+    def add(self, row_id: int, signature: int) -> None:
+        self.ids.append(row_id)
+        self.last_id = max(self.last_id, row_id)
+        self.signatures.append(signature)
+        if len(self.ids) >= max(self.min_partitioned, 2 * self.built_size):
+            self._partition()
+        elif self.centres:
+            distances = _hamming(signature, self.centres)
+            self.partitions[distances.index(min(distances))].append(len(self.ids) - 1)
+
+    def _partition(self) -> None:
+        count = len(self.signatures)
+        rng = random.Random(count)
+        self.centres = [self.signatures[position] for position in rng.sample(range(count), int(math.sqrt(count)))]
+        self.partitions = [[] for _ in self.centres]
+        for position, signature in enumerate(self.signatures):
+            distances = _hamming(signature, self.centres)
+            self.partitions[distances.index(min(distances))].append(position)
+        self.built_size = count
+
+    def nearest(self, signature: int, count: int) -> list[int]:
+        """Returns the ids of about the `count` passages with the closest signatures."""
+        if not self.centres:
+            positions = range(len(self.signatures))
+        else:
+            centre_distances = _hamming(signature, self.centres)
+            probes = max(1, int(len(self.centres) * self.probe_fraction))
+            nearest_centres = heapq.nsmallest(probes, range(len(self.centres)), key=centre_distances.__getitem__)
+            positions = [position for centre in nearest_centres for position in self.partitions[centre]]
+        distances = _hamming(signature, [self.signatures[position] for position in positions])
+        best = heapq.nsmallest(count, range(len(distances)), key=distances.__getitem__)
+        return [self.ids[positions[offset]] for offset in best]
+
+
+class LocalMemoryService(BaseMemoryService):
+    """SQLite-backed memory service with approximate nearest-neighbour recall.
+
+    Ingest is incremental: each session remembers the timestamp of the last
+    event it stored, so re-adding a session after every turn only embeds
+    the new events.
+    """
+
+    def __init__(
+        self,
+        path: str | Path = MEMORY_STORE_PATH,
+        embedder=None,
+        top_k: int = MEMORY_TOP_K,
+        min_score: float = MEMORY_MIN_SCORE,
+        candidates: int = MEMORY_CANDIDATES,
+    ):
+        self.path = Path(path)
+        self.embedder = embedder or get_embedder()
+        self.top_k = top_k
+        self.min_score = min_score
+        self.candidates = candidates
+        self.counters = Counter()
+        self.search_seconds = deque(maxlen=1000)
+        self._lock = threading.Lock()
+        self._indexes: dict[tuple[str, str], _UserIndex] = {}
+        self._ready = False
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._ready:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        if not self._ready:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS memories ("
+                "id INTEGER PRIMARY KEY, app_name TEXT NOT NULL, user_id TEXT NOT NULL, "
+                "session_id TEXT NOT NULL, event_id TEXT NOT NULL, passage INTEGER NOT NULL, "
+                "author TEXT, timestamp REAL NOT NULL, text TEXT NOT NULL, embedder TEXT NOT NULL, "
+                "dims BLOB NOT NULL, weights BLOB NOT NULL, signature BLOB NOT NULL, "
+                "UNIQUE (app_name, user_id, event_id, passage))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS memories_user ON memories (app_name, user_id, embedder)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS ingested ("
+                "app_name TEXT NOT NULL, user_id TEXT NOT NULL, session_id TEXT NOT NULL, "
+                "last_timestamp REAL NOT NULL, PRIMARY KEY (app_name, user_id, session_id))"
+            )
+            conn.commit()
+            self._ready = True
+        return conn
+
+    def _index(self, conn: sqlite3.Connection, app_name: str, user_id: str) -> _UserIndex:
+        """Returns the learner's signature index, loading the rows it doesn't have yet.
+
+        The first call loads every row; later calls only the rows added since,
+        including those stored by other processes sharing the database.
+        """
+        key = (app_name, user_id)
+        index = self._indexes.setdefault(key, _UserIndex())
+        rows = conn.execute(
+            "SELECT id, signature FROM memories WHERE app_name = ? AND user_id = ? AND embedder = ? AND id > ? ORDER BY id",
+            (app_name, user_id, self.embedder.name, index.last_id),
+        )
+        for row_id, signature in rows:
+            index.add(row_id, int.from_bytes(signature, "little"))
+        return index
+
+    def ingest(self, app_name: str, user_id: str, session_id: str, events: Sequence[Event]) -> int:
+        """Stores the text of `events` newer than the session's last ingest and returns the passages added."""
+        with self._lock:
+            conn = self._connect()
+            try:
+                row = conn.execute(
+                    "SELECT last_timestamp FROM ingested WHERE app_name = ? AND user_id = ? AND session_id = ?",
+                    (app_name, user_id, session_id),
+                ).fetchone()
+                last_timestamp = row[0] if row else float("-inf")
+
+                passages = []
+                for event in events:
+                    if event.partial or event.timestamp < last_timestamp or not event.content or not event.content.parts:
+                        continue
+                    text = "\n".join(part.text for part in event.content.parts if part.text and not part.thought)
+                    for number, passage in enumerate(split_passages(text)):
+                        passages.append((event, number, passage))
+                if not passages:
+                    return 0
+
+                vectors = self.embedder.embed([passage for _, _, passage in passages])
+                added = 0
+                for (event, number, passage), vector in zip(passages, vectors):
+                    if not vector:
+                        continue
+                    signature = simhash(vector)
+                    cursor = conn.execute(
+                        "INSERT OR IGNORE INTO memories (app_name, user_id, session_id, event_id, passage, author, "
+                        "timestamp, text, embedder, dims, weights, signature) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (app_name, user_id, session_id, event.id, number, event.author, event.timestamp, passage,
+                         self.embedder.name, *_pack(vector), signature.to_bytes(SIGNATURE_BITS // 8, "little")),
+                    )
+                    added += cursor.rowcount
+                self._index(conn, app_name, user_id)  # Picks up the new rows
+                conn.execute(
+                    "INSERT OR REPLACE INTO ingested (app_name, user_id, session_id, last_timestamp) VALUES (?, ?, ?, ?)",
+                    (app_name, user_id, session_id, max(event.timestamp for event, _, _ in passages)),
+                )
+                conn.commit()
+            finally:
+                conn.close()
+        self.counters["ingested_passages"] += added
+        return added
+
+    def search(self, app_name: str, user_id: str, query: str, top_k: int | None = None) -> list[tuple[float, dict]]:
+        """Returns up to `top_k` (score, passage) pairs for the learner, best first."""
+        started = time.perf_counter()
+        vector = self.embedder.embed([query])[0]
+        if not vector:
+            return []
+        signature = simhash(vector)
+        with self._lock:
+            conn = self._connect()
+            try:
+                index = self._index(conn, app_name, user_id)
+                candidate_ids = index.nearest(signature, self.candidates)
+                rows = conn.execute(
+                    f"SELECT id, dims, weights FROM memories WHERE id IN ({','.join('?' * len(candidate_ids))})", candidate_ids,
+                ).fetchall() if candidate_ids else []
+                best = heapq.nlargest(
+                    top_k or self.top_k,
+                    ((score, row_id) for row_id, dims, weights in rows if (score := _score(vector, dims, weights)) >= self.min_score),
+                )
+                # Only the passages returned are read in full
+                passages = {
+                    row[0]: row for row in conn.execute(
+                        f"SELECT id, session_id, author, timestamp, text FROM memories WHERE id IN ({','.join('?' * len(best))})",
+                        [row_id for _, row_id in best],
+                    )
+                } if best else {}
+            finally:
+                conn.close()
+
+        scored = []
+        for score, row_id in best:
+            _, session_id, author, timestamp, text = passages[row_id]
+            scored.append((score, {"id": row_id, "session_id": session_id, "author": author, "timestamp": timestamp, "text": text}))
+        self.counters["searches"] += 1
+        self.search_seconds.append(time.perf_counter() - started)
+        return scored
+
+    async def add_session_to_memory(self, session: Session) -> None:
+        await asyncio.to_thread(self.ingest, session.app_name, session.user_id, session.id, session.events)
+
+    async def add_events_to_memory(self, *, app_name: str, user_id: str, events: Sequence[Event], session_id: str | None = None, custom_metadata=None) -> None:
+        await asyncio.to_thread(self.ingest, app_name, user_id, session_id or "", events)
+
+    async def search_memory(self, *, app_name: str, user_id: str, query: str) -> SearchMemoryResponse:
+        results = await asyncio.to_thread(self.search, app_name, user_id, query)
+        return SearchMemoryResponse(memories=[
+            MemoryEntry(
+                content=types.Content(role="user" if match["author"] == "user" else "model", parts=[types.Part(text=match["text"])]),
+                author=match["author"],
+                timestamp=datetime.fromtimestamp(match["timestamp"], tz=timezone.utc).isoformat(),
+            )
+            for _, match in results
+        ])
+
+    def stats(self) -> dict:
+        """Returns ingest and search counters, indexed passages and search latency."""
+        return {
+            **self.counters,
+            "embedder": self.embedder.name,
+            "indexed_passages": sum(len(index.ids) for index in self._indexes.values()),
+            "search_latency": summarize_latencies(list(self.search_seconds)),
+        }
+
+
+class MemoryIngestPlugin(BasePlugin):
+    """Adds the new events of every finished turn to a `LocalMemoryService`.
+
+    Runners with any other memory service are left alone.
+    """
+
+    def __init__(self):
+        super().__init__(name="memory_ingest")
+
+    async def after_run_callback(self, *, invocation_context) -> None:
+        service = invocation_context.memory_service
+        if not isinstance(service, LocalMemoryService):
+            return
+        try:
+            await service.add_session_to_memory(invocation_context.session)
+        except sqlite3.Error:
+            logger.exception("Failed to add session %s to memory", invocation_context.session.id)
+
+
+def create_memory_service(uri: str, **kwargs) -> LocalMemoryService:
+    """Factory for `--memory_service_uri localmemory:///path/to/memory.sqlite`."""
+    path = uri.split("://", 1)[1] if "://" in uri else ""
+    return LocalMemoryService(path or MEMORY_STORE_PATH)
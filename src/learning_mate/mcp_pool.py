@@ -0,0 +1,376 @@
+import os
+import time
+import shutil
+import asyncio
+import contextlib
+from collections import Counter
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Optional
+
+import google.genai.types as types
+from google.adk.agents.readonly_context import ReadonlyContext
+from google.adk.tools.base_tool import BaseTool
+from google.adk.tools.base_toolset import BaseToolset
+from google.adk.tools.tool_context import ToolContext
+
+from .search_cache import SearchCache, make_search_key
+from .tracing import record_retry
+from .utils import require_env, summarize_latencies
+
+# The MCP client stack takes about half a second to import, so it is only
+# imported when the first server is launched
+if TYPE_CHECKING:
+    from mcp import ClientSession, StdioServerParameters
+
+
+# Pinned Tavily MCP server release; keep in sync with package.json
+TAVILY_MCP_VERSION = os.getenv("TAVILY_MCP_VERSION", "0.2.4")
+
+
+def _mcp_error() -> type[Exception]:
+    """Returns the exception class MCP servers' error replies are raised as."""
+    try:
+        from mcp.shared.exceptions import McpError
+    except ImportError:  # mcp >= 2 renamed the exception
+        from mcp.shared.exceptions import MCPError as McpError
+    return McpError
+
+
+def resolve_tavily_server(project_root: str | Path | None = None) -> "StdioServerParameters":
+    """Finds the Tavily MCP server to launch, preferring a locally installed binary.
+
+    Lookup order: the `TAVILY_MCP_COMMAND` environment variable, the binary
+    installed by `npm install` under `node_modules/.bin`, a `tavily-mcp` on
+    PATH, and finally `npx` pinned to `TAVILY_MCP_VERSION` (never `@latest`).
+
+    Args:
+        project_root (str | Path, optional): Directory holding `node_modules`.
+            Defaults to the current working directory.
+
+    Returns:
+        StdioServerParameters: Command, arguments and environment for the server.
+
+    Raises:
+        RuntimeError: If `TAVILY_API_KEY` is not set.
+    """
+    from mcp import StdioServerParameters
+
+    env = {"TAVILY_API_KEY": require_env(
+        "TAVILY_API_KEY",
+        "Failed to create MCP session: TAVILY_API_KEY not found. "
+        "Please set the TAVILY_API_KEY environment variable.",
+    )}
+    local_binary = Path(project_root or os.getcwd()) / "node_modules" / ".bin" / "tavily-mcp"
+
+    command = os.getenv("TAVILY_MCP_COMMAND")
+    if command:
+        return StdioServerParameters(command=command, args=[], env=env)
+    if local_binary.exists():
+        return StdioServerParameters(command=str(local_binary), args=[], env=env)
+    if shutil.which("tavily-mcp"):
+        return StdioServerParameters(command="tavily-mcp", args=[], env=env)
+    return StdioServerParameters(
+        command="npx",
+        args=["-y", "--prefer-offline", f"tavily-mcp@{TAVILY_MCP_VERSION}"],
+        env=env,
+    )
+
+
+class _PooledSession:
+    """One stdio MCP server process and its client session.
+
+    The transport is opened and closed inside a dedicated task, because the
+    underlying anyio cancel scopes must be exited by the task that entered them.
+    """
+
+    def __init__(self, server_params: "StdioServerParameters", timeout: float):
+        self.server_params = server_params
+        self.timeout = timeout
+        self.session: "ClientSession | None" = None
+        self._task: asyncio.Task | None = None
+
+    @property
+    def alive(self) -> bool:
+        return self._task is not None and not self._task.done() and self.session is not None
+
+    async def open(self) -> None:
+        self._ready = asyncio.Event()
+        self._stop = asyncio.Event()
+        self._error: BaseException | None = None
+        self._task = asyncio.create_task(self._run())
+        await asyncio.wait_for(self._ready.wait(), timeout=self.timeout)
+        if self._error is not None:
+            raise ConnectionError(f"Failed to start MCP server: {self._error}") from self._error
+
+    async def _run(self) -> None:
+        from mcp import ClientSession
+        from mcp.client.stdio import stdio_client
+
+        try:
+            async with stdio_client(self.server_params) as (read, write):
+                async with ClientSession(read, write) as session:
+                    await session.initialize()
+                    self.session = session
+                    self._ready.set()
+                    await self._stop.wait()
+        except Exception as e:
+            self._error = e
+        finally:
+            self.session = None
+            self._ready.set()
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._stop.set()
+            with contextlib.suppress(Exception, asyncio.CancelledError):
+                await asyncio.wait_for(self._task, timeout=5)
+            self._task = None
+
+
+class McpSessionPool:
+    """A small pool of warm stdio MCP sessions shared by every learner session.
+
+    Sessions are spawned once (cold start) and reused for every call (warm).
+    Broken sessions are detected by periodic pings or failed calls and
+    respawned automatically. `server_params` may be a function returning
+    them, called when the pool first starts.
+    """
+
+    def __init__(
+        self,
+        server_params: "StdioServerParameters | Callable[[], StdioServerParameters]",
+        size: int = 2,
+        timeout: float = 30,
+        health_interval: float = 60,
+    ):
+        self._server_params = server_params
+        self.size = size
+        self.timeout = timeout
+        self.health_interval = health_interval
+        self.counters = Counter()
+        self._cold_starts: list[float] = []
+        self._warm_calls: list[float] = []
+        self._idle: asyncio.Queue[_PooledSession] | None = None
+        self._sessions: list[_PooledSession] = []
+        self._tools: list | None = None
+        self._start_lock: asyncio.Lock | None = None
+        self._health_task: asyncio.Task | None = None
+        self._warm_up_task: asyncio.Task | None = None
+
+    @property
+    def server_params(self) -> "StdioServerParameters":
+        if callable(self._server_params):
+            self._server_params = self._server_params()
+        return self._server_params
+
+    @server_params.setter
+    def server_params(self, value: "StdioServerParameters") -> None:
+        self._server_params = value
+
+    @property
+    def started(self) -> bool:
+        return self._idle is not None
+
+    async def _open(self, pooled: _PooledSession) -> None:
+        """Starts (or restarts) the server process behind a pool slot."""
+        start = time.perf_counter()
+        await pooled.close()
+        try:
+            await pooled.open()
+        except Exception:
+            await pooled.close()
+            self.counters["spawn_failures"] += 1
+            raise
+        self._cold_starts.append(time.perf_counter() - start)
+        self.counters["spawns"] += 1
+
+    async def start(self) -> None:
+        """Spawns all sessions concurrently; safe to call repeatedly."""
+        if self._start_lock is None:
+            self._start_lock = asyncio.Lock()
+        async with self._start_lock:
+            if self.started:
+                return
+            sessions = [_PooledSession(self.server_params, self.timeout) for _ in range(self.size)]
+            results = await asyncio.gather(
+                *(self._open(pooled) for pooled in sessions), return_exceptions=True
+            )
+            errors = [result for result in results if isinstance(result, BaseException)]
+            if errors:
+                await asyncio.gather(*(pooled.close() for pooled in sessions))
+                raise errors[0]
+            self._idle = asyncio.Queue()
+            for pooled in sessions:
+                self._sessions.append(pooled)
+                self._idle.put_nowait(pooled)
+            self._health_task = asyncio.create_task(self._health_loop())
+
+    def warm_up(self) -> None:
+        """Starts the pool in the background so the first search finds it warm.
+
+        Must be called from a running event loop. Start-up failures are only
+        counted here; the next real call retries the start and reports them.
+        """
+        if self.started or (self._warm_up_task is not None and not self._warm_up_task.done()):
+            return
+
+        def _consume_error(task: asyncio.Task) -> None:
+            if not task.cancelled() and task.exception() is not None:
+                self.counters["warm_up_failures"] += 1
+
+        self._warm_up_task = asyncio.create_task(self.start())
+        self._warm_up_task.add_done_callback(_consume_error)
+
+    async def _respawn(self, pooled: _PooledSession) -> None:
+        """Replaces the server process of a broken pool slot."""
+        self.counters["respawns"] += 1
+        await self._open(pooled)
+
+    @contextlib.asynccontextmanager
+    async def _acquire(self):
+        await self.start()
+        pooled = await self._idle.get()
+        try:
+            if not pooled.alive:
+                await self._respawn(pooled)
+            yield pooled
+        finally:
+            self._idle.put_nowait(pooled)
+
+    async def _call(self, method: str, *args, **kwargs) -> Any:
+        """Runs a session method, respawning the session and retrying once on failure."""
+        for attempt in range(2):
+            async with self._acquire() as pooled:
+                start = time.perf_counter()
+                try:
+                    result = await asyncio.wait_for(
+                        getattr(pooled.session, method)(*args, **kwargs), timeout=self.timeout
+                    )
+                except _mcp_error():
+                    # The server answered with an error; the session itself is healthy
+                    self.counters["tool_errors"] += 1
+                    raise
+                except Exception as e:
+                    self.counters["call_failures"] += 1
+                    if attempt:
+                        raise ConnectionError(f"MCP call '{method}' failed: {e}") from e
+                    record_retry("mcp_session_respawn", method=method)
+                    await self._respawn(pooled)
+                    continue
+                self._warm_calls.append(time.perf_counter() - start)
+                self.counters["calls"] += 1
+                return result
+
+    async def list_tools(self) -> list:
+        """Returns the server's tool definitions, fetched once per pool."""
+        if self._tools is None:
+            self._tools = (await self._call("list_tools")).tools
+        return self._tools
+
+    async def call_tool(self, name: str, arguments: dict) -> Any:
+        """Calls an MCP tool on any idle warm session."""
+        return await self._call("call_tool", name, arguments=arguments)
+
+    async def health_check(self) -> int:
+        """Pings every idle session and respawns the ones that do not answer.
+
+        Returns:
+            int: Number of sessions respawned.
+        """
+        respawned = 0
+        for _ in range(self._idle.qsize()):
+            async with self._acquire() as pooled:
+                try:
+                    await asyncio.wait_for(pooled.session.send_ping(), timeout=self.timeout)
+                except Exception:
+                    self.counters["health_failures"] += 1
+                    await self._respawn(pooled)
+                    respawned += 1
+        return respawned
+
+    async def _health_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.health_interval)
+            with contextlib.suppress(Exception):
+                await self.health_check()
+
+    async def close(self) -> None:
+        """Stops the health checks and shuts down every server process."""
+        if self._health_task is not None:
+            self._health_task.cancel()
+            self._health_task = None
+        await asyncio.gather(*(pooled.close() for pooled in self._sessions))
+        self._sessions = []
+        self._idle = None
+        self._tools = None
+
+    def stats(self) -> dict:
+        """Returns counters plus cold start and warm call latency summaries."""
+        return {
+            **self.counters,
+            "cold_start": summarize_latencies(self._cold_starts),
+            "warm_call": summarize_latencies(self._warm_calls),
+        }
+
+
+class PooledMcpTool(BaseTool):
+    """Exposes one MCP tool to an agent, executing it on the shared pool."""
+
+    def __init__(self, mcp_tool, pool: McpSessionPool, cache: SearchCache | None = None):
+        super().__init__(name=mcp_tool.name, description=mcp_tool.description or "")
+        self._mcp_tool = mcp_tool
+        self._pool = pool
+        self._cache = cache
+
+    def _get_declaration(self) -> types.FunctionDeclaration:
+        return types.FunctionDeclaration(
+            name=self.name,
+            description=self.description,
+            # mcp >= 2 renamed `inputSchema` to `input_schema`
+            parameters_json_schema=getattr(self._mcp_tool, "input_schema", None)
+            or getattr(self._mcp_tool, "inputSchema", None),
+        )
+
+    async def _call(self, args: dict[str, Any]) -> dict:
+        result = await self._pool.call_tool(self.name, args)
+        return result.model_dump(exclude_none=True, mode="json")
+
+    async def run_async(self, *, args: dict[str, Any], tool_context: ToolContext) -> Any:
+        if self._cache is None:
+            return await self._call(args)
+        return await self._cache.get_or_fetch(
+            make_search_key(self.name, args), lambda: self._call(args)
+        )
+
+
+class PooledMcpToolset(BaseToolset):
+    """Toolset backed by a McpSessionPool instead of a per-agent stdio session.
+
+    When a SearchCache is given, tool results are served from it and only
+    misses reach the MCP server.
+    """
+
+    def __init__(
+        self,
+        pool: McpSessionPool,
+        cache: SearchCache | None = None,
+        tool_filter: Optional[list[str]] = None,
+    ):
+        super().__init__(tool_filter=tool_filter)
+        self.pool = pool
+        self.cache = cache
+
+    async def get_tools(self, readonly_context: Optional[ReadonlyContext] = None) -> list[BaseTool]:
+        tools = [
+            PooledMcpTool(mcp_tool, self.pool, self.cache)
+            for mcp_tool in await self.pool.list_tools()
+        ]
+        return [tool for tool in tools if self._is_tool_selected(tool, readonly_context)]
+
+    async def close(self) -> None:
+        """Leaves the pool running.
+
+        ADK closes an agent's toolsets whenever its runner closes, which
+        AgentTool does after every sub-agent run. The pool is shared by every
+        learner, so it is only closed when the app or worker shuts down.
+        """
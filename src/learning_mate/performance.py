@@ -0,0 +1,106 @@
+import base64
+from array import array
+
+
+STATE_KEY = "performance"
+LEGACY_STATE_KEY = "recent_percentages"
+
+
+class PerformanceTracker:
+    """Rolling quiz statistics kept compactly in session state.
+
+    The last `window` scores live in a fixed-size ring buffer of integer
+    hundredths (packed as base64 in state), with a running sum so each
+    update and each average is O(1). An exponentially weighted moving
+    average tracks the trend, and per-topic / per-difficulty summaries let
+    the teacher adapt difficulty without replaying history. Each breakdown
+    keeps its `max_keys` most recently updated entries.
+    """
+
+    def __init__(self, window: int = 25, alpha: float = 0.3, max_keys: int = 20):
+        self.window = window
+        self.alpha = alpha
+        self.max_keys = max_keys
+        self.ring = array("H", [0] * window)
+        self.head = 0       # Next slot to overwrite
+        self.count = 0      # Scores currently in the window
+        self.total = 0      # Sum of the window in hundredths
+        self.ewma: float | None = None
+        self.quizzes = 0    # Lifetime number of recorded quizzes
+        self.by_topic: dict[str, list] = {}       # topic -> [count, ewma, last]
+        self.by_difficulty: dict[str, list] = {}  # difficulty -> [count, ewma, last]
+
+    def record(self, percentage: float, topic: str | None = None, difficulty: str | None = None) -> None:
+        """Adds a quiz percentage (0-100) in constant time."""
+        percentage = min(max(float(percentage), 0.0), 100.0)
+        score = round(percentage * 100)
+        if self.count == self.window:
+            self.total -= self.ring[self.head]
+        else:
+            self.count += 1
+        self.ring[self.head] = score
+        self.total += score
+        self.head = (self.head + 1) % self.window
+
+        self.ewma = percentage if self.ewma is None else self.alpha * percentage + (1 - self.alpha) * self.ewma
+        self.quizzes += 1
+        for breakdown, key in ((self.by_topic, topic), (self.by_difficulty, difficulty)):
+            if key:
+                key = key.strip().casefold()
+                count, ewma, _ = breakdown.pop(key, (0, percentage, percentage))
+                breakdown[key] = [count + 1, round(self.alpha * percentage + (1 - self.alpha) * ewma, 2), percentage]
+                while len(breakdown) > self.max_keys:
+                    del breakdown[next(iter(breakdown))]  # Least recently updated
+
+    @property
+    def overall_percentage(self) -> int:
+        """Simple average of the scores in the window, rounded."""
+        return round(self.total / self.count / 100) if self.count else 0
+
+    def summary(self) -> dict:
+        """Returns the statistics the tutor uses to adapt the course."""
+        return {
+            "overall_percentage": self.overall_percentage,
+            "trend_percentage": round(self.ewma, 1) if self.ewma is not None else None,
+            "quizzes_taken": self.quizzes,
+            "by_topic": {key: {"quizzes": n, "trend": ewma, "last": last} for key, (n, ewma, last) in self.by_topic.items()},
+            "by_difficulty": {key: {"quizzes": n, "trend": ewma, "last": last} for key, (n, ewma, last) in self.by_difficulty.items()},
+        }
+
+    def to_state(self) -> dict:
+        return {
+            "v": 1,
+            "w": self.window,
+            "r": base64.b64encode(self.ring.tobytes()).decode("ascii"),
+            "h": self.head,
+            "n": self.count,
+            "s": self.total,
+            "e": self.ewma,
+            "q": self.quizzes,
+            "t": self.by_topic,
+            "d": self.by_difficulty,
+        }
+
+    @classmethod
+    def from_state(cls, state) -> "PerformanceTracker":
+        """Loads the tracker from session state, migrating a legacy `recent_percentages` list."""
+        stored = state.get(STATE_KEY)
+        if stored:
+            tracker = cls(window=stored["w"])
+            tracker.ring = array("H")
+            tracker.ring.frombytes(base64.b64decode(stored["r"]))
+            tracker.head, tracker.count, tracker.total = stored["h"], stored["n"], stored["s"]
+            tracker.ewma, tracker.quizzes = stored["e"], stored["q"]
+            tracker.by_topic, tracker.by_difficulty = stored["t"], stored["d"]
+            return tracker
+
+        tracker = cls()
+        for percentage in (state.get(LEGACY_STATE_KEY) or [])[-tracker.window:]:
+            tracker.record(percentage)
+        return tracker
+
+    def save(self, state) -> None:
+        """Writes the tracker to session state and retires the legacy list."""
+        state[STATE_KEY] = self.to_state()
+        if state.get(LEGACY_STATE_KEY):
+            state[LEGACY_STATE_KEY] = None
@@ -0,0 +1,224 @@
+import json
+import time
+import sqlite3
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+
+from .embeddings import cosine_similarity, hashed_ngram_embedding, normalize_text
+
+
+# Words that say how someone wants to learn rather than what
+_FILLER_WORDS = {
+    "a", "an", "the", "of", "to", "in", "on", "for", "and", "with", "about", "how", "i", "me", "my", "want",
+    "would", "like", "learn", "learning", "study", "teach", "understand", "course", "please",
+}
+
+
+def subject_words(course_goal: str) -> str:
+    """Returns the words of a goal that name its subject, sorted, e.g. "basics python"."""
+    return " ".join(sorted({word for word in normalize_text(course_goal).split() if word not in _FILLER_WORDS}))
+
+
+def _stems(subject: str) -> set[str]:
+    # Compared on their first five letters, so "computer" and "computing" agree but "organic" and "inorganic" do not
+    return {word[:5] for word in subject.split()}
+
+
+@dataclass
+class PlanMatch:
+    """A stored course plan returned for a new goal."""
+    plan: str
+    goal: str
+    similarity: float
+    kind: str  # "exact", "similar" or "personalized"
+
+
+def personalize_plan(plan: str, course_goal: str, additional_info: str | None) -> str:
+    """Adapts a stored plan to a new learner without calling the planner.
+
+    The curriculum itself is kept; the learner's own goal is stated up front
+    and their additional context is appended for the teacher to take into account.
+    """
+    parts = [f"**Course goal:** {course_goal}", "", plan.strip()]
+    if additional_info:
+        parts += ["", "## Learner Context", f"- {additional_info.strip()}"]
+    return "\n".join(parts)
+
+
+class PlanStore:
+    """Similarity-searchable store of generated course plans.
+
+    Plans are indexed by a hashed n-gram embedding of the course goal's
+    subject words. A stored plan is only considered for a new goal when both
+    name the same subject words (compared on their stems), so near misses
+    like "C#" and "C++" or "organic" and "inorganic chemistry" never share a
+    plan. Among those, a new goal reuses a plan as-is when it is a close
+    match, gets a cheap local personalization of one when it is a looser
+    match, and otherwise goes to the planner. Entries carry a `version` (e.g. a hash of the
+    planner instruction and model) so changing the planner invalidates them.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        version: str,
+        max_entries: int = 1000,
+        reuse_threshold: float = 0.95,
+        personalize_threshold: float = 0.9,
+    ):
+        self.path = Path(path)
+        self.version = version
+        self.max_entries = max_entries
+        self.reuse_threshold = reuse_threshold
+        self.personalize_threshold = personalize_threshold
+        self.counters = Counter()
+        self._lock = threading.Lock()
+        self._ready = False
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._ready:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        if not self._ready:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS plans ("
+                "goal_key TEXT NOT NULL, info_key TEXT NOT NULL, goal TEXT NOT NULL, "
+                "additional_info TEXT, embedding TEXT NOT NULL, plan TEXT NOT NULL, "
+                "version TEXT NOT NULL, last_used REAL NOT NULL, uses INTEGER NOT NULL DEFAULT 0, "
+                "PRIMARY KEY (goal_key, info_key))"
+            )
+            conn.commit()
+            self._ready = True
+        return conn
+
+    def lookup(self, course_goal: str, additional_info: str | None = None) -> PlanMatch | None:
+        """Finds the best stored plan for a goal.
+
+        Args:
+            course_goal (str): The learner's primary learning objective.
+            additional_info (str, optional): Extra learner context.
+
+        Returns:
+            PlanMatch | None: The match, or None when the planner must run.
+        """
+        self.counters["lookups"] += 1
+        goal_key = normalize_text(course_goal)
+        info_key = normalize_text(additional_info or "")
+        subject = subject_words(course_goal)
+        stems = _stems(subject)
+        query = hashed_ngram_embedding(subject)
+
+        with self._lock:
+            conn = self._connect()
+            try:
+                rows = conn.execute(
+                    "SELECT goal_key, info_key, goal, embedding, plan FROM plans WHERE version = ?",
+                    (self.version,),
+                ).fetchall()
+
+                best, best_similarity = None, 0.0
+                for row in rows:
+                    if row[0] == goal_key:
+                        similarity = 1.0
+                    elif stems and _stems(subject_words(row[2])) == stems:
+                        similarity = cosine_similarity(query, {int(k): v for k, v in json.loads(row[3]).items()})
+                    else:
+                        continue
+                    # Prefer the entry written for the same learner context on ties
+                    if similarity > best_similarity or (similarity == best_similarity and row[1] == info_key):
+                        best, best_similarity = row, similarity
+
+                if best is None or best_similarity < self.personalize_threshold:
+                    self.counters["misses"] += 1
+                    return None
+
+                conn.execute(
+                    "UPDATE plans SET last_used = ?, uses = uses + 1 WHERE goal_key = ? AND info_key = ?",
+                    (time.time(), best[0], best[1]),
+                )
+                conn.commit()
+            finally:
+                conn.close()
+
+        if best[0] == goal_key and best[1] == info_key:
+            kind, plan = "exact", best[4]
+        elif best_similarity >= self.reuse_threshold and not info_key and not best[1]:
+            kind, plan = "similar", best[4]
+        else:
+            kind, plan = "personalized", personalize_plan(best[4], course_goal, additional_info)
+
+        self.counters[f"{kind}_hits"] += 1
+        return PlanMatch(plan=plan, goal=best[2], similarity=round(best_similarity, 3), kind=kind)
+
+    def store(self, course_goal: str, additional_info: str | None, plan: str) -> None:
+        """Saves a freshly generated plan, purging stale versions and evicting LRU entries."""
+        embedding = json.dumps(hashed_ngram_embedding(subject_words(course_goal)))
+        with self._lock:
+            conn = self._connect()
+            try:
+                conn.execute("DELETE FROM plans WHERE version != ?", (self.version,))
+                conn.execute(
+                    "INSERT OR REPLACE INTO plans "
+                    "(goal_key, info_key, goal, additional_info, embedding, plan, version, last_used) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        normalize_text(course_goal), normalize_text(additional_info or ""),
+                        course_goal, additional_info, embedding, plan, self.version, time.time(),
+                    ),
+                )
+                overflow = conn.execute("SELECT COUNT(*) FROM plans").fetchone()[0] - self.max_entries
+                if overflow > 0:
+                    conn.execute(
+                        "DELETE FROM plans WHERE rowid IN "
+                        "(SELECT rowid FROM plans ORDER BY last_used LIMIT ?)",
+                        (overflow,),
+                    )
+                    self.counters["evictions"] += overflow
+                conn.commit()
+            finally:
+                conn.close()
+        self.counters["stored"] += 1
+
+    def invalidate(self, course_goal: str | None = None) -> int:
+        """Removes the plans stored for a goal, or every plan when no goal is given.
+
+        Returns:
+            int: Number of plans removed.
+        """
+        with self._lock:
+            conn = self._connect()
+            try:
+                if course_goal is None:
+                    cursor = conn.execute("DELETE FROM plans")
+                else:
+                    cursor = conn.execute("DELETE FROM plans WHERE goal_key = ?", (normalize_text(course_goal),))
+                conn.commit()
+                return cursor.rowcount
+            finally:
+                conn.close()
+
+    def load_templates(self, path: str | Path) -> int:
+        """Seeds the store from a JSON template library.
+
+        The file holds a list of `{"course_goal", "additional_info", "plan"}`
+        objects, e.g. curated plans for the most requested topics.
+
+        Returns:
+            int: Number of templates loaded.
+        """
+        templates = json.loads(Path(path).read_text(encoding="utf-8"))
+        for template in templates:
+            self.store(template["course_goal"], template.get("additional_info"), template["plan"])
+        return len(templates)
+
+    def stats(self) -> dict:
+        """Returns lookup counters and how often the planner call was skipped."""
+        skipped = sum(self.counters[f"{kind}_hits"] for kind in ("exact", "similar", "personalized"))
+        lookups = self.counters["lookups"]
+        return {
+            **self.counters,
+            "planner_skipped": skipped,
+            "skip_ratio": round(skipped / lookups, 3) if lookups else 0.0,
+        }
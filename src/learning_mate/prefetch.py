@@ -0,0 +1,218 @@
+import os
+import re
+import json
+import time
+import asyncio
+import hashlib
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
+
+from .embeddings import cosine_similarity, hashed_ngram_embedding, normalize_text
+
+
+# Set to "0" to stop preparing the next unit in the background
+PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED", "1") != "0"
+
+# Seconds a prefetched unit stays servable
+PREFETCH_TTL = float(os.getenv("PREFETCH_TTL", "1800"))
+
+# Sessions with a prefetch kept per process; the oldest is evicted beyond this
+PREFETCH_MAX_SESSIONS = int(os.getenv("PREFETCH_MAX_SESSIONS", "1000"))
+
+_UNIT_LINE = re.compile(r"^\s*(?:[-*]\s*|#{1,6}\s*|\d+[.)]\s*)?\**\s*(?:unit|module|week|lesson)\s+\d+(?:\.\d+)?\s*[:.\-–—]?\s*(.+?)\**\s*$", re.IGNORECASE | re.MULTILINE)
+_HEADING = re.compile(r"^\s*#{2,3}\s+(.+?)\s*$", re.MULTILINE)
+
+
+def _clean_title(title: str) -> str:
+    # Drop trailing durations like "(45 min)" and leftover Markdown emphasis
+    return re.sub(r"\s*\([^)]*\)\s*$", "", title.replace("**", "")).strip(" :*-")
+
+
+def parse_plan_units(plan: str) -> list[str]:
+    """Extracts the ordered unit titles from a course plan.
+
+    Plans come as JSON (`{"units": [{"title": ...}]}`) or Markdown with
+    "Unit N: Title" lines; Markdown headings are used as a last resort.
+    """
+    try:
+        parsed = json.loads(plan)
+    except (TypeError, ValueError):
+        parsed = None
+    if isinstance(parsed, dict):
+        units = parsed.get("units") or parsed.get("modules") or []
+        titles = [
+            str(unit.get("title") or unit.get("name") or "") if isinstance(unit, dict) else str(unit)
+            for unit in units
+        ]
+        return [title for title in titles if title]
+
+    titles = [_clean_title(match) for match in _UNIT_LINE.findall(plan or "")]
+    if not titles:
+        titles = [_clean_title(match) for match in _HEADING.findall(plan or "")]
+    return [title for title in titles if title]
+
+
+def unit_excerpt(plan: str, unit: str, max_chars: int = 1500) -> str:
+    """Returns the part of the plan describing `unit`, up to the next unit."""
+    lines = (plan or "").splitlines()
+    start = next((i for i, line in enumerate(lines) if unit in _clean_title(line) or unit in line), None)
+    if start is None:
+        return unit
+    excerpt = [lines[start]]
+    for line in lines[start + 1:]:
+        if _UNIT_LINE.match(line):
+            break
+        excerpt.append(line)
+    return "\n".join(excerpt).strip()[:max_chars]
+
+
+def plan_fingerprint(plan: str) -> str:
+    """Short hash of the plan, used as the freshness marker of prefetched units."""
+    return hashlib.sha256((plan or "").encode("utf-8")).hexdigest()[:12]
+
+
+def _similarity(unit: str, topic: str) -> float:
+    """Scores how well a free-form topic names a unit.
+
+    Besides n-gram cosine similarity, counts the share of the unit title's
+    words found in the topic (compared on their first five letters), so
+    "Lesson 1: what is a qubit?" still matches the unit "Qubits".
+    """
+    stems = lambda text: {word[:5] for word in normalize_text(text).split() if len(word) > 2}
+    unit_stems = stems(unit)
+    overlap = len(unit_stems & stems(topic)) / len(unit_stems) if unit_stems else 0.0
+    return max(overlap, cosine_similarity(hashed_ngram_embedding(unit), hashed_ngram_embedding(topic)))
+
+
+def match_unit(units: list[str], topic: str, threshold: float = 0.5) -> int | None:
+    """Returns the index of the unit `topic` refers to, or None when none is close enough."""
+    if not units:
+        return None
+    scores = [_similarity(unit, topic) for unit in units]
+    best = max(range(len(units)), key=scores.__getitem__)
+    return best if scores[best] >= threshold else None
+
+
+def next_unit(units: list[str], current_topic: str, threshold: float = 0.5) -> str | None:
+    """Returns the unit that follows the one matching `current_topic`, if any."""
+    current = match_unit(units, current_topic, threshold)
+    if current is None or current + 1 >= len(units):
+        return None
+    return units[current + 1]
+
+
+@dataclass
+class Prefetch:
+    """A unit being (or already) prepared ahead of the learner."""
+    unit: str
+    fingerprint: str
+    task: asyncio.Task
+    created_at: float = field(default_factory=time.time)
+
+
+class Prefetcher:
+    """Prepares each learner's next unit in the background and serves it on request.
+
+    At most one prefetch is kept per session. It is only served when the
+    requested unit matches it and the course plan is unchanged; otherwise
+    it is cancelled, so a learner who repeats a unit or switches course
+    stops the speculative work instead of paying for it. Prefetches older
+    than `ttl` and, beyond `max_sessions`, the oldest ones are evicted when
+    a new one is scheduled, so learners who leave do not hold on to theirs.
+    """
+
+    def __init__(self, ttl: float = PREFETCH_TTL, match_threshold: float = 0.6, max_sessions: int = PREFETCH_MAX_SESSIONS):
+        self.ttl = ttl
+        self.match_threshold = match_threshold
+        self.max_sessions = max_sessions
+        self.counters = Counter()
+        self._entries: dict[str, Prefetch] = {}  # Oldest first
+
+    def schedule(self, session_key: str, unit: str, fingerprint: str, prepare: Callable[[], Awaitable[dict]]) -> None:
+        """Starts preparing `unit` for a session, replacing any other prefetch it had."""
+        current = self._entries.get(session_key)
+        if current and current.unit == unit and current.fingerprint == fingerprint and not current.task.cancelled():
+            return
+        self._discard(session_key, "superseded")
+        self._evict()
+        self._entries[session_key] = Prefetch(unit, fingerprint, asyncio.create_task(prepare()))
+        self.counters["scheduled"] += 1
+
+    def _evict(self) -> None:
+        """Drops expired prefetches, then the oldest ones until there is room for another."""
+        now = time.time()
+        while self._entries:
+            oldest, entry = next(iter(self._entries.items()))
+            if now - entry.created_at > self.ttl:
+                self._discard(oldest, "expired")
+            elif len(self._entries) >= self.max_sessions:
+                self._discard(oldest, "evicted")
+            else:
+                return
+
+    def _discard(self, session_key: str, reason: str) -> None:
+        entry = self._entries.pop(session_key, None)
+        if entry is not None:
+            if not entry.task.done():
+                entry.task.cancel()
+            self.counters[reason] += 1
+
+    async def take(self, session_key: str, unit: str, fingerprint: str) -> tuple[dict, float] | None:
+        """Returns the prefetched materials for `unit` and when they were generated, or None.
+
+        A still-running prefetch for the same unit is awaited rather than duplicated.
+        """
+        entry = self._entries.get(session_key)
+        if entry is None:
+            self.counters["misses"] += 1
+            return None
+        if entry.fingerprint != fingerprint or time.time() - entry.created_at > self.ttl:
+            self._discard(session_key, "stale")
+            self.counters["misses"] += 1
+            return None
+        if _similarity(entry.unit, unit) < self.match_threshold:
+            self._discard(session_key, "irrelevant")
+            self.counters["misses"] += 1
+            return None
+
+        del self._entries[session_key]
+        if not entry.task.done():
+            self.counters["joined"] += 1
+        try:
+            # Shielded so a learner who disconnects while waiting does not cancel the prefetch itself
+            materials = await asyncio.shield(entry.task)
+        except asyncio.CancelledError:
+            if asyncio.current_task().cancelling():
+                # The caller was cancelled: keep the prefetch for the learner's next request
+                self._entries.setdefault(session_key, entry)
+                raise
+            self.counters["failed"] += 1
+            self.counters["misses"] += 1
+            return None
+        except Exception:
+            self.counters["failed"] += 1
+            self.counters["misses"] += 1
+            return None
+        self.counters["hits"] += 1
+        return materials, entry.created_at
+
+    def stats(self) -> dict:
+        """Returns prefetch counters and the hit rate over lesson requests."""
+        lookups = self.counters["hits"] + self.counters["misses"]
+        return {
+            **self.counters,
+            "pending": sum(1 for entry in self._entries.values() if not entry.task.done()),
+            "hit_rate": round(self.counters["hits"] / lookups, 3) if lookups else 0.0,
+        }
+
+
+_prefetcher: Prefetcher | None = None
+
+
+def get_prefetcher() -> Prefetcher:
+    """Returns the process-wide prefetcher, creating it on first use."""
+    global _prefetcher
+    if _prefetcher is None:
+        _prefetcher = Prefetcher()
+    return _prefetcher
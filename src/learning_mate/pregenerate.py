@@ -0,0 +1,279 @@
+"""Pre-generates course packs for a list of course goals.
+
+    python -m learning_mate.pregenerate goals.txt --workers 4
+
+`goals.txt` holds one course goal per line; a JSON file may instead list
+goals as strings or `{"course_goal", "additional_info"}` objects. For every
+goal, `course_planning_agent` writes the plan, then each unit gets its web
+research, illustration and quiz from `web_search_agent`,
+`image_generation_agent` and `quiz_generation_agent`. Plans and units are
+jobs on one queue served by `--workers` workers, so at most that many jobs
+(and three times as many agent runs) are in flight.
+
+Every finished material is written to the pack and checkpointed in its
+`pack.json` right away: rerunning the same command after an interruption or
+failure only generates what is still missing.
+"""
+import sys
+import json
+import time
+import asyncio
+import argparse
+from collections import Counter
+from pathlib import Path
+
+import google.genai.types as types
+from google.adk.agents import BaseAgent
+from google.adk.artifacts import InMemoryArtifactService
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+
+from .course_packs import (
+    COURSE_PACKS_DIR, MANIFEST, MATERIALS, PACK_FORMAT,
+    material_path, pack_dir_name, read_manifest, slugify, write_atomic,
+)
+from .lesson_assembly import default_unit_requests, run_branches
+from .prefetch import parse_plan_units
+from .quiz_bank import course_key
+from .sub_agents import course_planning_agent, image_generation_agent, quiz_generation_agent, web_search_agent
+from .sub_agents.course_planning_agent import SKIP_PLAN_STORE
+from .sub_agents.web_search_agent import tavily_pool
+
+
+APP_NAME = "learning_mate_pregenerate"
+USER_ID = "pregenerate"
+
+
+def load_goals(path: str | Path) -> list[dict]:
+    """Reads course goals from a text file (one per line) or a JSON list."""
+    text = Path(path).read_text(encoding="utf-8")
+    if Path(path).suffix == ".json":
+        entries = json.loads(text)
+    else:
+        entries = [line.strip() for line in text.splitlines() if line.strip() and not line.lstrip().startswith("#")]
+    goals = []
+    for entry in entries:
+        goal = {"course_goal": entry} if isinstance(entry, str) else entry
+        goals.append({"course_goal": goal["course_goal"], "additional_info": goal.get("additional_info")})
+    return goals
+
+
+async def run_agent(agent: BaseAgent, message: str, state: dict | None = None) -> tuple[str, InMemoryArtifactService, str]:
+    """Runs one agent on its own, as AgentTool would, outside any learner session.
+
+    Returns:
+        tuple: The agent's final text, the artifact service it saved to, and its session id.
+    """
+    session_service = InMemorySessionService()
+    artifact_service = InMemoryArtifactService()
+    runner = Runner(app_name=APP_NAME, agent=agent, session_service=session_service, artifact_service=artifact_service)
+    session = await session_service.create_session(app_name=APP_NAME, user_id=USER_ID, state=state or {})
+    last_content, error_message = None, None
+    try:
+        async for event in runner.run_async(
+            user_id=USER_ID,
+            session_id=session.id,
+            new_message=types.Content(role="user", parts=[types.Part(text=message)]),
+        ):
+            error_message = event.error_message or error_message
+            if event.content:
+                last_content = event.content
+    finally:
+        await runner.close()
+
+    text = "\n".join(part.text for part in (last_content.parts or []) if part.text and not part.thought) if last_content else ""
+    if not text:
+        raise RuntimeError(error_message or f"{agent.name} returned no output.")
+    return text, artifact_service, session.id
+
+
+async def _structured(agent: BaseAgent, request: dict, state: dict | None = None) -> tuple[dict, InMemoryArtifactService, str]:
+    """Runs an agent with an input and output schema and returns its parsed output."""
+    message = agent.input_schema.model_validate(request).model_dump_json(exclude_none=True)
+    text, artifacts, session_id = await run_agent(agent, message, state)
+    return agent.output_schema.model_validate_json(text).model_dump(exclude_none=True), artifacts, session_id
+
+
+async def generate_plan(course_goal: str, additional_info: str | None) -> str:
+    """Runs the planner for a pack, bypassing the plan store so a similar course's plan is never copied in."""
+    request = {"course_goal": course_goal, "additional_info": additional_info}
+    message = course_planning_agent.input_schema.model_validate(request).model_dump_json(exclude_none=True)
+    plan, _, _ = await run_agent(course_planning_agent, message, {SKIP_PLAN_STORE: True})
+    return plan
+
+
+async def generate_research(request: str) -> str:
+    research, _, _ = await run_agent(web_search_agent, request)
+    return research
+
+
+async def generate_illustration(unit_dir: Path, prompt: str, unit: str) -> dict:
+    """Generates the unit's illustration and copies its image artifacts into the pack."""
+    output, artifacts, session_id = await _structured(image_generation_agent, {"prompt": prompt, "context": unit})
+    files = []
+    for name in filter(None, (output.get("image_artifact_name"), output.get("thumbnail_artifact_name"))):
+        part = await artifacts.load_artifact(app_name=APP_NAME, user_id=USER_ID, session_id=session_id, filename=name)
+        if part is None or part.inline_data is None:
+            raise RuntimeError(f"Image artifact {name!r} was not saved.")
+        write_atomic(unit_dir / "images" / name, part.inline_data.data)
+        files.append({"name": name, "file": f"images/{name}", "mime_type": part.inline_data.mime_type})
+    return {**output, "files": files}
+
+
+async def generate_quiz(plan: str, reference_data: str) -> dict:
+    # The plan in state lets the quiz agent file the questions under the right unit of the quiz bank
+    quiz, _, _ = await _structured(quiz_generation_agent, {"reference_data": reference_data}, {"course_plan": plan})
+    return quiz
+
+
+class Pregenerator:
+    """Fills a directory with course packs using a bounded pool of workers."""
+
+    def __init__(self, out_dir: str | Path = COURSE_PACKS_DIR, workers: int = 4, max_units: int | None = None):
+        self.out_dir = Path(out_dir)
+        self.workers = workers
+        self.max_units = max_units
+        self.counters = Counter()
+        self.failures: list[str] = []
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._locks: dict[Path, asyncio.Lock] = {}
+
+    async def _save(self, pack_dir: Path, update) -> dict:
+        """Applies `update` to the pack's manifest and checkpoints it, one writer per pack at a time."""
+        async with self._locks.setdefault(pack_dir, asyncio.Lock()):
+            manifest = read_manifest(pack_dir)
+            update(manifest)
+            manifest["updated"] = time.time()
+            write_atomic(pack_dir / MANIFEST, json.dumps(manifest, indent=2))
+            return manifest
+
+    def _open_pack(self, goal: dict) -> tuple[Path, dict]:
+        pack_dir = self.out_dir / pack_dir_name(goal["course_goal"], goal["additional_info"])
+        manifest = read_manifest(pack_dir)
+        if manifest is None:
+            manifest = {
+                "format": PACK_FORMAT, **goal, "plan": None, "course_key": None, "units": [], "created": time.time(),
+            }
+            write_atomic(pack_dir / MANIFEST, json.dumps(manifest, indent=2))
+        return pack_dir, manifest
+
+    def _enqueue_units(self, pack_dir: Path, manifest: dict) -> None:
+        for unit in manifest["units"]:
+            if set(MATERIALS) - set(unit["done"]):
+                self._queue.put_nowait(("unit", pack_dir, unit["title"]))
+            else:
+                self.counters["units_skipped"] += 1
+
+    async def _plan_job(self, pack_dir: Path, manifest: dict) -> None:
+        plan = await generate_plan(manifest["course_goal"], manifest.get("additional_info"))
+        titles = parse_plan_units(plan)[:self.max_units]
+        if not titles:
+            raise RuntimeError("The plan has no recognizable units.")
+        write_atomic(pack_dir / "plan.md", plan)
+
+        def record_plan(manifest: dict) -> None:
+            manifest.update(plan=plan, course_key=course_key(plan), units=[
+                {"title": title, "dir": f"units/{index:02d}-{slugify(title)}", "done": [], "failed": {}}
+                for index, title in enumerate(titles, 1)
+            ])
+
+        self._enqueue_units(pack_dir, await self._save(pack_dir, record_plan))
+        self.counters["plans_generated"] += 1
+
+    async def _unit_job(self, pack_dir: Path, title: str) -> None:
+        manifest = read_manifest(pack_dir)
+        plan = manifest["plan"]
+        unit = next(unit for unit in manifest["units"] if unit["title"] == title)
+        unit_dir = pack_dir / unit["dir"]
+        requests = default_unit_requests(plan, title)
+
+        makers = {
+            "web_research": lambda: generate_research(requests["search_request"]),
+            "illustration": lambda: generate_illustration(unit_dir, requests["image_prompt"], title),
+            "quiz": lambda: generate_quiz(plan, requests["quiz_reference"]),
+        }
+        branches = {name: make for name, make in makers.items() if name not in unit["done"]}
+        outcomes = await run_branches(branches)
+
+        for name, outcome in outcomes.items():
+            if outcome["status"] != "success":
+                continue
+            result = outcome["result"]
+            write_atomic(material_path(pack_dir, unit, name), result if name == "web_research" else json.dumps(result, indent=2))
+            self.counters[f"{name}_generated"] += 1
+
+        def record_unit(manifest: dict) -> None:
+            entry = next(entry for entry in manifest["units"] if entry["title"] == title)
+            for name, outcome in outcomes.items():
+                if outcome["status"] == "success":
+                    entry["done"].append(name)
+                    entry["failed"].pop(name, None)
+                else:
+                    entry["failed"][name] = outcome.get("error_message", outcome["status"])
+
+        await self._save(pack_dir, record_unit)
+        for name, outcome in outcomes.items():
+            if outcome["status"] != "success":
+                self._fail(f"{pack_dir.name}/{unit['dir']} {name}: {outcome.get('error_message', outcome['status'])}")
+
+    def _fail(self, message: str) -> None:
+        self.failures.append(message)
+        self.counters["failures"] += 1
+
+    async def _worker(self) -> None:
+        while True:
+            kind, pack_dir, payload = await self._queue.get()
+            try:
+                if kind == "plan":
+                    await self._plan_job(pack_dir, payload)
+                else:
+                    await self._unit_job(pack_dir, payload)
+            except Exception as e:
+                self._fail(f"{pack_dir.name} {kind}: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def run(self, goals: list[dict]) -> dict:
+        """Generates or completes the pack of every goal.
+
+        Returns:
+            dict: Job counters, failures and elapsed time.
+        """
+        started = time.perf_counter()
+        for goal in goals:
+            pack_dir, manifest = self._open_pack(goal)
+            if manifest["plan"]:
+                self.counters["plans_skipped"] += 1
+                self._enqueue_units(pack_dir, manifest)
+            else:
+                self._queue.put_nowait(("plan", pack_dir, manifest))
+
+        workers = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        try:
+            await self._queue.join()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+        return {
+            "packs": len(goals),
+            **self.counters,
+            "failures": self.failures,
+            "elapsed_s": round(time.perf_counter() - started, 2),
+        }
+
+
+async def main(args: argparse.Namespace) -> int:
+    summary = await Pregenerator(args.out, args.workers, args.units).run(load_goals(args.goals))
+    await tavily_pool.close()
+    print(json.dumps(summary, indent=2))
+    return 1 if summary["failures"] else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pre-generate self-contained course packs for a list of course goals.")
+    parser.add_argument("goals", help="Text file with one course goal per line, or a JSON list of goals.")
+    parser.add_argument("--out", default=COURSE_PACKS_DIR, help="Directory the packs are written to.")
+    parser.add_argument("--workers", type=int, default=4, help="Jobs (plans or units) generated at the same time.")
+    parser.add_argument("--units", type=int, default=None, help="Only prepare the first N units of each plan.")
+    sys.exit(asyncio.run(main(parser.parse_args())))
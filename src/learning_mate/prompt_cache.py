@@ -0,0 +1,316 @@
+"""Provider-side caching of each agent's static prompt prefix.
+
+Every model call of an agent sends the same system instruction and tool
+declarations; the teacher's alone is a few thousand tokens, reprocessed on
+every turn of every session. `PrefixCache` registers that prefix once per
+model with the provider (Gemini's explicit context caching) and sends the
+following calls with `cached_content` instead. Caches are keyed by a
+fingerprint of the prefix, so every session and every sub-agent run of the
+process shares them; ADK's own `ContextCacheConfig` is per session and only
+starts on its second turn, which sub-agents run through AgentTool never reach.
+
+Lifetimes are managed here. A cache is created for
+PROMPT_CACHE_TTL_SECONDS, and a call that uses it within
+PROMPT_CACHE_REFRESH_SECONDS of its expiry extends it, so caches in use stay
+alive and idle ones expire on their own. When an agent's instruction or
+tools change, its next call creates a cache for the new prefix and the old
+one is deleted. Prefixes smaller than PROMPT_CACHE_MIN_TOKENS (the
+provider's minimum) are sent as before.
+
+Sections that tools append to the system instruction per session (the
+artifact list of `load_artifacts`) are not part of the prefix: they are sent
+as the first content of a cached call instead.
+"""
+import os
+import re
+import json
+import time
+import asyncio
+import hashlib
+import logging
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from typing import AsyncGenerator, Callable
+
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import errors as genai_errors
+from google.genai import types
+
+
+# Set to "0" to send every prompt in full
+PROMPT_CACHE_ENABLED = os.getenv("PROMPT_CACHE_ENABLED", "1") != "0"
+
+# Lifetime of a cached prefix, and how close to expiry a call extends it
+PROMPT_CACHE_TTL_SECONDS = float(os.getenv("PROMPT_CACHE_TTL_SECONDS", "3600"))
+PROMPT_CACHE_REFRESH_SECONDS = float(os.getenv("PROMPT_CACHE_REFRESH_SECONDS", "600"))
+
+# Smallest prefix worth caching; the provider rejects smaller ones
+PROMPT_CACHE_MIN_TOKENS = int(os.getenv("PROMPT_CACHE_MIN_TOKENS", "1024"))
+
+_PREFIX_FIELDS = {"system_instruction", "tools", "tool_config"}
+_AGENT_LABEL = "adk_agent_name"
+
+# Start of the system instruction sections that change from call to call
+_DYNAMIC_SECTIONS = ("You have a list of artifacts:",)
+
+# How the provider names the cache in its errors, e.g. "CachedContent not found (or permission denied)"
+_CACHE_ERROR_MESSAGE = re.compile(r"cached?[\s_]*contents?", re.IGNORECASE)
+
+logger = logging.getLogger(__name__)
+
+
+def split_instruction(instruction) -> tuple:
+    """Splits a system instruction into its static part and the dynamic sections appended to it."""
+    if not isinstance(instruction, str):
+        return instruction, ""
+    cut = min((index for index in (instruction.find(section) for section in _DYNAMIC_SECTIONS) if index >= 0), default=len(instruction))
+    return instruction[:cut].rstrip(), instruction[cut:]
+
+
+def static_prefix(llm_request: LlmRequest) -> dict:
+    """Returns the part of a request that is the same on every call of its agent, as JSON data."""
+    if llm_request.config is None:
+        return {}
+    prefix = llm_request.config.model_dump(mode="json", include=_PREFIX_FIELDS, exclude_none=True)
+    if "system_instruction" in prefix:
+        prefix["system_instruction"] = split_instruction(prefix["system_instruction"])[0]
+    return prefix
+
+
+def request_agent(llm_request: LlmRequest) -> str:
+    return (llm_request.config.labels or {}).get(_AGENT_LABEL, "unknown") if llm_request.config else "unknown"
+
+
+def prefix_fingerprint(model: str, prefix: dict) -> str:
+    return hashlib.sha256(json.dumps({"model": model, **prefix}, sort_keys=True).encode()).hexdigest()[:24]
+
+
+def estimate_prefix_tokens(prefix: dict) -> int:
+    """Rough token count of a prefix, at four characters per token."""
+    return len(json.dumps(prefix)) // 4
+
+
+@dataclass
+class CachedPrefix:
+    """A prefix registered with the provider."""
+    name: str
+    fingerprint: str
+    model: str
+    agent: str
+    tokens: int
+    expires_at: float
+
+
+class GeminiCacheBackend:
+    """Stores prefixes with the Gemini API's explicit context caching."""
+
+    def __init__(self, client):
+        self.client = client
+
+    async def create(self, model: str, config: types.GenerateContentConfig, ttl: float, display_name: str) -> tuple[str, int | None]:
+        cache = await self.client.aio.caches.create(model=model, config=types.CreateCachedContentConfig(
+            system_instruction=config.system_instruction,
+            tools=config.tools,
+            tool_config=config.tool_config,
+            ttl=f"{int(ttl)}s",
+            display_name=display_name,
+        ))
+        return cache.name, cache.usage_metadata.total_token_count if cache.usage_metadata else None
+
+    async def refresh(self, name: str, ttl: float) -> None:
+        await self.client.aio.caches.update(name=name, config=types.UpdateCachedContentConfig(ttl=f"{int(ttl)}s"))
+
+    async def delete(self, name: str) -> None:
+        await self.client.aio.caches.delete(name=name)
+
+    def is_cache_error(self, error: BaseException) -> bool:
+        """Whether the call failed because the cache expired or was deleted on the provider's side.
+
+        Only errors about the cached content count; any other invalid request
+        is not retried and leaves the cache alone.
+        """
+        return (
+            isinstance(error, genai_errors.ClientError)
+            and error.code in (400, 403, 404)
+            and bool(_CACHE_ERROR_MESSAGE.search(error.message or ""))
+        )
+
+
+class PrefixCache:
+    """Process-wide registry of cached prompt prefixes, with token savings counters."""
+
+    def __init__(
+        self,
+        ttl: float = PROMPT_CACHE_TTL_SECONDS,
+        refresh_window: float = PROMPT_CACHE_REFRESH_SECONDS,
+        min_tokens: int = PROMPT_CACHE_MIN_TOKENS,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.ttl = ttl
+        self.refresh_window = refresh_window
+        self.min_tokens = min_tokens
+        self.clock = clock
+        self.counters = Counter()
+        self._entries: dict[str, CachedPrefix] = {}
+        self._current: dict[tuple[str, str], str] = {}  # (agent, model) -> fingerprint of its latest prefix
+        self._skipped: dict[str, float] = {}  # fingerprint -> time until which it is sent uncached
+        self._locks: dict[str, asyncio.Lock] = {}
+        self._agents: dict[str, Counter] = defaultdict(Counter)
+
+    async def apply(self, llm_request: LlmRequest, model: str, backend) -> tuple[LlmRequest, CachedPrefix | None]:
+        """Returns the request to send: a copy that refers to the cached prefix, or the request itself.
+
+        The original request is left untouched, so it can still be sent in
+        full or to another model.
+        """
+        prefix = static_prefix(llm_request)
+        if not prefix.get("system_instruction") and not prefix.get("tools"):
+            return llm_request, None
+        fingerprint = prefix_fingerprint(model, prefix)
+        if self._skipped.get(fingerprint, 0) > self.clock():
+            return llm_request, None
+        agent = request_agent(llm_request)
+        instruction, dynamic = split_instruction(llm_request.config.system_instruction)
+        async with self._locks.setdefault(fingerprint, asyncio.Lock()):
+            entry = await self._ensure(
+                fingerprint, llm_request.config.model_copy(update={"system_instruction": instruction}), model, agent, prefix, backend
+            )
+        if entry is None:
+            return llm_request, None
+        config = llm_request.config.model_copy(update={
+            "system_instruction": None, "tools": None, "tool_config": None, "cached_content": entry.name,
+        })
+        contents = list(llm_request.contents)
+        if dynamic:
+            contents.insert(0, types.Content(role="user", parts=[types.Part(text=dynamic)]))
+        return llm_request.model_copy(update={"config": config, "contents": contents}), entry
+
+    async def _ensure(
+        self, fingerprint: str, config: types.GenerateContentConfig, model: str, agent: str, prefix: dict, backend
+    ) -> CachedPrefix | None:
+        now = self.clock()
+        entry = self._entries.get(fingerprint)
+        if entry is not None and entry.expires_at <= now:
+            self._entries.pop(fingerprint)
+            self.counters["expired"] += 1
+            entry = None
+
+        if entry is None:
+            tokens = estimate_prefix_tokens(prefix)
+            if tokens < self.min_tokens:
+                self._skipped[fingerprint] = float("inf")
+                self.counters["too_small"] += 1
+                return None
+            try:
+                name, counted = await backend.create(model, config, self.ttl, f"learning_mate-{agent}-{fingerprint[:8]}")
+            except Exception as e:
+                # Sent in full for a while rather than failing the call
+                logger.warning("Could not cache the prompt prefix of %s on %s: %s", agent, model, e)
+                self._skipped[fingerprint] = now + self.refresh_window
+                self.counters["create_failures"] += 1
+                return None
+            entry = self._entries[fingerprint] = CachedPrefix(name, fingerprint, model, agent, counted or tokens, now + self.ttl)
+            self.counters["created"] += 1
+            await self._replace(agent, model, fingerprint, backend)
+        elif entry.expires_at - now < self.refresh_window:
+            try:
+                await backend.refresh(entry.name, self.ttl)
+                entry.expires_at = now + self.ttl
+                self.counters["refreshed"] += 1
+            except Exception as e:
+                logger.warning("Could not extend the prompt cache %s: %s", entry.name, e)
+                self.counters["refresh_failures"] += 1
+        return entry
+
+    async def _replace(self, agent: str, model: str, fingerprint: str, backend) -> None:
+        """Deletes the agent's previous cache on `model` once its prefix has changed."""
+        if agent == "unknown":
+            return
+        previous = self._current.get((agent, model))
+        self._current[(agent, model)] = fingerprint
+        old = self._entries.pop(previous, None) if previous not in (None, fingerprint) else None
+        if old is None:
+            return
+        self.counters["replaced"] += 1
+        try:
+            await backend.delete(old.name)
+        except Exception as e:
+            logger.warning("Could not delete the outdated prompt cache %s: %s", old.name, e)
+
+    def invalidate(self, entry: CachedPrefix) -> None:
+        """Forgets a cache the provider no longer accepts; the next call creates a new one."""
+        if self._entries.get(entry.fingerprint) is entry:
+            self._entries.pop(entry.fingerprint)
+            self.counters["invalidated"] += 1
+
+    def record(self, agent: str, entry: CachedPrefix | None, usage: types.GenerateContentResponseUsageMetadata | None) -> None:
+        """Counts one call's prompt tokens and how many of them were served from a cache."""
+        counts = self._agents[agent]
+        cached = (usage.cached_content_token_count or 0) if usage is not None else 0
+        for counter in (self.counters, counts):
+            counter["calls"] += 1
+            counter["cached_calls"] += entry is not None
+            counter["prompt_tokens"] += (usage.prompt_token_count or 0) if usage is not None else 0
+            counter["cached_tokens"] += cached
+
+    def stats(self) -> dict:
+        """Returns cache lifecycle counters, prompt and cached token totals, and the share of input tokens saved."""
+        def saved(counts: Counter) -> float:
+            return round(counts["cached_tokens"] / counts["prompt_tokens"], 3) if counts["prompt_tokens"] else 0.0
+
+        return {
+            **self.counters,
+            "caches": len(self._entries),
+            "saved_input_ratio": saved(self.counters),
+            "by_agent": {agent: {**counts, "saved_input_ratio": saved(counts)} for agent, counts in self._agents.items()},
+        }
+
+
+async def generate_cached(
+    llm_request: LlmRequest,
+    model: str,
+    backend,
+    generate: Callable[[LlmRequest], AsyncGenerator[LlmResponse, None]],
+) -> AsyncGenerator[LlmResponse, None]:
+    """Calls `generate` with the request's static prefix served from the prompt cache.
+
+    If the provider rejects the cached call before anything was yielded, the
+    cache is forgotten and the call is sent once more in full.
+    """
+    if not PROMPT_CACHE_ENABLED:
+        async for response in generate(llm_request):
+            yield response
+        return
+
+    cache = get_prefix_cache()
+    agent = request_agent(llm_request)  # Read first: Gemini drops the labels of the request it sends
+    request, entry = await cache.apply(llm_request, model, backend)
+    usage, started = None, False
+    try:
+        async for response in generate(request):
+            started = True
+            usage = response.usage_metadata or usage
+            yield response
+    except Exception as error:
+        if entry is None or started or not backend.is_cache_error(error):
+            raise
+        cache.invalidate(entry)
+        entry = None
+        async for response in generate(llm_request):
+            usage = response.usage_metadata or usage
+            yield response
+    finally:
+        # Also counts calls whose caller stopped reading early
+        cache.record(agent, entry, usage)
+
+
+_prefix_cache: PrefixCache | None = None
+
+
+def get_prefix_cache() -> PrefixCache:
+    """Returns the process-wide prefix cache, creating it on first use."""
+    global _prefix_cache
+    if _prefix_cache is None:
+        _prefix_cache = PrefixCache()
+    return _prefix_cache
@@ -0,0 +1,280 @@
+"""Shared bank of generated quiz questions and each learner's review schedule.
+
+Every quiz `quiz_generation_agent` produces is added to the bank, and every
+locally graded answer updates the learner's SM-2 schedule for its question.
+The quiz agent then answers from the bank when it can: a unit quiz from
+questions the learner has not seen, or a review of the ones that are due.
+
+The bank is one SQLite file shared by all workers. Its methods block, so
+agent callbacks call them through `asyncio.to_thread`.
+"""
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from collections import Counter
+from pathlib import Path
+
+from .embeddings import normalize_text
+from .prefetch import parse_plan_units
+
+
+# Generated questions and learners' review history, next to the other local stores
+QUIZ_BANK_PATH = os.getenv("QUIZ_BANK_PATH", os.path.join(".data", "quiz_bank.sqlite"))
+
+# Questions in a quiz served from the bank
+QUIZ_SIZE = int(os.getenv("QUIZ_SIZE", "5"))
+
+# Fewer suitable questions than this and a fresh quiz is generated instead
+QUIZ_BANK_MIN_ITEMS = int(os.getenv("QUIZ_BANK_MIN_ITEMS", "4"))
+
+_DAY = 24 * 3600
+
+
+def course_key(plan: str | None) -> str:
+    """Identifies a course by its ordered unit titles.
+
+    Personalized copies of a stored plan (see `personalize_plan`) keep the
+    same units, so learners following them share one bank.
+    """
+    units = parse_plan_units(plan or "")
+    text = "\n".join(normalize_text(unit) for unit in units) if units else normalize_text(plan or "")
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16] if text else ""
+
+
+def item_key(question: dict) -> str:
+    """Identifies a question by its prompt and answer key, whatever id it is shown under."""
+    answer = [normalize_text(str(value)) for value in question.get("answer") or []]
+    text = normalize_text(question.get("prompt", "")) + "|" + json.dumps(answer)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+def answer_quality(points_earned: float, points_possible: float) -> int:
+    """Maps a graded answer to an SM-2 quality grade: 1 when wrong, 4 when right."""
+    fraction = points_earned / points_possible if points_possible else 0.0
+    return round(1 + 3 * min(max(fraction, 0.0), 1.0))
+
+
+def schedule_review(reps: int, interval_days: float, ease: float, quality: int) -> tuple[int, float, float]:
+    """Applies one SM-2 review and returns the new (repetitions, interval in days, ease).
+
+    A failed recall (quality below 3) restarts the item at a one-day
+    interval; a successful one grows the interval by the item's ease, which
+    itself drifts up or down with how easy the recall was.
+    """
+    ease = max(1.3, ease + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+    if quality < 3:
+        return 0, 1.0, ease
+    reps += 1
+    if reps == 1:
+        interval_days = 1.0
+    elif reps == 2:
+        interval_days = 6.0
+    else:
+        interval_days = round(interval_days * ease, 2)
+    return reps, interval_days, ease
+
+
+class QuizBank:
+    """Persistent bank of generated quiz questions with per-learner spaced repetition.
+
+    Questions are stored by course, unit, concept and difficulty as the quiz
+    generator produces them. Graded answers update each learner's SM-2
+    schedule for the question. Quizzes are then assembled locally: a unit
+    quiz from questions the learner has not seen yet, a review from the
+    questions that are due. When the bank holds fewer than `min_items`
+    suitable questions, nothing is served and a fresh quiz is generated.
+    """
+
+    def __init__(self, path: str | Path, quiz_size: int = QUIZ_SIZE, min_items: int = QUIZ_BANK_MIN_ITEMS):
+        self.path = Path(path)
+        self.quiz_size = quiz_size
+        self.min_items = min_items
+        self.counters = Counter()
+        self._lock = threading.Lock()
+        self._ready = False
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._ready:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        if not self._ready:
+            conn.executescript(
+                "CREATE TABLE IF NOT EXISTS items ("
+                "id TEXT PRIMARY KEY, course TEXT NOT NULL, unit TEXT NOT NULL, concept TEXT NOT NULL, "
+                "difficulty TEXT NOT NULL, question TEXT NOT NULL, created REAL NOT NULL);"
+                "CREATE INDEX IF NOT EXISTS items_by_unit ON items (course, unit, difficulty);"
+                "CREATE TABLE IF NOT EXISTS history ("
+                "user_id TEXT NOT NULL, item_id TEXT NOT NULL, course TEXT NOT NULL, reps INTEGER NOT NULL, "
+                "interval_days REAL NOT NULL, ease REAL NOT NULL, lapses INTEGER NOT NULL, "
+                "due REAL NOT NULL, last_seen REAL NOT NULL, PRIMARY KEY (user_id, item_id));"
+                "CREATE INDEX IF NOT EXISTS history_by_due ON history (user_id, course, due);"
+            )
+            self._ready = True
+        return conn
+
+    def add_quiz(self, course: str, unit: str, quiz: dict) -> int:
+        """Stores the questions of a generated quiz; questions already in the bank are skipped.
+
+        Returns:
+            int: Number of new questions.
+        """
+        difficulty = str(quiz.get("difficulty") or "medium")
+        rows = [
+            (
+                item_key(question), course, normalize_text(unit), normalize_text(question.get("concept") or ""),
+                difficulty, json.dumps({k: v for k, v in question.items() if k != "id"}), time.time(),
+            )
+            for question in quiz.get("questions") or []
+            if question.get("prompt")
+        ]
+        with self._lock:
+            conn = self._connect()
+            try:
+                before = conn.total_changes
+                conn.executemany("INSERT OR IGNORE INTO items VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+                conn.commit()
+                added = conn.total_changes - before
+            finally:
+                conn.close()
+        self.counters["stored"] += added
+        return added
+
+    def _select(self, candidates: list[tuple[str, str, str]]) -> list[dict]:
+        """Takes up to `quiz_size` questions, one per concept first, keeping the candidates' order."""
+        chosen, concepts = [], set()
+        for distinct in (True, False):
+            for item_id, concept, question in candidates:
+                if len(chosen) == self.quiz_size:
+                    break
+                if any(item_id == picked[0] for picked in chosen) or (distinct and concept and concept in concepts):
+                    continue
+                chosen.append((item_id, question))
+                concepts.add(concept)
+        return [json.loads(question) for _, question in chosen]
+
+    @staticmethod
+    def _as_quiz(title: str, difficulty: str | None, questions: list[dict]) -> dict:
+        return {
+            "title": title,
+            "difficulty": difficulty or "medium",
+            "questions": [{"id": f"q{index}", **question} for index, question in enumerate(questions, 1)],
+        }
+
+    def unit_quiz(self, user_id: str, course: str, unit: str, difficulty: str | None = None) -> dict | None:
+        """Assembles a quiz on `unit` from questions the learner has not answered yet, or None when too few."""
+        self.counters["unit_lookups"] += 1
+        query = (
+            "SELECT id, concept, question FROM items WHERE course = ? AND unit = ?"
+            + (" AND difficulty = ?" if difficulty else "")
+            + " AND id NOT IN (SELECT item_id FROM history WHERE user_id = ?) ORDER BY created"
+        )
+        params = [course, normalize_text(unit)] + ([difficulty] if difficulty else []) + [user_id]
+        with self._lock:
+            conn = self._connect()
+            try:
+                candidates = conn.execute(query, params).fetchall()
+            finally:
+                conn.close()
+        questions = self._select(candidates)
+        if not course or len(questions) < self.min_items:
+            self.counters["unit_misses"] += 1
+            return None
+        self.counters["unit_hits"] += 1
+        return self._as_quiz(f"Quiz: {unit}", difficulty, questions)
+
+    def review_quiz(self, user_id: str, course: str, now: float | None = None) -> dict | None:
+        """Assembles a review of the learner's due questions, most overdue first.
+
+        Unseen questions from the units the learner has already been quizzed
+        on top the review up. Returns None when fewer than `min_items` qualify.
+        """
+        now = time.time() if now is None else now
+        self.counters["review_lookups"] += 1
+        with self._lock:
+            conn = self._connect()
+            try:
+                due = conn.execute(
+                    "SELECT items.id, items.concept, items.question FROM history JOIN items ON items.id = history.item_id "
+                    "WHERE history.user_id = ? AND history.course = ? AND history.due <= ? ORDER BY history.due",
+                    (user_id, course, now),
+                ).fetchall()
+                unseen = conn.execute(
+                    "SELECT id, concept, question FROM items WHERE course = ? AND unit IN "
+                    "(SELECT DISTINCT items.unit FROM history JOIN items ON items.id = history.item_id "
+                    " WHERE history.user_id = ? AND history.course = ?) "
+                    "AND id NOT IN (SELECT item_id FROM history WHERE user_id = ?) ORDER BY created",
+                    (course, user_id, course, user_id),
+                ).fetchall()
+            finally:
+                conn.close()
+        questions = self._select(due + unseen)
+        if not course or len(questions) < self.min_items:
+            self.counters["review_misses"] += 1
+            return None
+        self.counters["review_hits"] += 1
+        self.counters["due_served"] += min(len(due), len(questions))
+        return self._as_quiz("Review", None, questions)
+
+    def record_results(self, user_id: str, results: list[tuple[dict, float, float]], now: float | None = None) -> int:
+        """Updates the learner's review schedule from graded answers.
+
+        Args:
+            user_id (str): The learner.
+            results (list): (question, points earned, points possible) per graded question.
+            now (float, optional): Time of the answers, defaults to now.
+
+        Returns:
+            int: Number of bank questions whose schedule was updated.
+        """
+        now = time.time() if now is None else now
+        updated = 0
+        with self._lock:
+            conn = self._connect()
+            try:
+                for question, earned, possible in results:
+                    item_id = item_key(question)
+                    item = conn.execute("SELECT course FROM items WHERE id = ?", (item_id,)).fetchone()
+                    if item is None:
+                        continue
+                    row = conn.execute(
+                        "SELECT reps, interval_days, ease, lapses FROM history WHERE user_id = ? AND item_id = ?",
+                        (user_id, item_id),
+                    ).fetchone()
+                    reps, interval_days, ease, lapses = row or (0, 0.0, 2.5, 0)
+                    quality = answer_quality(earned, possible)
+                    reps, interval_days, ease = schedule_review(reps, interval_days, ease, quality)
+                    conn.execute(
+                        "INSERT OR REPLACE INTO history VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (user_id, item_id, item[0], reps, interval_days, ease, lapses + (quality < 3),
+                         now + interval_days * _DAY, now),
+                    )
+                    updated += 1
+                conn.commit()
+            finally:
+                conn.close()
+        self.counters["recorded"] += updated
+        return updated
+
+    def stats(self) -> dict:
+        """Returns bank counters and how often a quiz was served without generating one."""
+        lookups = self.counters["unit_lookups"] + self.counters["review_lookups"]
+        served = self.counters["unit_hits"] + self.counters["review_hits"]
+        return {
+            **self.counters,
+            "generation_skipped": served,
+            "skip_ratio": round(served / lookups, 3) if lookups else 0.0,
+        }
+
+
+_quiz_bank: QuizBank | None = None
+
+
+def get_quiz_bank() -> QuizBank:
+    """Returns the process-wide quiz bank, creating it on first use."""
+    global _quiz_bank
+    if _quiz_bank is None:
+        _quiz_bank = QuizBank(QUIZ_BANK_PATH)
+    return _quiz_bank
@@ -0,0 +1,407 @@
+"""Retry, deadline and circuit-breaker policy for model and Imagen calls.
+
+Each agent's model gets a `RetryPolicy` with capped, jittered exponential
+backoff instead of the SDK's uncapped retries. Every retry must also fit in
+the time left for the current user turn, and a per-model `CircuitBreaker`
+fails fast while the backend keeps returning 429/5xx or timing out.
+Failures are classified from the exception's structured fields
+(`classify_error`) rather than parsed out of its message.
+"""
+import os
+import time
+import random
+import asyncio
+import logging
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import AsyncGenerator, Awaitable, Callable, TypeVar
+
+from functools import partial
+
+import httpx
+from google.genai import errors as genai_errors
+from google.adk.models.google_llm import Gemini
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.adk.plugins.base_plugin import BasePlugin
+
+from .prompt_cache import GeminiCacheBackend, generate_cached
+from .routing import MODEL_ROUTING_ENABLED, generate_routed, get_router
+from .scheduler import STANDARD, get_scheduler
+from .streaming import partial_relay
+from .tracing import record_retry
+from .utils import require_env
+
+
+# Wall-clock budget for everything a single user message triggers
+TURN_DEADLINE_SECONDS = float(os.getenv("TURN_DEADLINE_SECONDS", "120"))
+
+# Consecutive backend failures that open a breaker, and how long it stays open
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_RESET_SECONDS = float(os.getenv("BREAKER_RESET_SECONDS", "30"))
+
+T = TypeVar("T")
+
+logger = logging.getLogger(__name__)
+
+_turn_deadline: ContextVar[tuple[float, str] | None] = ContextVar("learning_mate_turn_deadline", default=None)
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """How often and how patiently a call is retried.
+
+    Delays grow as `initial_delay * exp_base ** attempt`, are capped at
+    `max_delay`, and are drawn uniformly below that bound ("full jitter") so
+    concurrent learners hitting the same 429 don't retry in lockstep.
+    """
+    attempts: int = 3
+    initial_delay: float = 0.5
+    max_delay: float = 8.0
+    exp_base: float = 2.0
+    attempt_timeout: float | None = None  # Seconds allowed for one non-streaming attempt
+
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.initial_delay * self.exp_base ** attempt))
+
+
+# Conversational agents the learner is waiting on: give the backend a real chance
+DEFAULT_POLICY = RetryPolicy(attempts=4, initial_delay=1.0, max_delay=10.0, attempt_timeout=90)
+# Agents picked for speed: fail quickly rather than stall the turn
+FAST_POLICY = RetryPolicy(attempts=3, initial_delay=0.5, max_delay=4.0, attempt_timeout=45)
+# Imagen renders are slow and optional; one quick retry, then give up
+IMAGE_POLICY = RetryPolicy(attempts=2, initial_delay=1.0, max_delay=4.0, attempt_timeout=60)
+
+
+@dataclass
+class ErrorInfo:
+    """Structured classification of a failed backend call."""
+    kind: str  # rate_limited, unavailable, timeout, network, billing_required, auth, invalid_request, deadline, circuit_open, unknown
+    message: str
+    status: int | None = None
+    retryable: bool = False
+
+    @property
+    def backend_failure(self) -> bool:
+        """Whether the failure says the backend is unhealthy (and should count against its breaker)."""
+        return self.kind in {"rate_limited", "unavailable", "timeout", "network"}
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised without calling the backend while its circuit breaker is open."""
+
+
+class DeadlineExceededError(TimeoutError):
+    """Raised when the current user turn has no time left for another attempt."""
+
+
+def classify_error(error: BaseException) -> ErrorInfo:
+    """Classifies an exception from the GenAI SDK, httpx or asyncio.
+
+    Args:
+        error (BaseException): The exception raised by a backend call.
+
+    Returns:
+        ErrorInfo: Kind, HTTP status, human-readable message and whether a retry can help.
+    """
+    if isinstance(error, CircuitOpenError):
+        return ErrorInfo("circuit_open", str(error))
+    if isinstance(error, DeadlineExceededError):
+        return ErrorInfo("deadline", str(error))
+    if isinstance(error, genai_errors.APIError):
+        message = error.message or str(error)
+        code = error.code
+        if code == 429:
+            return ErrorInfo("rate_limited", message, code, retryable=True)
+        if code in (408, 500, 502, 503, 504):
+            return ErrorInfo("unavailable", message, code, retryable=True)
+        if "billed users" in message:
+            return ErrorInfo("billing_required", message, code)
+        if code in (401, 403):
+            return ErrorInfo("auth", message, code)
+        return ErrorInfo("invalid_request" if code and code < 500 else "unknown", message, code)
+    if isinstance(error, (asyncio.TimeoutError, TimeoutError, httpx.TimeoutException)):
+        return ErrorInfo("timeout", str(error) or "The request timed out.", retryable=True)
+    if isinstance(error, (httpx.TransportError, ConnectionError)):
+        return ErrorInfo("network", str(error), retryable=True)
+    return ErrorInfo("unknown", str(error))
+
+
+class CircuitBreaker:
+    """Closed / open / half-open breaker guarding one backend.
+
+    After `failure_threshold` consecutive backend failures the breaker opens
+    and rejects calls immediately. Once `reset_timeout` seconds have passed,
+    a single probe call is let through: success closes the breaker, failure
+    opens it again.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+        reset_timeout: float = BREAKER_RESET_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at: float | None = None
+        self.probing = False
+        self.counters = Counter()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half_open" if self.clock() - self.opened_at >= self.reset_timeout else "open"
+
+    def before_call(self) -> bool:
+        """Admits a call or raises CircuitOpenError.
+
+        Returns:
+            bool: Whether the call is the half-open probe, which must end in
+            `record` or, when it never finishes, `release_probe`.
+        """
+        state = self.state
+        if state == "open" or (state == "half_open" and self.probing):
+            self.counters["rejected"] += 1
+            raise CircuitOpenError(f"{self.name} is unavailable right now; please try again in a moment.")
+        self.counters["calls"] += 1
+        if state == "half_open":
+            self.probing = True
+            return True
+        return False
+
+    def release_probe(self) -> None:
+        """Lets the next call probe after the probe was cancelled or abandoned before its outcome was known."""
+        if self.probing:
+            self.probing = False
+            self.counters["abandoned_probes"] += 1
+
+    def record_success(self) -> None:
+        self.counters["successes"] += 1
+        if self.opened_at is not None:
+            self.counters["closed"] += 1
+        self.failures, self.opened_at, self.probing = 0, None, False
+
+    def record_failure(self) -> None:
+        self.counters["failures"] += 1
+        self.failures += 1
+        if self.probing or self.failures >= self.failure_threshold:
+            if self.opened_at is None or self.probing:
+                self.counters["opened"] += 1
+                logger.warning("Circuit breaker for %s opened after %d failures", self.name, self.failures)
+            self.opened_at, self.probing = self.clock(), False
+
+    def record(self, error: BaseException | None) -> None:
+        """Updates the breaker from a call outcome; only backend failures count against it."""
+        if error is None or not classify_error(error).backend_failure:
+            self.record_success()
+        else:
+            self.record_failure()
+
+    def stats(self) -> dict:
+        return {"name": self.name, "state": self.state, "consecutive_failures": self.failures, **self.counters}
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """Returns the process-wide breaker for a backend (one per model name)."""
+    if name not in _breakers:
+        _breakers[name] = CircuitBreaker(name)
+    return _breakers[name]
+
+
+def breaker_stats() -> list[dict]:
+    """Returns the state and counters of every breaker created so far."""
+    return [breaker.stats() for breaker in _breakers.values()]
+
+
+def remaining_turn_time() -> float | None:
+    """Seconds left in the current user turn, or None outside a turn."""
+    current = _turn_deadline.get()
+    return None if current is None else current[0] - time.monotonic()
+
+
+def clear_turn_deadline() -> None:
+    """Detaches the current task from the turn deadline, e.g. for work that outlives the turn."""
+    _turn_deadline.set(None)
+
+
+async def _plan_retry(policy: RetryPolicy, attempt: int, error: BaseException, model: str | None) -> float:
+    """Returns the delay before the next attempt, or re-raises when retrying can't help."""
+    info = classify_error(error)
+    if info.kind == "rate_limited" and model:
+        await get_scheduler().penalize(model)
+    if not info.retryable or attempt + 1 >= policy.attempts:
+        raise error
+    delay = policy.backoff(attempt)
+    remaining = remaining_turn_time()
+    if remaining is not None and delay >= remaining:
+        raise DeadlineExceededError(f"No time left in this turn to retry after: {info.message}") from error
+    record_retry(info.kind, attempt=attempt + 1, delay_s=round(delay, 3), status=info.status)
+    return delay
+
+
+async def _admit(policy: RetryPolicy, breaker: CircuitBreaker, model: str | None, priority: int) -> tuple[float | None, bool]:
+    """Waits for a rate-limit slot within the turn deadline, then passes the breaker.
+
+    Returns:
+        tuple[float | None, bool]: Timeout for the attempt, bounded by the time
+        left in the turn, and whether the attempt is the breaker's half-open probe.
+    """
+    if breaker.state == "open":
+        breaker.before_call()  # Fail fast without spending a rate-limit slot
+    if model:
+        remaining = remaining_turn_time()
+        try:
+            await asyncio.wait_for(get_scheduler().acquire(model, priority), remaining)
+        except asyncio.TimeoutError:
+            raise DeadlineExceededError(f"Timed out waiting for a {model} request slot.") from None
+    remaining = remaining_turn_time()
+    if remaining is not None and remaining <= 0:
+        raise DeadlineExceededError("The time budget for this turn is used up.")
+    probe = breaker.before_call()
+    limits = [limit for limit in (policy.attempt_timeout, remaining) if limit is not None]
+    return (min(limits) if limits else None), probe
+
+
+async def call_with_policy(
+    operation: Callable[[], Awaitable[T]],
+    policy: RetryPolicy,
+    breaker: CircuitBreaker,
+    model: str | None = None,
+    priority: int = STANDARD,
+) -> T:
+    """Runs `operation` under a retry policy, the turn deadline, a circuit breaker and the rate limiter.
+
+    Args:
+        operation: Zero-argument coroutine factory, called once per attempt.
+        policy (RetryPolicy): Attempts, backoff and per-attempt timeout.
+        breaker (CircuitBreaker): Breaker of the backend being called.
+        model (str, optional): Model name whose rate limit every attempt is scheduled under.
+        priority (int): Scheduling priority (INTERACTIVE, STANDARD or BACKGROUND).
+
+    Returns:
+        The operation's result.
+    """
+    for attempt in range(policy.attempts):
+        timeout, probe = await _admit(policy, breaker, model, priority)
+        try:
+            result = await asyncio.wait_for(operation(), timeout)
+        except Exception as error:
+            breaker.record(error)
+            await asyncio.sleep(await _plan_retry(policy, attempt, error, model))
+            continue
+        except BaseException:
+            # Cancelled: the outcome is unknown, so the next call may probe instead
+            if probe:
+                breaker.release_probe()
+            raise
+        breaker.record(None)
+        return result
+
+
+class ResilientGemini(Gemini):
+    """Gemini model whose calls follow a RetryPolicy, a per-model circuit breaker and the shared scheduler.
+
+    SDK-level retries stay disabled (`retry_options` is None) so the policy
+    is the only place delays come from. A streaming call is only retried if
+    it failed before its first chunk reached the learner. Unary calls made
+    for a relayed sub-agent (see `streaming.StreamingAgentTool`) stream too,
+    sending partial responses to the relay and yielding the aggregated ones;
+    they keep the unary retry policy until a response has been yielded.
+    When `self.model` is one of the routing tiers, each call goes to the
+    tier `routing.get_router()` picks for it; `self.model` is only its prior.
+    Each attempt takes the agent's instruction and tool declarations from
+    the provider's prompt cache (see `prompt_cache`) when they are cached.
+    """
+
+    policy: RetryPolicy = DEFAULT_POLICY
+    priority: int = STANDARD
+
+    def _send(self, llm_request: LlmRequest, stream: bool, model: str) -> AsyncGenerator[LlmResponse, None]:
+        """Sends one attempt, with the static prompt prefix served from the prompt cache."""
+        generate = partial(super().generate_content_async, stream=stream)
+        return generate_cached(llm_request, model, GeminiCacheBackend(self.api_client), generate)
+
+    async def _collect(self, llm_request: LlmRequest, model: str) -> list[LlmResponse]:
+        return [response async for response in self._send(llm_request, False, model)]
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        require_env(
+            "GOOGLE_API_KEY",
+            "Failed to create session: GOOGLE_API_KEY not found. "
+            "Please set the GOOGLE_API_KEY environment variable.",
+        )
+        if MODEL_ROUTING_ENABLED and get_router().handles(self.model):
+            generator = generate_routed(get_router(), llm_request, self.model, stream, self._generate)
+        else:
+            generator = self._generate(llm_request, stream, self.model)
+        async for response in generator:
+            yield response
+
+    async def _generate(self, llm_request: LlmRequest, stream: bool, model: str) -> AsyncGenerator[LlmResponse, None]:
+        """Calls `model` under its retry policy, breaker and rate limit."""
+        breaker = get_breaker(model)
+        relay = None if stream else partial_relay()
+        if not stream and relay is None:
+            responses = await call_with_policy(
+                lambda: self._collect(llm_request, model), self.policy, breaker, model, self.priority
+            )
+            for response in responses:
+                yield response
+            return
+
+        for attempt in range(self.policy.attempts):
+            _, probe = await _admit(self.policy, breaker, model, self.priority)
+            started = False
+            try:
+                async for response in self._send(llm_request, True, model):
+                    if relay is not None and response.partial:
+                        relay(response)
+                    else:
+                        started = True
+                        yield response
+            except Exception as error:
+                breaker.record(error)
+                if started:
+                    raise
+                await asyncio.sleep(await _plan_retry(self.policy, attempt, error, model))
+                continue
+            except BaseException:
+                # Cancelled, or closed early by the caller (GeneratorExit)
+                if probe:
+                    breaker.release_probe()
+                raise
+            breaker.record(None)
+            return
+
+
+class TurnDeadlinePlugin(BasePlugin):
+    """Starts the per-turn deadline when a user message arrives.
+
+    Sub-agent runs launched through AgentTool inherit the deadline of the
+    turn that launched them instead of starting a new one.
+    """
+
+    def __init__(self, seconds: float = TURN_DEADLINE_SECONDS, name: str = "learning_mate_turn_deadline"):
+        super().__init__(name=name)
+        self.seconds = seconds
+
+    async def before_run_callback(self, *, invocation_context) -> None:
+        if _turn_deadline.get() is None:
+            _turn_deadline.set((time.monotonic() + self.seconds, invocation_context.invocation_id))
+
+    async def after_run_callback(self, *, invocation_context) -> None:
+        current = _turn_deadline.get()
+        if current is not None and current[1] == invocation_context.invocation_id:
+            _turn_deadline.set(None)
@@ -0,0 +1,349 @@
+"""Per-request model tier routing with escalation on invalid output.
+
+Every agent names a default model, but the right tier depends on the
+request: "thanks!" to the smart friend does not need the stronger model,
+while grading a long free-text answer does. `ModelRouter.route` scores each
+model call locally, with no model call of its own. The score combines:
+
+* a prior from the agent's own model (its author's best guess),
+* heuristics on the latest message: length, keywords, whether it carries
+  tool results to synthesize or must match an output schema,
+* a nearest-centroid classifier over hashed n-grams, seeded with examples
+  and updated with the latest requests that had to be escalated ("hard")
+  or were accepted from the cheapest tier ("easy").
+
+The request goes to the cheapest tier the score allows, or straight to the
+strongest one when the score is too close to call, but never below the
+agent's floor in MODEL_TIER_FLOORS. `generate_routed` then
+checks what came back: text must match the request's output schema, and
+calls to agent tools must match their input schema. When it does not (or
+the call fails), the request is retried one tier up, unless some of its
+text already reached the learner. Latency, tokens, estimated cost and
+escalations are counted per tier.
+"""
+import os
+import math
+import time
+from collections import Counter, defaultdict, deque
+from dataclasses import dataclass
+from typing import AsyncGenerator, Callable
+
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from pydantic import BaseModel, ValidationError
+
+from .embeddings import cosine_similarity, hashed_ngram_embedding, normalize_text
+from .streaming import partial_relay
+from .utils import summarize_latencies
+
+
+# Set to "0" to always use each agent's own model
+MODEL_ROUTING_ENABLED = os.getenv("MODEL_ROUTING_ENABLED", "1") != "0"
+
+# Models a request can be routed to, cheapest first
+MODEL_TIERS = [model.strip() for model in os.getenv("MODEL_TIERS", "gemini-2.5-flash-lite,gemini-2.5-flash").split(",") if model.strip()]
+
+# "model=input:output" USD per million tokens, used for cost estimates only
+MODEL_PRICES = os.getenv("MODEL_PRICES", "gemini-2.5-flash-lite=0.10:0.40,gemini-2.5-flash=0.30:2.50")
+
+# Below this confidence the request goes to the strongest tier
+ROUTER_MIN_CONFIDENCE = float(os.getenv("ROUTER_MIN_CONFIDENCE", "0.3"))
+
+# Learned examples the classifier keeps per label, on top of its seed examples
+ROUTER_MAX_LEARNED = int(os.getenv("ROUTER_MAX_LEARNED", "500"))
+
+# "agent=model" lowest tier per agent; stored plans are reused by many learners, so the planner keeps flash
+MODEL_TIER_FLOORS = os.getenv("MODEL_TIER_FLOORS", "course_planning_agent=gemini-2.5-flash")
+
+_AGENT_LABEL = "adk_agent_name"
+
+# Wording that signals reasoning-heavy or trivial requests
+_HARD_WORDS = {
+    "why", "explain", "prove", "derive", "compare", "evaluate", "grade", "analyze", "analyse", "design",
+    "plan", "curriculum", "debug", "step", "steps", "detailed", "complex", "difference", "feedback", "score",
+}
+_EASY_WORDS = {"hi", "hello", "hey", "thanks", "thank", "ok", "okay", "yes", "no", "sure", "cool", "great", "bye", "next"}
+
+# Seed examples of the local classifier
+_SEED_EXAMPLES = {
+    "easy": [
+        "hi there", "thanks, that was helpful", "ok next", "what's my name?", "good morning!",
+        "can you show the image again", "yes please continue", "what time is it in Tokyo",
+        "Illustration for the lesson on qubits", "search the web for the latest Python release",
+    ],
+    "hard": [
+        "explain why the proof of the theorem works step by step",
+        "grade these free-text answers against the rubric and justify each score",
+        "design a twelve-week curriculum with prerequisites and assessments",
+        "compare the trade-offs of these two algorithms and analyze their complexity",
+        "my code fails with this stack trace, help me debug it",
+        "evaluate my answers and give detailed feedback on each mistake",
+    ],
+}
+
+
+def parse_floors(spec: str) -> dict[str, str]:
+    """Parses MODEL_TIER_FLOORS into {agent name: lowest model}."""
+    entries = (entry.partition("=") for entry in filter(None, (item.strip() for item in spec.split(","))))
+    return {agent.strip(): model.strip() for agent, _, model in entries}
+
+
+def parse_prices(spec: str) -> dict[str, tuple[float, float]]:
+    """Parses MODEL_PRICES into {model: (input, output) USD per million tokens}."""
+    prices = {}
+    for entry in filter(None, (item.strip() for item in spec.split(","))):
+        model, _, value = entry.partition("=")
+        input_price, _, output_price = value.partition(":")
+        prices[model.strip()] = (float(input_price), float(output_price or input_price))
+    return prices
+
+
+def _last_user_text(llm_request: LlmRequest) -> str:
+    for content in reversed(llm_request.contents or []):
+        if content.role == "user":
+            texts = [part.text for part in content.parts or [] if part.text]
+            if texts:
+                return " ".join(texts)
+    return ""
+
+
+def _has_tool_results(llm_request: LlmRequest) -> bool:
+    last = llm_request.contents[-1] if llm_request.contents else None
+    return bool(last and any(part.function_response for part in last.parts or []))
+
+
+@dataclass
+class Route:
+    """The tier picked for one model call and why."""
+    tier: int
+    model: str
+    confidence: float
+    reason: str
+
+
+class CentroidClassifier:
+    """Nearest-centroid text classifier over hashed n-gram embeddings.
+
+    Seed examples stay for good; learned ones form a window of the latest
+    `max_learned` per label, so a burst of one kind of request cannot
+    outweigh everything else forever.
+    """
+
+    def __init__(self, examples: dict[str, list[str]], max_learned: int = ROUTER_MAX_LEARNED):
+        self._sums: dict[str, dict[int, float]] = {}
+        self._counts = Counter()
+        self._learned: dict[str, deque] = defaultdict(lambda: deque(maxlen=max_learned))
+        for label, texts in examples.items():
+            for text in texts:
+                self._add(label, hashed_ngram_embedding(text), 1)
+
+    def _add(self, label: str, embedding: dict[int, float], sign: int) -> None:
+        centroid = self._sums.setdefault(label, defaultdict(float))
+        for key, value in embedding.items():
+            centroid[key] += sign * value
+        self._counts[label] += sign
+
+    def learn(self, text: str, label: str) -> None:
+        learned = self._learned[label]
+        if learned.maxlen == 0:
+            return
+        if len(learned) == learned.maxlen:
+            self._add(label, learned[0], -1)
+        embedding = hashed_ngram_embedding(text)
+        learned.append(embedding)
+        self._add(label, embedding, 1)
+
+    def similarity(self, text: str, label: str) -> float:
+        centroid = self._sums.get(label)
+        if not centroid:
+            return 0.0
+        return cosine_similarity(hashed_ngram_embedding(text), centroid)
+
+
+class ModelRouter:
+    """Picks a model tier per call, checks the output and keeps per-tier counters."""
+
+    def __init__(
+        self,
+        tiers: list[str] = MODEL_TIERS,
+        prices: dict[str, tuple[float, float]] | None = None,
+        min_confidence: float = ROUTER_MIN_CONFIDENCE,
+        floors: dict[str, str] | None = None,
+    ):
+        self.tiers = list(tiers)
+        self.prices = parse_prices(MODEL_PRICES) if prices is None else prices
+        self.floors = parse_floors(MODEL_TIER_FLOORS) if floors is None else floors
+        self.min_confidence = min_confidence
+        self.classifier = CentroidClassifier(_SEED_EXAMPLES)
+        self.counters = Counter()
+        self._latencies: dict[str, deque] = defaultdict(lambda: deque(maxlen=1000))
+        self._tiers: dict[str, Counter] = defaultdict(Counter)
+        self._agents: dict[str, Counter] = defaultdict(Counter)
+
+    def handles(self, model: str) -> bool:
+        return len(self.tiers) > 1 and model in self.tiers
+
+    def score(self, llm_request: LlmRequest, default_model: str) -> float:
+        """Returns the estimated probability that the call needs a stronger tier than the cheapest."""
+        text = _last_user_text(llm_request)
+        words = set(normalize_text(text).split())
+        # Start from the agent's own model, then let the request move it
+        logit = 1.0 if self.tiers.index(default_model) > 0 else -1.0
+        logit += min(len(text) / 600, 2.0) - 0.5
+        logit += 0.6 * min(len(words & _HARD_WORDS), 3) - 0.8 * min(len(words & _EASY_WORDS), 2)
+        if llm_request.config and llm_request.config.response_schema is not None:
+            logit += 0.3
+        if _has_tool_results(llm_request):
+            logit += 0.3
+        if text:
+            logit += 6.0 * (self.classifier.similarity(text, "hard") - self.classifier.similarity(text, "easy"))
+        return 1 / (1 + math.exp(-logit))
+
+    def route(self, llm_request: LlmRequest, default_model: str) -> Route:
+        """Chooses the tier of one call from its score; uncertain calls go to the strongest tier.
+
+        The agent's floor, if any, is the lowest tier it can be given.
+        """
+        agent = (llm_request.config.labels or {}).get(_AGENT_LABEL, "unknown") if llm_request.config else "unknown"
+        probability = self.score(llm_request, default_model)
+        confidence = abs(2 * probability - 1)
+        if confidence < self.min_confidence:
+            tier, reason = len(self.tiers) - 1, "low_confidence"
+        else:
+            tier, reason = min(int(probability * len(self.tiers)), len(self.tiers) - 1), "classified"
+        floor = self.floors.get(agent)
+        if floor in self.tiers and self.tiers.index(floor) > tier:
+            tier, reason = self.tiers.index(floor), "floor"
+        self.counters[f"routed_{reason}"] += 1
+        self._agents[agent][self.tiers[tier]] += 1
+        return Route(tier, self.tiers[tier], round(confidence, 3), reason)
+
+    def check(self, llm_request: LlmRequest, responses: list[LlmResponse]) -> str | None:
+        """Returns why the responses are unusable (invalid against a schema, empty), or None."""
+        parts = [part for response in responses if response.content for part in response.content.parts or []]
+        if not parts:
+            return None if any(response.error_code for response in responses) else "empty"
+        tools = llm_request.tools_dict
+        for part in parts:
+            if not part.function_call:
+                continue
+            tool = tools.get(part.function_call.name)
+            if tool is None:
+                return "unknown_tool"
+            schema = getattr(tool, "output_schema", None) if part.function_call.name == "set_model_response" else (
+                getattr(getattr(tool, "agent", None), "input_schema", None)
+            )
+            if isinstance(schema, type) and issubclass(schema, BaseModel):
+                try:
+                    schema.model_validate(part.function_call.args or {})
+                except ValidationError:
+                    return "invalid_arguments"
+        schema = llm_request.config.response_schema if llm_request.config else None
+        text = "".join(part.text for part in parts if part.text and not part.thought)
+        if isinstance(schema, type) and issubclass(schema, BaseModel) and not any(part.function_call for part in parts):
+            try:
+                schema.model_validate_json(text)
+            except ValidationError:
+                return "invalid_output"
+        return None
+
+    def record(self, model: str, seconds: float, responses: list[LlmResponse], problem: str | None) -> None:
+        """Counts one call of a tier: latency, tokens, estimated cost and its outcome."""
+        tier = self._tiers[model]
+        tier["calls"] += 1
+        tier["rejected" if problem else "accepted"] += 1
+        self._latencies[model].append(seconds)
+        usage = next((response.usage_metadata for response in reversed(responses) if response.usage_metadata), None)
+        if usage is not None:
+            tier["input_tokens"] += usage.prompt_token_count or 0
+            tier["output_tokens"] += usage.candidates_token_count or 0
+
+    def escalate(self, llm_request: LlmRequest, model: str, reason: str) -> None:
+        """Counts an escalation and teaches the classifier that such requests need more than `model`."""
+        self._tiers[model]["escalated"] += 1
+        self.counters[f"escalated_{reason}"] += 1
+        text = _last_user_text(llm_request)
+        if text:
+            self.classifier.learn(text, "hard")
+
+    def confirm(self, llm_request: LlmRequest, model: str) -> None:
+        """Teaches the classifier that the request was fine on `model` when it is the cheapest tier."""
+        text = _last_user_text(llm_request)
+        if text and model == self.tiers[0]:
+            self.classifier.learn(text, "easy")
+
+    def stats(self) -> dict:
+        """Returns routing counters, per-tier latency, tokens, cost and escalation rate, and each agent's tiers."""
+        tiers = {}
+        for model, counts in self._tiers.items():
+            input_price, output_price = self.prices.get(model, (0.0, 0.0))
+            tiers[model] = {
+                **counts,
+                "latency": summarize_latencies(list(self._latencies[model])),
+                "cost_usd": round((counts["input_tokens"] * input_price + counts["output_tokens"] * output_price) / 1e6, 6),
+                "escalation_rate": round(counts["escalated"] / counts["calls"], 3) if counts["calls"] else 0.0,
+            }
+        return {**self.counters, "tiers": tiers, "by_agent": {agent: dict(counts) for agent, counts in self._agents.items()}}
+
+
+async def generate_routed(
+    router: ModelRouter,
+    llm_request: LlmRequest,
+    default_model: str,
+    stream: bool,
+    generate: Callable[[LlmRequest, bool, str], AsyncGenerator[LlmResponse, None]],
+) -> AsyncGenerator[LlmResponse, None]:
+    """Calls `generate` on the routed tier, moving up a tier while the output is unusable.
+
+    Complete responses are held back until they are checked. Partial
+    (streamed) ones go out as they come, and once any has, the call can no
+    longer be escalated. Unary calls of a relayed sub-agent (see
+    `streaming.partial_relay`) are streamed here, with their partial
+    responses sent to the relay, so they stop escalating the same way.
+    """
+    relay = None if stream else partial_relay()
+    tier = router.route(llm_request, default_model).tier
+    while True:
+        model = router.tiers[tier]
+        llm_request.model = model
+        started = time.perf_counter()
+        responses, streamed, problem = [], False, None
+        try:
+            async for response in generate(llm_request, stream or relay is not None, model):
+                if response.partial:
+                    streamed = True
+                    if relay is not None:
+                        relay(response)
+                    else:
+                        yield response
+                else:
+                    responses.append(response)
+        except Exception:
+            router.record(model, time.perf_counter() - started, responses, "error")
+            if streamed or tier + 1 >= len(router.tiers):
+                raise
+            router.escalate(llm_request, model, "error")
+            tier += 1
+            continue
+        problem = router.check(llm_request, responses)
+        router.record(model, time.perf_counter() - started, responses, problem)
+        if problem and not streamed and tier + 1 < len(router.tiers):
+            router.escalate(llm_request, model, problem)
+            tier += 1
+            continue
+        if not problem:
+            router.confirm(llm_request, model)
+        for response in responses:
+            yield response
+        return
+
+
+_router: ModelRouter | None = None
+
+
+def get_router() -> ModelRouter:
+    """Returns the process-wide model router, creating it on first use."""
+    global _router
+    if _router is None:
+        _router = ModelRouter()
+    return _router
@@ -0,0 +1,292 @@
+"""Process-wide request scheduler that keeps model calls under each model's rate limit.
+
+Every Gemini and Imagen call takes a slot from its model's token bucket
+before it is sent. When the bucket is empty, callers queue up and are
+served by priority (interactive tutor replies before standard sub-agent
+work before background image renders), then in arrival order. Retries go
+through the same queue, so a burst of 429s slows every agent down together
+instead of multiplying the load. Worker processes serving the same app
+share their buckets through the SQLite file in MODEL_RATE_LIMITS_STORE.
+"""
+import os
+import time
+import heapq
+import asyncio
+import sqlite3
+import threading
+import itertools
+from collections import Counter, deque
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Callable
+
+from .utils import summarize_latencies
+
+
+INTERACTIVE, STANDARD, BACKGROUND = 0, 1, 2
+PRIORITY_NAMES = {INTERACTIVE: "interactive", STANDARD: "standard", BACKGROUND: "background"}
+
+# "model=requests_per_minute[:burst]" entries; a key applies to every model name it prefixes.
+# Empty by default: limits are opt-in, set to the quota of the project's tier
+MODEL_RATE_LIMITS = os.getenv("MODEL_RATE_LIMITS", "")
+
+# SQLite file holding the buckets when several processes share the quota (set for each worker)
+MODEL_RATE_LIMITS_STORE = os.getenv("MODEL_RATE_LIMITS_STORE", "")
+
+
+# Lowest priority the current task may schedule at; raised for speculative background work
+_priority_floor: ContextVar[int] = ContextVar("learning_mate_priority_floor", default=INTERACTIVE)
+
+
+def demote_to_background() -> None:
+    """Schedules every later model call of the current task at BACKGROUND priority."""
+    _priority_floor.set(BACKGROUND)
+
+
+def parse_rate_limits(spec: str) -> dict[str, tuple[float, int]]:
+    """Parses `MODEL_RATE_LIMITS` into {model prefix: (requests per minute, burst)}.
+
+    The burst defaults to half the per-minute limit (at least 1), so the few
+    calls of one turn go out at once instead of being spaced over the minute.
+    """
+    limits = {}
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        model, _, value = entry.partition("=")
+        rpm, _, burst = value.partition(":")
+        limits[model.strip()] = (float(rpm), int(burst) if burst else max(1, int(float(rpm)) // 2))
+    return limits
+
+
+class TokenBucket:
+    """Token bucket sized so that no 60-second window exceeds `requests_per_minute`.
+
+    It holds up to `burst` tokens and refills at `(requests_per_minute - burst) / 60`
+    per second, so an idle bucket's burst plus a minute of refill adds up
+    to the per-minute quota.
+    """
+
+    def __init__(self, requests_per_minute: float, burst: int, clock: Callable[[], float] = time.monotonic):
+        self.capacity = max(1, min(burst, int(requests_per_minute)))
+        self.rate = max(requests_per_minute - self.capacity, 1) / 60
+        self.clock = clock
+        self.tokens = float(self.capacity)
+        self.updated = clock()
+
+    def _refill(self) -> None:
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_take(self) -> bool:
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def time_until_available(self) -> float:
+        self._refill()
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def drain(self) -> None:
+        """Empties the bucket, e.g. after the server answered 429."""
+        self._refill()
+        self.tokens = min(self.tokens, 0.0)
+
+
+class SharedTokenBucket(TokenBucket):
+    """A TokenBucket kept in SQLite, so every process using `path` draws from the same quota.
+
+    Each operation refills and updates the bucket's row in one write
+    transaction, on wall-clock time shared by all processes.
+    """
+
+    def __init__(self, path: str | Path, name: str, requests_per_minute: float, burst: int, clock: Callable[[], float] = time.time):
+        super().__init__(requests_per_minute, burst, clock)
+        self.name = name
+        self._lock = threading.Lock()
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS buckets (name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)")
+
+    def _update(self, change: Callable[[float], float]) -> float:
+        """Refills the shared bucket, applies `change` to its tokens and returns the tokens before the change."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                now = self.clock()
+                row = self._conn.execute("SELECT tokens, updated FROM buckets WHERE name = ?", (self.name,)).fetchone()
+                tokens = self.capacity if row is None else min(self.capacity, row[0] + max(0.0, now - row[1]) * self.rate)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO buckets (name, tokens, updated) VALUES (?, ?, ?)", (self.name, change(tokens), now),
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return tokens
+
+    def try_take(self) -> bool:
+        return self._update(lambda tokens: tokens - 1 if tokens >= 1 else tokens) >= 1
+
+    def time_until_available(self) -> float:
+        tokens = self._update(lambda tokens: tokens)
+        return 0.0 if tokens >= 1 else (1 - tokens) / self.rate
+
+    def drain(self) -> None:
+        self._update(lambda tokens: min(tokens, 0.0))
+
+
+class _Lane:
+    """Bucket, priority queue and statistics of one rate-limited model."""
+
+    def __init__(self, name: str, bucket: TokenBucket):
+        self.name = name
+        self.bucket = bucket
+        self.queue: list[tuple[int, int, asyncio.Future]] = []
+        self.sequence = itertools.count()
+        self.dispatcher: asyncio.Task | None = None
+        self.counters = Counter()
+        self.max_depth = 0
+        self.waits = {priority: deque(maxlen=1000) for priority in PRIORITY_NAMES}
+
+    @property
+    def depth(self) -> int:
+        return sum(1 for _, _, future in self.queue if not future.done())
+
+
+class RequestScheduler:
+    """Grants model calls a slot under per-model rate limits, by priority.
+
+    Models without a configured limit are never queued. With a `store`, the
+    buckets are shared with every other process using the same file.
+    """
+
+    def __init__(
+        self,
+        limits: dict[str, tuple[float, int]],
+        clock: Callable[[], float] = time.monotonic,
+        store: str | Path | None = None,
+    ):
+        self.limits = limits
+        self.clock = clock
+        self.store = store
+        self._lanes: dict[str, _Lane | None] = {}
+
+    def _lane(self, model: str) -> _Lane | None:
+        if model not in self._lanes:
+            # The longest matching prefix wins, so "gemini-2.5-flash-lite" isn't limited as "gemini-2.5-flash"
+            prefixes = [prefix for prefix in self.limits if model.startswith(prefix)]
+            if not prefixes:
+                self._lanes[model] = None
+            else:
+                prefix = max(prefixes, key=len)
+                lane = next((lane for lane in self._lanes.values() if lane and lane.name == prefix), None)
+                if lane is None:
+                    bucket = (
+                        SharedTokenBucket(self.store, prefix, *self.limits[prefix]) if self.store
+                        else TokenBucket(*self.limits[prefix], clock=self.clock)
+                    )
+                    lane = _Lane(prefix, bucket)
+                self._lanes[model] = lane
+        return self._lanes[model]
+
+    async def _call_bucket(self, lane: _Lane, operation: str):
+        """Runs a bucket operation; a shared bucket's SQLite transaction runs in a thread, off the event loop."""
+        method = getattr(lane.bucket, operation)
+        if isinstance(lane.bucket, SharedTokenBucket):
+            return await asyncio.to_thread(method)
+        return method()
+
+    async def acquire(self, model: str, priority: int = STANDARD) -> float:
+        """Waits for a request slot for `model`.
+
+        Args:
+            model (str): Model name the request is sent to.
+            priority (int): INTERACTIVE, STANDARD or BACKGROUND.
+
+        Returns:
+            float: Seconds spent waiting in the queue.
+        """
+        lane = self._lane(model)
+        if lane is None:
+            return 0.0
+
+        priority = max(priority, _priority_floor.get())
+        started = self.clock()
+        if not lane.queue and await self._call_bucket(lane, "try_take"):
+            self._record(lane, priority, 0.0)
+            return 0.0
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(lane.queue, (priority, next(lane.sequence), future))
+        lane.max_depth = max(lane.max_depth, lane.depth)
+        if lane.dispatcher is None or lane.dispatcher.done():
+            lane.dispatcher = asyncio.create_task(self._dispatch(lane))
+        try:
+            await future
+        except asyncio.CancelledError:
+            lane.counters["abandoned"] += 1
+            raise
+        waited = self.clock() - started
+        self._record(lane, priority, waited)
+        return waited
+
+    async def _dispatch(self, lane: _Lane) -> None:
+        """Hands out tokens to queued callers, highest priority first, until the queue is empty."""
+        while lane.queue:
+            if lane.queue[0][2].done():  # Caller gave up (cancelled or timed out)
+                heapq.heappop(lane.queue)
+                continue
+            delay = await self._call_bucket(lane, "time_until_available")
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+            if await self._call_bucket(lane, "try_take"):
+                # Callers may have given up or joined the queue while the bucket was updated
+                while lane.queue and lane.queue[0][2].done():
+                    heapq.heappop(lane.queue)
+                if lane.queue:
+                    heapq.heappop(lane.queue)[2].set_result(None)
+
+    def _record(self, lane: _Lane, priority: int, waited: float) -> None:
+        lane.counters["granted"] += 1
+        lane.counters[f"granted_{PRIORITY_NAMES[priority]}"] += 1
+        if waited:
+            lane.counters["queued"] += 1
+        lane.waits[priority].append(waited)
+
+    async def penalize(self, model: str) -> None:
+        """Drains the model's bucket after a 429 so queued callers back off together."""
+        lane = self._lane(model)
+        if lane is not None:
+            await self._call_bucket(lane, "drain")
+            lane.counters["throttled"] += 1
+
+    def stats(self) -> dict:
+        """Returns queue depth, grant counters and wait-time percentiles per rate-limited model."""
+        lanes = {lane.name: lane for lane in self._lanes.values() if lane is not None}
+        return {
+            name: {
+                "queue_depth": lane.depth,
+                "max_queue_depth": lane.max_depth,
+                **lane.counters,
+                "wait": {
+                    PRIORITY_NAMES[priority]: summarize_latencies(list(waits))
+                    for priority, waits in lane.waits.items() if waits
+                },
+            }
+            for name, lane in lanes.items()
+        }
+
+
+_scheduler: RequestScheduler | None = None
+
+
+def get_scheduler() -> RequestScheduler:
+    """Returns the process-wide scheduler configured from MODEL_RATE_LIMITS and MODEL_RATE_LIMITS_STORE."""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = RequestScheduler(parse_rate_limits(MODEL_RATE_LIMITS), store=MODEL_RATE_LIMITS_STORE or None)
+    return _scheduler
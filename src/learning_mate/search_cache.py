@@ -0,0 +1,221 @@
+import re
+import json
+import time
+import asyncio
+import sqlite3
+import threading
+from collections import Counter
+from functools import partial
+from pathlib import Path
+from typing import Awaitable, Callable
+
+
+# Queries that ask for recent events get a shorter time-to-live
+_TIME_SENSITIVE = re.compile(
+    r"\b(latest|newest|recent|today|yesterday|this (week|month|year)|news|current|now)\b"
+)
+
+
+def make_search_key(tool_name: str, arguments: dict) -> str:
+    """Builds a stable cache key from a search tool call.
+
+    String arguments are case-folded and whitespace-collapsed so near-identical
+    queries from different learners share one entry.
+
+    Args:
+        tool_name (str): Name of the MCP tool being called.
+        arguments (dict): Tool call arguments.
+
+    Returns:
+        str: The normalized key.
+    """
+    normalized = {
+        name: " ".join(value.casefold().split()) if isinstance(value, str) else value
+        for name, value in arguments.items()
+    }
+    return f"{tool_name}:{json.dumps(normalized, sort_keys=True, default=str)}"
+
+
+class SearchCache:
+    """SQLite-backed cache of raw search results with per-query TTLs.
+
+    Entries expire after `default_ttl` seconds, or `fresh_ttl` for
+    time-sensitive queries. With `stale_while_revalidate`, an expired entry
+    younger than `default_ttl + stale_ttl` is served immediately while a
+    background task refreshes it. Least recently used entries are evicted
+    once the store exceeds `max_bytes` or `max_entries`.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        default_ttl: float = 24 * 3600,
+        fresh_ttl: float = 3600,
+        stale_while_revalidate: bool = False,
+        stale_ttl: float = 24 * 3600,
+        max_bytes: int = 64 * 1024 * 1024,
+        max_entries: int = 50_000,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.path = Path(path)
+        self.default_ttl = default_ttl
+        self.fresh_ttl = fresh_ttl
+        self.stale_while_revalidate = stale_while_revalidate
+        self.stale_ttl = stale_ttl
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.clock = clock
+        self.counters = Counter()
+        self._lock = threading.Lock()
+        self._in_flight: dict[str, asyncio.Task] = {}
+        self._refreshing: set[asyncio.Task] = set()
+        self._ready = False
+
+    def ttl_for(self, key: str) -> float:
+        """Returns the time-to-live for a key, shorter for time-sensitive queries."""
+        return self.fresh_ttl if _TIME_SENSITIVE.search(key) else self.default_ttl
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._ready:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        if not self._ready:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+                "expires REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)")
+            conn.commit()
+            self._ready = True
+        return conn
+
+    def get(self, key: str) -> tuple[dict, float] | None:
+        """Returns the cached result and its expiry time, or None on a miss.
+
+        Entries past their stale window are deleted and reported as misses.
+        """
+        now = self.clock()
+        with self._lock:
+            conn = self._connect()
+            try:
+                row = conn.execute("SELECT value, expires FROM results WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    return None
+                value, expires = row
+                grace = self.stale_ttl if self.stale_while_revalidate else 0
+                if now >= expires + grace:
+                    conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                    conn.commit()
+                    self.counters["expired"] += 1
+                    return None
+                conn.execute("UPDATE results SET last_used = ? WHERE key = ?", (now, key))
+                conn.commit()
+                return json.loads(value), expires
+            finally:
+                conn.close()
+
+    def put(self, key: str, result: dict, ttl: float | None = None) -> None:
+        """Stores a result under `key` and evicts old entries if over the limits."""
+        now = self.clock()
+        value = json.dumps(result)
+        expires = now + (self.ttl_for(key) if ttl is None else ttl)
+        with self._lock:
+            conn = self._connect()
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO results (key, value, size, expires, last_used) VALUES (?, ?, ?, ?, ?)",
+                    (key, value, len(value), expires, now),
+                )
+                self._evict(conn)
+                conn.commit()
+            finally:
+                conn.close()
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+
+        for key, size in conn.execute("SELECT key, size FROM results ORDER BY last_used").fetchall():
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM results WHERE key = ?", (key,))
+            self.counters["evictions"] += 1
+            count -= 1
+            total -= size
+
+    async def _fetch_and_store(self, key: str, fetch: Callable[[], Awaitable[dict]]) -> dict:
+        """Fetches a result, sharing one call among concurrent requests for `key`.
+
+        The call runs in a task of its own, so a cancelled caller stops waiting
+        without cancelling the search for the others.
+        """
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.counters["coalesced"] += 1
+        else:
+            task = asyncio.create_task(self._fetch(key, fetch))
+            self._in_flight[key] = task
+            task.add_done_callback(partial(self._fetch_done, key))
+        return await asyncio.shield(task)
+
+    async def _fetch(self, key: str, fetch: Callable[[], Awaitable[dict]]) -> dict:
+        result = await fetch()
+        # Errors reported by the server are passed through but never cached
+        if not result.get("is_error", result.get("isError", False)):
+            try:
+                await asyncio.to_thread(self.put, key, result)
+            except sqlite3.Error:
+                self.counters["store_errors"] += 1
+        return result
+
+    def _fetch_done(self, key: str, task: asyncio.Task) -> None:
+        del self._in_flight[key]
+        if not task.cancelled():
+            # Mark retrieved so a failure no caller waited for does not log a warning
+            task.exception()
+
+    async def _refresh(self, key: str, fetch: Callable[[], Awaitable[dict]]) -> None:
+        try:
+            await self._fetch_and_store(key, fetch)
+            self.counters["refreshes"] += 1
+        except Exception:
+            self.counters["refresh_failures"] += 1
+
+    async def get_or_fetch(self, key: str, fetch: Callable[[], Awaitable[dict]]) -> dict:
+        """Returns a cached result for `key`, calling `fetch` on a miss.
+
+        Args:
+            key (str): Key built with `make_search_key`.
+            fetch (Callable): Coroutine factory performing the real search.
+
+        Returns:
+            dict: The raw search result.
+        """
+        cached = await asyncio.to_thread(self.get, key)
+        if cached is not None:
+            result, expires = cached
+            if self.clock() < expires:
+                self.counters["hits"] += 1
+                return result
+
+            # Expired but inside the stale window: answer now, refresh in the background
+            self.counters["stale_hits"] += 1
+            if key not in self._in_flight:
+                task = asyncio.create_task(self._refresh(key, fetch))
+                self._refreshing.add(task)
+                task.add_done_callback(self._refreshing.discard)
+            return result
+
+        self.counters["misses"] += 1
+        return await self._fetch_and_store(key, fetch)
+
+    def stats(self) -> dict:
+        """Returns hit/miss/stale/refresh/eviction counters and the hit ratio."""
+        served = self.counters["hits"] + self.counters["stale_hits"]
+        lookups = served + self.counters["misses"]
+        return {
+            **self.counters,
+            "hit_ratio": round(served / lookups, 3) if lookups else 0.0,
+        }
@@ -0,0 +1,485 @@
+"""SQLite session service tuned for many concurrent learners on one machine.
+
+Compared with ADK's stock SQLite backend, `TunedSqliteSessionService`:
+
+* opens the database in WAL mode with `synchronous=NORMAL`, so readers
+  never block the writer and commits don't wait for a full fsync;
+* reuses connections from a small pool instead of opening one per call;
+* buffers the events of a turn in memory and writes them in one
+  transaction when the turn ends (`SessionFlushPlugin`), when the buffer
+  fills up, or after `SESSION_FLUSH_SECONDS` at the latest, batching the
+  pending turns of all learners into the same commit;
+* stores state one key per row and writes only the keys an event changed,
+  instead of rewriting the whole state document on every update;
+* indexes the per-user session listing and the per-session event scan.
+
+Reads flush the buffer first, so they always see every appended event.
+As in the stock backend, appending through a copy of a session that another
+writer has updated since it was read raises `StaleSessionError`.
+"""
+import os
+import json
+import time
+import uuid
+import queue
+import asyncio
+import sqlite3
+import logging
+import threading
+from collections import Counter, deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Optional
+
+from google.adk.errors import StaleSessionError
+from google.adk.errors.already_exists_error import AlreadyExistsError
+from google.adk.events import Event
+from google.adk.plugins.base_plugin import BasePlugin
+from google.adk.sessions import BaseSessionService, Session, State
+from google.adk.sessions.base_session_service import GetSessionConfig, ListSessionsResponse
+
+from .utils import summarize_latencies
+
+
+# Separate from the stock backend's sessions.sqlite, whose schema differs
+SESSION_STORE_PATH = os.getenv("SESSION_STORE_PATH", os.path.join(".data", "session_store.sqlite"))
+
+# Longest time an appended event may wait in memory before it is committed
+SESSION_FLUSH_SECONDS = float(os.getenv("SESSION_FLUSH_SECONDS", "1.0"))
+
+# Number of pooled connections
+SESSION_POOL_SIZE = int(os.getenv("SESSION_POOL_SIZE", "4"))
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    app_name TEXT NOT NULL, user_id TEXT NOT NULL, id TEXT NOT NULL,
+    create_time REAL NOT NULL, update_time REAL NOT NULL,
+    PRIMARY KEY (app_name, user_id, id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS sessions_by_update ON sessions (app_name, user_id, update_time);
+CREATE TABLE IF NOT EXISTS events (
+    app_name TEXT NOT NULL, user_id TEXT NOT NULL, session_id TEXT NOT NULL, id TEXT NOT NULL,
+    invocation_id TEXT NOT NULL, timestamp REAL NOT NULL, event_data TEXT NOT NULL,
+    UNIQUE (app_name, user_id, session_id, id)
+);
+CREATE INDEX IF NOT EXISTS events_by_session ON events (app_name, user_id, session_id, timestamp);
+CREATE TABLE IF NOT EXISTS session_states (
+    app_name TEXT NOT NULL, user_id TEXT NOT NULL, session_id TEXT NOT NULL, key TEXT NOT NULL, value TEXT,
+    PRIMARY KEY (app_name, user_id, session_id, key)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS user_states (
+    app_name TEXT NOT NULL, user_id TEXT NOT NULL, key TEXT NOT NULL, value TEXT,
+    PRIMARY KEY (app_name, user_id, key)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS app_states (
+    app_name TEXT NOT NULL, key TEXT NOT NULL, value TEXT,
+    PRIMARY KEY (app_name, key)
+) WITHOUT ROWID;
+"""
+
+
+def _split_delta(delta: dict[str, Any]) -> tuple[dict, dict, dict]:
+    """Splits a state delta into app, user and session keys (prefixes removed)."""
+    app, user, session = {}, {}, {}
+    for key, value in delta.items():
+        if key.startswith(State.APP_PREFIX):
+            app[key[len(State.APP_PREFIX):]] = value
+        elif key.startswith(State.USER_PREFIX):
+            user[key[len(State.USER_PREFIX):]] = value
+        elif not key.startswith(State.TEMP_PREFIX):
+            session[key] = value
+    return app, user, session
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, default=str)
+
+
+class _ConnectionPool:
+    """A fixed set of WAL-mode connections shared by worker threads.
+
+    Connections are opened on demand, up to `size`; the first one creates
+    the schema before any other is handed out.
+    """
+
+    def __init__(self, path: Path, size: int):
+        self.path = path
+        self.size = size
+        self._idle: queue.Queue[sqlite3.Connection] = queue.Queue()
+        self._opened = 0
+        self._schema_ready = False
+        self._lock = threading.Lock()
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA cache_size=-16000")  # 16 MB page cache per connection
+        with self._lock:
+            if not self._schema_ready:
+                conn.executescript(_SCHEMA)
+                self._schema_ready = True
+        return conn
+
+    def _acquire(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            can_open = self._opened < self.size
+            if can_open:
+                self._opened += 1  # Reserved before opening, so concurrent callers cannot exceed `size`
+        if not can_open:
+            return self._idle.get()
+        try:
+            return self._open()
+        except BaseException:
+            with self._lock:
+                self._opened -= 1
+            raise
+
+    @contextmanager
+    def connection(self):
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            self._idle.put(conn)
+
+    def close(self) -> None:
+        while not self._idle.empty():
+            self._idle.get_nowait().close()
+
+
+class TunedSqliteSessionService(BaseSessionService):
+    """Write-batched SQLite session service; see the module docstring."""
+
+    def __init__(
+        self,
+        path: str | Path = SESSION_STORE_PATH,
+        pool_size: int = SESSION_POOL_SIZE,
+        flush_seconds: float = SESSION_FLUSH_SECONDS,
+        max_pending: int = 256,
+    ):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.flush_seconds = flush_seconds
+        self.max_pending = max_pending
+        self.counters = Counter()
+        self.commit_seconds = deque(maxlen=1000)
+        self._pool = _ConnectionPool(self.path, pool_size)
+        # Buffered writes in append order: (session, event, app delta, user delta, session delta)
+        self._pending: list[tuple[Session, Event, dict, dict, dict]] = []
+        self._flush_lock: asyncio.Lock | None = None
+        # Sessions with events in the batch being written
+        self._writing: set[tuple[str, str, str]] = set()
+        # Update time of sessions whose latest events are not committed yet
+        self._buffered_updates: dict[tuple[str, str, str], float] = {}
+        self._flush_timer: asyncio.Task | None = None
+
+    # Writes
+
+    async def create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: Optional[dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+    ) -> Session:
+        session_id = (session_id or "").strip() or str(uuid.uuid4())
+        app_delta, user_delta, session_state = _split_delta(state or {})
+        now = time.time()
+
+        def write() -> None:
+            with self._pool.connection() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    conn.execute(
+                        "INSERT INTO sessions (app_name, user_id, id, create_time, update_time) VALUES (?, ?, ?, ?, ?)",
+                        (app_name, user_id, session_id, now, now),
+                    )
+                    self._write_states(conn, app_name, user_id, session_id, app_delta, user_delta, session_state)
+                    conn.execute("COMMIT")
+                except sqlite3.IntegrityError:
+                    conn.execute("ROLLBACK")
+                    raise AlreadyExistsError(f"Session with id {session_id} already exists.")
+                except BaseException:
+                    conn.execute("ROLLBACK")
+                    raise
+
+        await asyncio.to_thread(write)
+        return await self.get_session(app_name=app_name, user_id=user_id, session_id=session_id)
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        if event.partial:
+            return event
+        key = (session.app_name, session.user_id, session.id)
+        stored = await asyncio.to_thread(self._stored_update_time, *key)
+        latest = max(stored or 0.0, self._buffered_updates.get(key, 0.0))
+        if latest > session.last_update_time:
+            self.counters["stale_rejected"] += 1
+            raise StaleSessionError(
+                "The last_update_time provided in the session object is earlier than the update_time in storage."
+                " Please check if it is a stale session."
+            )
+        event = await super().append_event(session, event)
+        session.last_update_time = event.timestamp
+        self._buffered_updates[key] = event.timestamp
+        self._pending.append((session, event, *_split_delta(event.actions.state_delta if event.actions else {})))
+        self.counters["appended"] += 1
+        if len(self._pending) >= self.max_pending:
+            await self.flush()
+        elif self._flush_timer is None or self._flush_timer.done():
+            self._flush_timer = asyncio.create_task(self._flush_later())
+        return event
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.flush_seconds)
+        try:
+            await self.flush()
+        except sqlite3.Error:
+            logger.exception("Failed to write buffered session events")
+
+    async def flush(self) -> None:
+        """Commits every buffered event and state change in a single transaction."""
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            batch, self._pending = self._pending, []
+            self._writing = {(session.app_name, session.user_id, session.id) for session, *_ in batch}
+            started = time.perf_counter()
+            try:
+                await asyncio.to_thread(self._write_batch, batch)
+            except BaseException:
+                self._pending[:0] = batch  # Keep them for the next attempt
+                raise
+            finally:
+                self._writing = set()
+            for session, event, *_ in batch:
+                key = (session.app_name, session.user_id, session.id)
+                if self._buffered_updates.get(key) == event.timestamp:
+                    del self._buffered_updates[key]
+            self.commit_seconds.append(time.perf_counter() - started)
+            self.counters["commits"] += 1
+            self.counters["committed_events"] += len(batch)
+
+    async def _flush_session(self, app_name: str, user_id: str, session_id: str) -> None:
+        """Flushes only when the session has uncommitted events, so reads of idle sessions never wait on others' commits."""
+        key = (app_name, user_id, session_id)
+        if key in self._writing or any((session.app_name, session.user_id, session.id) == key for session, *_ in self._pending):
+            await self.flush()
+
+    def _stored_update_time(self, app_name: str, user_id: str, session_id: str) -> float | None:
+        with self._pool.connection() as conn:
+            row = conn.execute(
+                "SELECT update_time FROM sessions WHERE app_name = ? AND user_id = ? AND id = ?", (app_name, user_id, session_id),
+            ).fetchone()
+        return row[0] if row else None
+
+    def _write_batch(self, batch: list[tuple[Session, Event, dict, dict, dict]]) -> None:
+        with self._pool.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(
+                    "INSERT OR IGNORE INTO events (app_name, user_id, session_id, id, invocation_id, timestamp, event_data) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [
+                        (session.app_name, session.user_id, session.id, event.id, event.invocation_id,
+                         event.timestamp, event.model_dump_json(exclude_none=True))
+                        for session, event, *_ in batch
+                    ],
+                )
+                for session, event, app_delta, user_delta, session_delta in batch:
+                    self._write_states(conn, session.app_name, session.user_id, session.id, app_delta, user_delta, session_delta)
+                latest = {}
+                for session, event, *_ in batch:
+                    latest[(session.app_name, session.user_id, session.id)] = event.timestamp
+                conn.executemany(
+                    "UPDATE sessions SET update_time = ? WHERE app_name = ? AND user_id = ? AND id = ?",
+                    [(timestamp, *key) for key, timestamp in latest.items()],
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    @staticmethod
+    def _write_states(conn, app_name, user_id, session_id, app_delta, user_delta, session_delta) -> None:
+        """Upserts only the state keys that changed."""
+        if app_delta:
+            conn.executemany(
+                "INSERT OR REPLACE INTO app_states (app_name, key, value) VALUES (?, ?, ?)",
+                [(app_name, key, _dumps(value)) for key, value in app_delta.items()],
+            )
+        if user_delta:
+            conn.executemany(
+                "INSERT OR REPLACE INTO user_states (app_name, user_id, key, value) VALUES (?, ?, ?, ?)",
+                [(app_name, user_id, key, _dumps(value)) for key, value in user_delta.items()],
+            )
+        if session_delta:
+            conn.executemany(
+                "INSERT OR REPLACE INTO session_states (app_name, user_id, session_id, key, value) VALUES (?, ?, ?, ?, ?)",
+                [(app_name, user_id, session_id, key, _dumps(value)) for key, value in session_delta.items()],
+            )
+
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        await self.flush()
+
+        def delete() -> None:
+            with self._pool.connection() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                for table, column in (("events", "session_id"), ("session_states", "session_id"), ("sessions", "id")):
+                    conn.execute(f"DELETE FROM {table} WHERE app_name = ? AND user_id = ? AND {column} = ?", (app_name, user_id, session_id))
+                conn.execute("COMMIT")
+
+        await asyncio.to_thread(delete)
+
+    # Reads
+
+    @staticmethod
+    def _read_state(conn, query: str, params: tuple) -> dict[str, Any]:
+        return {key: json.loads(value) for key, value in conn.execute(query, params)}
+
+    def _merged_state(self, conn, app_name: str, user_id: str, session_id: str) -> dict[str, Any]:
+        state = self._read_state(
+            conn, "SELECT key, value FROM session_states WHERE app_name = ? AND user_id = ? AND session_id = ?",
+            (app_name, user_id, session_id),
+        )
+        for key, value in self._read_state(conn, "SELECT key, value FROM app_states WHERE app_name = ?", (app_name,)).items():
+            state[State.APP_PREFIX + key] = value
+        for key, value in self._read_state(
+            conn, "SELECT key, value FROM user_states WHERE app_name = ? AND user_id = ?", (app_name, user_id),
+        ).items():
+            state[State.USER_PREFIX + key] = value
+        return state
+
+    async def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: Optional[GetSessionConfig] = None,
+    ) -> Optional[Session]:
+        await self._flush_session(app_name, user_id, session_id)
+
+        def read() -> Optional[Session]:
+            with self._pool.connection() as conn:
+                row = conn.execute(
+                    "SELECT update_time FROM sessions WHERE app_name = ? AND user_id = ? AND id = ?",
+                    (app_name, user_id, session_id),
+                ).fetchone()
+                if row is None:
+                    return None
+                query = "SELECT event_data FROM events WHERE app_name = ? AND user_id = ? AND session_id = ?"
+                params: list[Any] = [app_name, user_id, session_id]
+                if config and config.after_timestamp:
+                    query += " AND timestamp >= ?"
+                    params.append(config.after_timestamp)
+                query += " ORDER BY timestamp DESC, rowid DESC"
+                if config and config.num_recent_events is not None:
+                    query += " LIMIT ?"
+                    params.append(config.num_recent_events)
+                events = [Event.model_validate_json(data) for data, in conn.execute(query, params)]
+                events.reverse()
+                return Session(
+                    app_name=app_name,
+                    user_id=user_id,
+                    id=session_id,
+                    state=self._merged_state(conn, app_name, user_id, session_id),
+                    events=events,
+                    last_update_time=row[0],
+                )
+
+        started = time.perf_counter()
+        session = await asyncio.to_thread(read)
+        self.counters["reads"] += 1
+        self.counters["read_ms"] += round((time.perf_counter() - started) * 1000)
+        return session
+
+    async def list_sessions(self, *, app_name: str, user_id: Optional[str] = None) -> ListSessionsResponse:
+        await self.flush()
+
+        def read() -> list[Session]:
+            with self._pool.connection() as conn:
+                if user_id is None:
+                    rows = conn.execute(
+                        "SELECT user_id, id, update_time FROM sessions WHERE app_name = ? ORDER BY update_time", (app_name,),
+                    ).fetchall()
+                else:
+                    rows = conn.execute(
+                        "SELECT user_id, id, update_time FROM sessions WHERE app_name = ? AND user_id = ? ORDER BY update_time",
+                        (app_name, user_id),
+                    ).fetchall()
+                return [
+                    Session(
+                        app_name=app_name, user_id=row_user, id=row_id, last_update_time=update_time,
+                        state=self._merged_state(conn, app_name, row_user, row_id), events=[],
+                    )
+                    for row_user, row_id, update_time in rows
+                ]
+
+        return ListSessionsResponse(sessions=await asyncio.to_thread(read))
+
+    async def get_user_state(self, *, app_name: str, user_id: str) -> dict[str, Any]:
+        await self.flush()
+
+        def read() -> dict[str, Any]:
+            with self._pool.connection() as conn:
+                return self._read_state(
+                    conn, "SELECT key, value FROM user_states WHERE app_name = ? AND user_id = ?", (app_name, user_id),
+                )
+
+        return await asyncio.to_thread(read)
+
+    def stats(self) -> dict:
+        """Returns write counters and commit latency."""
+        return {
+            **self.counters,
+            "pending": len(self._pending),
+            "events_per_commit": round(self.counters["committed_events"] / self.counters["commits"], 2) if self.counters["commits"] else 0.0,
+            "commit_latency": summarize_latencies(list(self.commit_seconds)),
+        }
+
+    async def close(self) -> None:
+        """Commits the buffered events and closes the pooled connections; called when the server stops."""
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+        await self.flush()
+        self._pool.close()
+
+
+class SessionFlushPlugin(BasePlugin):
+    """Commits a turn's buffered events as soon as the turn ends."""
+
+    def __init__(self):
+        super().__init__(name="session_flush")
+
+    async def after_run_callback(self, *, invocation_context) -> None:
+        service = invocation_context.session_service
+        if isinstance(service, TunedSqliteSessionService):
+            await service.flush()
+
+
+_services: list[TunedSqliteSessionService] = []
+
+
+def create_session_service(uri: str, **kwargs) -> TunedSqliteSessionService:
+    """Factory for `--session_service_uri tunedsqlite:///path/to/sessions.sqlite`."""
+    path = uri.split("://", 1)[1] if "://" in uri else ""
+    service = TunedSqliteSessionService(path or SESSION_STORE_PATH)
+    _services.append(service)
+    return service
+
+
+async def close_session_services() -> None:
+    """Closes every service the factory created, so no buffered event is lost on shutdown."""
+    while _services:
+        await _services.pop().close()
@@ -0,0 +1,148 @@
+"""Streams sub-agent output to the learner while the teacher's tool calls run.
+
+With `StreamingMode.SSE`, ADK streams the replies of the agent the learner
+talks to, but agents wrapped in `AgentTool` always run unary: a plan or a
+web research summary only shows up once the sub-agent has finished, and the
+teacher's own reply starts after that.
+
+`StreamingAgentTool` marks its sub-agent's model calls for relaying. The
+model then streams internally, hands each text chunk to the relay and still
+returns only the aggregated responses, so the sub-agent (and any output
+schema it has) sees exactly what a unary call would have returned.
+`RelayingAgent` collects those chunks while its tools run and yields them as
+partial events authored by the sub-agent. Partial events are never stored
+in the session.
+"""
+import asyncio
+from contextvars import ContextVar
+from typing import AsyncGenerator, Callable
+
+import google.genai.types as types
+from google.adk.agents import Agent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.agents.run_config import StreamingMode
+from google.adk.events import Event
+from google.adk.models.llm_response import LlmResponse
+from google.adk.tools import AgentTool
+from google.adk.tools.tool_context import ToolContext
+from google.adk.utils.context_utils import Aclosing
+
+
+# Receives (author, text chunk) for the invocation being relayed
+_partial_sink: ContextVar[Callable[[str, str], None] | None] = ContextVar("learning_mate_partial_sink", default=None)
+
+# Sub-agent whose model output is relayed, set for the duration of its tool call
+_relay_author: ContextVar[str | None] = ContextVar("learning_mate_relay_author", default=None)
+
+_DONE = object()
+
+
+def partial_relay() -> Callable[[LlmResponse], None] | None:
+    """Returns where the current model call should send its partial responses, or None.
+
+    Models call this before a unary call: with a relay, they stream instead,
+    pass every partial response to it and yield only the aggregated ones.
+    """
+    sink, author = _partial_sink.get(), _relay_author.get()
+    if sink is None or author is None:
+        return None
+
+    def relay(response: LlmResponse) -> None:
+        text = "".join(part.text for part in (response.content.parts if response.content else None) or [] if part.text and not part.thought)
+        if text:
+            sink(author, text)
+
+    return relay
+
+
+def detach_relay() -> None:
+    """Stops relaying model output from the current task, e.g. for work that outlives the turn."""
+    _partial_sink.set(None)
+    _relay_author.set(None)
+
+
+class StreamingAgentTool(AgentTool):
+    """AgentTool whose sub-agent's text output is relayed to the learner as it is generated.
+
+    Agents with an output schema are not relayed by default: their output is
+    data for the teacher (a quiz includes its answer key), not text for the learner.
+    """
+
+    def __init__(self, agent, relay: bool | None = None, **kwargs):
+        super().__init__(agent, **kwargs)
+        self.relay = getattr(agent, "output_schema", None) is None if relay is None else relay
+
+    async def run_async(self, *, args: dict, tool_context: ToolContext):
+        if not self.relay:
+            return await super().run_async(args=args, tool_context=tool_context)
+        token = _relay_author.set(self.agent.name)
+        try:
+            return await super().run_async(args=args, tool_context=tool_context)
+        finally:
+            _relay_author.reset(token)
+
+
+async def relay_partials(events: AsyncGenerator[Event, None], ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+    """Yields `events`, interleaved with partial events relayed from sub-agents.
+
+    The wrapped generator runs in its own task, so chunks can be yielded while
+    it waits on a tool. It only moves on once its previous event has been
+    handled by the caller, which keeps the session updated in the usual order.
+    Without SSE streaming the events pass through untouched.
+    """
+    if ctx.run_config is None or ctx.run_config.streaming_mode != StreamingMode.SSE:
+        async with Aclosing(events) as agen:
+            async for event in agen:
+                yield event
+        return
+
+    queue: asyncio.Queue = asyncio.Queue()
+
+    def forward(author: str, text: str) -> None:
+        queue.put_nowait((Event(
+            invocation_id=ctx.invocation_id,
+            author=author,
+            branch=ctx.branch,
+            partial=True,
+            content=types.Content(role="model", parts=[types.Part(text=text)]),
+        ), None))
+
+    async def produce() -> None:
+        try:
+            async with Aclosing(events) as agen:
+                async for event in agen:
+                    handled = asyncio.get_running_loop().create_future()
+                    queue.put_nowait((event, handled))
+                    await handled
+        except BaseException as error:
+            queue.put_nowait((error, None))
+        else:
+            queue.put_nowait((_DONE, None))
+
+    # The producer task inherits the sink, and with it every model call of the invocation
+    token = _partial_sink.set(forward)
+    producer = asyncio.create_task(produce())
+    _partial_sink.reset(token)
+    try:
+        while True:
+            item, handled = await queue.get()
+            if item is _DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+            if handled is not None:
+                handled.set_result(None)
+    finally:
+        if not producer.done():
+            producer.cancel()
+            await asyncio.gather(producer, return_exceptions=True)
+
+
+class RelayingAgent(Agent):
+    """LLM agent that forwards its `StreamingAgentTool` sub-agents' output as partial events."""
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        async with Aclosing(relay_partials(super()._run_async_impl(ctx), ctx)) as agen:
+            async for event in agen:
+                yield event
@@ -1,5 +1,22 @@
-from .web_search_agent import web_search_agent
-from .course_planning_agent import course_planning_agent
-from .image_generation_agent import image_generation_agent
-from .quiz_generation_agent import quiz_generation_agent
-from .answer_evaluation_agent import answer_evaluation_agent
+import importlib
+
+# Each sub-agent module is imported when one of its names is first used
+_EXPORTS = {
+    "web_search_agent": ".web_search_agent",
+    "warm_up_web_search": ".web_search_agent",
+    "course_planning_agent": ".course_planning_agent",
+    "image_generation_agent": ".image_generation_agent",
+    "quiz_generation_agent": ".quiz_generation_agent",
+    "answer_evaluation_agent": ".answer_evaluation_agent",
+    "get_student_performance_summary": ".answer_evaluation_agent",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    if name in _EXPORTS:
+        value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,11 +1,25 @@
+import json
+import asyncio
 from textwrap import dedent
+from collections import Counter
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, ValidationError
+import google.genai.types as types
 from google.adk.agents import Agent
-from google.adk.models.google_llm import Gemini
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models.llm_request import LlmRequest
 from google.adk.tools.tool_context import ToolContext
 
-from ..utils import retry_config
+from ..embeddings import normalize_text
+from ..grading import QuizGrade, grade_quiz, render_partial_grading, render_report
+from ..performance import PerformanceTracker
+from ..prefetch import match_unit, parse_plan_units
+from ..quiz_bank import get_quiz_bank
+from ..resilience import FAST_POLICY, ResilientGemini
+
+
+# How submissions were graded: "local" (no LLM), "partial" (LLM judged the rest) or "llm"
+grading_stats = Counter()
 
 
 class Input(BaseModel):
@@ -15,56 +29,172 @@ class Input(BaseModel):
     reference_data: str | None = Field(None, description="Optional additional reference material to assist evaluation.")
 
 
+def _plan_unit(state, topic: str | None) -> str | None:
+    """Returns the course plan unit `topic` refers to, if any."""
+    if not topic:
+        return None
+    units = parse_plan_units(state.get("course_plan") or "")
+    index = match_unit(units, topic)
+    return units[index] if index is not None else None
+
+
+def _quiz_topic(state, quiz: dict) -> str | None:
+    """Returns the plan unit a quiz covered, or else the concept most of its questions test.
+
+    Quiz titles are unique per quiz, so they would give every quiz its own topic.
+    """
+    concepts = [normalize_text(question.get("concept") or "") for question in quiz["questions"]]
+    concepts = [concept for concept in concepts if concept]
+    for candidate in (quiz.get("title"), *concepts):
+        unit = _plan_unit(state, candidate)
+        if unit:
+            return unit
+    return Counter(concepts).most_common(1)[0][0] if concepts else None
+
+
+def _record_quiz_percentage(
+    state,
+    current_quiz_percentage: float,
+    topic: str | None = None,
+    difficulty: str | None = None,
+) -> dict:
+    """Adds a quiz percentage to the performance tracker in state and returns its summary."""
+    topic = _plan_unit(state, topic) or topic
+    tracker = PerformanceTracker.from_state(state)
+    tracker.record(current_quiz_percentage, topic=topic, difficulty=difficulty)
+    tracker.save(state)
+    return tracker.summary()
+
+
 def get_student_overall_performance(
     current_quiz_percentage: float,
-    tool_context: ToolContext
+    tool_context: ToolContext,
+    topic: str | None = None,
+    difficulty: str | None = None,
 ) -> dict:
     """Tracks recent quiz percentages and calculates the student's overall performance.
 
     The overall performance is calculated as the rolling average of the last 25 quiz percentages.
+    A weighted trend and per-topic / per-difficulty breakdowns are returned alongside it.
 
     Args:
         current_quiz_percentage: The student's percentage score (0.0 to 100.0) from the
             most recently completed quiz.
+        topic: Optional unit or concept the quiz covered.
+        difficulty: Optional quiz difficulty, e.g. "easy", "medium" or "hard".
 
     Returns:
         A dictionary containing the status and the calculated overall performance percentage.
-        Example: {"status": "success", "overall_percentage": 78}
+        Example: {"status": "success", "overall_percentage": 78, "trend_percentage": 81.5, ...}
     """
-    # Use .get() with a default value for cleaner initialization
-    percentages = tool_context.state.get("recent_percentages", [])
-
-    # Ensure list is manageable (maintains a rolling window of 25 scores)
-    MAX_SCORES = 25
-    if len(percentages) >= MAX_SCORES:
-        percentages.pop(0) # Remove oldest percentage
-
-    # Append the new percentage
-    percentages.append(current_quiz_percentage)
-    tool_context.state["recent_percentages"] = percentages
-
-    # Calculating Percentage (as average of percentages)
-    if percentages:
-        # Overall percentage is the simple average of all stored percentages
-        average_percentage = sum(percentages) / len(percentages)
-        overall_percentage = round(average_percentage)
-    else:
-        overall_percentage = 0
+    return {
+        "status": "success",
+        **_record_quiz_percentage(tool_context.state, current_quiz_percentage, topic, difficulty)
+    }
+
+
+def get_student_performance_summary(tool_context: ToolContext) -> dict:
+    """Returns the student's performance statistics without recording a new score.
 
+    Use this to adapt the difficulty of upcoming lessons and quizzes.
+
+    Returns:
+        A dictionary with the overall percentage, the recent trend, the number of
+        quizzes taken, and per-topic and per-difficulty breakdowns.
+    """
     return {
         "status": "success",
-        "overall_percentage": overall_percentage
+        **PerformanceTracker.from_state(tool_context.state).summary()
     }
 
 
+def _load_structured_quiz(request: Input, state) -> dict | None:
+    """Finds the structured quiz (with answer key) that the submission answers.
+
+    The teacher may pass the quiz JSON itself as `current_quiz`; otherwise the
+    last quiz generated in this session is used if the submitted quiz text
+    contains all of its questions.
+    """
+    try:
+        quiz = json.loads(request.current_quiz)
+        if isinstance(quiz, dict) and quiz.get("questions"):
+            return quiz
+    except ValueError:
+        pass
+
+    quiz = state.get("current_quiz")
+    if not isinstance(quiz, dict) or not quiz.get("questions"):
+        return None
+    submitted = " ".join(request.current_quiz.casefold().split())
+    for question in quiz["questions"]:
+        if " ".join(question["prompt"].casefold().split())[:40] not in submitted:
+            return None
+    return quiz
+
+
+async def _record_item_history(callback_context: CallbackContext, quiz: dict, grade: QuizGrade) -> None:
+    """Feeds the locally graded answers into the learner's spaced-repetition schedule."""
+    questions = {str(question.get("id")): question for question in quiz["questions"]}
+    results = [
+        (questions[item.question_id], item.points_earned, item.points_possible)
+        for item in grade.items
+        if item.status is not None and item.question_id in questions
+    ]
+    if results:
+        await asyncio.to_thread(get_quiz_bank().record_results, callback_context.user_id, results)
+
+
+async def grade_objective_items(callback_context: CallbackContext) -> types.Content | None:
+    """Grades objective questions locally, answering without the LLM when nothing is left to judge."""
+    content = callback_context.user_content
+    try:
+        request = Input.model_validate_json(content.parts[0].text)
+    except (AttributeError, IndexError, TypeError, ValidationError):
+        grading_stats["llm"] += 1
+        return None
+
+    quiz = _load_structured_quiz(request, callback_context.state)
+    if quiz is None:
+        grading_stats["llm"] += 1
+        return None
+
+    grade = grade_quiz(quiz, request.answers)
+    await _record_item_history(callback_context, quiz, grade)
+    if grade.complete:
+        grading_stats["local"] += 1
+        performance = _record_quiz_percentage(
+            callback_context.state, grade.percentage, _quiz_topic(callback_context.state, quiz), quiz.get("difficulty")
+        )
+        return types.Content(
+            role="model",
+            parts=[types.Part(text=render_report(grade, performance["overall_percentage"]))]
+        )
+
+    if len(grade.pending) < len(grade.items):
+        grading_stats["partial"] += 1
+        callback_context.state["temp:partial_grading"] = render_partial_grading(grade)
+    else:
+        grading_stats["llm"] += 1
+    return None
+
+
+def add_partial_grading(callback_context: CallbackContext, llm_request: LlmRequest) -> None:
+    """Tells the model which questions were already scored so it only judges the rest."""
+    note = callback_context.state.get("temp:partial_grading")
+    if note:
+        llm_request.contents.append(types.Content(role="user", parts=[types.Part(text=note)]))
+
+
 answer_evaluation_agent = Agent(
-    model=Gemini(
+    model=ResilientGemini(
         model="gemini-2.5-flash-lite",  # Used for speed
-        retry_options=retry_config
+        policy=FAST_POLICY,
     ),
     name="answer_evaluation_agent",
     description="Agent that precisely evaluates quiz answers, computes performance metrics, and generates a formal, objective student report.",
     input_schema=Input,
+    before_agent_callback=grade_objective_items,
+    before_model_callback=add_partial_grading,
     instruction=dedent("""
         # Role
         Neutral Examination Grader and Comprehensive Performance Data Analyst. Your function is to systematically assess a submitted quiz, then integrate and compare that result with the student's available historical performance data.
@@ -1,11 +1,30 @@
+import os
+import asyncio
+import hashlib
 from textwrap import dedent
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, ValidationError
+import google.genai.types as types
 from google.adk.agents import Agent
-from google.adk.models.google_llm import Gemini
+from google.adk.agents.callback_context import CallbackContext
 from google.adk.tools import AgentTool
 
-from ..utils import retry_config
+from ..course_packs import get_course_packs
+from ..plan_store import PlanStore
+from ..resilience import DEFAULT_POLICY, ResilientGemini
+
+
+# Generated plans are stored next to the artifact store started by start_agent.sh
+PLAN_STORE_PATH = os.getenv("PLAN_STORE_PATH", os.path.join(".data", "plans.sqlite"))
+PLAN_STORE_MAX_ENTRIES = int(os.getenv("PLAN_STORE_MAX_ENTRIES", "1000"))
+
+# Optional JSON library of curated plans loaded into the store on first use
+PLAN_TEMPLATES_PATH = os.getenv("PLAN_TEMPLATES_PATH")
+
+# Session state flag for runs that must always call the planner, such as course pack pre-generation
+SKIP_PLAN_STORE = "skip_plan_store"
+
+_plan_store: PlanStore | None = None
 
 
 class Input(BaseModel):
@@ -23,14 +42,73 @@ class Input(BaseModel):
     )
 
 
+def get_plan_store() -> PlanStore:
+    """Returns the process-wide plan store, creating it on first use.
+
+    The store version hashes the planner model and instruction, so editing
+    either one automatically invalidates previously stored plans.
+    """
+    global _plan_store
+    if _plan_store is None:
+        planner_version = hashlib.sha256(
+            f"{course_planning_agent.model.model}\n{course_planning_agent.instruction}".encode("utf-8")
+        ).hexdigest()[:16]
+        _plan_store = PlanStore(PLAN_STORE_PATH, version=planner_version, max_entries=PLAN_STORE_MAX_ENTRIES)
+        if PLAN_TEMPLATES_PATH:
+            _plan_store.load_templates(PLAN_TEMPLATES_PATH)
+        # Plans of pre-generated course packs, so learners asking for those courses get their materials
+        for pack in get_course_packs().manifests():
+            _plan_store.store(pack["course_goal"], pack.get("additional_info"), pack["plan"])
+    return _plan_store
+
+
+def _read_request(callback_context: CallbackContext) -> Input | None:
+    """Parses the planner input that AgentTool sends as the user message."""
+    content = callback_context.user_content
+    if not content or not content.parts or not content.parts[0].text:
+        return None
+    try:
+        return Input.model_validate_json(content.parts[0].text)
+    except ValidationError:
+        return None
+
+
+async def reuse_stored_plan(callback_context: CallbackContext) -> types.Content | None:
+    """Answers from the plan store when a close match exists, skipping the planner call."""
+    request = _read_request(callback_context)
+    if request is None or callback_context.state.get(SKIP_PLAN_STORE):
+        return None
+
+    # The store is a SQLite file shared by every worker and the lookup scans it, so keep both off the event loop
+    store = await asyncio.to_thread(get_plan_store)
+    match = await asyncio.to_thread(store.lookup, request.course_goal, request.additional_info)
+    if match is None:
+        return None
+
+    callback_context.state["course_plan"] = match.plan
+    return types.Content(role="model", parts=[types.Part(text=match.plan)])
+
+
+async def store_generated_plan(callback_context: CallbackContext) -> None:
+    """Saves the plan the planner just produced for future learners."""
+    request = _read_request(callback_context)
+    plan = callback_context.state.get("course_plan")
+    if request is not None and plan and not callback_context.state.get(SKIP_PLAN_STORE):
+        store = await asyncio.to_thread(get_plan_store)
+        await asyncio.to_thread(store.store, request.course_goal, request.additional_info, plan)
+
+
 course_planning_agent = Agent(
-    model=Gemini(
+    model=ResilientGemini(
         model="gemini-2.5-flash",
-        retry_options=retry_config
+        policy=DEFAULT_POLICY,
     ),
     name="course_planning_agent",
     description="Agent that designs progressive, time-based course plans using specific goals and prepares the output for downstream lesson agents.",
     input_schema=Input,
+    output_key="course_plan",
+    before_agent_callback=reuse_stored_plan,
+    after_agent_callback=store_generated_plan,
     instruction=dedent("""
         # Role
         Curriculum Architect and Educational System Designer. Your function is to translate core educational goals and input data into a logically sound, structurally complete, and executable course curriculum.
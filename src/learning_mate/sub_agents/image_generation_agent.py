@@ -1,17 +1,60 @@
-import requests
-from io import BytesIO
+import os
+import asyncio
 from textwrap import dedent
-from difflib import SequenceMatcher
+from urllib.parse import quote
 
+import httpx
 from pydantic import BaseModel, Field
 
 from google.genai import Client
 import google.genai.types as types
 from google.adk.agents import Agent
 from google.adk.tools.tool_context import ToolContext
-from google.adk.models.google_llm import Gemini
 
-from ..utils import retry_config, extract_genai_error_message
+from ..image_cache import ImageCache, make_cache_key
+from ..image_processing import process_image
+from ..tracing import record_retry
+from ..resilience import FAST_POLICY, IMAGE_POLICY, ResilientGemini, call_with_policy, classify_error, get_breaker
+from ..scheduler import BACKGROUND
+
+
+IMAGEN_MODEL = "imagen-4.0-generate-001"
+
+# Maximum number of image renders allowed in flight per process
+IMAGE_CONCURRENCY = int(os.getenv("IMAGE_GENERATION_CONCURRENCY", "4"))
+
+# Seconds to wait for a Pollinations render before giving up
+POLLINATIONS_TIMEOUT = float(os.getenv("POLLINATIONS_TIMEOUT", "60"))
+
+# Pollinations parameters overriding its defaults
+POLLINATIONS_PARAMS = {
+    "width": 1024,
+    "height": 1024,
+    "enhance": "true", # Enables detailed processing
+    "nologo": "true",  # Removes the watermark
+    "private": "True", # To prevent it go public
+    "model": "flux"    # Recommended to specify the model for consistency
+}
+
+# Rendered images are cached next to the artifact store started by start_agent.sh
+IMAGE_CACHE_DIR = os.getenv("IMAGE_CACHE_DIR", os.path.join(".data", "image_cache"))
+IMAGE_CACHE_MAX_BYTES = int(os.getenv("IMAGE_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+# Post-processing applied before artifacts are saved
+IMAGE_FORMAT = os.getenv("IMAGE_FORMAT", "webp")  # "webp" or "png"
+IMAGE_QUALITY = int(os.getenv("IMAGE_QUALITY", "80"))
+IMAGE_MAX_SIDE = int(os.getenv("IMAGE_MAX_SIDE", "1024"))
+THUMBNAIL_SIDE = int(os.getenv("THUMBNAIL_SIDE", "256"))
+
+# Shared clients, limiter and cache, created lazily on first use
+_genai_client: Client | None = None
+_http_client: httpx.AsyncClient | None = None
+_image_semaphore: asyncio.Semaphore | None = None
+_image_cache: ImageCache | None = None
+
+
+class ImageGenerationError(Exception):
+    """Raised when neither Imagen nor the Pollinations fallback produced an image."""
 
 
 class Input(BaseModel):
@@ -30,13 +73,103 @@ class Output(BaseModel):
     )
     image_artifact_name: str = Field(
         ...,
-        description="The unique filename or key under which the generated image artifact was saved to the service."
+        description="The unique filename or key under which the full-size image artifact was saved to the service. Load it only when the full image is needed."
+    )
+    thumbnail_artifact_name: str | None = Field(
+        None,
+        description="The filename of the small preview version of the image, suitable for chat previews."
     )
     version: int = Field(
         ...,
         description="The version number assigned to the saved image artifact by the system."
     )
 
+def _get_genai_client() -> Client:
+    """Returns the process-wide GenAI client, creating it on first use."""
+    global _genai_client
+    if _genai_client is None:
+        _genai_client = Client()
+    return _genai_client
+
+
+def _get_http_client() -> httpx.AsyncClient:
+    """Returns the pooled async HTTP client used for the Pollinations fallback."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            timeout=POLLINATIONS_TIMEOUT,
+            limits=httpx.Limits(max_connections=IMAGE_CONCURRENCY),
+            follow_redirects=True,
+        )
+    return _http_client
+
+
+def _get_image_semaphore() -> asyncio.Semaphore:
+    """Returns the semaphore bounding concurrent image renders in this process."""
+    global _image_semaphore
+    if _image_semaphore is None:
+        _image_semaphore = asyncio.Semaphore(IMAGE_CONCURRENCY)
+    return _image_semaphore
+
+
+async def _render_with_imagen(prompt: str) -> bytes:
+    """Renders an image with Google Imagen through the async GenAI client."""
+    response = await _get_genai_client().aio.models.generate_images(
+        model=IMAGEN_MODEL,
+        prompt=prompt,
+        config=types.GenerateImagesConfig(number_of_images=1)
+    )
+    return response.generated_images[0].image.image_bytes
+
+
+async def _render_with_pollinations(prompt: str) -> bytes:
+    """Renders an image with Pollinations through the pooled async HTTP client."""
+    base_url = f"https://image.pollinations.ai/prompt/{quote(prompt)}"
+    response = await _get_http_client().get(base_url, params=POLLINATIONS_PARAMS)
+    response.raise_for_status() # Check for HTTP errors
+    return response.content
+
+
+async def _render_image(prompt: str) -> bytes:
+    """Renders `prompt` with Imagen, falling back to Pollinations for free users.
+
+    Raises:
+        ImageGenerationError: If no backend could produce the image.
+    """
+    # Renders never block the event loop; the semaphore only caps how many
+    # are in flight so a burst of illustrations cannot exhaust the quota.
+    async with _get_image_semaphore():
+        try:
+            # Attempt Google Imagen generation first
+            return await call_with_policy(
+                lambda: _render_with_imagen(prompt), IMAGE_POLICY, get_breaker(IMAGEN_MODEL), IMAGEN_MODEL, BACKGROUND
+            )
+
+        except Exception as e:
+            error = classify_error(e)
+            if error.kind != "billing_required":
+                raise ImageGenerationError(error.message) from e
+            record_retry("imagen_free_user_fallback", backend="pollinations")
+
+        # Pollinations fallback
+        try:
+            return await _render_with_pollinations(prompt)
+
+        except Exception as pollination_error:
+            raise ImageGenerationError(
+                f"Google Imagen is not available for free users. "
+                f"Pollinations attempt encountered an error: {pollination_error}"
+            ) from pollination_error
+
+
+def get_image_cache() -> ImageCache:
+    """Returns the process-wide image cache, creating it on first use."""
+    global _image_cache
+    if _image_cache is None:
+        _image_cache = ImageCache(IMAGE_CACHE_DIR, max_bytes=IMAGE_CACHE_MAX_BYTES)
+    return _image_cache
+
+
 async def generate_image(
     prompt: str,
     name: str | None = None,
@@ -44,6 +177,9 @@ async def generate_image(
 ) -> dict:
     """Generate an image using Google Imagen API with Pollinations fallback for free users.
 
+    Renders are cached on disk by normalized prompt, so repeated requests for
+    the same illustration are served without calling either API.
+
     Args:
         prompt (str): Description of the desired image.
         name (str, optional): Optional artifact filename prefix.
@@ -53,91 +189,82 @@ async def generate_image(
             "status": "success" or "error",
             "image_artifact_name": artifact filename,
             "version": saved version,
+            "size_metrics": original/stored/thumbnail sizes in bytes,
+            "thumbnail_artifact_name": optional preview artifact filename,
             "error_message": optional error message
         }
     """
-    GOOGLE_FREE_USER_MSG = "Imagen API is only accessible to billed users at this time."
-
+    cache_key = make_cache_key(prompt, {"imagen": IMAGEN_MODEL, **POLLINATIONS_PARAMS})
     try:
-        # Attempt Google Imagen generation first
-        client = Client()
-        response = client.models.generate_images(
-            model="imagen-4.0-generate-001",
-            prompt=prompt,
-            config=types.GenerateImagesConfig(number_of_images=1)
-        )
-        image_bytes = BytesIO(response.generated_images[0].image.image_bytes).getvalue()
-
-    except Exception as e:
-        genai_error_msg = extract_genai_error_message(e)
-        similarity = SequenceMatcher(None, genai_error_msg, GOOGLE_FREE_USER_MSG).ratio()
-
-        if similarity >= 0.8:
-            # Pollinations fallback
-            try:
-                encoded_prompt = requests.utils.quote(prompt)
-                base_url = f"https://image.pollinations.ai/prompt/{encoded_prompt}"
-
-                # Define parameters to override defaults
-                params = {
-                    "width": 1024,
-                    "height": 1024,
-                    "enhance": "true", # Enables detailed processing
-                    "nologo": "true",  # Removes the watermark
-                    "private": "True", # To prevent it go public
-                    "model": "flux"    # Recommended to specify the model for consistency
-                }
-
-                response = requests.get(base_url, params=params, stream=True)
-                response.raise_for_status() # Check for HTTP errors
-                image_bytes = BytesIO(response.content).getvalue()
-
-            except Exception as pollination_error:
-                return {
-                    "status": "error",
-                    "errr_message": (
-                        f"Google Imagen is not available for free users. "
-                        f"Pollinations attempt encountered an error: {pollination_error}"
-                    )
-                }
-        else:
-            return {
-                "status": "error",
-                "error_message": genai_error_msg
-            }
-
-    # Create artifact object from generated image data
-    artifact_name = name or "_".join(prompt.split()[:7]) + ".png"
-    if image_bytes:
-        image_artifact = types.Part(
-            inline_data=types.Blob(
-                mime_type="image/png",
-                data=image_bytes
-            )
+        image_bytes = await get_image_cache().get_or_render(
+            cache_key, lambda: _render_image(prompt)
         )
-    else:
+    except ImageGenerationError as e:
+        return {
+            "status": "error",
+            "error_message": str(e)
+        }
+
+    if not image_bytes:
         return {
             "status": "error",
             "error_message": f"The image_bytes returned is empty."
         }
 
-    # Save artifact using tool context
+    # Re-encoding is CPU bound, so keep it off the event loop
+    processed = await asyncio.to_thread(
+        process_image,
+        image_bytes,
+        image_format=IMAGE_FORMAT,
+        quality=IMAGE_QUALITY,
+        max_side=IMAGE_MAX_SIDE,
+        thumbnail_side=THUMBNAIL_SIDE,
+    )
+
+    # Create artifact objects named after the real format of their data
+    base_name = os.path.splitext(name)[0] if name else "_".join(prompt.split()[:7])
+    artifact_name = base_name + processed.extension
+    image_artifact = types.Part(
+        inline_data=types.Blob(
+            mime_type=processed.mime_type,
+            data=processed.data
+        )
+    )
+
+    # Save artifacts using tool context
     version = await tool_context.save_artifact(
         filename=artifact_name,
         artifact=image_artifact,
     )
 
-    return {
+    result = {
         "status": "success",
         "image_artifact_name": artifact_name,
         "version": version,
+        "size_metrics": processed.size_metrics(),
     }
 
+    if processed.thumbnail:
+        thumbnail_name = f"{base_name}.thumb{processed.thumbnail_extension}"
+        await tool_context.save_artifact(
+            filename=thumbnail_name,
+            artifact=types.Part(
+                inline_data=types.Blob(
+                    mime_type=processed.thumbnail_mime_type,
+                    data=processed.thumbnail
+                )
+            ),
+        )
+        result["thumbnail_artifact_name"] = thumbnail_name
+
+    return result
+
 
 image_generation_agent = Agent(
-    model=Gemini(
+    model=ResilientGemini(
         model="gemini-2.5-flash-lite", # Used for speed
-        retry_options=retry_config
+        policy=FAST_POLICY,
+        priority=BACKGROUND,
     ),
     name="image_generation_agent",
     description="An agent that creates and refines visual illustrations to perfectly complement lesson content using contextual cues.",
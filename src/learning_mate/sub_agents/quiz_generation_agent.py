@@ -1,26 +1,124 @@
+import json
+import asyncio
 from textwrap import dedent
+from typing import Literal
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, ValidationError
+import google.genai.types as types
 from google.adk.agents import Agent
-from google.adk.models.google_llm import Gemini
+from google.adk.agents.callback_context import CallbackContext
 from google.adk.tools import AgentTool
 
-from ..utils import retry_config
+from ..prefetch import match_unit, parse_plan_units
+from ..quiz_bank import course_key, get_quiz_bank
+from ..resilience import FAST_POLICY, ResilientGemini
 
 
 class Input(BaseModel):
     """Model representing the input schema for the quiz generation agent"""
     reference_data: str = Field(..., description="The reference material or source content from which the quiz should be generated.")
+    difficulty: Literal["easy", "medium", "hard"] | None = Field(None, description="Optional target difficulty, adapted to the student's recent performance.")
+    review: bool = Field(False, description="Set to true for a spaced-repetition review of the units covered so far instead of a quiz on new material.")
+
+class Question(BaseModel):
+    """Model representing one quiz question together with its answer key."""
+    id: str = Field(..., description="Short unique question identifier, e.g. 'q1'.")
+    type: Literal["multiple_choice", "true_false", "fill_in_blank", "ordering", "open_ended"] = Field(
+        ...,
+        description="The question format."
+    )
+    prompt: str = Field(..., description="The question text shown to the student.")
+    options: list[str] | None = Field(
+        None,
+        description="Answer options labelled 'A) ...', 'B) ...' for multiple choice, or the items to order for ordering questions."
+    )
+    answer: list[str] = Field(
+        ...,
+        description=(
+            "The answer key: the correct option letter for multiple choice, 'true' or 'false' for true/false, "
+            "every acceptable answer for fill-in-the-blank, the option letters in the correct order for ordering, "
+            "and a model answer with the key points expected for open-ended questions."
+        )
+    )
+    points: int = Field(1, description="Points awarded for a correct answer.")
+    concept: str | None = Field(None, description="Short name of the concept the question tests, e.g. 'superposition'.")
+
+class Output(BaseModel):
+    """
+    Model representing the output schema for the quiz generation agent.
+    The answer key lets objective questions be graded locally without an LLM call.
+    """
+    title: str = Field(..., description="A short title describing what the quiz covers.")
+    difficulty: Literal["easy", "medium", "hard"] = Field(
+        "medium",
+        description="The overall difficulty of the quiz."
+    )
+    questions: list[Question] = Field(..., description="The quiz questions in the order they should be asked.")
+
+
+def _read_request(callback_context: CallbackContext) -> Input | None:
+    """Parses the quiz request that AgentTool sends as the user message."""
+    content = callback_context.user_content
+    if not content or not content.parts or not content.parts[0].text:
+        return None
+    try:
+        return Input.model_validate_json(content.parts[0].text)
+    except ValidationError:
+        return None
+
+
+def _unit_for(plan: str | None, reference_data: str) -> str | None:
+    """Returns the course plan unit the reference material is about, if any."""
+    units = parse_plan_units(plan or "")
+    index = match_unit(units, reference_data[:300])
+    return units[index] if index is not None else None
+
+
+async def serve_from_bank(callback_context: CallbackContext) -> types.Content | None:
+    """Answers from the quiz bank when it holds enough suitable questions, skipping generation.
+
+    Reviews are made of the learner's due questions; other requests get the
+    questions on the same unit that the learner has not answered yet.
+    """
+    request = _read_request(callback_context)
+    if request is None:
+        return None
+    plan = callback_context.state.get("course_plan")
+    user_id = callback_context.user_id
+    if request.review:
+        quiz = await asyncio.to_thread(get_quiz_bank().review_quiz, user_id, course_key(plan))
+    else:
+        unit = _unit_for(plan, request.reference_data)
+        quiz = await asyncio.to_thread(get_quiz_bank().unit_quiz, user_id, course_key(plan), unit, request.difficulty) if unit else None
+    if quiz is None:
+        return None
+    callback_context.state["current_quiz"] = quiz
+    return types.Content(role="model", parts=[types.Part(text=json.dumps(quiz))])
+
+
+async def store_generated_quiz(callback_context: CallbackContext) -> None:
+    """Adds the questions just generated to the quiz bank."""
+    request = _read_request(callback_context)
+    quiz = callback_context.state.get("current_quiz")
+    if request is None or not isinstance(quiz, dict):
+        return
+    plan = callback_context.state.get("course_plan")
+    unit = _unit_for(plan, request.reference_data) or str(quiz.get("title") or "")
+    await asyncio.to_thread(get_quiz_bank().add_quiz, course_key(plan), unit, quiz)
 
 
 quiz_generation_agent = Agent(
-    model=Gemini(
+    model=ResilientGemini(
         model="gemini-2.5-flash-lite",  # Used for speed
-        retry_options=retry_config
+        policy=FAST_POLICY,
     ),
     name="quiz_generation_agent",
     description="Agent that generates quizzes based on reference materials.",
     input_schema=Input,
+    output_schema=Output,
+    output_key="current_quiz",
+    before_agent_callback=serve_from_bank,
+    after_agent_callback=store_generated_quiz,
     instruction=dedent("""
         # Role
         You are a **Dynamic Educational Content Architect** specializing in flexible, high-fidelity assessment design. Your task is to craft rigorous, adaptive quizzes that accurately gauge a user's mastery of specific, provided source material.
@@ -34,12 +132,14 @@ quiz_generation_agent = Agent(
           * **True/False Statements:** Ensure statements are precise and unambiguous.
           * **Completion/Fill-in-the-Blank:** Use this for testing recall of key terminology or values.
           * **Sequencing/Ordering:** Use this to test understanding of processes or chronological flows.
-        2.  **Output Structure:** The final output must be structured cleanly in **Markdown format**.
+          * **Open-Ended:** Use sparingly, only for concepts that cannot be assessed with an objective format.
+        2.  **Output Structure:** Return the quiz in the structured output format, with a precise **answer key** for every question so objective questions can be graded automatically, and the short name of the **concept** each question tests.
 
         ## Constraints
         * **Source Fidelity:** Questions must be generated **exclusively** from the concepts explicitly present in the provided reference material. **Do not** introduce outside information.
         * **Assessment Range:** Ensure the generated quiz covers the **full breadth** of the provided source material, not just the easiest or first few concepts.
-        * **Response Purity:** The final output must **strictly** contain only the generated questions. **Do not** include answers, hints, grading criteria, or any introductory/explanatory text.
+        * **Response Purity:** The final output must **strictly** contain only the generated questions and their answer keys. **Do not** include hints, grading criteria, or any introductory/explanatory text.
+        * **Unambiguous Keys:** Every objective question must have exactly one defensible answer; list all acceptable spellings for fill-in-the-blank answers.
         * **Styling:** Maintain a **professional, neutral, and consistent** tone suitable for an academic assessment.
     """),
 )
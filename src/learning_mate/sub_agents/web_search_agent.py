@@ -2,18 +2,40 @@ import os
 from textwrap import dedent
 
 from google.adk.agents import Agent
-from google.adk.models.google_llm import Gemini
-from google.adk.tools.mcp_tool import McpToolset
-from google.adk.tools.mcp_tool.mcp_session_manager import StdioConnectionParams
-from mcp import StdioServerParameters
+from google.adk.agents.callback_context import CallbackContext
 
-from ..utils import retry_config
+from ..mcp_pool import McpSessionPool, PooledMcpToolset, resolve_tavily_server
+from ..search_cache import SearchCache
+from ..resilience import FAST_POLICY, ResilientGemini
+
+
+# Warm Tavily MCP sessions shared by every learner session in this process;
+# the server (and TAVILY_API_KEY) is only resolved when the pool first starts
+tavily_pool = McpSessionPool(
+    resolve_tavily_server,
+    size=int(os.getenv("TAVILY_MCP_POOL_SIZE", "2")),
+    timeout=30,
+)
+
+# Raw Tavily results shared across learners, so repeated queries skip the round trip
+search_cache = SearchCache(
+    os.getenv("SEARCH_CACHE_PATH", os.path.join(".data", "search_cache.sqlite")),
+    default_ttl=float(os.getenv("SEARCH_CACHE_TTL", str(24 * 3600))),
+    fresh_ttl=float(os.getenv("SEARCH_CACHE_FRESH_TTL", "3600")),
+    stale_while_revalidate=os.getenv("SEARCH_CACHE_STALE_WHILE_REVALIDATE", "false").lower() == "true",
+    max_bytes=int(os.getenv("SEARCH_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+)
+
+
+def warm_up_web_search(callback_context: CallbackContext) -> None:
+    """Agent callback that starts the Tavily MCP pool in the background."""
+    tavily_pool.warm_up()
 
 
 web_search_agent = Agent(
-    model=Gemini(
+    model=ResilientGemini(
         model="gemini-2.5-flash-lite",  # Used for speed
-        retry_options=retry_config
+        policy=FAST_POLICY,
     ),
     name="web_search_agent",
     description="Agent that retrieves information from the web.",
@@ -36,18 +58,5 @@ web_search_agent = Agent(
         * **Tone:** The delivery must be **technically precise**, yet maintain a **highly professional and efficient** tone.
         * **Exclusions:** Avoid opinion, anecdotal evidence, or information older than 18 months, unless historical context is explicitly requested.
     """),
-    tools=[
-        McpToolset(
-            connection_params=StdioConnectionParams(
-                server_params=StdioServerParameters(
-                    command="npx",
-                    args=[
-                        "-y",
-                        "tavily-mcp@latest",
-                    ],
-                ),
-                timeout=30,
-            ),
-        )
-    ],
+    tools=[PooledMcpToolset(tavily_pool, cache=search_cache)],
 )
@@ -0,0 +1,453 @@
+"""Per-agent, per-tool and per-model tracing for the Learning Mate agent tree.
+
+`TracingPlugin` hooks the ADK plugin callbacks, so a single instance on the
+App sees every agent, tool and model call, including agents run through
+`AgentTool`. Finished spans are logged as JSON records on the
+`learning_mate.tracing` logger. When TRACE_EXPORT_PATH is set, finished
+traces are also appended, from a background thread, to an OTLP/JSON file
+that OpenTelemetry collectors and viewers can import. `summarize_traces`
+reads that file back and ranks the hottest call paths.
+"""
+import os
+import json
+import time
+import queue
+import atexit
+import logging
+import secrets
+import asyncio
+import argparse
+import threading
+from collections import defaultdict
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Optional
+
+from google.adk.agents import BaseAgent
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.adk.plugins.base_plugin import BasePlugin
+from google.adk.tools import BaseTool, ToolContext
+
+
+# OTLP/JSON file finished traces are appended to, e.g. ".data/traces.jsonl"; unset to skip the export
+TRACE_EXPORT_PATH = os.getenv("TRACE_EXPORT_PATH", "")
+
+# Size at which the trace file is rotated to "<name>.1", replacing the previous one
+TRACE_EXPORT_MAX_BYTES = int(os.getenv("TRACE_EXPORT_MAX_BYTES", str(50 * 1024 * 1024)))
+SERVICE_NAME = "learning_mate"
+
+logger = logging.getLogger(__name__)
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("learning_mate_current_span", default=None)
+
+
+@dataclass
+class Span:
+    """One timed operation: an agent run, a tool call or a model call."""
+    name: str
+    kind: str  # "agent", "tool" or "model"
+    trace_id: str
+    parent: Optional["Span"] = None
+    span_id: str = field(default_factory=lambda: secrets.token_hex(8))
+    start_ns: int = field(default_factory=time.time_ns)
+    end_ns: int | None = None
+    attributes: dict = field(default_factory=dict)
+    events: list = field(default_factory=list)
+    error: str | None = None
+
+    @property
+    def duration_ms(self) -> float:
+        return round(((self.end_ns or time.time_ns()) - self.start_ns) / 1e6, 3)
+
+    def add_event(self, name: str, **attributes) -> None:
+        self.events.append({"name": name, "time_ns": time.time_ns(), "attributes": attributes})
+
+    def to_record(self) -> dict:
+        """Flat JSON record used for structured logs."""
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent.span_id if self.parent else None,
+            "name": self.name,
+            "kind": self.kind,
+            "duration_ms": self.duration_ms,
+            "error": self.error,
+            **self.attributes,
+        }
+
+    def to_otlp(self) -> dict:
+        """Span in the OTLP/JSON encoding."""
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent.span_id if self.parent else "",
+            "name": self.name,
+            "kind": 3 if self.kind == "model" else 1,  # SPAN_KIND_CLIENT for remote models, else INTERNAL
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or self.start_ns),
+            "attributes": _otlp_attributes({"learning_mate.span.kind": self.kind, **self.attributes}),
+            "events": [
+                {"name": event["name"], "timeUnixNano": str(event["time_ns"]), "attributes": _otlp_attributes(event["attributes"])}
+                for event in self.events
+            ],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1},
+        }
+
+
+def _otlp_value(value: Any) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    if isinstance(value, (list, tuple)):
+        return {"arrayValue": {"values": [_otlp_value(item) for item in value]}}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: dict) -> list[dict]:
+    return [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items() if value is not None]
+
+
+def _from_otlp_value(value: dict) -> Any:
+    if "intValue" in value:
+        return int(value["intValue"])
+    if "arrayValue" in value:
+        return [_from_otlp_value(item) for item in value["arrayValue"].get("values", [])]
+    return next(iter(value.values()), None)
+
+
+def current_span() -> Span | None:
+    """Returns the agent or tool span the calling code runs under, if tracing is active."""
+    return _current_span.get()
+
+
+def detach_span() -> None:
+    """Makes spans started later in the current task begin a new trace."""
+    _current_span.set(None)
+
+
+def record_retry(reason: str, **attributes) -> None:
+    """Counts a retry on the current span; a no-op when nothing is being traced."""
+    span = current_span()
+    if span is not None:
+        span.attributes["retries"] = span.attributes.get("retries", 0) + 1
+        span.add_event("retry", reason=reason, **attributes)
+
+
+class TraceWriter:
+    """Appends trace documents to a file from a background thread, rotating it by size.
+
+    `write` only enqueues, so the event loop never waits on the disk. When
+    the queue is full, documents are dropped and counted rather than
+    blocking the caller.
+    """
+
+    def __init__(self, path: str | Path, max_bytes: int = TRACE_EXPORT_MAX_BYTES, max_pending: int = 10000):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.written = 0
+        self.dropped = 0
+        self.rotations = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=max_pending)
+        self._thread: threading.Thread | None = None
+        self._start_lock = threading.Lock()
+
+    def write(self, document: dict) -> None:
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="learning_mate-trace-writer", daemon=True)
+                    self._thread.start()
+                    atexit.register(self.flush)
+        try:
+            self._queue.put_nowait(document)
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self) -> None:
+        """Blocks until every document written so far is on disk."""
+        if self._thread is not None:
+            self._queue.join()
+
+    def _run(self) -> None:
+        while True:
+            document = self._queue.get()
+            try:
+                self._append(json.dumps(document, default=str) + "\n")
+            except OSError:
+                logger.exception("Could not write trace to %s", self.path)
+            finally:
+                self._queue.task_done()
+
+    def _append(self, line: str) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if self.max_bytes and self.path.exists() and self.path.stat().st_size >= self.max_bytes:
+            self.path.replace(self.path.with_name(self.path.name + ".1"))
+            self.rotations += 1
+        with self.path.open("a", encoding="utf-8") as file:
+            file.write(line)
+        self.written += 1
+
+    def stats(self) -> dict:
+        return {"written": self.written, "dropped": self.dropped, "rotations": self.rotations, "pending": self._queue.qsize()}
+
+
+class TracingPlugin(BasePlugin):
+    """Records a span tree per invocation through ADK plugin callbacks.
+
+    Agent spans nest under the span that was active when the agent started
+    (the transferring agent, or the `AgentTool` call that launched it), and
+    model and tool spans nest under the agent that issued them. Model spans
+    carry token usage, tool spans carry artifact names and sizes, and any
+    span can collect retries through `record_retry`. With an `export_path`,
+    each finished trace goes to a `TraceWriter`; `close` waits for it.
+    """
+
+    def __init__(self, export_path: str | Path | None = TRACE_EXPORT_PATH, name: str = "learning_mate_tracing"):
+        super().__init__(name=name)
+        self.export_path = Path(export_path) if export_path else None
+        self.writer = TraceWriter(self.export_path) if self.export_path else None
+        self._open: dict[tuple, Span] = {}
+        self._finished: dict[str, list[Span]] = defaultdict(list)
+        self._lock = threading.Lock()
+
+    # Span bookkeeping
+
+    def _start(self, key: tuple, name: str, kind: str, parent: Span | None, context, **attributes) -> Span:
+        session = context.session
+        span = Span(
+            name=name,
+            kind=kind,
+            trace_id=parent.trace_id if parent else secrets.token_hex(16),
+            parent=parent,
+            attributes={
+                # AgentTool runs sub-agents in throwaway sessions, so children keep the root session id
+                "session.id": parent.attributes.get("session.id") if parent else session.id,
+                "user.id": session.user_id,
+                "invocation.id": context.invocation_id,
+                **attributes,
+            },
+        )
+        self._open[key] = span
+        return span
+
+    def _end(self, key: tuple, error: Exception | None = None) -> Span | None:
+        span = self._open.pop(key, None)
+        if span is None:
+            return None
+        span.end_ns = time.time_ns()
+        if error is not None:
+            span.error = f"{type(error).__name__}: {error}"
+        with self._lock:
+            self._finished[span.trace_id].append(span)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps(span.to_record(), default=str))
+        if span.parent is None:
+            self._flush(span.trace_id)
+        return span
+
+    def _flush(self, trace_id: str) -> None:
+        with self._lock:
+            spans = self._finished.pop(trace_id, [])
+        if not spans or self.writer is None:
+            return
+        self.writer.write({
+            "resourceSpans": [{
+                "resource": {"attributes": _otlp_attributes({"service.name": SERVICE_NAME})},
+                "scopeSpans": [{"scope": {"name": __name__}, "spans": [span.to_otlp() for span in spans]}],
+            }]
+        })
+
+    async def close(self) -> None:
+        """Waits until every finished trace is written to the export file."""
+        if self.writer is not None:
+            await asyncio.to_thread(self.writer.flush)
+
+    def _agent_span(self, context) -> Span | None:
+        return self._open.get(("agent", context.invocation_id, context.agent_name))
+
+    # Agents
+
+    async def before_agent_callback(self, *, agent: BaseAgent, callback_context: CallbackContext):
+        key = ("agent", callback_context.invocation_id, agent.name)
+        span = self._start(key, agent.name, "agent", current_span(), callback_context, **{"agent.name": agent.name})
+        _current_span.set(span)
+
+    async def after_agent_callback(self, *, agent: BaseAgent, callback_context: CallbackContext):
+        span = self._end(("agent", callback_context.invocation_id, agent.name))
+        if span is not None:
+            _current_span.set(span.parent)
+
+    async def on_agent_error_callback(self, *, agent: BaseAgent, callback_context: CallbackContext, error: Exception):
+        span = self._end(("agent", callback_context.invocation_id, agent.name), error)
+        if span is not None:
+            _current_span.set(span.parent)
+
+    async def after_run_callback(self, *, invocation_context) -> None:
+        # Agents short-circuited by their own before_agent_callback never reach after_agent
+        invocation_id = invocation_context.invocation_id
+        for key in [key for key in self._open if key[1] == invocation_id]:
+            self._end(key)
+
+    # Models
+
+    async def before_model_callback(self, *, callback_context: CallbackContext, llm_request: LlmRequest):
+        key = ("model", callback_context.invocation_id, callback_context.agent_name)
+        self._start(
+            key, f"model:{llm_request.model}", "model", self._agent_span(callback_context), callback_context,
+            **{"gen_ai.request.model": llm_request.model, "gen_ai.request.contents": len(llm_request.contents)},
+        )
+
+    async def after_model_callback(self, *, callback_context: CallbackContext, llm_response: LlmResponse):
+        if llm_response.partial:
+            return
+        key = ("model", callback_context.invocation_id, callback_context.agent_name)
+        span = self._open.get(key)
+        if span is None:
+            return
+        usage = llm_response.usage_metadata
+        if usage is not None:
+            span.attributes["gen_ai.usage.input_tokens"] = usage.prompt_token_count or 0
+            span.attributes["gen_ai.usage.output_tokens"] = usage.candidates_token_count or 0
+            span.attributes["gen_ai.usage.cached_tokens"] = usage.cached_content_token_count or 0
+        if llm_response.error_code:
+            span.error = f"{llm_response.error_code}: {llm_response.error_message}"
+        self._end(key)
+
+    async def on_model_error_callback(self, *, callback_context: CallbackContext, llm_request: LlmRequest, error: Exception):
+        self._end(("model", callback_context.invocation_id, callback_context.agent_name), error)
+
+    # Tools
+
+    async def before_tool_callback(self, *, tool: BaseTool, tool_args: dict, tool_context: ToolContext):
+        key = ("tool", tool_context.invocation_id, tool_context.function_call_id)
+        span = self._start(
+            key, f"tool:{tool.name}", "tool", self._agent_span(tool_context), tool_context,
+            **{"tool.name": tool.name},
+        )
+        _current_span.set(span)
+
+    async def after_tool_callback(self, *, tool: BaseTool, tool_args: dict, tool_context: ToolContext, result: dict):
+        key = ("tool", tool_context.invocation_id, tool_context.function_call_id)
+        span = self._open.get(key)
+        if span is None:
+            return
+        artifacts = list(tool_context.actions.artifact_delta)
+        if artifacts:
+            span.attributes["artifact.names"] = artifacts
+        sizes = result.get("size_metrics") if isinstance(result, dict) else None
+        if isinstance(sizes, dict):
+            span.attributes["artifact.bytes"] = sizes.get("stored_bytes", 0) + sizes.get("thumbnail_bytes", 0)
+        if isinstance(result, dict) and result.get("status") == "error":
+            span.error = str(result.get("message") or result.get("error_message") or "tool error")
+        self._end(key)
+        _current_span.set(span.parent)
+
+    async def on_tool_error_callback(self, *, tool: BaseTool, tool_args: dict, tool_context: ToolContext, error: Exception):
+        span = self._end(("tool", tool_context.invocation_id, tool_context.function_call_id), error)
+        if span is not None:
+            _current_span.set(span.parent)
+
+
+def load_spans(path: str | Path, session_id: str | None = None) -> list[dict]:
+    """Reads spans back from an OTLP/JSON trace file.
+
+    Args:
+        path (str | Path): File written by TracingPlugin.
+        session_id (str, optional): Only keep spans from this session.
+
+    Returns:
+        list[dict]: One dict per span with its ids, name, timing and attributes.
+    """
+    spans = []
+    for line in Path(path).read_text(encoding="utf-8").splitlines():
+        if not line.strip():
+            continue
+        for resource in json.loads(line)["resourceSpans"]:
+            for scope in resource["scopeSpans"]:
+                for raw in scope["spans"]:
+                    attributes = {item["key"]: _from_otlp_value(item["value"]) for item in raw.get("attributes", [])}
+                    if session_id and attributes.get("session.id") != session_id:
+                        continue
+                    spans.append({
+                        "trace_id": raw["traceId"],
+                        "span_id": raw["spanId"],
+                        "parent_span_id": raw.get("parentSpanId") or None,
+                        "name": raw["name"],
+                        "duration_ms": (int(raw["endTimeUnixNano"]) - int(raw["startTimeUnixNano"])) / 1e6,
+                        "error": raw.get("status", {}).get("code") == 2,
+                        "attributes": attributes,
+                    })
+    return spans
+
+
+def summarize_traces(path: str | Path, session_id: str | None = None, top: int = 10) -> list[dict]:
+    """Ranks call paths (e.g. `smart_friend_agent > teacher_agent > tool:web_search_agent`) by self time.
+
+    Self time is a span's duration minus that of its children, so the
+    ranking points at where time is actually spent rather than at the
+    agents that merely wait on their sub-calls.
+
+    Returns:
+        list[dict]: The `top` paths with call count, total and self milliseconds,
+        token counts, retries and errors.
+    """
+    spans = load_spans(path, session_id)
+    by_id = {span["span_id"]: span for span in spans}
+    child_ms = defaultdict(float)
+    for span in spans:
+        if span["parent_span_id"] in by_id:
+            child_ms[span["parent_span_id"]] += span["duration_ms"]
+
+    def path_of(span: dict) -> str:
+        names = []
+        while span is not None:
+            names.append(span["name"])
+            span = by_id.get(span["parent_span_id"])
+        return " > ".join(reversed(names))
+
+    paths = defaultdict(lambda: {"calls": 0, "total_ms": 0.0, "self_ms": 0.0, "input_tokens": 0, "output_tokens": 0, "retries": 0, "errors": 0})
+    for span in spans:
+        entry = paths[path_of(span)]
+        attributes = span["attributes"]
+        entry["calls"] += 1
+        entry["total_ms"] += span["duration_ms"]
+        entry["self_ms"] += max(span["duration_ms"] - child_ms[span["span_id"]], 0.0)
+        entry["input_tokens"] += attributes.get("gen_ai.usage.input_tokens", 0)
+        entry["output_tokens"] += attributes.get("gen_ai.usage.output_tokens", 0)
+        entry["retries"] += attributes.get("retries", 0)
+        entry["errors"] += span["error"]
+
+    ranked = sorted(paths.items(), key=lambda item: item[1]["self_ms"], reverse=True)[:top]
+    return [
+        {"path": name, **{key: round(value, 1) if isinstance(value, float) else value for key, value in entry.items()}}
+        for name, entry in ranked
+    ]
+
+
+def format_summary(rows: list[dict]) -> str:
+    """Renders summarize_traces output as a Markdown table."""
+    lines = [
+        "| Path | Calls | Self ms | Total ms | Input tokens | Output tokens | Retries | Errors |",
+        "| :--- | ---: | ---: | ---: | ---: | ---: | ---: | ---: |",
+    ]
+    lines += [
+        f"| {row['path']} | {row['calls']} | {row['self_ms']} | {row['total_ms']} | {row['input_tokens']} "
+        f"| {row['output_tokens']} | {row['retries']} | {row['errors']} |"
+        for row in rows
+    ]
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Print the hottest call paths recorded in a trace file.")
+    parser.add_argument("path", nargs="?", default=TRACE_EXPORT_PATH or os.path.join(".data", "traces.jsonl"), help="OTLP/JSON trace file.")
+    parser.add_argument("--session", help="Only include spans from this session id.")
+    parser.add_argument("--top", type=int, default=10, help="Number of paths to show.")
+    args = parser.parse_args()
+    print(format_summary(summarize_traces(args.path, args.session, args.top)))
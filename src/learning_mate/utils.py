@@ -1,31 +1,51 @@
-import ast
-from google.genai import types
+import os
 
-# Retry configuration for Google GenAI API
-retry_config = types.HttpRetryOptions(
-    attempts=5,           # Maximum retry attempts
-    exp_base=7,           # Delay multiplier for exponential backoff
-    initial_delay=1,      # Initial delay in seconds
-    http_status_codes=[429, 500, 503, 504],  # Retry on these HTTP status codes
-)
 
+def summarize_latencies(samples: list[float]) -> dict:
+    """
+    Summarizes latency samples (in seconds) as millisecond statistics.
+
+    Args:
+        samples (list[float]): Observed durations in seconds.
+
+    Returns:
+        dict: count, mean, p50, p95 and max in milliseconds (zeros when empty).
+    """
+    if not samples:
+        return {"count": 0, "mean_ms": 0.0, "p50_ms": 0.0, "p95_ms": 0.0, "max_ms": 0.0}
 
-def extract_genai_error_message(error: Exception) -> str:
+    ordered = sorted(samples)
+
+    def percentile(fraction: float) -> float:
+        return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+    return {
+        "count": len(ordered),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 1),
+        "p50_ms": round(percentile(0.50) * 1000, 1),
+        "p95_ms": round(percentile(0.95) * 1000, 1),
+        "max_ms": round(ordered[-1] * 1000, 1),
+    }
+
+
+def require_env(name: str, message: str) -> str:
     """
-    Extracts a human-readable error message from a Google GenAI API exception.
+    Returns an environment variable that must be set before a backend is used.
+
+    Called on first real use rather than at import, so tooling and tests
+    that never reach the backend run without the key.
 
     Args:
-        error (Exception): The caught exception from any GenAI API call.
+        name (str): Environment variable to read.
+        message (str): Error message when it is missing or empty.
 
     Returns:
-        str: Parsed error message if possible, else the raw exception string.
+        str: The variable's value.
+
+    Raises:
+        RuntimeError: If the variable is missing or empty.
     """
-    raw_msg = str(error)
-    try:
-        # GenAI errors often have a leading code followed by a dict-like structure
-        dict_part = raw_msg.split(". ", 1)[1]  # skip leading code/message
-        error_json = ast.literal_eval(dict_part)
-        return error_json.get("error", {}).get("message", raw_msg)
-    except Exception:
-        # Fallback to raw string if parsing fails
-        return raw_msg
+    value = os.getenv(name)
+    if not value:
+        raise RuntimeError(message)
+    return value
@@ -0,0 +1,359 @@
+"""Multi-worker deployment: several ADK web workers behind one front end.
+
+    PYTHONPATH=src python -m learning_mate.workers src --workers 4 --port 8000
+
+One `adk web` process runs every learner on one event loop and one core.
+This module starts `--workers` worker processes serving the same agents,
+each on its own local port, and a front end on `--port` that forwards every
+request to one of them.
+
+Routing is sticky: requests are routed by session ID (taken from the URL, or
+from the body of `/run` and `/run_sse`), using rendezvous hashing over the
+workers that are up. A session stays on one worker, where its prefetched
+lessons and buffered session writes live, and when a worker goes down only
+its own sessions move. Requests without a session go to the least busy
+worker.
+
+Workers share the stores behind the URIs they are given: the `tunedsqlite`
+session store (WAL mode; one writer per session thanks to sticky routing),
+`file://` artifacts (ADK's `FileArtifactService` reserves each version
+with an exclusive directory create and publishes it with a rename, so
+concurrent `save_artifact` calls never get the same version), the memory
+index and the local caches. The front end restarts a worker that exits. When
+MODEL_RATE_LIMITS is set, the workers draw from one set of token buckets in
+`--rate-limit-store`, so together they stay within the quota.
+
+On SIGINT or SIGTERM the front end drains: it stops accepting connections,
+lets running requests finish for up to WORKER_DRAIN_SECONDS, then stops the
+workers, which commit buffered session events before they exit.
+"""
+import os
+import re
+import sys
+import json
+import time
+import asyncio
+import hashlib
+import logging
+import argparse
+from collections import Counter
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Callable
+
+import httpx
+
+from .scheduler import MODEL_RATE_LIMITS
+
+
+# Time running requests get to finish on shutdown; longer than a turn's deadline
+WORKER_DRAIN_SECONDS = float(os.getenv("WORKER_DRAIN_SECONDS", "150"))
+
+# Time a worker gets to start serving
+WORKER_START_SECONDS = float(os.getenv("WORKER_START_SECONDS", "60"))
+
+# Front-end paths of its own; everything else is forwarded
+STATS_PATH = "/_workers"
+
+_SESSION_PATH = re.compile(r"^/apps/[^/]+/users/(?P<user>[^/]+)/sessions/(?P<session>[^/]+)")
+_USER_PATH = re.compile(r"^/apps/[^/]+/users/(?P<user>[^/]+)")
+_RUN_PATHS = {"/run", "/run_sse"}
+_HOP_HEADERS = {"connection", "keep-alive", "transfer-encoding", "upgrade", "host", "content-length", "te", "trailer"}
+
+logger = logging.getLogger(__name__)
+
+
+def routing_key(path: str, body: bytes) -> str | None:
+    """Returns the session ID a request belongs to, the user ID when it has none, or None."""
+    match = _SESSION_PATH.match(path)
+    if match:
+        return match["session"]
+    if path in _RUN_PATHS and body:
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            payload = None
+        if isinstance(payload, dict) and (payload.get("session_id") or payload.get("sessionId")):
+            return payload.get("session_id") or payload.get("sessionId")
+    match = _USER_PATH.match(path)
+    return f"user:{match['user']}" if match else None
+
+
+def rendezvous_pick(key: str, names: list[str]) -> str:
+    """Returns the name with the highest hash for `key` (highest random weight hashing)."""
+    return max(names, key=lambda name: hashlib.sha256(f"{name}|{key}".encode()).digest())
+
+
+@dataclass
+class Worker:
+    """One worker process and its routing counters."""
+    index: int
+    port: int
+    process: asyncio.subprocess.Process | None = None
+    ready: bool = False
+    in_flight: int = 0
+    counters: Counter = field(default_factory=Counter)
+
+    @property
+    def name(self) -> str:
+        return f"worker-{self.index}"
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+
+def adk_worker_command(port: int, args: argparse.Namespace) -> list[str]:
+    return [
+        sys.executable, "-m", "learning_mate.workers", args.agents_dir, "--serve-worker",
+        "--port", str(port),
+        "--session-uri", args.session_uri,
+        "--artifact-uri", args.artifact_uri,
+        "--memory-uri", args.memory_uri,
+    ]
+
+
+class WorkerPool:
+    """Starts the worker processes, restarts the ones that exit, and stops them all on shutdown."""
+
+    def __init__(
+        self,
+        count: int,
+        first_port: int,
+        command: Callable[[int], list[str]],
+        env: dict[str, str] | None = None,
+        rate_limit_store: str | None = None,
+    ):
+        self.workers = [Worker(index, first_port + index) for index in range(count)]
+        self.command = command
+        self.env = {**os.environ, **(env or {})}
+        if MODEL_RATE_LIMITS and rate_limit_store:
+            # One quota for all workers, with each model's full burst
+            self.env["MODEL_RATE_LIMITS_STORE"] = rate_limit_store
+        self.counters = Counter()
+        self._client = httpx.AsyncClient(timeout=2)
+        self._supervisors: list[asyncio.Task] = []
+        self._stopping = False
+
+    async def start(self) -> None:
+        await asyncio.gather(*(self._launch(worker) for worker in self.workers))
+        self._supervisors = [asyncio.create_task(self._supervise(worker)) for worker in self.workers]
+
+    async def _launch(self, worker: Worker) -> None:
+        worker.process = await asyncio.create_subprocess_exec(*self.command(worker.port), env=self.env)
+        deadline = time.monotonic() + WORKER_START_SECONDS
+        while time.monotonic() < deadline and worker.process.returncode is None:
+            try:
+                if (await self._client.get(f"{worker.url}/list-apps")).status_code == 200:
+                    worker.ready = True
+                    self.counters["started"] += 1
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+        logger.error("%s did not start serving on port %d", worker.name, worker.port)
+
+    async def _supervise(self, worker: Worker) -> None:
+        """Restarts the worker whenever it exits, until the pool stops."""
+        while not self._stopping:
+            code = await worker.process.wait()
+            worker.ready = False
+            if self._stopping:
+                return
+            logger.warning("%s exited with code %s; restarting it", worker.name, code)
+            self.counters["restarts"] += 1
+            await asyncio.sleep(1)
+            await self._launch(worker)
+
+    def pick(self, key: str | None) -> Worker | None:
+        """Returns the worker a request goes to: the session's own, or the least busy one."""
+        ready = [worker for worker in self.workers if worker.ready]
+        if not ready:
+            return None
+        if key is None:
+            return min(ready, key=lambda worker: worker.in_flight)
+        name = rendezvous_pick(key, [worker.name for worker in ready])
+        return next(worker for worker in ready if worker.name == name)
+
+    async def stop(self, timeout: float = WORKER_DRAIN_SECONDS) -> None:
+        """Asks every worker to shut down (they commit buffered writes first), killing those that don't in time."""
+        self._stopping = True
+        running = [worker.process for worker in self.workers if worker.process and worker.process.returncode is None]
+        for process in running:
+            process.terminate()
+        try:
+            await asyncio.wait_for(asyncio.gather(*(process.wait() for process in running)), timeout)
+        except asyncio.TimeoutError:
+            for process in running:
+                if process.returncode is None:
+                    process.kill()
+        for task in self._supervisors:
+            task.cancel()
+        await asyncio.gather(*self._supervisors, return_exceptions=True)
+        await self._client.aclose()
+
+    def stats(self) -> dict:
+        return {
+            **self.counters,
+            "workers": [
+                {"name": worker.name, "port": worker.port, "ready": worker.ready, "in_flight": worker.in_flight, **worker.counters}
+                for worker in self.workers
+            ],
+        }
+
+
+class FrontEnd:
+    """ASGI app that forwards each request to its session's worker and streams the response back.
+
+    Served by uvicorn, whose graceful shutdown provides the drain: the
+    listening socket closes and running requests (including SSE streams)
+    finish before the lifespan shutdown stops the workers.
+    """
+
+    def __init__(self, pool: WorkerPool):
+        self.pool = pool
+        self.counters = Counter()
+        self._client: httpx.AsyncClient | None = None
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http":
+            await self._forward(scope, receive, send)
+        else:
+            # Live (websocket) sessions are not forwarded; they need a single `adk web`
+            await send({"type": "websocket.close", "code": 1003})
+
+    async def _lifespan(self, receive, send) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                # Turns can run long; each worker enforces the turn deadline itself
+                self._client = httpx.AsyncClient(timeout=httpx.Timeout(None, connect=5), limits=httpx.Limits(max_connections=None))
+                await self.pool.start()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.pool.stop()
+                await self._client.aclose()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _respond(self, send, status: int, body: dict, headers: list | None = None) -> None:
+        await send({"type": "http.response.start", "status": status, "headers": [(b"content-type", b"application/json"), *(headers or [])]})
+        await send({"type": "http.response.body", "body": json.dumps(body).encode()})
+
+    async def _forward(self, scope, receive, send) -> None:
+        if scope["path"] == STATS_PATH:
+            await self._respond(send, 200, {**self.counters, **self.pool.stats()})
+            return
+
+        chunks = []
+        while True:
+            message = await receive()
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body"):
+                break
+        body = b"".join(chunks)
+
+        worker = self.pool.pick(routing_key(scope["path"], body))
+        if worker is None:
+            self.counters["unavailable"] += 1
+            await self._respond(send, 503, {"detail": "No worker is available."}, [(b"retry-after", b"5")])
+            return
+
+        url = worker.url + scope.get("raw_path", scope["path"].encode()).decode()
+        if scope.get("query_string"):
+            url += "?" + scope["query_string"].decode()
+        headers = [(name, value) for name, value in scope["headers"] if name.decode().lower() not in _HOP_HEADERS]
+        worker.in_flight += 1
+        started = False
+        try:
+            async with self._client.stream(scope["method"], url, headers=headers, content=body) as upstream:
+                await send({
+                    "type": "http.response.start",
+                    "status": upstream.status_code,
+                    "headers": [
+                        (name.encode(), value.encode()) for name, value in upstream.headers.multi_items()
+                        if name.lower() not in _HOP_HEADERS
+                    ],
+                })
+                started = True
+                async for chunk in upstream.aiter_raw():
+                    await send({"type": "http.response.body", "body": chunk, "more_body": True})
+                await send({"type": "http.response.body", "body": b""})
+            worker.counters["requests"] += 1
+        except httpx.TransportError as e:
+            worker.counters["errors"] += 1
+            if started:
+                raise
+            await self._respond(send, 502, {"detail": f"{worker.name} is unreachable: {e}"})
+        finally:
+            worker.in_flight -= 1
+
+
+@asynccontextmanager
+async def _worker_lifespan(app):
+    """Commits buffered session events and closes the search pool when a worker stops."""
+    yield
+    from .session_store import close_session_services
+    from .sub_agents.web_search_agent import tavily_pool
+
+    await close_session_services()
+    await tavily_pool.close()
+
+
+def serve_worker(args: argparse.Namespace) -> None:
+    """Runs one worker: ADK's web server for `args.agents_dir` on 127.0.0.1:`args.port`."""
+    import uvicorn
+    from google.adk.cli.fast_api import get_fast_api_app
+
+    app = get_fast_api_app(
+        agents_dir=args.agents_dir,
+        session_service_uri=args.session_uri,
+        artifact_service_uri=args.artifact_uri,
+        memory_service_uri=args.memory_uri,
+        web=True,
+        lifespan=_worker_lifespan,
+        host="127.0.0.1",
+        port=args.port,
+    )
+    uvicorn.Server(uvicorn.Config(
+        app, host="127.0.0.1", port=args.port, timeout_graceful_shutdown=WORKER_DRAIN_SECONDS, log_level="warning",
+    )).run()
+
+
+def serve_front_end(pool: WorkerPool, host: str, port: int) -> None:
+    """Runs the front end until SIGINT or SIGTERM, then drains it and its workers."""
+    import uvicorn
+
+    uvicorn.Server(uvicorn.Config(
+        FrontEnd(pool), host=host, port=port, lifespan="on", timeout_graceful_shutdown=WORKER_DRAIN_SECONDS,
+    )).run()
+
+
+def build_parser() -> argparse.ArgumentParser:
+    data_dir = os.path.abspath(".data")
+    parser = argparse.ArgumentParser(description="Serve Learning Mate with several worker processes behind one front end.")
+    parser.add_argument("agents_dir", nargs="?", default="src", help="Agents directory, as given to `adk web`.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Number of worker processes (default: one per core).")
+    parser.add_argument("--host", default="127.0.0.1", help="Front-end host.")
+    parser.add_argument("--port", type=int, default=8000, help="Front-end port; workers listen on the ports right after it.")
+    parser.add_argument("--session-uri", default=f"tunedsqlite:///{data_dir}/session_store.sqlite", help="Shared session store.")
+    parser.add_argument("--artifact-uri", default=f"file:///{data_dir}/artifacts", help="Shared artifact store.")
+    parser.add_argument("--memory-uri", default=f"localmemory:///{data_dir}/memory.sqlite", help="Shared memory store.")
+    parser.add_argument("--rate-limit-store", default=f"{data_dir}/rate_limits.sqlite", help="Token buckets shared by the workers when MODEL_RATE_LIMITS is set.")
+    parser.add_argument("--serve-worker", action="store_true", help=argparse.SUPPRESS)
+    return parser
+
+
+if __name__ == "__main__":
+    args = build_parser().parse_args()
+    if args.serve_worker:
+        serve_worker(args)
+    else:
+        logging.basicConfig(level=logging.INFO)
+        pythonpath = os.pathsep.join(filter(None, (os.path.abspath(args.agents_dir), os.getenv("PYTHONPATH"))))
+        pool = WorkerPool(
+            args.workers, args.port + 1, lambda port: adk_worker_command(port, args), {"PYTHONPATH": pythonpath}, args.rate_limit_store,
+        )
+        serve_front_end(pool, args.host, args.port)
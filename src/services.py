@@ -0,0 +1,12 @@
+"""Custom service URI schemes, loaded by `adk web`/`adk run` from the agents directory."""
+from google.adk.cli.service_registry import get_service_registry
+
+from learning_mate.local_memory import create_memory_service
+from learning_mate.session_store import create_session_service
+
+
+# --memory_service_uri "localmemory:///absolute/path/memory.sqlite"
+get_service_registry().register_memory_service("localmemory", create_memory_service)
+
+# --session_service_uri "tunedsqlite:///absolute/path/sessions.sqlite"
+get_service_registry().register_session_service("tunedsqlite", create_session_service)
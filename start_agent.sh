@@ -22,31 +22,56 @@ chmod 755 "$PROJECT_ROOT/.data"
 
 # --- 2. CONFIGURATION: CUSTOM URIs ---
 # Session Service URI (Database):
-# Using 'sqlite://<path>' for local, persistent chat session history.
-# This is a robust, local database solution.
-# NOTE: Requires the 'sqlite' dependency to be installed!
-SESSION_URI="sqlite:///$PROJECT_ROOT/.data/sessions.sqlite"
+# Using 'tunedsqlite://<path>' (registered in src/services.py) for local,
+# persistent chat session history: SQLite in WAL mode with pooled connections,
+# one commit per turn and per-key state updates.
+# Use 'sqlite://<path>' instead for ADK's stock SQLite backend (the two use
+# different schemas, hence the separate file).
+SESSION_URI="tunedsqlite:///$PROJECT_ROOT/.data/session_store.sqlite"
 
 # Artifact Service URI (Local File System):
 # Using 'file://<path>' to store all generated non-text data (images, files)
 # in a custom local directory.
 ARTIFACT_URI="file:///$PROJECT_ROOT/.data/artifacts"
 
+# Memory Service URI (Local Vector Index):
+# Using 'localmemory://<path>' (registered in src/services.py) so `load_memory`
+# recalls earlier sessions from an on-disk embedding index.
+MEMORY_URI="localmemory:///$PROJECT_ROOT/.data/memory.sqlite"
+
+# Worker Processes:
+# WORKERS=1 (default) runs a single `adk web` process. With WORKERS=N > 1,
+# N workers share the stores above behind a front end on port 8000 that
+# keeps each session on one worker (see src/learning_mate/workers.py).
+WORKERS="${WORKERS:-1}"
+
 # --- 3. EXECUTION LOGIC ---
 print_separator
 # Launch message with info on session and artifact persistence
 echo "🚀 Launching ADK Web Environment for Agent Package: src/learning_mate"
-echo "Persistence Mode: SQLite DB (Session) + Local Disk (Artifacts)"
+echo "Persistence Mode: SQLite DB (Session) + Local Disk (Artifacts) + Local Vector Index (Memory)"
 print_separator
 echo "SESSION_SERVICE_URI: $SESSION_URI"
 echo "ARTIFACT_SERVICE_URI: $ARTIFACT_URI"
+echo "MEMORY_SERVICE_URI: $MEMORY_URI"
+echo "WORKERS: $WORKERS"
 print_separator
 
 # --- 4. START ADK WEB SERVER ---
 # Run ADK web server in the background so we can open the browser later
-adk web "src" \
-    --session_service_uri "$SESSION_URI" \
-    --artifact_service_uri "$ARTIFACT_URI" &
+if [ "$WORKERS" -gt 1 ]; then
+    PYTHONPATH="src${PYTHONPATH:+:$PYTHONPATH}" python -m learning_mate.workers "src" \
+        --workers "$WORKERS" \
+        --port 8000 \
+        --session-uri "$SESSION_URI" \
+        --artifact-uri "$ARTIFACT_URI" \
+        --memory-uri "$MEMORY_URI" &
+else
+    adk web "src" \
+        --session_service_uri "$SESSION_URI" \
+        --artifact_service_uri "$ARTIFACT_URI" \
+        --memory_service_uri "$MEMORY_URI" &
+fi
 
 # Capture the background PID to wait for later
 ADK_PID=$!
@@ -84,7 +109,9 @@ else
 fi
 
 # --- 7. WAIT FOR ADK SERVER TO EXIT ---
-# Keep the script running until the ADK process ends
+# Keep the script running until the ADK process ends; Ctrl+C lets running turns finish first
+trap 'kill -TERM $ADK_PID 2>/dev/null' INT TERM
+wait $ADK_PID
 wait $ADK_PID
 
 print_separator
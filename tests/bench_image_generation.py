@@ -0,0 +1,83 @@
+import sys
+import time
+import asyncio
+import importlib
+import tempfile
+from pathlib import Path
+
+# Set up sys.path to ensure 'learning_mate' package is found when running from 'tests/'
+current_dir = Path(__file__).resolve().parent
+project_root = current_dir.parent
+sys.path.append(str(project_root / "src"))
+
+# The sub_agents package re-exports the agent under the module's name, so import the module explicitly
+image_module = importlib.import_module("learning_mate.sub_agents.image_generation_agent")
+from learning_mate.image_cache import ImageCache
+
+
+RENDER_SECONDS = 0.5   # Simulated Imagen latency
+SESSIONS = 8           # Concurrent learners asking for an illustration
+CHAT_TURNS = 20        # Text turns each learner runs while waiting
+CHAT_SECONDS = 0.01    # Simulated latency of one text turn
+
+
+class FakeToolContext:
+    """Minimal stand-in for ToolContext that keeps artifacts in memory."""
+
+    def __init__(self):
+        self.artifacts = {}
+
+    async def save_artifact(self, filename, artifact):
+        self.artifacts.setdefault(filename, []).append(artifact)
+        return len(self.artifacts[filename]) - 1
+
+
+async def blocking_render(prompt: str) -> bytes:
+    """Mimics the old synchronous client call made from inside the coroutine."""
+    time.sleep(RENDER_SECONDS)
+    return b"\x89PNG fake"
+
+
+async def async_render(prompt: str) -> bytes:
+    """Mimics the async GenAI client call."""
+    await asyncio.sleep(RENDER_SECONDS)
+    return b"\x89PNG fake"
+
+
+async def learner(index: int) -> float:
+    """Requests one illustration and keeps chatting; returns the worst chat turn latency."""
+    worst = 0.0
+
+    async def chat():
+        nonlocal worst
+        for _ in range(CHAT_TURNS):
+            start = time.perf_counter()
+            await asyncio.sleep(CHAT_SECONDS)
+            worst = max(worst, time.perf_counter() - start)
+
+    await asyncio.gather(
+        image_module.generate_image(f"Bloch sphere {index}", tool_context=FakeToolContext()),
+        chat(),
+    )
+    return worst
+
+
+async def run(render) -> tuple[float, float]:
+    image_module._render_with_imagen = render
+    image_module._image_semaphore = None
+    image_module._image_cache = ImageCache(tempfile.mkdtemp(prefix="image_cache_"))
+    start = time.perf_counter()
+    worst_turns = await asyncio.gather(*(learner(i) for i in range(SESSIONS)))
+    return time.perf_counter() - start, max(worst_turns)
+
+
+async def main():
+    """Compares blocking and non-blocking image renders under concurrent learners."""
+    print(f"{SESSIONS} learners, {RENDER_SECONDS}s render, concurrency limit {image_module.IMAGE_CONCURRENCY}")
+    for label, render in (("blocking", blocking_render), ("async", async_render)):
+        wall, worst = await run(render)
+        print(f"{label:>9}: wall {wall:6.2f}s | worst chat turn {worst * 1000:8.1f}ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
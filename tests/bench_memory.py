@@ -0,0 +1,86 @@
+import sys
+import time
+import random
+import argparse
+import tempfile
+from pathlib import Path
+
+from google.adk.events import Event
+from google.genai import types as genai_types
+
+# Set up sys.path to ensure 'learning_mate' package is found when running from 'tests/'
+current_dir = Path(__file__).resolve().parent
+project_root = current_dir.parent
+sys.path.append(str(project_root / "src"))
+
+from learning_mate.local_memory import LocalMemoryService, _score
+from learning_mate.utils import summarize_latencies
+
+
+TOPICS = ["qubits", "superposition", "entanglement", "quantum gates", "rust ownership", "borrow checker",
+          "italian pasta", "sourdough starter", "linear algebra", "eigenvalues", "french verbs", "guitar chords"]
+WORDS = "learn practice example explain review quiz score lesson unit diagram note question answer".split()
+
+
+def passage(rng: random.Random) -> str:
+    topic = rng.choice(TOPICS)
+    return f"{topic}: " + " ".join(rng.choice(WORDS + topic.split()) for _ in range(rng.randint(12, 40)))
+
+
+def main(args) -> None:
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as data_dir:
+        memory = LocalMemoryService(Path(data_dir) / "memory.sqlite")
+        stored, timestamp = 0, time.time()
+        print("| Passages | Ingest s | p50 ms | p95 ms | Recall@5 vs exact |")
+        print("| ---: | ---: | ---: | ---: | ---: |")
+        for size in args.sizes:
+            started = time.perf_counter()
+            events = []
+            while stored < size:
+                timestamp += 1
+                events.append(Event(
+                    invocation_id="bench", author="teacher_agent", timestamp=timestamp,
+                    content=genai_types.Content(role="model", parts=[genai_types.Part(text=passage(rng))]),
+                ))
+                stored += 1
+            memory.ingest("bench", "learner", f"session_{size}", events)
+            ingest_seconds = time.perf_counter() - started
+
+            memory.search_seconds.clear()
+            rows = stored_vectors(memory) if not args.skip_recall else []
+            recalls = []
+            for _ in range(args.queries):
+                query = passage(rng)
+                found = {match["id"] for _, match in memory.search("bench", "learner", query, top_k=5)}
+                if rows:
+                    exact = exact_top_ids(memory, rows, query)
+                    if exact:
+                        recalls.append(len(found & exact) / len(exact))
+            latency = summarize_latencies(list(memory.search_seconds))
+            recall = f"{sum(recalls) / len(recalls):.2f}" if recalls else "-"
+            print(f"| {size} | {ingest_seconds:.1f} | {latency['p50_ms']} | {latency['p95_ms']} | {recall} |")
+
+
+def stored_vectors(memory: LocalMemoryService) -> list[tuple[int, bytes, bytes]]:
+    conn = memory._connect()
+    try:
+        return conn.execute("SELECT id, dims, weights FROM memories").fetchall()
+    finally:
+        conn.close()
+
+
+def exact_top_ids(memory: LocalMemoryService, rows: list[tuple[int, bytes, bytes]], query: str) -> set[int]:
+    """Brute-force cosine top 5, to measure how much the approximate search misses."""
+    vector = memory.embedder.embed([query])[0]
+    scored = sorted(((_score(vector, dims, weights), row_id) for row_id, dims, weights in rows), reverse=True)
+    return {row_id for score, row_id in scored[:5] if score >= memory.min_score}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recall latency of the local memory index as it grows.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 30000], help="Passages per learner to measure at.")
+    parser.add_argument("--queries", type=int, default=200, help="Searches per size.")
+    parser.add_argument("--skip-recall", action="store_true", help="Skip comparing each result with a brute-force search.")
+    parser.add_argument("--seed", type=int, default=0)
+    main(parser.parse_args())
@@ -0,0 +1,99 @@
+import sys
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+from pathlib import Path
+
+from google.adk.events import Event, EventActions
+from google.genai import types as genai_types
+
+# Set up sys.path to ensure 'learning_mate' package is found when running from 'tests/'
+current_dir = Path(__file__).resolve().parent
+project_root = current_dir.parent
+sys.path.append(str(project_root / "src"))
+
+from learning_mate.session_store import TunedSqliteSessionService
+from learning_mate.utils import summarize_latencies
+
+
+def stock_service(path: Path):
+    """ADK's own SQLite backend (DatabaseSessionService on releases that predate it)."""
+    try:
+        from google.adk.sessions.sqlite_session_service import SqliteSessionService
+        return SqliteSessionService(str(path))
+    except ImportError:
+        from google.adk.sessions import DatabaseSessionService
+        return DatabaseSessionService(f"sqlite:///{path}")
+
+
+def turn_events(rng: random.Random, learner: int, turn: int) -> list[Event]:
+    """A typical tutoring turn: user message, tool call and result, reply, with state updates."""
+    invocation = f"inv_{learner}_{turn}"
+    text = lambda role, size: genai_types.Content(role=role, parts=[genai_types.Part(text="x" * size)])
+    score = rng.randint(40, 100)
+    return [
+        Event(invocation_id=invocation, author="user", content=text("user", rng.randint(40, 200))),
+        Event(invocation_id=invocation, author="learning_mate", content=genai_types.Content(role="model", parts=[
+            genai_types.Part(function_call=genai_types.FunctionCall(name="assemble_lesson", args={"unit_topic": f"Unit {turn}"})),
+        ])),
+        Event(invocation_id=invocation, author="learning_mate", content=genai_types.Content(role="user", parts=[
+            genai_types.Part(function_response=genai_types.FunctionResponse(name="assemble_lesson", response={"lesson": "y" * rng.randint(1000, 4000)})),
+        ]), actions=EventActions(state_delta={"current_quiz": f"quiz {turn}", "prefetched_unit": f"Unit {turn + 1}"})),
+        Event(invocation_id=invocation, author="learning_mate", content=text("model", rng.randint(800, 3000)),
+              actions=EventActions(state_delta={f"quiz_{turn}": score, "user:last_score": score, "temp:draft": "z"})),
+    ]
+
+
+async def learner(service, rng: random.Random, index: int, turns: int, think: float, flush: bool, turn_seconds: list, get_seconds: list) -> None:
+    # A long course plan in state, as set by the planner, so full-state rewrites have something to rewrite
+    session = await service.create_session(app_name="bench", user_id=f"learner_{index}", state={"course_plan": "Unit: plan\n" * 300})
+    for turn in range(turns):
+        # Runner loads the session at the start of every turn
+        started = time.perf_counter()
+        session = await service.get_session(app_name="bench", user_id=f"learner_{index}", session_id=session.id)
+        get_seconds.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        for event in turn_events(rng, index, turn):
+            await service.append_event(session, event)
+        if flush:
+            await service.flush()  # What SessionFlushPlugin does at the end of every turn
+        turn_seconds.append(time.perf_counter() - started)
+        await asyncio.sleep(think * (0.5 + rng.random()))  # The model and the learner take their time
+
+
+async def run(name: str, service, args) -> None:
+    rng = random.Random(args.seed)
+    turn_seconds, get_seconds = [], []
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        learner(service, rng, index, args.turns, args.think_ms / 1000, isinstance(service, TunedSqliteSessionService), turn_seconds, get_seconds)
+        for index in range(args.learners)
+    ))
+    wall = time.perf_counter() - started
+    turn, get = summarize_latencies(turn_seconds), summarize_latencies(get_seconds)
+    print(f"| {name} | {wall:.2f} | {turn['p50_ms']} | {turn['p95_ms']} | {get['p50_ms']} | {get['p95_ms']} |")
+
+
+async def main(args) -> None:
+    print(f"{args.learners} learners x {args.turns} turns (4 events per turn, {args.think_ms:g} ms between turns)\n")
+    print("| Backend | Wall s | turn writes p50 ms | turn writes p95 ms | get_session p50 ms | get_session p95 ms |")
+    print("| :--- | ---: | ---: | ---: | ---: | ---: |")
+    with tempfile.TemporaryDirectory() as data_dir:
+        await run("stock sqlite", stock_service(Path(data_dir) / "stock.sqlite"), args)
+        tuned = TunedSqliteSessionService(Path(data_dir) / "tuned.sqlite")
+        await run("tuned (WAL, batched)", tuned, args)
+    stats = tuned.stats()
+    print(f"\nTuned backend: {stats['commits']} commits, {stats['events_per_commit']} events per commit, "
+          f"commit p95 {stats['commit_latency']['p95_ms']} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compares the stock and tuned SQLite session backends under concurrent learners.")
+    parser.add_argument("--learners", type=int, default=20, help="Concurrent learners.")
+    parser.add_argument("--turns", type=int, default=15, help="Turns per learner.")
+    parser.add_argument("--think-ms", type=float, default=100, help="Mean pause between turns (model and learner time).")
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(main(parser.parse_args()))
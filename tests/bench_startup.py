@@ -0,0 +1,89 @@
+import os
+import sys
+import argparse
+import statistics
+import subprocess
+from pathlib import Path
+
+# Set up sys.path to ensure 'learning_mate' package is found when running from 'tests/'
+current_dir = Path(__file__).resolve().parent
+project_root = current_dir.parent
+sys.path.append(str(project_root / "src"))
+
+# What every ADK agent pays anyway: the agent, app and Gemini model stacks
+ADK_BASELINE = "import google.adk.agents, google.adk.apps, google.adk.tools, google.adk.models.google_llm"
+PACKAGE_IMPORT = "import learning_mate.agent"
+
+# Heavy optional stacks that must only load on first use
+DEFERRED_MODULES = ["mcp", "sentence_transformers"]
+
+
+def import_profile(statement: str) -> tuple[float, dict[str, int]]:
+    """Runs `statement` in a fresh interpreter without API keys.
+
+    Returns the total import time in milliseconds (interpreter start-up
+    included) and the cumulative microseconds of every imported module.
+    """
+    env = {key: value for key, value in os.environ.items() if key not in ("GOOGLE_API_KEY", "TAVILY_API_KEY")}
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(project_root / "src"), env.get("PYTHONPATH")]))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True, text=True, env=env, cwd=project_root,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"`{statement}` failed:\n{result.stderr[-2000:]}")
+    total_us, profile = 0, {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        if not self_us.strip().isdigit():
+            continue  # The header line
+        profile[name.strip()] = int(cumulative_us)
+        if not name[1:].startswith(" "):  # Top-level imports; nested ones are indented
+            total_us += int(cumulative_us)
+    return total_us / 1000, profile
+
+
+def main(args) -> int:
+    package_ms, baseline_ms = [], []
+    for _ in range(args.runs):
+        total_ms, profile = import_profile(PACKAGE_IMPORT)
+        package_ms.append(total_ms)
+        baseline_ms.append(import_profile(ADK_BASELINE)[0])
+
+    total = statistics.median(package_ms)
+    floor = statistics.median(baseline_ms)
+    overhead = total - floor
+    print(f"Import of learning_mate.agent over {args.runs} fresh interpreters (no API keys set)\n")
+    print("| Measure | Median ms |")
+    print("| :--- | ---: |")
+    print(f"| `{PACKAGE_IMPORT}` | {total:.0f} |")
+    print(f"| ADK baseline (`{ADK_BASELINE}`) | {floor:.0f} |")
+    print(f"| Learning Mate overhead | {overhead:.0f} |")
+
+    own = sorted(
+        ((cumulative, name) for name, cumulative in profile.items() if name.startswith("learning_mate.")),
+        reverse=True,
+    )
+    print("\nSlowest learning_mate modules (cumulative, last run):")
+    for cumulative, name in own[:args.top]:
+        print(f"  {cumulative / 1000:7.1f} ms  {name}")
+
+    failures = []
+    loaded = [module for module in DEFERRED_MODULES if any(name == module or name.startswith(module + ".") for name in profile)]
+    if loaded:
+        failures.append(f"imported at startup instead of on first use: {', '.join(loaded)}")
+    if args.budget_ms and overhead > args.budget_ms:
+        failures.append(f"overhead {overhead:.0f} ms exceeds the {args.budget_ms:g} ms budget")
+    for failure in failures:
+        print(f"\nFAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import-time cost of learning_mate.agent, with a regression budget.")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to measure.")
+    parser.add_argument("--budget-ms", type=float, default=400, help="Maximum import overhead over the ADK baseline (0 disables the check).")
+    parser.add_argument("--top", type=int, default=8, help="learning_mate modules to list.")
+    sys.exit(main(parser.parse_args()))
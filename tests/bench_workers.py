@@ -0,0 +1,208 @@
+import os
+import sys
+import json
+import time
+import random
+import signal
+import asyncio
+import argparse
+import tempfile
+import subprocess
+from collections import Counter
+from pathlib import Path
+
+import httpx
+
+# Set up sys.path to ensure 'learning_mate' package is found when running from 'tests/'
+current_dir = Path(__file__).resolve().parent
+project_root = current_dir.parent
+sys.path.append(str(project_root / "src"))
+
+from learning_mate.utils import summarize_latencies
+
+# The learning session of the integration test in test.py
+QUERIES = [
+    "I need to learn the core concepts of quantum computing, starting from the basics.",
+    "Can you break down the first two concepts into small, actionable lessons?",
+    "Provide me with the content for the first lesson on 'Superposition'.",
+    "Based on my progress, what should my personalized plan look like for the rest of the week?",
+    "I've finished the 'Entanglement' lesson. Mark that task as complete.",
+    "What's the next step in my learning path?",
+]
+APP_NAME = "learning_mate"
+
+
+def store_args(args) -> list[str]:
+    data_dir = Path(args.data_dir).resolve()
+    return [
+        "--data-dir", str(data_dir),
+        "--model-latency", str(args.model_latency),
+        "--session-uri", f"tunedsqlite:///{data_dir}/session_store.sqlite",
+        "--artifact-uri", f"file:///{data_dir}/artifacts",
+        "--memory-uri", f"localmemory:///{data_dir}/memory.sqlite",
+    ]
+
+
+def serve_worker(args) -> None:
+    """One worker: ADK's web server for the agents in src, with fake models and offline backends."""
+    os.environ["TRACE_EXPORT_PATH"] = str(Path(args.data_dir) / f"traces-{args.port}.jsonl")
+    from learning_mate.agent import root_agent
+    from fakes import FakeLlm, install_offline_backends, replace_models
+    from learning_mate import workers
+
+    rng = random.Random(args.port)
+    # Uniform jitter around the configured mean keeps concurrent learners from moving in lockstep
+    replace_models(root_agent, lambda agent: FakeLlm(agent_name=agent.name, latency=lambda: args.model_latency * rng.uniform(0.5, 1.5)))
+    install_offline_backends(args.data_dir, current_dir / "fake_tavily_server.py")
+    args.agents_dir = str(project_root / "src")
+    workers.serve_worker(args)
+
+
+def serve_front_end(args) -> None:
+    """The front end, starting its workers with `serve_worker` above."""
+    from learning_mate.workers import WorkerPool, serve_front_end
+
+    command = lambda port: [sys.executable, __file__, "--serve-worker", "--port", str(port), *store_args(args)]
+    serve_front_end(WorkerPool(args.workers, args.port + 1, command), "127.0.0.1", args.port)
+
+
+async def learner(client: httpx.AsyncClient, name: str, queries: list[str], turns: list) -> None:
+    user_id, session_id = f"{name}_user", f"{name}_session"
+    (await client.post(f"/apps/{APP_NAME}/users/{user_id}/sessions/{session_id}")).raise_for_status()
+    for query in queries:
+        started = time.perf_counter()
+        response = await client.post("/run", json={
+            "app_name": APP_NAME, "user_id": user_id, "session_id": session_id,
+            "new_message": {"role": "user", "parts": [{"text": query}]},
+        })
+        turns.append({"seconds": time.perf_counter() - started, "status": response.status_code, "events": len(response.json())})
+
+
+async def wait_until_ready(client: httpx.AsyncClient, workers: int, timeout: float = 120) -> dict:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            stats = (await client.get("/_workers")).json()
+            if sum(worker["ready"] for worker in stats["workers"]) == workers:
+                return stats
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.5)
+    raise TimeoutError(f"{workers} workers did not start within {timeout:.0f}s")
+
+
+async def count_events(session_uri: str, names: list[str]) -> int:
+    from learning_mate.session_store import create_session_service
+
+    service = create_session_service(session_uri)
+    sessions = [
+        await service.get_session(app_name=APP_NAME, user_id=f"{name}_user", session_id=f"{name}_session")
+        for name in names
+    ]
+    await service.close()
+    return sum(len(session.events) for session in sessions if session)
+
+
+async def run(args, workers: int) -> dict:
+    """Serves the agents with `workers` workers, runs the learners through the front end, then drains it."""
+    with tempfile.TemporaryDirectory() as data_dir:
+        args.data_dir = data_dir
+        # In a process group of its own, so its workers and their search servers can be killed with it
+        front_end = subprocess.Popen(
+            [sys.executable, __file__, "--serve-frontend", "--workers", str(workers), "--port", str(args.port), *store_args(args)],
+            env={**os.environ, "MODEL_RATE_LIMITS": "", "PYTHONPATH": str(project_root / "src")},
+            start_new_session=True,
+        )
+        try:
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", timeout=None) as client:
+                await wait_until_ready(client, workers)
+
+                turns = []
+                started = time.perf_counter()
+                await asyncio.gather(*(learner(client, f"learner_{index}", QUERIES * args.rounds, turns) for index in range(args.learners)))
+                wall = time.perf_counter() - started
+                stats = await client.get("/_workers")
+                distribution = {worker["name"]: worker.get("requests", 0) for worker in stats.json()["workers"]}
+
+                # Drain: stop the front end while turns are running; they should all complete and be stored
+                drained = []
+                names = [f"draining_{index}" for index in range(args.drain_learners)]
+                running = asyncio.gather(*(learner(client, name, QUERIES[:1], drained) for name in names))
+                while sum(worker["in_flight"] for worker in (await client.get("/_workers")).json()["workers"]) < args.drain_learners:
+                    await asyncio.sleep(0.01)
+                stopping = time.perf_counter()
+                front_end.send_signal(signal.SIGTERM)
+                await running
+            exit_code = await asyncio.to_thread(front_end.wait, 300)
+            stopped = time.perf_counter() - stopping
+        finally:
+            # Also reaches workers left behind when the benchmark is interrupted mid-run
+            try:
+                os.killpg(front_end.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            front_end.wait()
+        stored_events = await count_events(f"tunedsqlite:///{Path(data_dir).resolve()}/session_store.sqlite", names)
+
+    statuses = Counter(turn["status"] for turn in turns)
+    return {
+        "workers": workers,
+        "turns": len(turns),
+        "statuses": dict(statuses),
+        "wall_seconds": round(wall, 3),
+        "turns_per_second": round(len(turns) / wall, 2),
+        "turn_latency": summarize_latencies([turn["seconds"] for turn in turns]),
+        "requests_by_worker": distribution,
+        "drain": {
+            "turns": len(drained),
+            "completed": sum(turn["status"] == 200 for turn in drained),
+            "stored_events": stored_events,
+            "shutdown_seconds": round(stopped, 2),
+            "exit_code": exit_code,
+        },
+    }
+
+
+async def main(args) -> dict:
+    runs = [await run(args, workers) for workers in args.workers]
+    single = next((result for result in runs if result["workers"] == 1), None)
+    for result in runs:
+        if single:
+            result["speedup"] = round(result["turns_per_second"] / single["turns_per_second"], 2)
+            result["scaling_efficiency"] = round(result["speedup"] / result["workers"], 2)
+    return {"cpu_count": os.cpu_count(), "learners": args.learners, "model_latency": args.model_latency, "runs": runs}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Throughput of Learning Mate served by 1..N worker processes, fully offline.")
+    parser.add_argument("--workers", default="1,2,4", help="Comma-separated worker counts to compare.")
+    parser.add_argument("--learners", type=int, default=24, help="Number of concurrent learners.")
+    parser.add_argument("--rounds", type=int, default=1, help="Times each learner repeats the session.")
+    parser.add_argument("--model-latency", type=float, default=0.05, help="Mean fake model latency in seconds.")
+    parser.add_argument("--drain-learners", type=int, default=4, help="Turns left running when the front end is stopped.")
+    parser.add_argument("--port", type=int, default=8765, help="Front-end port; workers use the ports after it.")
+    parser.add_argument("--json", help="Also write the results to this file.")
+    # Internal modes, started by the benchmark itself
+    parser.add_argument("--serve-frontend", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--serve-worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--data-dir", help=argparse.SUPPRESS)
+    parser.add_argument("--session-uri", help=argparse.SUPPRESS)
+    parser.add_argument("--artifact-uri", help=argparse.SUPPRESS)
+    parser.add_argument("--memory-uri", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve_worker:
+        serve_worker(args)
+    elif args.serve_frontend:
+        args.workers = int(args.workers)
+        serve_front_end(args)
+    else:
+        args.workers = [int(count) for count in args.workers.split(",")]
+        # Exit through the cleanup in `run` rather than dying with the servers still running
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(128 + signum))
+        results = asyncio.run(main(args))
+        if max(args.workers) > results["cpu_count"]:
+            print(f"Warning: more workers than the {results['cpu_count']} available cores; scaling is capped by the cores.", file=sys.stderr)
+        print(json.dumps(results, indent=2))
+        if args.json:
+            Path(args.json).write_text(json.dumps(results, indent=2), encoding="utf-8")
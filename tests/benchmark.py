@@ -0,0 +1,200 @@
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+from collections import Counter
+from pathlib import Path
+
+from google.adk.agents.run_config import RunConfig, StreamingMode
+from google.adk.artifacts import InMemoryArtifactService
+from google.adk.memory import InMemoryMemoryService
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types as genai_types
+
+# Set up sys.path to ensure 'learning_mate' package is found when running from 'tests/'
+current_dir = Path(__file__).resolve().parent
+project_root = current_dir.parent
+sys.path.append(str(project_root / "src"))
+
+from learning_mate.agent import app, root_agent
+from fakes import FakeLlm, LocalCacheBackend, Recording, install_offline_backends, replace_models
+from learning_mate.sub_agents.web_search_agent import tavily_pool
+from learning_mate import scheduler
+from learning_mate.compaction import HISTORY_TOKEN_BUDGET, HistoryCompactionPlugin
+from learning_mate.course_packs import get_course_packs
+from learning_mate.pregenerate import Pregenerator
+from learning_mate.prefetch import get_prefetcher
+from learning_mate.prompt_cache import get_prefix_cache
+from learning_mate.quiz_bank import get_quiz_bank
+from learning_mate.resilience import TurnDeadlinePlugin, breaker_stats
+from learning_mate.routing import MODEL_TIERS, get_router
+from learning_mate.tracing import TracingPlugin, format_summary, summarize_traces
+from learning_mate.utils import summarize_latencies
+
+
+# The learning session of the integration test in test.py, plus the follow-up lesson the prefetcher prepares
+QUERIES = [
+    "I need to learn the core concepts of quantum computing, starting from the basics.",
+    "Can you break down the first two concepts into small, actionable lessons?",
+    "Provide me with the content for the first lesson on 'Superposition'.",
+    "Now the lesson content for 'Entanglement', please.",
+    "Based on my progress, what should my personalized plan look like for the rest of the week?",
+    "I've finished the 'Entanglement' lesson. Mark that task as complete.",
+    "What's the next step in my learning path?",
+]
+
+
+async def learner(
+    runner: Runner, session_service, index: int, turns: list, events: Counter, rounds: int = 1, stream: bool = False
+) -> None:
+    """Runs the query sequence `rounds` times as one learner, recording each turn's latency and events.
+
+    The time to first token is when the first text for the learner arrived:
+    a streamed chunk with `stream`, otherwise the first complete reply.
+    """
+    user_id, session_id = f"learner_{index}", f"session_{index}"
+    await session_service.create_session(app_name="bench", user_id=user_id, session_id=session_id)
+    run_config = RunConfig(streaming_mode=StreamingMode.SSE if stream else StreamingMode.NONE)
+    for query in QUERIES * rounds:
+        started = time.perf_counter()
+        first_token = None
+        count = 0
+        async for event in runner.run_async(
+            user_id=user_id,
+            session_id=session_id,
+            new_message=genai_types.Content(role="user", parts=[genai_types.Part.from_text(text=query)]),
+            run_config=run_config,
+        ):
+            count += 1
+            events["total"] += 1
+            events[event.author] += 1
+            if event.partial:
+                events["partial"] += 1
+            if event.get_function_calls():
+                events["function_calls"] += len(event.get_function_calls())
+            if first_token is None and event.content and any(part.text for part in event.content.parts or []):
+                first_token = time.perf_counter() - started
+        seconds = time.perf_counter() - started
+        turns.append({"seconds": seconds, "first_token_seconds": first_token or seconds, "events": count})
+
+
+async def main(args) -> dict:
+    """Runs N concurrent learners against the agent tree with fake backends and reports latency."""
+    rng = random.Random(args.seed)
+    recording = Recording(args.replay) if args.replay else None
+
+    def latency() -> float:
+        # Uniform jitter around the configured mean keeps concurrent learners from moving in lockstep
+        return args.model_latency * rng.uniform(0.5, 1.5)
+
+    # With --route, each call goes to the tier the router picks; the cheap tier answers faster.
+    # With --prompt-cache, static prompt prefixes are served from one local stand-in of the provider's cache
+    cache_backend = LocalCacheBackend() if args.prompt_cache else None
+    models = replace_models(
+        root_agent,
+        lambda agent: FakeLlm(
+            agent_name=agent.name,
+            latency=latency,
+            recording=recording,
+            routed_model=agent.model.model if args.route else None,
+            tier_latency={MODEL_TIERS[0]: args.cheap_tier_latency_ratio},
+            cache_backend=cache_backend,
+            prefill_latency=args.prefill_latency,
+        ),
+    )
+
+    if args.rate_limits is not None:
+        scheduler._scheduler = scheduler.RequestScheduler(scheduler.parse_rate_limits(args.rate_limits))
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        install_offline_backends(data_dir, current_dir / "fake_tavily_server.py", image_latency=args.image_latency, search_latency=args.search_latency)
+        if args.packs:
+            # Pre-generate the course of the session, as `python -m learning_mate.pregenerate` would
+            await Pregenerator(Path(data_dir) / "course_packs").run([{"course_goal": QUERIES[0], "additional_info": None}])
+            get_course_packs().refresh()
+            for model in models.values():
+                model.counters.clear()
+        session_service = InMemorySessionService()
+        # Trace into the temp dir unless asked to keep the file
+        trace_path = Path(args.trace or Path(data_dir) / "traces.jsonl")
+        tracing = TracingPlugin(trace_path)
+        compaction = HistoryCompactionPlugin(token_budget=args.history_budget or 10**9)
+        runner = Runner(
+            app=app.model_copy(update={
+                "name": "bench",
+                "plugins": [tracing, TurnDeadlinePlugin(), compaction],
+            }),
+            session_service=session_service,
+            artifact_service=InMemoryArtifactService(),
+            memory_service=InMemoryMemoryService(),
+        )
+
+        turns, events = [], Counter()
+        started = time.perf_counter()
+        try:
+            await asyncio.gather(*(
+                learner(runner, session_service, index, turns, events, args.rounds, args.stream) for index in range(args.learners)
+            ))
+        finally:
+            await tavily_pool.close()
+        wall = time.perf_counter() - started
+        await tracing.close()
+        hottest_paths = summarize_traces(trace_path, top=args.top_paths)
+
+    llm_calls = Counter()
+    for name, model in models.items():
+        llm_calls[name] = model.counters["calls"]
+    total_turns = len(turns)
+    return {
+        "learners": args.learners,
+        "turns": total_turns,
+        "wall_seconds": round(wall, 3),
+        "turn_latency": summarize_latencies([turn["seconds"] for turn in turns]),
+        "time_to_first_token": summarize_latencies([turn["first_token_seconds"] for turn in turns]),
+        "llm_calls_per_turn": round(sum(llm_calls.values()) / total_turns, 2),
+        "llm_calls_by_agent": dict(llm_calls),
+        "events_per_turn": round(events["total"] / total_turns, 2),
+        "events": dict(events),
+        "breakers": breaker_stats(),
+        "scheduler": scheduler.get_scheduler().stats(),
+        "prefetch": get_prefetcher().stats(),
+        "history": compaction.stats(),
+        "quiz_bank": get_quiz_bank().stats(),
+        "course_packs": get_course_packs().stats(),
+        "routing": get_router().stats(),
+        "prompt_cache": get_prefix_cache().stats(),
+        "hottest_paths": hottest_paths,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline load benchmark for the Learning Mate agent tree.")
+    parser.add_argument("--learners", type=int, default=10, help="Number of concurrent learners.")
+    parser.add_argument("--rounds", type=int, default=1, help="Times each learner repeats the session, to simulate a long course.")
+    parser.add_argument("--history-budget", type=int, default=HISTORY_TOKEN_BUDGET, help="Prompt token budget of history compaction (0 disables it).")
+    parser.add_argument("--model-latency", type=float, default=0.2, help="Mean fake model latency in seconds.")
+    parser.add_argument("--search-latency", type=float, default=0.3, help="Fake Tavily latency in seconds.")
+    parser.add_argument("--image-latency", type=float, default=1.0, help="Fake Imagen latency in seconds.")
+    parser.add_argument("--route", action="store_true", help="Route each model call to a tier instead of the agent's own model.")
+    parser.add_argument("--cheap-tier-latency-ratio", type=float, default=0.4, help="Latency of the cheapest tier relative to --model-latency.")
+    parser.add_argument("--prompt-cache", action="store_true", help="Serve each agent's static prompt prefix from a local context cache.")
+    parser.add_argument("--prefill-latency", type=float, default=0.0, help="Fake model seconds per 1,000 prompt tokens not served from a cache.")
+    parser.add_argument("--stream", action="store_true", help="Run turns with SSE streaming, relaying sub-agent output as it is generated.")
+    parser.add_argument("--packs", action="store_true", help="Pre-generate a course pack for the session before the learners start.")
+    parser.add_argument("--replay", help="JSONL recording to replay model responses from.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the latency jitter.")
+    parser.add_argument("--rate-limits", help="Override MODEL_RATE_LIMITS, e.g. 'imagen-4.0=10' ('' disables limits).")
+    parser.add_argument("--trace", help="Keep the OTLP/JSON trace file at this path.")
+    parser.add_argument("--top-paths", type=int, default=8, help="Number of hottest call paths to report.")
+    parser.add_argument("--json", help="Also write the results to this file.")
+    args = parser.parse_args()
+
+    results = asyncio.run(main(args))
+    print(json.dumps({key: value for key, value in results.items() if key != "hottest_paths"}, indent=2))
+    print(format_summary(results["hottest_paths"]))
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2), encoding="utf-8")
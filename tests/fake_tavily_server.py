@@ -0,0 +1,41 @@
+"""A stand-in for the Tavily MCP server that answers from canned results.
+
+Launch it over stdio exactly like the real server, e.g. by pointing
+`TAVILY_MCP_COMMAND` at a wrapper script or building StdioServerParameters
+with `sys.executable` and this file's path. Set `FAKE_TAVILY_LATENCY` to
+simulate network latency in seconds.
+"""
+import os
+import json
+import asyncio
+
+try:
+    from mcp.server.fastmcp import FastMCP as MCPServer
+except ImportError:  # mcp >= 2 renamed FastMCP
+    from mcp.server.mcpserver import MCPServer
+
+
+LATENCY = float(os.getenv("FAKE_TAVILY_LATENCY", "0"))
+
+server = MCPServer("fake-tavily")
+
+
+@server.tool(name="tavily-search")
+async def tavily_search(query: str, max_results: int = 5) -> str:
+    """Search the web for real-time information."""
+    await asyncio.sleep(LATENCY)
+    return json.dumps({
+        "query": query,
+        "results": [
+            {
+                "title": f"Result {i + 1} for {query}",
+                "url": f"https://example.org/{i + 1}",
+                "content": f"Canned content about {query}.",
+            }
+            for i in range(max_results)
+        ],
+    })
+
+
+if __name__ == "__main__":
+    server.run()
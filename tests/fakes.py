@@ -0,0 +1,460 @@
+"""Local stand-ins for Gemini, Imagen and Tavily used by offline tests and benchmarks.
+
+`FakeLlm` answers from a recording when one matches and otherwise follows a
+small deterministic script per Learning Mate agent, so the whole agent tree
+can run through `Runner` with configurable latency and no network access.
+`RecordingLlm` wraps a real model and captures its responses for replay.
+`LocalCacheBackend` stands in for the provider's context cache.
+"""
+import sys
+import json
+import time
+import asyncio
+import hashlib
+import importlib
+import threading
+from collections import Counter, defaultdict, deque
+from functools import partial
+from io import BytesIO
+from pathlib import Path
+from typing import AsyncGenerator, Callable
+
+import google.genai.types as types
+from google.adk.agents import BaseAgent
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.adk.tools import AgentTool
+from pydantic import Field
+
+from learning_mate.prompt_cache import estimate_prefix_tokens, generate_cached, static_prefix
+from learning_mate.routing import generate_routed, get_router
+from learning_mate.streaming import partial_relay
+
+
+_LESSON = (
+    "## {title}\n\n"
+    "Let's build an intuition first, then formalize it. "
+    "A classical bit is either 0 or 1, while a qubit's state is a combination of both until it is measured. "
+) + "Key idea: amplitudes, not probabilities, are what quantum gates manipulate. " * 20
+
+FAKE_QUIZ = {
+    "title": "Qubits and Superposition",
+    "difficulty": "medium",
+    "questions": [
+        {"id": "q1", "type": "multiple_choice", "prompt": "Which state can a qubit be in before measurement?",
+         "options": ["A) Only 0", "B) Only 1", "C) A superposition of 0 and 1"], "answer": ["C"], "points": 1},
+        {"id": "q2", "type": "true_false", "prompt": "Measuring a qubit collapses its superposition.",
+         "answer": ["true"], "points": 1},
+        {"id": "q3", "type": "fill_in_blank", "prompt": "The ___ sphere is used to visualize a single qubit.",
+         "answer": ["Bloch"], "points": 1},
+    ],
+}
+
+
+def request_key(llm_request: LlmRequest) -> str:
+    """Identifies a model call by the text and function names of its latest content.
+
+    Function response payloads are left out because they often embed
+    run-specific values (versions, timestamps) that would defeat replay.
+    """
+    if not llm_request.contents:
+        return "empty"
+    material = []
+    for part in llm_request.contents[-1].parts or []:
+        if part.text:
+            material.append(part.text)
+        if part.function_call:
+            material.append(f"call:{part.function_call.name}")
+        if part.function_response:
+            material.append(f"response:{part.function_response.name}")
+    return hashlib.sha256("\n".join(material).encode("utf-8")).hexdigest()[:16]
+
+
+class Recording:
+    """Model responses captured per agent and request key, stored as JSON lines."""
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._entries: dict[tuple[str, str], deque] = defaultdict(deque)
+        if self.path.exists():
+            for line in self.path.read_text(encoding="utf-8").splitlines():
+                if line.strip():
+                    entry = json.loads(line)
+                    self._entries[(entry["agent"], entry["key"])].append(entry["responses"])
+
+    def pop(self, agent_name: str, key: str) -> list[LlmResponse] | None:
+        """Returns the next recorded responses for a call, or None when nothing matches."""
+        queue = self._entries.get((agent_name, key))
+        if not queue:
+            return None
+        responses = queue.popleft() if len(queue) > 1 else queue[0]
+        return [LlmResponse.model_validate(response) for response in responses]
+
+    def append(self, agent_name: str, key: str, responses: list[LlmResponse]) -> None:
+        entry = {
+            "agent": agent_name,
+            "key": key,
+            "responses": [response.model_dump(mode="json", exclude_none=True) for response in responses],
+        }
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open("a", encoding="utf-8") as file:
+                file.write(json.dumps(entry) + "\n")
+
+
+def _last_user_text(llm_request: LlmRequest) -> str:
+    for content in reversed(llm_request.contents):
+        if content.role == "user":
+            texts = [part.text for part in content.parts or [] if part.text]
+            if texts:
+                return " ".join(texts)
+    return ""
+
+
+def _last_function_response(llm_request: LlmRequest) -> types.FunctionResponse | None:
+    if not llm_request.contents:
+        return None
+    for part in llm_request.contents[-1].parts or []:
+        if part.function_response:
+            return part.function_response
+    return None
+
+
+def _called_before(llm_request: LlmRequest, tool_name: str) -> bool:
+    return any(
+        part.function_call and part.function_call.name == tool_name
+        for content in llm_request.contents
+        for part in content.parts or []
+    )
+
+
+def _call(name: str, args: dict) -> types.Content:
+    return types.Content(role="model", parts=[types.Part(function_call=types.FunctionCall(name=name, args=args))])
+
+
+def _text(text: str) -> types.Content:
+    return types.Content(role="model", parts=[types.Part(text=text)])
+
+
+def _structured(llm_request: LlmRequest, payload: dict) -> types.Content:
+    # Agents mixing tools and an output schema must answer through set_model_response
+    if "set_model_response" in llm_request.tools_dict:
+        return _call("set_model_response", payload)
+    return _text(json.dumps(payload))
+
+
+def scripted_response(agent_name: str, llm_request: LlmRequest) -> types.Content:
+    """Produces a plausible response for a Learning Mate agent without any model.
+
+    The script exercises the same delegation paths as a real session: the
+    root agent hands learning requests to the teacher, and the teacher calls
+    the planner, search, illustration and quiz agents depending on the turn.
+    """
+    user_text = _last_user_text(llm_request)
+    function_response = _last_function_response(llm_request)
+    tools = llm_request.tools_dict
+
+    if agent_name == "smart_friend_agent":
+        if function_response is None and "transfer_to_agent" in tools:
+            return _call("transfer_to_agent", {"agent_name": "teacher_agent"})
+        return _text("Happy to help! Let's keep learning together.")
+
+    if agent_name == "teacher_agent":
+        if function_response is not None:
+            return _text(_LESSON.format(title=f"Lesson notes ({function_response.name})"))
+        lowered = user_text.casefold()
+        if not _called_before(llm_request, "course_planning_agent"):
+            return _call("course_planning_agent", {"course_goal": user_text})
+        if "finished" in lowered or "complete" in lowered:
+            return _call("quiz_generation_agent", {"reference_data": user_text})
+        if "plan" in lowered or "week" in lowered:
+            return _call("web_search_agent", {"request": user_text})
+        if ("lesson" in lowered or "content" in lowered) and "assemble_lesson" in tools:
+            return _call("assemble_lesson", {
+                "unit_topic": user_text[:80],
+                "search_request": user_text,
+                "image_prompt": f"Illustration for: {user_text}",
+                "quiz_reference": user_text,
+            })
+        if "lesson" in lowered or "content" in lowered:
+            return _call("image_generation_agent", {"prompt": f"Illustration for: {user_text}"})
+        return _text(_LESSON.format(title="Next Steps"))
+
+    if agent_name == "course_planning_agent":
+        units = "\n".join(
+            f"- Unit {i}: {topic} (45 min)\n  - Quiz: 5 questions, pass at 80%"
+            for i, topic in enumerate(["Qubits", "Superposition", "Entanglement", "Quantum Gates"], start=1)
+        )
+        return _text(f"# Course Plan: {user_text[:80]}\n{units}")
+
+    if agent_name == "web_search_agent":
+        search_tool = next((name for name in tools if "search" in name), None)
+        if function_response is None and search_tool:
+            return _call(search_tool, {"query": user_text[:200]})
+        return _text("## Findings\n- Canned research summary.\n\n## Sources\n- https://example.org/1")
+
+    if agent_name == "image_generation_agent":
+        if function_response is None and "generate_image" in tools:
+            return _call("generate_image", {"prompt": user_text[:200]})
+        result = function_response.response if function_response else {}
+        return _structured(llm_request, {
+            "description": user_text[:200],
+            "image_artifact_name": result.get("image_artifact_name", "image.png"),
+            "thumbnail_artifact_name": result.get("thumbnail_artifact_name"),
+            "version": result.get("version", 0),
+        })
+
+    if agent_name == "quiz_generation_agent":
+        return _structured(llm_request, FAKE_QUIZ)
+
+    if agent_name == "answer_evaluation_agent":
+        return _text("# Student Performance Report\n\nAll answers were reviewed.")
+
+    return _text(f"[{agent_name}] {user_text[:200]}")
+
+
+class LocalCacheBackend:
+    """In-process stand-in for the provider's context cache, for `FakeLlm(cache_backend=...)`.
+
+    Calls that name an unknown or expired cache fail with a LookupError, as
+    the provider rejects them.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.time):
+        self.clock = clock
+        self.caches: dict[str, dict] = {}
+        self.counters = Counter()
+
+    async def create(self, model: str, config: types.GenerateContentConfig, ttl: float, display_name: str) -> tuple[str, int]:
+        self.counters["created"] += 1
+        name = f"cachedContents/{display_name}-{self.counters['created']}"
+        tokens = estimate_prefix_tokens(config.model_dump(mode="json", include={"system_instruction", "tools", "tool_config"}, exclude_none=True))
+        self.caches[name] = {"model": model, "tokens": tokens, "expires_at": self.clock() + ttl}
+        return name, tokens
+
+    async def refresh(self, name: str, ttl: float) -> None:
+        self.counters["refreshed"] += 1
+        self.caches[name]["expires_at"] = self.clock() + ttl
+
+    async def delete(self, name: str) -> None:
+        self.counters["deleted"] += 1
+        self.caches.pop(name, None)
+
+    def lookup(self, name: str) -> int:
+        """Returns the token count of a live cache."""
+        cache = self.caches.get(name)
+        if cache is None or cache["expires_at"] <= self.clock():
+            raise LookupError(f"Cached content {name} not found or expired.")
+        return cache["tokens"]
+
+    def is_cache_error(self, error: BaseException) -> bool:
+        return isinstance(error, LookupError)
+
+
+class FakeLlm(BaseLlm):
+    """Offline stand-in for a Gemini model bound to one agent.
+
+    Responses come from `recording` when it has a match for the request,
+    otherwise from `scripted_response`. Each call sleeps for `latency`
+    seconds (or `latency()` when callable) to simulate the network. Streamed
+    (or relayed) scripted text comes in `stream_chunks` partial responses
+    spread over that time, followed by the aggregated response. With
+    `routed_model` (the agent's real model), calls go through the model
+    router, and `tier_latency` scales the latency of each tier it picks.
+    With a `cache_backend`, the static prompt prefix goes through the prompt
+    cache. Usage counts that prefix in the prompt tokens, and
+    `prefill_latency` adds seconds per 1,000 prompt tokens not served from a cache.
+    """
+
+    model: str = "fake-gemini"
+    agent_name: str
+    latency: float | Callable[[], float] = 0.0
+    stream_chunks: int = 8
+    first_token_ratio: float = 0.2
+    routed_model: str | None = None
+    tier_latency: dict[str, float] = Field(default_factory=dict)
+    cache_backend: LocalCacheBackend | None = None
+    prefill_latency: float = 0.0
+    recording: Recording | None = None
+    counters: Counter = Field(default_factory=Counter)
+
+    model_config = {"arbitrary_types_allowed": True}
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        router = get_router()
+        if self.routed_model and router.handles(self.routed_model):
+            generator = generate_routed(router, llm_request, self.routed_model, stream, self._generate)
+        else:
+            generator = self._generate(llm_request, stream, None)
+        async for response in generator:
+            yield response
+
+    def _generate(self, llm_request: LlmRequest, stream: bool, model: str | None) -> AsyncGenerator[LlmResponse, None]:
+        respond = partial(self._respond, stream=stream, model=model)
+        if self.cache_backend is None:
+            return respond(llm_request)
+        return generate_cached(llm_request, model or self.model, self.cache_backend, respond)
+
+    async def _respond(self, llm_request: LlmRequest, stream: bool, model: str | None) -> AsyncGenerator[LlmResponse, None]:
+        cached_name = llm_request.config.cached_content if llm_request.config else None
+        cached_tokens = self.cache_backend.lookup(cached_name) if cached_name and self.cache_backend else 0
+        prefix_tokens = cached_tokens or estimate_prefix_tokens(static_prefix(llm_request))
+        prompt_tokens = sum(len(part.text or "") for c in llm_request.contents for part in c.parts or []) // 4 + prefix_tokens
+
+        self.counters["calls"] += 1
+        self.counters["cached_calls"] += bool(cached_tokens)
+        delay = (self.latency() if callable(self.latency) else self.latency) * self.tier_latency.get(model, 1.0)
+        delay += self.prefill_latency * (prompt_tokens - cached_tokens) / 1000
+        recorded = self.recording.pop(self.agent_name, request_key(llm_request)) if self.recording else None
+        content = scripted_response(self.agent_name, llm_request) if recorded is None else None
+        relay = None if stream else partial_relay()
+
+        # Streamed text arrives in chunks: the first after `first_token_ratio` of the latency
+        text = content.parts[0].text if content and len(content.parts) == 1 else None
+        if text and (stream or relay) and self.stream_chunks > 1:
+            size = -(-len(text) // self.stream_chunks)
+            chunks = [text[i:i + size] for i in range(0, len(text), size)]
+            await asyncio.sleep(delay * self.first_token_ratio)
+            for index, chunk in enumerate(chunks):
+                if index:
+                    await asyncio.sleep(delay * (1 - self.first_token_ratio) / (len(chunks) - 1))
+                partial = LlmResponse(content=types.Content(role="model", parts=[types.Part(text=chunk)]), partial=True)
+                if relay is not None:
+                    relay(partial)
+                else:
+                    yield partial
+            self.counters["streamed"] += 1
+        elif delay:
+            await asyncio.sleep(delay)
+
+        if recorded is not None:
+            self.counters["replayed"] += 1
+            for response in recorded:
+                yield response
+            return
+
+        self.counters["scripted"] += 1
+        output_tokens = sum(len(part.text or "") for part in content.parts) // 4
+        yield LlmResponse(
+            content=content,
+            turn_complete=True,
+            usage_metadata=types.GenerateContentResponseUsageMetadata(
+                prompt_token_count=prompt_tokens,
+                cached_content_token_count=cached_tokens or None,
+                candidates_token_count=output_tokens,
+                total_token_count=prompt_tokens + output_tokens,
+            ),
+        )
+
+
+class RecordingLlm(BaseLlm):
+    """Wraps a real model and appends every response it returns to a Recording."""
+
+    model: str = "recording"
+    agent_name: str
+    inner: BaseLlm
+    recording: Recording
+
+    model_config = {"arbitrary_types_allowed": True}
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        key = request_key(llm_request)
+        responses = []
+        async for response in self.inner.generate_content_async(llm_request, stream=stream):
+            responses.append(response)
+            yield response
+        self.recording.append(self.agent_name, key, responses)
+
+
+def iter_agents(root_agent: BaseAgent):
+    """Yields every agent in the tree once, including agents wrapped in AgentTool."""
+    seen, stack = set(), [root_agent]
+    while stack:
+        agent = stack.pop()
+        if id(agent) in seen:
+            continue
+        seen.add(id(agent))
+        yield agent
+        stack.extend(agent.sub_agents)
+        stack.extend(tool.agent for tool in getattr(agent, "tools", []) if isinstance(tool, AgentTool))
+
+
+def replace_models(root_agent: BaseAgent, factory: Callable[[BaseAgent], BaseLlm]) -> dict[str, BaseLlm]:
+    """Swaps the model of every LLM agent in the tree for `factory(agent)`.
+
+    Returns:
+        dict[str, BaseLlm]: The new model per agent name.
+    """
+    models = {}
+    for agent in iter_agents(root_agent):
+        if hasattr(agent, "model"):
+            agent.model = models[agent.name] = factory(agent)
+    return models
+
+
+def fake_png(size: int = 64) -> bytes:
+    """Returns a small valid PNG (solid colour), or a PNG header stub without Pillow."""
+    try:
+        from PIL import Image
+    except ImportError:
+        return b"\x89PNG\r\n\x1a\n" + b"\x00" * 64
+    buffer = BytesIO()
+    Image.new("RGB", (size, size), (40, 90, 160)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def install_offline_backends(
+    data_dir: str | Path,
+    search_server: str | Path,
+    image_latency: float = 0.0,
+    search_latency: float = 0.0,
+) -> None:
+    """Points image rendering, web search and every local store at offline stand-ins.
+
+    Imagen is replaced by a coroutine returning a small PNG after
+    `image_latency` seconds, the Tavily pool launches the fake MCP server
+    script at `search_server`, and the image cache, search cache, plan
+    store, quiz bank and course packs are redirected under `data_dir` so runs start cold and leave
+    the real `.data` directory untouched.
+    """
+    from mcp import StdioServerParameters
+
+    from learning_mate.course_packs import CoursePackLibrary
+    from learning_mate.image_cache import ImageCache
+    from learning_mate.quiz_bank import QuizBank
+    from learning_mate.search_cache import SearchCache
+
+    data_dir = Path(data_dir)
+    image_module = importlib.import_module("learning_mate.sub_agents.image_generation_agent")
+    search_module = importlib.import_module("learning_mate.sub_agents.web_search_agent")
+    planning_module = importlib.import_module("learning_mate.sub_agents.course_planning_agent")
+
+    png = fake_png()
+
+    async def render_with_fake_imagen(prompt: str) -> bytes:
+        await asyncio.sleep(image_latency)
+        return png
+
+    image_module._render_with_imagen = render_with_fake_imagen
+    image_module._image_cache = ImageCache(data_dir / "image_cache")
+
+    search_module.tavily_pool.server_params = StdioServerParameters(
+        command=sys.executable,
+        args=[str(search_server)],
+        env={"FAKE_TAVILY_LATENCY": str(search_latency)},
+    )
+    search_module.search_cache.path = data_dir / "search_cache.sqlite"
+    search_module.search_cache._ready = False
+
+    planning_module.PLAN_STORE_PATH = str(data_dir / "plans.sqlite")
+    planning_module._plan_store = None
+
+    importlib.import_module("learning_mate.quiz_bank")._quiz_bank = QuizBank(data_dir / "quiz_bank.sqlite")
+    importlib.import_module("learning_mate.course_packs")._course_packs = CoursePackLibrary(data_dir / "course_packs")
+
@@ -2,6 +2,7 @@ import sys
 import asyncio
 from pathlib import Path
 
+from google.adk.agents.run_config import RunConfig, StreamingMode
 from google.adk.runners import Runner
 from google.adk.sessions import InMemorySessionService
 from google.genai import types as genai_types
@@ -33,8 +34,11 @@ async def main():
         "What's the next step in my learning path?",
     ]
 
+    # Replies, and the output of the sub-agents they call, are printed as they are generated
+    run_config = RunConfig(streaming_mode=StreamingMode.SSE)
     for query in queries:
         print(f">>> {query}")
+        streamed = None
         async for event in runner.run_async(
             user_id="test_user",
             session_id="test_session",
@@ -42,9 +46,19 @@ async def main():
                 role="user",
                 parts=[genai_types.Part.from_text(text=query)]
             ),
+            run_config=run_config,
         ):
-            if event.is_final_response() and event.content and event.content.parts:
-                print(event.content.parts[0].text)
+            if not event.content or not event.content.parts or not event.content.parts[0].text:
+                continue
+            if event.partial:
+                if streamed != event.author:
+                    print(f"\n[{event.author}] ", end="")
+                    streamed = event.author
+                print(event.content.parts[0].text, end="", flush=True)
+            elif event.is_final_response():
+                # The complete reply repeats the chunks already printed
+                print("" if streamed == event.author else event.content.parts[0].text)
+                streamed = None
 
 
 if __name__ == "__main__":
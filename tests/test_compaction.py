@@ -0,0 +1,96 @@
+import sys
+import asyncio
+from pathlib import Path
+
+from google.adk.agents import Agent
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.apps import App
+from google.adk.artifacts import InMemoryArtifactService
+from google.adk.models.llm_request import LlmRequest
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types as genai_types
+
+# Set up sys.path to ensure 'learning_mate' package is found when running from 'tests/'
+current_dir = Path(__file__).resolve().parent
+project_root = current_dir.parent
+sys.path.append(str(project_root / "src"))
+
+from learning_mate.compaction import HistoryCompactionPlugin, build_summary
+from fakes import FakeLlm
+
+
+PLAN = "# Course Plan\n- Unit 1: Qubits\n- Unit 2: Superposition\n- Unit 3: Entanglement\n- Unit 4: Quantum Gates\n"
+TOPICS = ["Qubits", "Superposition", "Entanglement", "Quantum Gates"]
+
+
+async def _run_course(compaction: HistoryCompactionPlugin) -> dict:
+    tutor = Agent(name="tutor", model=FakeLlm(agent_name="tutor"), instruction="Teach.")
+    session_service = InMemorySessionService()
+    await session_service.create_session(
+        app_name="course", user_id="u", session_id="s1", state={"course_plan": PLAN},
+    )
+    runner = Runner(
+        app=App(name="course", root_agent=tutor, plugins=[compaction]),
+        session_service=session_service,
+        artifact_service=InMemoryArtifactService(),
+    )
+    for turn in range(12):
+        topic = TOPICS[turn // 3]
+        message = f"Teach me more about {topic}, part {turn % 3 + 1}. " + "Please go slowly. " * 8
+        async for _ in runner.run_async(
+            user_id="u",
+            session_id="s1",
+            new_message=genai_types.Content(role="user", parts=[genai_types.Part.from_text(text=message)]),
+        ):
+            pass
+    session = await session_service.get_session(app_name="course", user_id="u", session_id="s1")
+    return session.state
+
+
+def test_prompt_size_stays_bounded_and_progress_is_summarized():
+    compaction = HistoryCompactionPlugin(token_budget=400, keep_turns=2)
+    state = asyncio.run(_run_course(compaction))
+
+    stats = compaction.stats()
+    assert stats["summarized"] > 0
+    assert stats["tokens_before"]["max"] > 2 * stats["tokens_after"]["max"]
+    assert stats["tokens_after"]["max"] <= 400
+    # The last turns are about Quantum Gates; everything before them is summarized by unit
+    progress = state["course_progress"]
+    assert progress["covered"] == TOPICS
+    summary = build_summary(state, progress)
+    assert "Units covered so far: Qubits, Superposition, Entanglement, Quantum Gates." in summary
+
+
+def test_bulky_parts_are_archived_once_however_many_there_are():
+    compaction = HistoryCompactionPlugin(token_budget=400, keep_turns=2, bulky_chars=500)
+    artifacts = InMemoryArtifactService()
+    lessons = [f"## Lesson {number}\n" + f"Notes for lesson {number}. " * 60 for number in range(25)]
+    contents = []
+    for number, lesson in enumerate(lessons + ["", ""]):
+        contents.append(genai_types.Content(role="user", parts=[genai_types.Part(text=f"Lesson {number}, please.")]))
+        if lesson:
+            contents.append(genai_types.Content(role="model", parts=[genai_types.Part(text=lesson)]))
+
+    async def main():
+        session = await InMemorySessionService().create_session(app_name="course", user_id="u", session_id="s1")
+        context = InvocationContext(
+            invocation_id="inv", agent=Agent(name="tutor"), session=session,
+            session_service=InMemorySessionService(), artifact_service=artifacts,
+        )
+        for _ in range(3):  # Every model call of a turn sends the same history
+            await compaction.before_model_callback(
+                callback_context=CallbackContext(context), llm_request=LlmRequest(contents=list(contents)),
+            )
+        names = await artifacts.list_artifact_keys(app_name="course", user_id="u", session_id="s1")
+        versions = [
+            await artifacts.list_versions(app_name="course", user_id="u", session_id="s1", filename=name) for name in names
+        ]
+        return context.session.state, names, versions
+
+    state, names, versions = asyncio.run(main())
+    assert len(names) == 25 and all(len(saved) == 1 for saved in versions)
+    assert compaction.stats()["archived"] == 25
+    assert len(state["course_progress"]["archived"]) == 20  # Only the latest are listed in the summary
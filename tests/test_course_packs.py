@@ -0,0 +1,79 @@
+import sys
+import json
+import asyncio
+from pathlib import Path
+
+# Set up sys.path to ensure 'learning_mate' package is found when running from 'tests/'
+current_dir = Path(__file__).resolve().parent
+project_root = current_dir.parent
+sys.path.append(str(project_root / "src"))
+
+from learning_mate.course_packs import CoursePackLibrary
+from fakes import FakeLlm, install_offline_backends
+from learning_mate.pregenerate import Pregenerator, generate_plan, load_goals
+from learning_mate.sub_agents import course_planning_agent, image_generation_agent, quiz_generation_agent, web_search_agent
+from learning_mate.sub_agents.course_planning_agent import get_plan_store
+from learning_mate.sub_agents.web_search_agent import tavily_pool
+
+
+def _use_fake_models() -> dict:
+    models = {}
+    for agent in (course_planning_agent, image_generation_agent, quiz_generation_agent, web_search_agent):
+        agent.model = models[agent.name] = FakeLlm(agent_name=agent.name)
+    return models
+
+
+async def _pregenerate(out_dir: Path, goals: list[dict]) -> dict:
+    try:
+        return await Pregenerator(out_dir, workers=3, max_units=2).run(goals)
+    finally:
+        await tavily_pool.close()
+
+
+def test_packs_are_written_resumed_and_served(tmp_path):
+    install_offline_backends(tmp_path / "data", current_dir / "fake_tavily_server.py")
+    models = _use_fake_models()
+    goals_file = tmp_path / "goals.txt"
+    goals_file.write_text("# Courses to prepare\nLearn quantum computing\nLearn Rust ownership\n", encoding="utf-8")
+    goals = load_goals(goals_file)
+    out_dir = tmp_path / "packs"
+
+    summary = asyncio.run(_pregenerate(out_dir, goals))
+    assert summary["failures"] == []
+    assert summary["plans_generated"] == 2
+    assert summary["quiz_generated"] + summary["web_research_generated"] + summary["illustration_generated"] == 12
+
+    pack_dir = next(out_dir.glob("learn-quantum-computing-*"))
+    manifest = json.loads((pack_dir / "pack.json").read_text(encoding="utf-8"))
+    assert [unit["title"] for unit in manifest["units"]] == ["Qubits", "Superposition"]
+    unit_dir = pack_dir / manifest["units"][0]["dir"]
+    assert (pack_dir / "plan.md").read_text(encoding="utf-8") == manifest["plan"]
+    assert "Findings" in (unit_dir / "lesson.md").read_text(encoding="utf-8")
+    assert json.loads((unit_dir / "quiz.json").read_text(encoding="utf-8"))["questions"]
+    assert list((unit_dir / "images").iterdir())
+
+    # A second run finds every material checkpointed and calls no model
+    calls = sum(model.counters["calls"] for model in models.values())
+    summary = asyncio.run(_pregenerate(out_dir, goals))
+    assert summary["plans_skipped"] == 2 and summary["units_skipped"] == 4
+    assert sum(model.counters["calls"] for model in models.values()) == calls
+
+    library = CoursePackLibrary(out_dir)
+    materials = library.unit_materials(manifest["plan"], "Lesson 2: superposition explained")
+    assert set(materials) == {"web_research", "illustration", "quiz"}
+    assert Path(materials["illustration"]["files"][0]["path"]).is_file()
+    assert library.has_unit(manifest["plan"], "Qubits")
+    assert library.unit_materials(manifest["plan"], "Entanglement") is None  # Beyond --units
+    assert library.unit_materials("Unit 1: Photosynthesis", "Photosynthesis") is None
+    assert library.stats()["quiz_items_seeded"] == 0  # The quiz agent already banked them
+
+
+def test_pregenerated_plans_never_come_from_the_plan_store(tmp_path):
+    install_offline_backends(tmp_path / "data", current_dir / "fake_tavily_server.py")
+    models = _use_fake_models()
+    get_plan_store().store("Learn quantum computing", None, "Unit 1: A plan stored for another learner")
+
+    plan = asyncio.run(generate_plan("Learn quantum computing", None))
+    assert "stored for another learner" not in plan
+    assert models["course_planning_agent"].counters["calls"] == 1
+    assert get_plan_store().lookup("Learn quantum computing", None).plan == "Unit 1: A plan stored for another learner"
@@ -0,0 +1,39 @@
+import sys
+import asyncio
+from pathlib import Path
+
+import google.genai.types as types
+from google.adk.models.llm_request import LlmRequest
+
+# Set up sys.path to ensure 'learning_mate' package is found when running from 'tests/'
+current_dir = Path(__file__).resolve().parent
+project_root = current_dir.parent
+sys.path.append(str(project_root / "src"))
+
+from fakes import FakeLlm, Recording, RecordingLlm
+
+
+def _request(text: str) -> LlmRequest:
+    return LlmRequest(contents=[types.Content(role="user", parts=[types.Part(text=text)])])
+
+
+async def _collect(model, request):
+    return [response async for response in model.generate_content_async(request)]
+
+
+def test_recorded_responses_are_replayed(tmp_path):
+    path = tmp_path / "recording.jsonl"
+    recorder = RecordingLlm(
+        agent_name="course_planning_agent",
+        inner=FakeLlm(agent_name="course_planning_agent"),
+        recording=Recording(path),
+    )
+    recorded = asyncio.run(_collect(recorder, _request("Learn Rust")))
+
+    replayer = FakeLlm(agent_name="course_planning_agent", recording=Recording(path))
+    replayed = asyncio.run(_collect(replayer, _request("Learn Rust")))
+    assert replayed[0].content.parts[0].text == recorded[0].content.parts[0].text
+    assert replayer.counters["replayed"] == 1
+
+    asyncio.run(_collect(replayer, _request("Learn Go")))
+    assert replayer.counters["scripted"] == 1
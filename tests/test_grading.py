@@ -0,0 +1,69 @@
+import sys
+from pathlib import Path
+
+# Set up sys.path to ensure 'learning_mate' package is found when running from 'tests/'
+current_dir = Path(__file__).resolve().parent
+project_root = current_dir.parent
+sys.path.append(str(project_root / "src"))
+
+from learning_mate.grading import grade_quiz, parse_answers, render_report
+
+
+QUIZ = {
+    "title": "Qubits",
+    "questions": [
+        {"id": "q1", "type": "multiple_choice", "prompt": "A qubit can be...",
+         "options": ["A) only 0", "B) only 1", "C) a superposition of 0 and 1"], "answer": ["C"]},
+        {"id": "q2", "type": "true_false", "prompt": "Measurement collapses superposition.", "answer": ["true"]},
+        {"id": "q3", "type": "fill_in_blank", "prompt": "The ___ sphere visualizes a qubit.", "answer": ["Bloch"]},
+        {"id": "q4", "type": "ordering", "prompt": "Order the steps.",
+         "options": ["A) prepare", "B) apply gates", "C) measure"], "answer": ["A", "B", "C"], "points": 2},
+    ],
+}
+
+
+def test_objective_quiz_is_graded_without_llm():
+    grade = grade_quiz(QUIZ, "q1: c\nq2: True\nq3: bloch\nq4: A, B, C")
+    assert grade.complete
+    assert grade.points_earned == grade.points_possible == 5
+    assert grade.percentage == 100
+
+
+def test_option_text_and_wrong_answers():
+    grade = grade_quiz(QUIZ, '{"q1": "a superposition of 0 and 1", "q2": "no", "q3": "Bloch", "q4": "C B A"}')
+    assert [item.status for item in grade.items] == ["CORRECT", "INCORRECT", "CORRECT", "INCORRECT"]
+    assert grade.percentage == 40
+
+
+def test_multiple_choice_key_is_resolved_against_the_options():
+    options = QUIZ["questions"][0]["options"]
+    quiz = {"questions": [
+        {"id": "q1", "type": "multiple_choice", "options": options, "answer": ["a superposition of 0 and 1"]},
+        {"id": "q2", "type": "multiple_choice", "options": options, "answer": ["C) a superposition of 0 and 1"]},
+        {"id": "q3", "type": "multiple_choice", "options": options, "answer": ["both 0 and 1 at once"]},
+    ]}
+    grade = grade_quiz(quiz, "q1: C\nq2: a superposition of 0 and 1\nq3: C")
+    assert [item.status for item in grade.items] == ["CORRECT", "CORRECT", None]
+    assert [item.question_id for item in grade.pending] == ["q3"]
+
+
+def test_unmatched_fill_in_and_open_ended_need_judgment():
+    quiz = {"questions": QUIZ["questions"] + [
+        {"id": "q5", "type": "open_ended", "prompt": "Explain entanglement.", "answer": ["correlated states"]},
+    ]}
+    grade = grade_quiz(quiz, "1) C\n2) true\n3) Bloch's\n4) A B C\n5) Two qubits share a state")
+    assert [item.question_id for item in grade.pending] == ["q3", "q5"]
+    assert not grade.complete
+
+
+def test_positional_answers_and_missing_answers():
+    assert parse_answers("C\ntrue\nBloch\nA B C", ["q1", "q2", "q3", "q4"])["q4"] == "A B C"
+    assert parse_answers("1 C\nQ2 - true", ["q1", "q2"]) == {"q1": "C", "q2": "true"}
+    grade = grade_quiz(QUIZ, "q1: C")
+    assert grade.complete and grade.percentage == 20
+
+
+def test_report_contains_both_tables():
+    report = render_report(grade_quiz(QUIZ, "q1: C\nq2: true\nq3: Bloch\nq4: A B C"), overall_percentage=90)
+    assert "## Detailed Quiz Assessment" in report and "## Performance Summary" in report
+    assert "| 4 | 5 | 5 | 100% | 90% |" in report
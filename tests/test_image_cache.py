@@ -0,0 +1,95 @@
+import sys
+import asyncio
+from pathlib import Path
+
+# Set up sys.path to ensure 'learning_mate' package is found when running from 'tests/'
+current_dir = Path(__file__).resolve().parent
+project_root = current_dir.parent
+sys.path.append(str(project_root / "src"))
+
+from learning_mate.image_cache import ImageCache, make_cache_key
+
+
+def test_key_normalizes_prompt():
+    assert make_cache_key("Bloch  sphere\nshowing Superposition", {"model": "m"}) == \
+        make_cache_key("bloch sphere showing superposition", {"model": "m"})
+    assert make_cache_key("bloch sphere", {"model": "a"}) != make_cache_key("bloch sphere", {"model": "b"})
+
+
+def test_concurrent_identical_prompts_render_once(tmp_path):
+    cache = ImageCache(tmp_path)
+    renders = 0
+
+    async def render():
+        nonlocal renders
+        renders += 1
+        await asyncio.sleep(0.05)
+        return b"image"
+
+    async def main():
+        results = await asyncio.gather(*(cache.get_or_render("k", render) for _ in range(5)))
+        assert results == [b"image"] * 5
+        assert await cache.get_or_render("k", render) == b"image"
+
+    asyncio.run(main())
+    assert renders == 1
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["coalesced"] == 4
+    assert cache.stats()["hits"] == 1
+
+
+def test_cancelled_requester_does_not_cancel_the_shared_render(tmp_path):
+    cache = ImageCache(tmp_path)
+    renders = 0
+
+    async def render():
+        nonlocal renders
+        renders += 1
+        await asyncio.sleep(0.05)
+        return b"image"
+
+    async def main():
+        first = asyncio.create_task(cache.get_or_render("k", render))
+        await asyncio.sleep(0.01)
+        second = asyncio.create_task(cache.get_or_render("k", render))
+        await asyncio.sleep(0.01)
+        first.cancel()  # The learner who asked first disconnects
+        assert await second == b"image"
+        assert first.cancelled()
+
+    asyncio.run(main())
+    assert renders == 1
+    assert cache.get("k") == b"image"
+
+
+def test_identical_bytes_share_one_blob(tmp_path):
+    cache = ImageCache(tmp_path)
+    cache.put("a", b"same")
+    cache.put("b", b"same")
+    assert len(list((tmp_path / "blobs").rglob("*"))) == 2  # one shard dir + one blob
+    assert cache.get("a") == cache.get("b") == b"same"
+
+
+def test_lru_eviction_respects_size_budget(tmp_path):
+    cache = ImageCache(tmp_path, max_bytes=10)
+    cache.put("old", b"x" * 6)
+    cache.put("new", b"y" * 6)
+    assert cache.get("old") is None
+    assert cache.get("new") == b"y" * 6
+    assert cache.stats()["evictions"] == 1
+
+
+def test_failed_render_is_not_cached(tmp_path):
+    cache = ImageCache(tmp_path)
+
+    async def fail():
+        raise RuntimeError("backend down")
+
+    async def main():
+        try:
+            await cache.get_or_render("k", fail)
+        except RuntimeError:
+            pass
+        assert cache.get("k") is None
+
+    asyncio.run(main())
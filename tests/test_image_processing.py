@@ -0,0 +1,71 @@
+import sys
+from io import BytesIO
+from pathlib import Path
+
+import pytest
+
+# Set up sys.path to ensure 'learning_mate' package is found when running from 'tests/'
+current_dir = Path(__file__).resolve().parent
+project_root = current_dir.parent
+sys.path.append(str(project_root / "src"))
+
+from learning_mate import image_processing
+from learning_mate.image_processing import process_image, sniff_mime_type
+
+Image = pytest.importorskip("PIL.Image")
+
+
+def _png(width: int, height: int) -> bytes:
+    image = Image.new("RGB", (width, height))
+    image.putdata([(x % 256, y % 256, (x * y) % 256) for y in range(height) for x in range(width)])
+    buffer = BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def test_mime_type_is_sniffed_from_the_leading_bytes():
+    assert sniff_mime_type(b"\x89PNG\r\n\x1a\n" + b"\x00" * 8) == "image/png"
+    assert sniff_mime_type(b"\xff\xd8\xff\xe0rest") == "image/jpeg"
+    assert sniff_mime_type(b"GIF89a...") == "image/gif"
+    assert sniff_mime_type(b"RIFF\x10\x00\x00\x00WEBPVP8 ") == "image/webp"
+    assert sniff_mime_type(b"RIFF\x10\x00\x00\x00WAVEfmt ") == "application/octet-stream"
+    assert sniff_mime_type(b"") == "application/octet-stream"
+
+
+def test_large_image_is_downscaled_with_a_thumbnail():
+    original = _png(1600, 800)
+    processed = process_image(original, max_side=1024, thumbnail_side=256)
+
+    assert processed.mime_type == "image/webp" and processed.extension == ".webp"
+    assert len(processed.data) < len(original)
+    with Image.open(BytesIO(processed.data)) as stored:
+        assert stored.size == (1024, 512)
+    assert processed.thumbnail_mime_type == "image/webp"
+    with Image.open(BytesIO(processed.thumbnail)) as thumbnail:
+        assert thumbnail.size == (256, 128)
+    assert processed.size_metrics()["ratio"] < 1
+
+
+@pytest.mark.parametrize("error", [OSError, ValueError, SyntaxError, Image.DecompressionBombError])
+def test_undecodable_images_are_stored_untouched(monkeypatch, error):
+    def fail(*args, **kwargs):
+        raise error("cannot decode")
+
+    monkeypatch.setattr(Image, "open", fail)
+    errors = image_processing.totals["decode_errors"]
+    original = _png(32, 32)
+    processed = process_image(original)
+
+    assert (processed.data, processed.mime_type, processed.thumbnail) == (original, "image/png", None)
+    assert image_processing.totals["decode_errors"] == errors + 1
+
+
+def test_truncated_and_oversized_payloads_fall_back_to_the_original(monkeypatch):
+    truncated = _png(64, 64)[:60]
+    assert process_image(truncated).data == truncated
+
+    # More than twice Pillow's pixel limit is refused as a decompression bomb
+    monkeypatch.setattr(Image, "MAX_IMAGE_PIXELS", 100)
+    bomb = _png(32, 32)
+    processed = process_image(bomb)
+    assert (processed.data, processed.thumbnail) == (bomb, None)
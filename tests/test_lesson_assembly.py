@@ -0,0 +1,40 @@
+import sys
+import time
+import asyncio
+from pathlib import Path
+
+# Set up sys.path to ensure 'learning_mate' package is found when running from 'tests/'
+current_dir = Path(__file__).resolve().parent
+project_root = current_dir.parent
+sys.path.append(str(project_root / "src"))
+
+from learning_mate.lesson_assembly import run_branches
+
+
+async def _sleep_then(seconds, value):
+    await asyncio.sleep(seconds)
+    return value
+
+
+async def _fail():
+    raise RuntimeError("Imagen unavailable")
+
+
+def test_branches_run_concurrently_and_fail_independently():
+    started = time.perf_counter()
+    outcomes = asyncio.run(run_branches(
+        {
+            "web_research": lambda: _sleep_then(0.2, "findings"),
+            "quiz": lambda: _sleep_then(0.3, {"questions": []}),
+            "illustration": lambda: _sleep_then(5, "too slow"),
+            "broken": _fail,
+        },
+        timeouts={"illustration": 0.4},
+    ))
+    elapsed = time.perf_counter() - started
+
+    assert elapsed < 1.0  # Bounded by the slowest branch's timeout, not the sum
+    assert outcomes["web_research"] == {**outcomes["web_research"], "status": "success", "result": "findings"}
+    assert outcomes["quiz"]["status"] == "success"
+    assert outcomes["illustration"]["status"] == "timeout"
+    assert outcomes["broken"]["status"] == "error" and "Imagen" in outcomes["broken"]["error_message"]
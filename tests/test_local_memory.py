@@ -0,0 +1,84 @@
+import sys
+import time
+import random
+import asyncio
+from pathlib import Path
+
+from google.adk.events import Event
+from google.adk.sessions import Session
+from google.genai import types as genai_types
+
+# Set up sys.path to ensure 'learning_mate' package is found when running from 'tests/'
+current_dir = Path(__file__).resolve().parent
+project_root = current_dir.parent
+sys.path.append(str(project_root / "src"))
+
+from learning_mate.local_memory import LocalMemoryService, _score, split_passages
+
+
+def _event(author, text, timestamp):
+    return Event(
+        invocation_id="inv", author=author, timestamp=timestamp,
+        content=genai_types.Content(role="user" if author == "user" else "model", parts=[genai_types.Part(text=text)]),
+    )
+
+
+def _session(session_id, events):
+    return Session(app_name="learning_mate", user_id="ada", id=session_id, events=events)
+
+
+def test_sessions_are_ingested_incrementally_and_recalled(tmp_path):
+    path = tmp_path / "memory.sqlite"
+    memory = LocalMemoryService(path)
+    now = time.time()
+    course = _session("s1", [
+        _event("user", "My name is Ada and I prefer short lessons with diagrams.", now),
+        _event("teacher_agent", "## Unit 1: Qubits\n\nA qubit is a superposition of 0 and 1.", now + 1),
+    ])
+
+    async def main():
+        await memory.add_session_to_memory(course)
+        course.events.append(_event("user", "I scored 90% on the entanglement quiz.", now + 2))
+        await memory.add_session_to_memory(course)  # Only the new event is embedded
+        await memory.add_session_to_memory(_session("s2", [_event("user", "Teach me Italian cooking basics.", now + 3)]))
+        return await LocalMemoryService(path).search_memory(app_name="learning_mate", user_id="ada", query="what lesson style does Ada prefer?")
+
+    response = asyncio.run(main())
+    assert memory.counters["ingested_passages"] == 4
+    assert "short lessons with diagrams" in response.memories[0].content.parts[0].text
+    assert response.memories[0].author == "user"
+    assert not memory.search("learning_mate", "someone_else", "short lessons")
+
+
+def test_long_texts_are_split_into_passages():
+    text = "\n\n".join(f"Paragraph {i}. " + "word " * 60 for i in range(10))
+    passages = split_passages(text, max_chars=800)
+    assert len(passages) > 1 and all(len(passage) <= 800 for passage in passages)
+    assert all(any(f"Paragraph {i}." in passage for passage in passages) for i in range(10))
+
+
+def test_partitioned_index_keeps_recall_close_to_exact_search(tmp_path):
+    rng = random.Random(0)
+    topics = ["qubits", "superposition", "entanglement", "rust ownership", "borrow checker", "sourdough starter",
+              "linear algebra", "eigenvalues", "french verbs", "guitar chords"]
+    words = "learn practice example explain review quiz score lesson unit diagram note question answer".split()
+
+    def passage():
+        topic = rng.choice(topics)
+        return f"{topic}: " + " ".join(rng.choice(words + topic.split()) for _ in range(rng.randint(12, 40)))
+
+    memory = LocalMemoryService(tmp_path / "memory.sqlite")
+    memory.ingest("app", "ada", "s1", [_event("teacher_agent", passage(), 1000 + index) for index in range(5000)])
+    assert memory._indexes[("app", "ada")].centres  # Past the threshold, so searches only probe some partitions
+
+    conn = memory._connect()
+    rows = conn.execute("SELECT id, dims, weights FROM memories").fetchall()
+    conn.close()
+    recalls = []
+    for _ in range(40):
+        query = passage()
+        vector = memory.embedder.embed([query])[0]
+        exact = sorted(((_score(vector, dims, weights), row_id) for row_id, dims, weights in rows), reverse=True)[:5]
+        found = {match["id"] for _, match in memory.search("app", "ada", query, top_k=5)}
+        recalls.append(len(found & {row_id for _, row_id in exact}) / 5)
+    assert sum(recalls) / len(recalls) >= 0.85
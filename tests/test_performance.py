@@ -0,0 +1,70 @@
+import sys
+from pathlib import Path
+
+# Set up sys.path to ensure 'learning_mate' package is found when running from 'tests/'
+current_dir = Path(__file__).resolve().parent
+project_root = current_dir.parent
+sys.path.append(str(project_root / "src"))
+
+from learning_mate.performance import PerformanceTracker
+from learning_mate.sub_agents.answer_evaluation_agent import _quiz_topic, _record_quiz_percentage
+
+
+def test_window_average_matches_legacy_behaviour():
+    scores = [50 + i for i in range(40)]
+    tracker = PerformanceTracker()
+    for score in scores:
+        tracker.record(score)
+    assert tracker.count == 25
+    assert tracker.overall_percentage == round(sum(scores[-25:]) / 25)
+    assert tracker.quizzes == 40
+
+
+def test_round_trip_through_state_and_breakdowns():
+    state = {}
+    tracker = PerformanceTracker.from_state(state)
+    tracker.record(90, topic="Superposition", difficulty="easy")
+    tracker.record(40, topic="Entanglement", difficulty="hard")
+    tracker.save(state)
+
+    restored = PerformanceTracker.from_state(state)
+    summary = restored.summary()
+    assert summary["overall_percentage"] == 65
+    assert summary["by_topic"]["superposition"]["last"] == 90
+    assert summary["by_difficulty"]["hard"]["quizzes"] == 1
+
+
+def test_legacy_recent_percentages_are_migrated():
+    state = {"recent_percentages": [80, 60, 100]}
+    tracker = PerformanceTracker.from_state(state)
+    assert tracker.overall_percentage == 80
+    tracker.record(100)
+    tracker.save(state)
+    assert state["recent_percentages"] is None
+    assert PerformanceTracker.from_state(state).overall_percentage == 85
+
+
+def test_breakdowns_keep_the_most_recently_updated_keys():
+    tracker = PerformanceTracker(max_keys=3)
+    for topic in ["Qubits", "Superposition", "Entanglement", "Qubits", "Quantum Gates"]:
+        tracker.record(80, topic=topic)
+    assert list(tracker.summary()["by_topic"]) == ["entanglement", "qubits", "quantum gates"]
+    assert tracker.summary()["by_topic"]["qubits"]["quizzes"] == 2
+
+
+def test_quizzes_are_filed_under_their_plan_unit():
+    state = {"course_plan": "# Course Plan\n- Unit 1: Qubits (45 min)\n- Unit 2: Superposition (45 min)"}
+    quiz = lambda title, *concepts: {"title": title, "questions": [{"id": "q1", "concept": concept} for concept in concepts]}
+
+    assert _quiz_topic(state, quiz("Checkpoint: what is a qubit?")) == "Qubits"
+    assert _quiz_topic(state, quiz("Quick check #7", "superposition", "superposition")) == "Superposition"
+    assert _quiz_topic(state, quiz("Bonus round", "Bloch sphere", "bloch  sphere", "phase")) == "bloch sphere"
+    assert _quiz_topic(state, quiz("Bonus round")) is None
+
+    for title in ["Qubits warm-up", "Qubit basics quiz", "More about qubits"]:
+        _record_quiz_percentage(state, 70, _quiz_topic(state, quiz(title)))
+    _record_quiz_percentage(state, 90, "unit 2: superposition")  # A topic named by the model
+    assert PerformanceTracker.from_state(state).summary()["by_topic"] == {
+        "qubits": {"quizzes": 3, "trend": 70.0, "last": 70.0},
+        "superposition": {"quizzes": 1, "trend": 90.0, "last": 90.0},
+    }
@@ -0,0 +1,58 @@
+import sys
+from pathlib import Path
+
+# Set up sys.path to ensure 'learning_mate' package is found when running from 'tests/'
+current_dir = Path(__file__).resolve().parent
+project_root = current_dir.parent
+sys.path.append(str(project_root / "src"))
+
+from learning_mate.plan_store import PlanStore
+
+
+def test_exact_and_close_goals_skip_the_planner(tmp_path):
+    store = PlanStore(tmp_path / "plans.sqlite", version="v1")
+    store.store("Learn Python basics", None, "PLAN")
+
+    assert store.lookup("learn  python basics!").kind == "exact"
+    assert store.lookup("I want to learn the basics of Python").plan == "PLAN"
+    match = store.lookup("Learn the basics of Python", "I already know C")
+    assert match.kind == "personalized"
+    assert "Learn the basics of Python" in match.plan and "PLAN" in match.plan
+    assert store.lookup("Cook Italian food") is None
+    assert store.stats()["planner_skipped"] == 3
+
+
+def test_near_miss_goals_never_share_a_plan(tmp_path):
+    store = PlanStore(tmp_path / "plans.sqlite", version="v1")
+    for goal in ("C++ fundamentals", "Inorganic chemistry", "Python for data science", "Learn Rust"):
+        store.store(goal, None, goal.upper())
+
+    assert store.lookup("C# fundamentals") is None
+    assert store.lookup("Organic chemistry") is None
+    assert store.lookup("Python for web development") is None
+    assert store.lookup("Learn Rust ownership") is None
+    assert store.lookup("Learn C++ fundamentals").plan == "C++ FUNDAMENTALS"
+    assert store.stats()["misses"] == 4
+
+
+def test_learner_context_is_carried_into_reused_plan(tmp_path):
+    store = PlanStore(tmp_path / "plans.sqlite", version="v1")
+    store.store("Learn Python basics", None, "PLAN")
+    match = store.lookup("Learn Python basics", "I already know C")
+    assert match.kind == "personalized"
+    assert "I already know C" in match.plan
+
+
+def test_new_version_ignores_old_plans(tmp_path):
+    PlanStore(tmp_path / "plans.sqlite", version="v1").store("Learn Python basics", None, "OLD")
+    store = PlanStore(tmp_path / "plans.sqlite", version="v2")
+    assert store.lookup("Learn Python basics") is None
+
+
+def test_bounded_size_and_invalidation(tmp_path):
+    store = PlanStore(tmp_path / "plans.sqlite", version="v1", max_entries=2)
+    for goal in ("Learn Rust", "Learn Go", "Learn Haskell"):
+        store.store(goal, None, goal.upper())
+    assert store.lookup("Learn Rust") is None
+    assert store.invalidate("Learn Go") == 1
+    assert store.lookup("Learn Go") is None
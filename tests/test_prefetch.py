@@ -0,0 +1,162 @@
+import sys
+import asyncio
+from pathlib import Path
+
+from google.adk.agents import Agent
+from google.adk.artifacts import InMemoryArtifactService
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.adk.tools import AgentTool
+from google.genai import types as genai_types
+
+# Set up sys.path to ensure 'learning_mate' package is found when running from 'tests/'
+current_dir = Path(__file__).resolve().parent
+project_root = current_dir.parent
+sys.path.append(str(project_root / "src"))
+
+from fakes import FakeLlm, install_offline_backends
+from learning_mate import prefetch
+from learning_mate.lesson_assembly import assemble_lesson
+from learning_mate.prefetch import Prefetcher, next_unit, parse_plan_units, unit_excerpt
+from learning_mate.sub_agents import course_planning_agent, image_generation_agent, quiz_generation_agent, web_search_agent
+from learning_mate.sub_agents.web_search_agent import tavily_pool
+
+
+PLAN = """# Course Plan: Quantum Computing
+- Unit 1: Qubits (45 min)
+  - Quiz: 5 questions
+- Unit 2: Superposition (45 min)
+  - Read: interference basics
+- Unit 3: Entanglement and Bell States (60 min)
+"""
+
+
+def test_plan_units_are_parsed_in_order_and_followed():
+    units = parse_plan_units(PLAN)
+    assert units == ["Qubits", "Superposition", "Entanglement and Bell States"]
+    assert parse_plan_units('{"units": [{"title": "Qubits"}, {"title": "Gates"}]}') == ["Qubits", "Gates"]
+
+    assert next_unit(units, "Lesson 1: what is a qubit?") == "Superposition"
+    assert next_unit(units, "Provide the content for the lesson on 'Superposition'") == "Entanglement and Bell States"
+    assert next_unit(units, "Entanglement") is None  # Last unit
+    assert next_unit(units, "Cooking pasta") is None
+    assert unit_excerpt(PLAN, "Superposition").splitlines() == [
+        "- Unit 2: Superposition (45 min)", "  - Read: interference basics",
+    ]
+
+
+def test_prefetch_is_served_once_and_dropped_when_irrelevant_or_stale():
+    prefetcher = Prefetcher()
+    started = []
+
+    async def prepare(unit):
+        started.append(unit)
+        await asyncio.sleep(0.05)
+        return {"quiz": {"status": "success", "result": unit}}
+
+    async def main():
+        prefetcher.schedule("learner/1", "Superposition", "plan-a", lambda: prepare("Superposition"))
+        prefetcher.schedule("learner/1", "Superposition", "plan-a", lambda: prepare("Superposition"))
+        hit = await prefetcher.take("learner/1", "Lesson on superposition", "plan-a")  # Joins the running task
+        again = await prefetcher.take("learner/1", "Lesson on superposition", "plan-a")
+
+        prefetcher.schedule("learner/1", "Entanglement", "plan-a", lambda: prepare("Entanglement"))
+        irrelevant = await prefetcher.take("learner/1", "Quantum gates", "plan-a")
+
+        prefetcher.schedule("learner/1", "Entanglement", "plan-a", lambda: prepare("Entanglement"))
+        stale = await prefetcher.take("learner/1", "Entanglement", "plan-b")
+        return hit, again, irrelevant, stale
+
+    hit, again, irrelevant, stale = asyncio.run(main())
+    assert hit[0] == {"quiz": {"status": "success", "result": "Superposition"}}
+    assert again is None and irrelevant is None and stale is None
+    assert started.count("Superposition") == 1
+
+    stats = prefetcher.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 3 and stats["joined"] == 1
+    assert stats["irrelevant"] == 1 and stats["stale"] == 1 and stats["pending"] == 0
+    assert stats["hit_rate"] == 0.25
+
+
+def test_cancelled_caller_leaves_the_prefetch_running():
+    prefetcher = Prefetcher()
+
+    async def main():
+        prefetcher.schedule("learner/1", "Superposition", "plan-a", lambda: asyncio.sleep(0.05, result={"quiz": {}}))
+        waiter = asyncio.create_task(prefetcher.take("learner/1", "Superposition", "plan-a"))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            cancelled = True
+        else:
+            cancelled = False
+        return cancelled, await prefetcher.take("learner/1", "Superposition", "plan-a")
+
+    cancelled, retry = asyncio.run(main())
+    assert cancelled
+    assert retry[0] == {"quiz": {}}
+    assert prefetcher.stats()["hits"] == 1 and "failed" not in prefetcher.stats()
+
+
+def test_old_and_excess_prefetches_are_evicted():
+    prefetcher = Prefetcher(ttl=60, max_sessions=2)
+
+    async def main():
+        prepare = lambda: asyncio.sleep(0, result={})
+        for learner in ["learner/1", "learner/2", "learner/3"]:
+            prefetcher.schedule(learner, "Superposition", "plan-a", prepare)
+        kept = list(prefetcher._entries)
+        prefetcher._entries["learner/2"].created_at -= 120
+        prefetcher.schedule("learner/4", "Superposition", "plan-a", prepare)
+        return kept
+
+    assert asyncio.run(main()) == ["learner/2", "learner/3"]
+    assert list(prefetcher._entries) == ["learner/3", "learner/4"]
+    assert prefetcher.stats()["evicted"] == 1 and prefetcher.stats()["expired"] == 1
+
+
+def test_speculative_illustrations_reach_the_session_only_when_served(tmp_path):
+    install_offline_backends(tmp_path, current_dir / "fake_tavily_server.py")
+    for agent in (course_planning_agent, image_generation_agent, quiz_generation_agent, web_search_agent):
+        agent.model = FakeLlm(agent_name=agent.name)
+    prefetch._prefetcher = Prefetcher()
+    teacher = Agent(
+        name="teacher_agent",
+        model=FakeLlm(agent_name="teacher_agent"),
+        instruction="Teach.",
+        tools=[AgentTool(course_planning_agent), assemble_lesson],
+    )
+
+    async def main():
+        artifacts = InMemoryArtifactService()
+        sessions = InMemorySessionService()
+        session = await sessions.create_session(app_name="app", user_id="ada")
+        runner = Runner(app_name="app", agent=teacher, session_service=sessions, artifact_service=artifacts)
+
+        async def turn(text):
+            async for _ in runner.run_async(
+                user_id="ada", session_id=session.id,
+                new_message=genai_types.Content(role="user", parts=[genai_types.Part(text=text)]),
+            ):
+                pass
+            return set(await artifacts.list_artifact_keys(app_name="app", user_id="ada", session_id=session.id))
+
+        try:
+            await turn("Learn quantum computing")
+            first_lesson = await turn("Give me the lesson content on qubits")
+            await prefetch._prefetcher._entries[f"ada/{session.id}"].task  # Superposition, prepared in the background
+            before_served = set(await artifacts.list_artifact_keys(app_name="app", user_id="ada", session_id=session.id))
+            second_lesson = await turn("Give me the lesson content on superposition")
+        finally:
+            for entry in prefetch._prefetcher._entries.values():  # Entanglement, scheduled by the last turn
+                entry.task.cancel()
+            await tavily_pool.close()
+        return first_lesson, before_served, second_lesson
+
+    first_lesson, before_served, second_lesson = asyncio.run(main())
+    assert before_served == first_lesson
+    assert prefetch._prefetcher.stats()["hits"] == 1
+    served = {name for name in second_lesson - first_lesson if "Superposition" in name}
+    assert len(served) == 2 and sum(".thumb." in name for name in served) == 1  # The image and its preview
@@ -0,0 +1,104 @@
+import sys
+import asyncio
+from pathlib import Path
+
+from google.adk.models.llm_request import LlmRequest
+from google.genai import errors as genai_errors
+from google.genai import types as genai_types
+
+# Set up sys.path to ensure 'learning_mate' package is found when running from 'tests/'
+current_dir = Path(__file__).resolve().parent
+project_root = current_dir.parent
+sys.path.append(str(project_root / "src"))
+
+from learning_mate import prompt_cache
+from fakes import FakeLlm, LocalCacheBackend
+from learning_mate.prompt_cache import GeminiCacheBackend, PrefixCache
+
+INSTRUCTION = "# Role\nTeach one unit at a time and check understanding before moving on.\n" * 80
+ARTIFACTS = "You have a list of artifacts:\n  [\"qubit.webp\"]"
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _request(instruction: str, text: str = "Teach me qubits") -> LlmRequest:
+    return LlmRequest(
+        model="gemini-2.5-flash",
+        contents=[genai_types.Content(role="user", parts=[genai_types.Part(text=text)])],
+        config=genai_types.GenerateContentConfig(system_instruction=instruction, labels={"adk_agent_name": "teacher_agent"}),
+    )
+
+
+def _call(model: FakeLlm, request: LlmRequest) -> list:
+    async def run():
+        return [response async for response in model.generate_content_async(request)]
+    return asyncio.run(run())
+
+
+def _setup() -> tuple[Clock, LocalCacheBackend, PrefixCache, FakeLlm]:
+    clock = Clock()
+    backend = LocalCacheBackend(clock=clock)
+    cache = prompt_cache._prefix_cache = PrefixCache(ttl=3600, refresh_window=600, min_tokens=1024, clock=clock)
+    return clock, backend, cache, FakeLlm(agent_name="teacher_agent", cache_backend=backend)
+
+
+def test_static_prefix_is_cached_once_and_saves_input_tokens():
+    _, backend, cache, model = _setup()
+    first = _request(INSTRUCTION)
+    _call(model, first)
+    second = _request(INSTRUCTION + "\n\n" + ARTIFACTS, "Now superposition")
+    usage = _call(model, second)[-1].usage_metadata
+
+    assert backend.counters["created"] == 1 and model.counters["cached_calls"] == 2
+    assert usage.cached_content_token_count > usage.prompt_token_count / 2
+    assert second.config.system_instruction.endswith(ARTIFACTS)  # The request itself is not modified
+
+    stats = cache.stats()
+    assert stats["cached_calls"] == 2 and stats["created"] == 1
+    assert 0.5 < stats["saved_input_ratio"] < 1
+    assert stats["by_agent"]["teacher_agent"]["cached_tokens"] == stats["cached_tokens"]
+
+    # Too small to cache: sent in full
+    _call(model, _request("Be brief."))
+    assert cache.stats()["too_small"] == 1 and model.counters["cached_calls"] == 2
+
+
+def test_caches_are_refreshed_replaced_and_recreated():
+    clock, backend, cache, model = _setup()
+    _call(model, _request(INSTRUCTION))
+    name = next(iter(backend.caches))
+
+    clock.now += 3200  # Within the refresh window
+    _call(model, _request(INSTRUCTION))
+    assert cache.stats()["refreshed"] == 1 and backend.caches[name]["expires_at"] == clock.now + 3600
+
+    # A changed instruction gets its own cache, and the old one is deleted
+    _call(model, _request(INSTRUCTION + "Use short paragraphs.\n"))
+    assert cache.stats()["replaced"] == 1 and name not in backend.caches and len(backend.caches) == 1
+
+    # The provider dropped the cache: the call is sent in full, and the next one caches again
+    backend.caches.clear()
+    responses = _call(model, _request(INSTRUCTION + "Use short paragraphs.\n"))
+    assert responses[-1].usage_metadata.cached_content_token_count is None
+    assert cache.stats()["invalidated"] == 1
+    _call(model, _request(INSTRUCTION + "Use short paragraphs.\n"))
+    assert backend.counters["created"] == 3 and len(backend.caches) == 1
+
+
+def test_only_errors_about_the_cached_content_drop_the_cache():
+    def error(code, message, status="X"):
+        return genai_errors.ClientError(code, {"error": {"code": code, "message": message, "status": status}})
+
+    backend = GeminiCacheBackend(client=None)
+    assert backend.is_cache_error(error(403, "CachedContent not found (or permission denied)", "PERMISSION_DENIED"))
+    assert backend.is_cache_error(error(404, "Cached content cachedContents/abc is not found.", "NOT_FOUND"))
+    assert backend.is_cache_error(error(400, "Cache content 123 is expired.", "INVALID_ARGUMENT"))
+    assert not backend.is_cache_error(error(400, "Request contains an invalid argument.", "INVALID_ARGUMENT"))
+    assert not backend.is_cache_error(error(403, "Method doesn't allow unregistered callers.", "PERMISSION_DENIED"))
+    assert not backend.is_cache_error(error(429, "Quota exceeded for cached content storage.", "RESOURCE_EXHAUSTED"))
@@ -0,0 +1,72 @@
+import sys
+from pathlib import Path
+
+# Set up sys.path to ensure 'learning_mate' package is found when running from 'tests/'
+current_dir = Path(__file__).resolve().parent
+project_root = current_dir.parent
+sys.path.append(str(project_root / "src"))
+
+from learning_mate.quiz_bank import QuizBank, course_key, schedule_review
+
+PLAN = "Unit 1: Qubits\nUnit 2: Superposition\nUnit 3: Entanglement"
+DAY = 24 * 3600
+
+
+def _quiz(unit, count, difficulty="medium"):
+    return {
+        "title": f"{unit} quiz",
+        "difficulty": difficulty,
+        "questions": [
+            {"id": f"q{i}", "type": "true_false", "prompt": f"{unit} statement {i}?", "answer": ["true"], "points": 1, "concept": f"{unit} {i % 3}"}
+            for i in range(count)
+        ],
+    }
+
+
+def test_unit_quiz_is_served_from_unseen_questions_until_coverage_is_thin(tmp_path):
+    bank = QuizBank(tmp_path / "quiz_bank.sqlite", quiz_size=4, min_items=3)
+    course = course_key(PLAN)
+    assert bank.add_quiz(course, "Qubits", _quiz("Qubits", 6)) == 6
+    assert bank.add_quiz(course, "Qubits", _quiz("Qubits", 6)) == 0  # Already in the bank
+
+    quiz = bank.unit_quiz("ada", course, "qubits")
+    assert [question["id"] for question in quiz["questions"]] == ["q1", "q2", "q3", "q4"]
+    # One question per concept before repeating a concept
+    assert len({question["concept"] for question in quiz["questions"][:3]}) == 3
+
+    bank.record_results("ada", [(question, 1, 1) for question in quiz["questions"]])
+    assert bank.unit_quiz("ada", course, "Qubits") is None  # Only 2 unseen questions left
+    assert bank.unit_quiz("grace", course, "Qubits") is not None  # Another learner has seen none
+    assert bank.unit_quiz("ada", course, "Entanglement") is None
+    assert bank.unit_quiz("ada", course, "Qubits", difficulty="hard") is None
+
+
+def test_review_serves_due_questions_most_overdue_first(tmp_path):
+    bank = QuizBank(tmp_path / "quiz_bank.sqlite", quiz_size=5, min_items=2)
+    course = course_key(PLAN)
+    bank.add_quiz(course, "Qubits", _quiz("Qubits", 3))
+    questions = bank.unit_quiz("ada", course, "Qubits")["questions"]
+
+    now = 1_000_000.0
+    # Missed and answered once: both due a day later, the older answer first
+    bank.record_results("ada", [(questions[0], 0, 1)], now=now)
+    bank.record_results("ada", [(questions[1], 1, 1)], now=now - 600)
+    # Answered right twice: due six days later
+    bank.record_results("ada", [(questions[2], 1, 1)], now=now - 2 * DAY)
+    bank.record_results("ada", [(questions[2], 1, 1)], now=now)
+    assert bank.review_quiz("ada", course, now=now) is None  # Nothing is due yet
+
+    review = bank.review_quiz("ada", course, now=now + DAY + 1)
+    assert [question["prompt"] for question in review["questions"]] == [questions[1]["prompt"], questions[0]["prompt"]]
+    assert bank.stats()["review_hits"] == 1
+
+
+def test_sm2_intervals_grow_on_success_and_reset_on_failure():
+    reps, interval, ease = schedule_review(0, 0.0, 2.5, 4)
+    assert (reps, interval) == (1, 1.0)
+    reps, interval, ease = schedule_review(reps, interval, ease, 4)
+    assert (reps, interval) == (2, 6.0)
+    reps, interval, ease = schedule_review(reps, interval, ease, 4)
+    assert reps == 3 and interval == round(6.0 * ease, 2)
+    reps, interval, lowered = schedule_review(reps, interval, ease, 1)
+    assert (reps, interval) == (0, 1.0) and lowered < ease
@@ -0,0 +1,139 @@
+import sys
+import time
+import asyncio
+from pathlib import Path
+
+import pytest
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import errors as genai_errors
+from google.genai import types as genai_types
+
+# Set up sys.path to ensure 'learning_mate' package is found when running from 'tests/'
+current_dir = Path(__file__).resolve().parent
+project_root = current_dir.parent
+sys.path.append(str(project_root / "src"))
+
+from learning_mate import resilience, streaming
+from learning_mate.resilience import (
+    CircuitBreaker, CircuitOpenError, DeadlineExceededError, ResilientGemini, RetryPolicy, call_with_policy,
+    classify_error,
+)
+
+
+def _api_error(code: int, message: str) -> genai_errors.APIError:
+    return genai_errors.APIError(code, {"error": {"code": code, "message": message, "status": "X"}})
+
+
+def test_errors_are_classified_from_structured_fields():
+    assert classify_error(_api_error(429, "Quota exceeded")).kind == "rate_limited"
+    assert classify_error(_api_error(503, "Overloaded")).retryable
+    billing = classify_error(_api_error(400, "Imagen API is only accessible to billed users at this time."))
+    assert billing.kind == "billing_required" and not billing.retryable
+    assert billing.message.startswith("Imagen API")
+    assert classify_error(asyncio.TimeoutError()).kind == "timeout"
+    assert classify_error(ValueError("bad")).kind == "unknown"
+
+
+def test_breaker_opens_fails_fast_and_recovers():
+    now = [0.0]
+    breaker = CircuitBreaker("model", failure_threshold=2, reset_timeout=10, clock=lambda: now[0])
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record(_api_error(503, "Overloaded"))
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    now[0] = 11
+    breaker.before_call()  # Half-open probe
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record(None)
+    assert breaker.state == "closed"
+    assert breaker.stats()["opened"] == 1 and breaker.stats()["rejected"] == 2
+
+
+def test_retries_transient_errors_but_not_invalid_requests():
+    policy = RetryPolicy(attempts=3, initial_delay=0.001, max_delay=0.001)
+    outcomes = [_api_error(429, "slow down"), _api_error(503, "busy"), "ok"]
+
+    async def flaky():
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    assert asyncio.run(call_with_policy(flaky, policy, CircuitBreaker("a"))) == "ok"
+
+    async def invalid():
+        raise _api_error(400, "bad request")
+
+    breaker = CircuitBreaker("b")
+    with pytest.raises(genai_errors.APIError):
+        asyncio.run(call_with_policy(invalid, policy, breaker))
+    assert breaker.stats()["calls"] == 1 and breaker.state == "closed"
+
+
+def test_no_retry_past_the_turn_deadline():
+    policy = RetryPolicy(attempts=5, initial_delay=5, max_delay=5)
+
+    async def unavailable():
+        raise _api_error(503, "busy")
+
+    async def turn():
+        resilience._turn_deadline.set((time.monotonic() + 0.05, "turn"))
+        await call_with_policy(unavailable, policy, CircuitBreaker("c"))
+
+    started = time.monotonic()
+    with pytest.raises(DeadlineExceededError):
+        asyncio.run(turn())
+    assert time.monotonic() - started < 1
+
+
+def test_cancelled_half_open_probe_lets_the_next_call_probe():
+    now = [0.0]
+    breaker = CircuitBreaker("model", failure_threshold=1, reset_timeout=10, clock=lambda: now[0])
+    breaker.before_call()
+    breaker.record(_api_error(503, "Overloaded"))
+    now[0] = 11
+
+    async def main():
+        probe = asyncio.create_task(call_with_policy(lambda: asyncio.sleep(60), RetryPolicy(attempts=1), breaker))
+        await asyncio.sleep(0.01)
+        assert breaker.probing
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+
+    asyncio.run(main())
+    assert breaker.before_call()  # Probing again instead of rejecting every call
+    assert breaker.stats()["abandoned_probes"] == 1
+
+
+class FlakyRelayedGemini(ResilientGemini):
+    """Streams a chunk, then fails on the first attempt; answers on the next."""
+
+    attempts: list = []
+
+    async def _send(self, llm_request, stream, model):
+        self.attempts.append(stream)
+        yield LlmResponse(content=genai_types.Content(role="model", parts=[genai_types.Part(text="Super")]), partial=True)
+        if len(self.attempts) == 1:
+            raise _api_error(503, "busy")
+        yield LlmResponse(content=genai_types.Content(role="model", parts=[genai_types.Part(text="Superposition")]))
+
+
+def test_relayed_unary_call_keeps_its_retries():
+    model = FlakyRelayedGemini(model="relayed-test-model", policy=RetryPolicy(attempts=2, initial_delay=0.001, max_delay=0.001))
+    relayed = []
+
+    async def run():
+        streaming._partial_sink.set(lambda author, text: relayed.append(text))
+        streaming._relay_author.set("web_search_agent")
+        return [response async for response in model._generate(LlmRequest(), False, model.model)]
+
+    responses = asyncio.run(run())
+    assert model.attempts == [True, True]  # Retried: nothing had been yielded to the sub-agent yet
+    assert [response.content.parts[0].text for response in responses] == ["Superposition"]
+    assert relayed == ["Super", "Super"]
@@ -0,0 +1,116 @@
+import sys
+import asyncio
+from pathlib import Path
+
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types as genai_types
+from pydantic import BaseModel
+
+# Set up sys.path to ensure 'learning_mate' package is found when running from 'tests/'
+current_dir = Path(__file__).resolve().parent
+project_root = current_dir.parent
+sys.path.append(str(project_root / "src"))
+
+from learning_mate.routing import ModelRouter, generate_routed
+
+LITE, FLASH = "gemini-2.5-flash-lite", "gemini-2.5-flash"
+
+
+class Grade(BaseModel):
+    score: int
+    feedback: str
+
+
+def _request(text: str, agent: str, response_schema=None) -> LlmRequest:
+    return LlmRequest(
+        contents=[genai_types.Content(role="user", parts=[genai_types.Part(text=text)])],
+        config=genai_types.GenerateContentConfig(labels={"adk_agent_name": agent}, response_schema=response_schema),
+    )
+
+
+def _router() -> ModelRouter:
+    return ModelRouter(
+        tiers=[LITE, FLASH],
+        prices={LITE: (0.1, 0.4), FLASH: (0.3, 2.5)},
+        floors={"course_planning_agent": FLASH},
+    )
+
+
+def test_requests_are_routed_by_difficulty():
+    router = _router()
+    assert router.route(_request("thanks, ok next", "smart_friend"), FLASH).model == LITE
+    hard = "Explain why my proof fails and grade each step with detailed feedback. " * 8
+    assert router.route(_request(hard, "teacher_agent"), LITE).model == FLASH
+    route = router.route(_request("hi", "course_planning_agent"), FLASH)
+    assert (route.model, route.reason) == (FLASH, "floor")
+    assert router.stats()["by_agent"] == {
+        "smart_friend": {LITE: 1}, "teacher_agent": {FLASH: 1}, "course_planning_agent": {FLASH: 1},
+    }
+
+
+def test_invalid_output_is_escalated_before_anything_is_yielded():
+    router = _router()
+    calls = []
+
+    async def generate(llm_request, stream, model):
+        calls.append(model)
+        text = '{"score": 3, "feedback": "Good"}' if model == FLASH else "Score: 3"
+        yield LlmResponse(
+            content=genai_types.Content(role="model", parts=[genai_types.Part(text=text)]),
+            usage_metadata=genai_types.GenerateContentResponseUsageMetadata(prompt_token_count=1000, candidates_token_count=100),
+        )
+
+    async def run():
+        request = _request("ok thanks", "answer_evaluation_agent", response_schema=Grade)
+        return [response async for response in generate_routed(router, request, FLASH, False, generate)]
+
+    responses = asyncio.run(run())
+    assert calls == [LITE, FLASH]
+    assert [Grade.model_validate_json(response.content.parts[0].text).score for response in responses] == [3]
+
+    stats = router.stats()
+    assert stats["escalated_invalid_output"] == 1
+    assert stats["tiers"][LITE]["escalation_rate"] == 1.0
+    assert stats["tiers"][FLASH]["accepted"] == 1
+    assert stats["tiers"][FLASH]["cost_usd"] == round((1000 * 0.3 + 100 * 2.5) / 1e6, 6)
+
+
+def test_relayed_text_is_never_escalated():
+    from learning_mate.streaming import _partial_sink, _relay_author
+
+    router = _router()
+    relayed, calls = [], []
+
+    async def generate(llm_request, stream, model):
+        calls.append((model, stream))
+        yield LlmResponse(content=genai_types.Content(role="model", parts=[genai_types.Part(text="Score")]), partial=True)
+        yield LlmResponse(content=genai_types.Content(role="model", parts=[genai_types.Part(text="Score: 3")]))
+
+    async def run():
+        _partial_sink.set(lambda author, text: relayed.append((author, text)))
+        _relay_author.set("answer_evaluation_agent")
+        request = _request("ok thanks", "answer_evaluation_agent", response_schema=Grade)
+        return [response async for response in generate_routed(router, request, FLASH, False, generate)]
+
+    responses = asyncio.run(run())
+    # The learner already saw "Score", so the invalid output is returned instead of retried on flash
+    assert calls == [(LITE, True)]
+    assert relayed == [("answer_evaluation_agent", "Score")]
+    assert [response.content.parts[0].text for response in responses] == ["Score: 3"]
+    assert router.stats()["tiers"][LITE]["rejected"] == 1
+    assert "escalated_invalid_output" not in router.stats()
+
+
+def test_classifier_learns_both_labels_from_a_bounded_window():
+    router = ModelRouter(tiers=[LITE, FLASH], prices={}, floors={})
+    router.classifier = type(router.classifier)({"easy": ["hi"], "hard": ["explain why"]}, max_learned=3)
+
+    router.confirm(_request("show me the next flashcard", "smart_friend"), LITE)
+    router.confirm(_request("show me the next flashcard", "smart_friend"), FLASH)  # Not the cheapest tier
+    assert router.classifier._counts == {"easy": 2, "hard": 1}
+
+    for number in range(10):
+        router.escalate(_request(f"derive the formula number {number}", "teacher_agent"), LITE, "invalid_output")
+    assert router.classifier._counts == {"easy": 2, "hard": 4}  # One seed and the latest three
+    assert len(router.classifier._learned["hard"]) == 3
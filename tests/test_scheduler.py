@@ -0,0 +1,77 @@
+import sys
+import asyncio
+import threading
+from pathlib import Path
+
+# Set up sys.path to ensure 'learning_mate' package is found when running from 'tests/'
+current_dir = Path(__file__).resolve().parent
+project_root = current_dir.parent
+sys.path.append(str(project_root / "src"))
+
+from learning_mate.scheduler import (
+    BACKGROUND, INTERACTIVE, STANDARD, RequestScheduler, SharedTokenBucket, TokenBucket, parse_rate_limits,
+)
+
+
+def test_rate_limits_are_parsed_and_matched_by_longest_prefix():
+    limits = parse_rate_limits("gemini-2.5-flash=10, gemini-2.5-flash-lite=15:3")
+    assert limits == {"gemini-2.5-flash": (10.0, 5), "gemini-2.5-flash-lite": (15.0, 3)}
+    scheduler = RequestScheduler(limits)
+    assert scheduler._lane("gemini-2.5-flash-lite").name == "gemini-2.5-flash-lite"
+    assert scheduler._lane("gemini-2.5-flash").name == "gemini-2.5-flash"
+    assert scheduler._lane("gemini-2.5-pro") is None
+
+
+def test_bucket_never_exceeds_the_per_minute_quota():
+    now = [0.0]
+    bucket = TokenBucket(12, burst=2, clock=lambda: now[0])
+    granted = 0
+    for _ in range(600):  # One minute in 0.1 s steps
+        granted += bucket.try_take()
+        now[0] += 0.1
+    assert granted <= 12
+
+
+def test_interactive_requests_jump_the_queue():
+    scheduler = RequestScheduler({"model": (600, 1)})  # About one slot every 0.1 s
+    order = []
+
+    async def request(name, priority):
+        await scheduler.acquire("model", priority)
+        order.append(name)
+
+    async def main():
+        await scheduler.acquire("model", STANDARD)  # Uses the only burst token
+        background = [asyncio.create_task(request(f"image{i}", BACKGROUND)) for i in range(2)]
+        await asyncio.sleep(0)
+        tutor = asyncio.create_task(request("tutor", INTERACTIVE))
+        await asyncio.gather(*background, tutor)
+
+    asyncio.run(main())
+    assert order[0] == "tutor"
+    stats = scheduler.stats()["model"]
+    assert stats["granted"] == 4 and stats["max_queue_depth"] == 3 and stats["queue_depth"] == 0
+    assert stats["wait"]["background"]["count"] == 2
+
+
+def test_shared_bucket_is_updated_off_the_event_loop(tmp_path, monkeypatch):
+    threads = []
+    update = SharedTokenBucket._update
+
+    def recording_update(self, change):
+        threads.append(threading.current_thread())
+        return update(self, change)
+
+    monkeypatch.setattr(SharedTokenBucket, "_update", recording_update)
+    scheduler = RequestScheduler({"model": (600, 1)}, store=tmp_path / "rate_limits.sqlite")
+
+    async def main():
+        await scheduler.acquire("model")
+        await scheduler.penalize("model")
+        await scheduler.acquire("model")  # Queued until the drained bucket refills
+
+    asyncio.run(main())
+    assert len(threads) >= 4
+    assert threading.main_thread() not in threads
+    stats = scheduler.stats()["model"]
+    assert stats["granted"] == 2 and stats["throttled"] == 1 and stats["queued"] == 1
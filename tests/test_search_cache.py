@@ -0,0 +1,181 @@
+import sys
+import asyncio
+from pathlib import Path
+
+from google.adk.agents import Agent
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_response import LlmResponse
+from google.adk.runners import InMemoryRunner
+from google.adk.tools import AgentTool
+from google.genai import types as genai_types
+from mcp import StdioServerParameters
+
+# Set up sys.path to ensure 'learning_mate' package is found when running from 'tests/'
+current_dir = Path(__file__).resolve().parent
+project_root = current_dir.parent
+sys.path.append(str(project_root / "src"))
+
+from learning_mate.mcp_pool import McpSessionPool, PooledMcpToolset
+from learning_mate.search_cache import SearchCache, make_search_key
+from fakes import FakeLlm
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_fetch(results):
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        return {"content": [{"type": "text", "text": results[len(calls) - 1]}]}
+
+    return fetch, calls
+
+
+def test_key_normalizes_query():
+    assert make_search_key("tavily-search", {"query": "Latest  Quantum\nError Correction"}) == \
+        make_search_key("tavily-search", {"query": "latest quantum error correction"})
+
+
+def test_time_sensitive_queries_get_short_ttl(tmp_path):
+    cache = SearchCache(tmp_path / "cache.sqlite", default_ttl=100, fresh_ttl=10)
+    assert cache.ttl_for(make_search_key("s", {"query": "latest qubit research"})) == 10
+    assert cache.ttl_for(make_search_key("s", {"query": "what is a qubit"})) == 100
+
+
+def test_entries_expire_after_ttl(tmp_path):
+    clock = FakeClock()
+    cache = SearchCache(tmp_path / "cache.sqlite", default_ttl=100, clock=clock)
+    fetch, calls = make_fetch(["first", "second"])
+
+    async def main():
+        await cache.get_or_fetch("k", fetch)
+        await cache.get_or_fetch("k", fetch)
+        clock.now += 101
+        return await cache.get_or_fetch("k", fetch)
+
+    result = asyncio.run(main())
+    assert len(calls) == 2
+    assert result["content"][0]["text"] == "second"
+    assert cache.stats()["hits"] == 1
+
+
+def test_stale_while_revalidate_serves_then_refreshes(tmp_path):
+    clock = FakeClock()
+    cache = SearchCache(
+        tmp_path / "cache.sqlite", default_ttl=100, stale_while_revalidate=True, stale_ttl=100, clock=clock
+    )
+    fetch, calls = make_fetch(["old", "new"])
+
+    async def main():
+        await cache.get_or_fetch("k", fetch)
+        clock.now += 150
+        stale = await cache.get_or_fetch("k", fetch)
+        await asyncio.sleep(0.1)  # let the background refresh finish
+        fresh = await cache.get_or_fetch("k", fetch)
+        return stale, fresh
+
+    stale, fresh = asyncio.run(main())
+    assert stale["content"][0]["text"] == "old"
+    assert fresh["content"][0]["text"] == "new"
+    assert cache.stats()["refreshes"] == 1
+
+
+def test_cancelled_searcher_does_not_cancel_the_shared_search(tmp_path):
+    cache = SearchCache(tmp_path / "cache.sqlite", default_ttl=100)
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"content": [{"type": "text", "text": "result"}]}
+
+    async def main():
+        first = asyncio.create_task(cache.get_or_fetch("k", fetch))
+        await asyncio.sleep(0.01)
+        second = asyncio.create_task(cache.get_or_fetch("k", fetch))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        result = await second
+        assert first.cancelled()
+        return result
+
+    assert asyncio.run(main())["content"][0]["text"] == "result"
+    assert len(calls) == 1
+    assert cache.stats()["coalesced"] == 1
+    assert cache.get("k") is not None
+
+
+def test_eviction_respects_entry_limit(tmp_path):
+    cache = SearchCache(tmp_path / "cache.sqlite", max_entries=2)
+    for i in range(3):
+        cache.put(f"k{i}", {"n": i})
+    assert cache.get("k0") is None
+    assert cache.get("k2") is not None
+
+
+def test_toolset_serves_repeated_searches_from_cache(tmp_path):
+    server = StdioServerParameters(command=sys.executable, args=[str(current_dir / "fake_tavily_server.py")])
+    pool = McpSessionPool(server, size=1)
+    toolset = PooledMcpToolset(pool, cache=SearchCache(tmp_path / "cache.sqlite"))
+
+    async def main():
+        try:
+            (tool,) = await toolset.get_tools()
+            first = await tool.run_async(args={"query": "Bloch sphere"}, tool_context=None)
+            second = await tool.run_async(args={"query": "bloch  SPHERE"}, tool_context=None)
+            return first, second
+        finally:
+            await pool.close()
+
+    first, second = asyncio.run(main())
+    assert first == second
+    assert pool.stats()["calls"] == 2  # list_tools + one search
+    assert toolset.cache.stats()["hits"] == 1
+
+
+class CallsWebSearch(BaseLlm):
+    """Calls the web search agent, then answers once it has returned."""
+
+    model: str = "calls-web-search"
+
+    async def generate_content_async(self, llm_request, stream=False):
+        if any(part.function_response for part in llm_request.contents[-1].parts or []):
+            yield LlmResponse(content=genai_types.Content(role="model", parts=[genai_types.Part(text="Done.")]))
+        else:
+            yield LlmResponse(content=genai_types.Content(role="model", parts=[genai_types.Part(
+                function_call=genai_types.FunctionCall(name="web_search_agent", args={"request": "Bloch sphere"}),
+            )]))
+
+
+def test_pool_stays_warm_across_agent_tool_runs():
+    server = StdioServerParameters(command=sys.executable, args=[str(current_dir / "fake_tavily_server.py")])
+    pool = McpSessionPool(server, size=1)
+    web_search_agent = Agent(name="web_search_agent", model=FakeLlm(agent_name="web_search_agent"), tools=[PooledMcpToolset(pool)])
+    teacher = Agent(name="teacher", model=CallsWebSearch(), tools=[AgentTool(web_search_agent)])
+    runner = InMemoryRunner(agent=teacher, app_name="search")
+
+    async def main():
+        session = await runner.session_service.create_session(app_name="search", user_id="ada")
+        try:
+            for _ in range(2):
+                async for _ in runner.run_async(
+                    user_id="ada", session_id=session.id,
+                    new_message=genai_types.Content(role="user", parts=[genai_types.Part(text="Teach me the Bloch sphere")]),
+                ):
+                    pass
+                # AgentTool closes the sub-agent's runner after each run; the shared pool must survive it
+                assert pool.started
+        finally:
+            await pool.close()
+
+    asyncio.run(main())
+    stats = pool.stats()
+    assert stats["spawns"] == 1 and stats.get("respawns", 0) == 0
+    assert stats["calls"] == 3  # list_tools once, then one search per run
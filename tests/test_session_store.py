@@ -0,0 +1,117 @@
+import sys
+import time
+import asyncio
+import threading
+from pathlib import Path
+
+import pytest
+from google.adk.errors import StaleSessionError
+from google.adk.events import Event, EventActions
+from google.adk.sessions.base_session_service import GetSessionConfig
+
+# Set up sys.path to ensure 'learning_mate' package is found when running from 'tests/'
+current_dir = Path(__file__).resolve().parent
+project_root = current_dir.parent
+sys.path.append(str(project_root / "src"))
+
+from learning_mate.session_store import TunedSqliteSessionService, _ConnectionPool
+
+
+def _event(index, **state_delta):
+    return Event(
+        invocation_id=f"inv{index}", author="user", timestamp=time.time() + index,
+        actions=EventActions(state_delta=state_delta),
+    )
+
+
+def test_events_are_buffered_and_committed_once_per_flush(tmp_path):
+    path = tmp_path / "sessions.sqlite"
+
+    async def main():
+        service = TunedSqliteSessionService(path, flush_seconds=60)
+        session = await service.create_session(app_name="app", user_id="ada", state={"course_plan": "Unit 1: Qubits"})
+        for index in range(5):
+            await service.append_event(session, _event(index, step=index, **{"user:level": "beginner", "temp:scratch": 1}))
+        assert service.stats()["pending"] == 5
+        await service.flush()
+        stats = service.stats()
+        assert (stats["commits"], stats["committed_events"], stats["pending"]) == (1, 5, 0)
+
+        # A fresh service reads back the merged state, without temp keys
+        reopened = TunedSqliteSessionService(path)
+        loaded = await reopened.get_session(app_name="app", user_id="ada", session_id=session.id)
+        assert [event.invocation_id for event in loaded.events] == [f"inv{index}" for index in range(5)]
+        assert loaded.state == {"course_plan": "Unit 1: Qubits", "step": 4, "user:level": "beginner"}
+        assert await reopened.get_user_state(app_name="app", user_id="ada") == {"level": "beginner"}
+
+        recent = await reopened.get_session(
+            app_name="app", user_id="ada", session_id=session.id, config=GetSessionConfig(num_recent_events=2),
+        )
+        assert [event.invocation_id for event in recent.events] == ["inv3", "inv4"]
+
+    asyncio.run(main())
+
+
+def test_reads_see_pending_events_and_delete_removes_everything(tmp_path):
+    async def main():
+        service = TunedSqliteSessionService(tmp_path / "sessions.sqlite", flush_seconds=60)
+        session = await service.create_session(app_name="app", user_id="ada", session_id="s1")
+        await service.append_event(session, _event(0, topic="qubits"))
+
+        loaded = await service.get_session(app_name="app", user_id="ada", session_id="s1")
+        assert loaded.state["topic"] == "qubits" and len(loaded.events) == 1
+        assert [s.id for s in (await service.list_sessions(app_name="app", user_id="ada")).sessions] == ["s1"]
+
+        await service.delete_session(app_name="app", user_id="ada", session_id="s1")
+        assert await service.get_session(app_name="app", user_id="ada", session_id="s1") is None
+        assert (await service.list_sessions(app_name="app", user_id="ada")).sessions == []
+
+    asyncio.run(main())
+
+
+def test_appends_from_a_stale_copy_are_rejected(tmp_path):
+    path = tmp_path / "sessions.sqlite"
+
+    async def main():
+        service = TunedSqliteSessionService(path, flush_seconds=60)
+        other_worker = TunedSqliteSessionService(path, flush_seconds=60)
+        await service.create_session(app_name="app", user_id="ada", session_id="s1")
+        first = await service.get_session(app_name="app", user_id="ada", session_id="s1")
+        second = await service.get_session(app_name="app", user_id="ada", session_id="s1")
+        elsewhere = await other_worker.get_session(app_name="app", user_id="ada", session_id="s1")
+
+        await service.append_event(first, _event(0, topic="qubits"))
+        await service.append_event(first, _event(1, topic="gates"))  # The writer's own copy stays current
+        with pytest.raises(StaleSessionError):
+            await service.append_event(second, _event(2, topic="entanglement"))  # Rejected while still buffered
+
+        await service.flush()
+        with pytest.raises(StaleSessionError):
+            await other_worker.append_event(elsewhere, _event(3, topic="entanglement"))
+
+        loaded = await other_worker.get_session(app_name="app", user_id="ada", session_id="s1")
+        assert [event.invocation_id for event in loaded.events] == ["inv0", "inv1"]
+        assert loaded.state["topic"] == "gates"
+        assert service.stats()["stale_rejected"] == other_worker.stats()["stale_rejected"] == 1
+        await other_worker.append_event(loaded, _event(4, topic="entanglement"))  # A fresh copy is accepted
+
+    asyncio.run(main())
+
+
+def test_pool_never_opens_more_connections_than_its_size(tmp_path):
+    pool = _ConnectionPool(tmp_path / "sessions.sqlite", size=2)
+    start = threading.Barrier(16)
+
+    def use():
+        start.wait()
+        with pool.connection() as conn:
+            conn.execute("SELECT count(*) FROM sessions").fetchone()
+            time.sleep(0.01)
+
+    threads = [threading.Thread(target=use) for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert pool._opened == pool._idle.qsize() == 2
+    pool.close()
@@ -0,0 +1,36 @@
+import os
+import sys
+import asyncio
+import subprocess
+from pathlib import Path
+
+import pytest
+from google.adk.models.llm_request import LlmRequest
+
+# Set up sys.path to ensure 'learning_mate' package is found when running from 'tests/'
+current_dir = Path(__file__).resolve().parent
+project_root = current_dir.parent
+sys.path.append(str(project_root / "src"))
+
+from learning_mate.resilience import ResilientGemini
+
+
+def test_agent_imports_without_api_keys_or_the_mcp_stack():
+    env = {key: value for key, value in os.environ.items() if key not in ("GOOGLE_API_KEY", "TAVILY_API_KEY")}
+    env["PYTHONPATH"] = str(project_root / "src")
+    script = "import sys, learning_mate.agent as agent; print(agent.app.name, 'mcp' in sys.modules)"
+    result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, env=env, cwd=project_root)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.split() == ["learning_mate", "False"]
+
+
+def test_missing_google_api_key_is_reported_on_first_model_call(monkeypatch):
+    monkeypatch.delenv("GOOGLE_API_KEY", raising=False)
+    model = ResilientGemini(model="gemini-2.5-flash")
+
+    async def main():
+        async for _ in model.generate_content_async(LlmRequest()):
+            pass
+
+    with pytest.raises(RuntimeError, match="GOOGLE_API_KEY not found"):
+        asyncio.run(main())
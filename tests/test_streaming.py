@@ -0,0 +1,97 @@
+import sys
+import asyncio
+from pathlib import Path
+
+from google.adk.agents.run_config import RunConfig, StreamingMode
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types as genai_types
+
+# Set up sys.path to ensure 'learning_mate' package is found when running from 'tests/'
+current_dir = Path(__file__).resolve().parent
+project_root = current_dir.parent
+sys.path.append(str(project_root / "src"))
+
+from fakes import FAKE_QUIZ, FakeLlm, install_offline_backends
+from learning_mate.lesson_assembly import assemble_lesson
+from learning_mate.streaming import RelayingAgent, StreamingAgentTool
+from learning_mate.sub_agents import course_planning_agent, image_generation_agent, quiz_generation_agent, web_search_agent
+from learning_mate.sub_agents.web_search_agent import tavily_pool
+
+
+def _teacher() -> RelayingAgent:
+    course_planning_agent.model = FakeLlm(agent_name="course_planning_agent", latency=0.05)
+    quiz_generation_agent.model = FakeLlm(agent_name="quiz_generation_agent", latency=0.05)
+    return RelayingAgent(
+        name="teacher_agent",
+        model=FakeLlm(agent_name="teacher_agent"),
+        instruction="Teach.",
+        tools=[StreamingAgentTool(course_planning_agent), StreamingAgentTool(quiz_generation_agent, relay=True)],
+    )
+
+
+async def _turns(agent, queries: list[str], mode: StreamingMode) -> tuple[list[list], object]:
+    session_service = InMemorySessionService()
+    session = await session_service.create_session(app_name="app", user_id="ada")
+    runner = Runner(app_name="app", agent=agent, session_service=session_service)
+    turns = []
+    for query in queries:
+        turns.append([event async for event in runner.run_async(
+            user_id="ada",
+            session_id=session.id,
+            new_message=genai_types.Content(role="user", parts=[genai_types.Part(text=query)]),
+            run_config=RunConfig(streaming_mode=mode),
+        )])
+    return turns, await session_service.get_session(app_name="app", user_id="ada", session_id=session.id)
+
+
+def test_sub_agent_output_is_relayed_while_the_tool_runs(tmp_path):
+    install_offline_backends(tmp_path, current_dir / "fake_tavily_server.py")
+    turns, session = asyncio.run(_turns(_teacher(), ["Learn quantum computing", "I finished unit 1"], StreamingMode.SSE))
+
+    plan_turn = turns[0]
+    chunks = [event for event in plan_turn if event.partial and event.author == "course_planning_agent"]
+    response_index = next(i for i, event in enumerate(plan_turn) if event.get_function_responses())
+    assert len(chunks) > 1
+    assert max(plan_turn.index(chunk) for chunk in chunks) < response_index  # Before the tool returned
+    plan = "".join(chunk.content.parts[0].text for chunk in chunks)
+    assert plan == session.state["course_plan"]
+
+    # A relayed structured output still reaches the teacher parsed against its schema
+    quiz_turn = turns[1]
+    assert any(event.partial and event.author == "quiz_generation_agent" for event in quiz_turn)
+    quiz = next(event for event in quiz_turn if event.get_function_responses()).get_function_responses()[0].response
+    assert [question["id"] for question in quiz["questions"]] == [question["id"] for question in FAKE_QUIZ["questions"]]
+    assert session.state["current_quiz"]["title"] == FAKE_QUIZ["title"]
+
+    assert not any(event.partial for event in session.events)  # Chunks are never stored
+
+
+def test_nothing_is_relayed_without_streaming(tmp_path):
+    install_offline_backends(tmp_path, current_dir / "fake_tavily_server.py")
+    turns, session = asyncio.run(_turns(_teacher(), ["Learn quantum computing"], StreamingMode.NONE))
+    assert not any(event.partial for event in turns[0])
+    assert session.state["course_plan"].startswith("# Course Plan")
+    assert course_planning_agent.model.counters["streamed"] == 0
+
+
+def test_lesson_research_is_relayed_from_the_assembled_lesson(tmp_path):
+    install_offline_backends(tmp_path, current_dir / "fake_tavily_server.py")
+    for agent in (image_generation_agent, web_search_agent):
+        agent.model = FakeLlm(agent_name=agent.name)
+    teacher = _teacher()
+    teacher.tools.append(assemble_lesson)
+
+    async def run():
+        try:
+            return await _turns(teacher, ["Learn quantum computing", "Give me the lesson content on qubits"], StreamingMode.SSE)
+        finally:
+            await tavily_pool.close()
+
+    turns, _ = asyncio.run(run())
+    lesson_turn = turns[1]
+    research = [event for event in lesson_turn if event.partial and event.author == "web_search_agent"]
+    response_index = next(i for i, event in enumerate(lesson_turn) if event.get_function_responses())
+    assert research and max(lesson_turn.index(chunk) for chunk in research) < response_index
+    assert "".join(chunk.content.parts[0].text for chunk in research).startswith("## Findings")
+    assert not any(event.partial and event.author == "image_generation_agent" for event in lesson_turn)
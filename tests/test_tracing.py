@@ -0,0 +1,67 @@
+import sys
+import json
+import asyncio
+from pathlib import Path
+
+from google.adk.agents import Agent
+from google.adk.apps import App
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.adk.tools import AgentTool
+from google.genai import types as genai_types
+
+# Set up sys.path to ensure 'learning_mate' package is found when running from 'tests/'
+current_dir = Path(__file__).resolve().parent
+project_root = current_dir.parent
+sys.path.append(str(project_root / "src"))
+
+from fakes import FakeLlm
+from learning_mate.tracing import TraceWriter, TracingPlugin, load_spans, summarize_traces
+
+
+async def _run_turn(trace_path: Path) -> None:
+    planner = Agent(name="course_planning_agent", model=FakeLlm(agent_name="course_planning_agent"), instruction="Plan.")
+    teacher = Agent(
+        name="teacher_agent",
+        model=FakeLlm(agent_name="teacher_agent"),
+        instruction="Teach.",
+        tools=[AgentTool(planner)],
+    )
+    session_service = InMemorySessionService()
+    await session_service.create_session(app_name="traced", user_id="u", session_id="s1")
+    runner = Runner(
+        app=App(name="traced", root_agent=teacher, plugins=[TracingPlugin(trace_path)]),
+        session_service=session_service,
+    )
+    async for _ in runner.run_async(
+        user_id="u",
+        session_id="s1",
+        new_message=genai_types.Content(role="user", parts=[genai_types.Part.from_text(text="Learn Rust")]),
+    ):
+        pass
+    await runner.close()  # Waits for the trace file to be written
+
+
+def test_spans_nest_through_agent_tools(tmp_path):
+    trace_path = tmp_path / "traces.jsonl"
+    asyncio.run(_run_turn(trace_path))
+
+    spans = load_spans(trace_path, session_id="s1")
+    names = {span["name"] for span in spans}
+    assert {"teacher_agent", "tool:course_planning_agent", "course_planning_agent"} <= names
+    assert len({span["trace_id"] for span in spans}) == 1
+
+    paths = {row["path"]: row for row in summarize_traces(trace_path, top=50)}
+    planner_model = paths["teacher_agent > tool:course_planning_agent > course_planning_agent > model:fake-gemini"]
+    assert planner_model["calls"] == 1 and planner_model["output_tokens"] > 0
+
+
+def test_trace_file_is_written_in_the_background_and_rotated(tmp_path):
+    writer = TraceWriter(tmp_path / "traces.jsonl", max_bytes=200)
+    for number in range(5):
+        writer.write({"resourceSpans": [], "padding": "x" * 80, "number": number})
+    writer.flush()
+
+    assert writer.stats() == {"written": 5, "dropped": 0, "rotations": 2, "pending": 0}
+    assert [json.loads(line)["number"] for line in (tmp_path / "traces.jsonl").read_text().splitlines()] == [4]
+    assert [json.loads(line)["number"] for line in (tmp_path / "traces.jsonl.1").read_text().splitlines()] == [2, 3]
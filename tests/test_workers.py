@@ -0,0 +1,110 @@
+import sys
+import json
+import time
+import asyncio
+import multiprocessing
+from collections import Counter
+from pathlib import Path
+
+from google.adk.artifacts.file_artifact_service import FileArtifactService
+from google.adk.events import Event
+from google.genai import types as genai_types
+
+# Set up sys.path to ensure 'learning_mate' package is found when running from 'tests/'
+current_dir = Path(__file__).resolve().parent
+project_root = current_dir.parent
+sys.path.append(str(project_root / "src"))
+
+from learning_mate.local_memory import LocalMemoryService
+from learning_mate.scheduler import SharedTokenBucket
+from learning_mate.workers import WorkerPool, routing_key
+
+
+def test_requests_stick_to_their_session_worker(tmp_path):
+    assert routing_key("/apps/learning_mate/users/ada/sessions/s1/events", b"") == "s1"
+    assert routing_key("/run_sse", json.dumps({"app_name": "learning_mate", "user_id": "ada", "session_id": "s2"}).encode()) == "s2"
+    assert routing_key("/apps/learning_mate/users/ada/sessions", b"") == "user:ada"
+    assert routing_key("/list-apps", b"") is None
+
+    pool = WorkerPool(4, 9001, command=lambda port: [])
+    for worker in pool.workers:
+        worker.ready = True
+    sessions = [f"session-{number}" for number in range(400)]
+    before = {session: pool.pick(session).name for session in sessions}
+    assert before == {session: pool.pick(session).name for session in sessions}
+    assert min(Counter(before.values()).values()) > 60  # Spread over every worker
+
+    # A worker going down only moves its own sessions
+    pool.workers[1].ready = False
+    after = {session: pool.pick(session).name for session in sessions}
+    assert {session for session in sessions if before[session] != after[session]} == {
+        session for session in sessions if before[session] == "worker-1"
+    }
+
+    # Requests without a session go to the least busy worker
+    pool.workers[0].in_flight = 3
+    assert pool.pick(None).name == "worker-2"
+
+    # The workers draw from one quota, each with the model's full burst
+    now = [0.0]
+    buckets = [SharedTokenBucket(tmp_path / "rate_limits.sqlite", "gemini-2.5-flash", 10, 5, clock=lambda: now[0]) for _ in range(2)]
+    assert [buckets[1].try_take()] + [buckets[0].try_take() for _ in range(5)] == [True] * 5 + [False]
+    granted = 5
+    for step in range(599):  # The rest of the minute in 0.1 s steps
+        now[0] += 0.1
+        granted += buckets[step % 2].try_take()
+    assert granted <= 10
+
+
+def _save_artifacts(root: str, worker: int, count: int) -> list[int]:
+    service = FileArtifactService(root)
+
+    async def save():
+        return [
+            await service.save_artifact(
+                app_name="learning_mate", user_id="ada", session_id="s1", filename="qubit.txt",
+                artifact=genai_types.Part(text=f"worker {worker} copy {number}"),
+            )
+            for number in range(count)
+        ]
+    return asyncio.run(save())
+
+
+def test_artifact_versions_are_unique_across_processes(tmp_path):
+    with multiprocessing.get_context("spawn").Pool(3) as processes:
+        saved = processes.starmap(_save_artifacts, [(str(tmp_path), worker, 10) for worker in range(3)])
+
+    versions = sorted(version for worker in saved for version in worker)
+    assert versions == list(range(30))
+
+    service = FileArtifactService(tmp_path)
+
+    async def load():
+        return [
+            (await service.load_artifact(
+                app_name="learning_mate", user_id="ada", session_id="s1", filename="qubit.txt", version=version,
+            )).text
+            for version in versions
+        ]
+    texts = asyncio.run(load())
+    assert sorted(texts) == sorted(f"worker {worker} copy {number}" for worker in range(3) for number in range(10))
+
+
+def test_memory_index_sees_passages_stored_by_other_workers(tmp_path):
+    first, second = LocalMemoryService(tmp_path / "memory.sqlite"), LocalMemoryService(tmp_path / "memory.sqlite")
+    now = time.time()
+
+    def event(text, timestamp):
+        return Event(
+            invocation_id="inv", author="user", timestamp=timestamp,
+            content=genai_types.Content(role="user", parts=[genai_types.Part(text=text)]),
+        )
+
+    first.ingest("learning_mate", "ada", "s1", [event("I prefer short lessons with diagrams.", now)])
+    assert second.search("learning_mate", "ada", "short lessons with diagrams")  # Loads the index
+
+    # Stored by the other worker after this one loaded its index
+    first.ingest("learning_mate", "ada", "s2", [event("Entanglement links the states of two qubits.", now + 1)])
+    results = second.search("learning_mate", "ada", "entanglement of two qubits")
+    assert results[0][1]["session_id"] == "s2"
+    assert second.stats()["indexed_passages"] == 2